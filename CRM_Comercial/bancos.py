@@ -0,0 +1,110 @@
+"""
+Perfis de banco de dados escolhidos por variável de ambiente (CRM_BANCO).
+
+- sqlite (padrão): arquivo local em modo WAL. Leituras (dashboards) não esperam
+  as gravações (HTMX) e vice-versa; synchronous=NORMAL, cache e mmap maiores e
+  transações IMMEDIATE, que pegam o lock de escrita no início em vez de falhar
+  com "database is locked" no meio da transação.
+- postgres: conexões persistentes (CONN_MAX_AGE) com verificação de saúde
+  antes de reaproveitar. O driver do requirements.txt é o psycopg2, sem pool
+  nativo no Django: para pool de verdade entre processos, aponte CRM_PG_HOST
+  para um PgBouncer.
+
+Variáveis (todas opcionais):
+  CRM_BANCO            sqlite | postgres
+  CRM_SQLITE_ARQUIVO   caminho do arquivo (padrão: <projeto>/db.sqlite3)
+  CRM_SQLITE_CACHE_MB  cache de páginas por conexão (padrão 64)
+  CRM_SQLITE_MMAP_MB   leitura por memory-map (padrão 256)
+  CRM_PG_NOME, CRM_PG_USUARIO, CRM_PG_SENHA, CRM_PG_HOST, CRM_PG_PORTA
+  CRM_PG_CONN_MAX_AGE  segundos que a conexão fica aberta (padrão 600)
+  CRM_PG_SSLMODE       ex.: require
+
+Réplica de leitura (opcional, alias "replica"; ver app/replica.py):
+  CRM_SQLITE_REPLICA   caminho de uma cópia do arquivo (ex.: manage.py copiar_replica)
+  CRM_PG_REPLICA_HOST, CRM_PG_REPLICA_PORTA  servidor em hot standby; demais dados iguais ao primário
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+
+def _inteiro(ambiente, nome, padrao):
+    valor = ambiente.get(nome)
+    if valor in (None, ''):
+        return padrao
+    try:
+        return int(valor)
+    except ValueError:
+        raise ImproperlyConfigured(f'{nome} deve ser um número inteiro (recebido: {valor!r}).')
+
+
+def sqlite(ambiente, base_dir):
+    cache_mb = _inteiro(ambiente, 'CRM_SQLITE_CACHE_MB', 64)
+    mmap_mb = _inteiro(ambiente, 'CRM_SQLITE_MMAP_MB', 256)
+    pragmas = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',  # seguro com WAL: só o último commit pode se perder numa queda de energia
+        f'PRAGMA cache_size=-{cache_mb * 1024}',  # negativo = KiB
+        f'PRAGMA mmap_size={mmap_mb * 1024 * 1024}',
+        'PRAGMA temp_store=MEMORY',
+    ]
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ambiente.get('CRM_SQLITE_ARQUIVO') or base_dir / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(pragmas),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,  # segundos esperando o lock de escrita antes de desistir
+        },
+        # Testes em arquivo, não em memória: os de concorrência abrem uma conexão por thread
+        'TEST': {'NAME': str(base_dir / 'test_db.sqlite3')},
+    }
+
+
+def postgres(ambiente, base_dir):
+    opcoes = {'connect_timeout': 5}
+    if ambiente.get('CRM_PG_SSLMODE'):
+        opcoes['sslmode'] = ambiente['CRM_PG_SSLMODE']
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': ambiente.get('CRM_PG_NOME', 'crm_comercial'),
+        'USER': ambiente.get('CRM_PG_USUARIO', 'postgres'),
+        'PASSWORD': ambiente.get('CRM_PG_SENHA', ''),
+        'HOST': ambiente.get('CRM_PG_HOST', 'localhost'),
+        'PORT': ambiente.get('CRM_PG_PORTA', '5432'),
+        'CONN_MAX_AGE': _inteiro(ambiente, 'CRM_PG_CONN_MAX_AGE', 600),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': opcoes,
+    }
+
+
+PERFIS = {'sqlite': sqlite, 'postgres': postgres}
+
+
+def replica(ambiente, principal):
+    """ Entrada da réplica de leitura, ou None se não configurada. """
+    config = dict(principal, OPTIONS=dict(principal['OPTIONS']), TEST={'MIRROR': 'default'})
+    if principal['ENGINE'].endswith('sqlite3') and ambiente.get('CRM_SQLITE_REPLICA'):
+        config['NAME'] = ambiente['CRM_SQLITE_REPLICA']
+    elif principal['ENGINE'].endswith('postgresql') and ambiente.get('CRM_PG_REPLICA_HOST'):
+        config['HOST'] = ambiente['CRM_PG_REPLICA_HOST']
+        config['PORT'] = ambiente.get('CRM_PG_REPLICA_PORTA', principal['PORT'])
+    else:
+        return None
+    return config
+
+
+def configuracao(ambiente, base_dir):
+    """ Entrada de DATABASES para o perfil de CRM_BANCO. """
+    perfil = ambiente.get('CRM_BANCO', 'sqlite').strip().lower()
+    if perfil not in PERFIS:
+        raise ImproperlyConfigured(f'CRM_BANCO deve ser um de {", ".join(PERFIS)} (recebido: {perfil!r}).')
+    return PERFIS[perfil](ambiente, base_dir)
+
+
+def bancos(ambiente, base_dir):
+    """ DATABASES completo: "default" e, se configurada, a "replica". """
+    principal = configuracao(ambiente, base_dir)
+    databases = {'default': principal}
+    config_replica = replica(ambiente, principal)
+    if config_replica:
+        databases['replica'] = config_replica
+    return databases
@@ -1,12 +1,9 @@
-import locale
 from pathlib import Path
 import os
 
-# Força o locale para Português do Brasil para que os meses e números apareçam corretamente
-try:
-    locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-except locale.Error:
-    locale.setlocale(locale.LC_ALL, 'portuguese')
+from . import bancos
+
+# O locale pt_BR (nomes de meses, números) é aplicado em app/apps.py, no ready()
 
 
 """
@@ -35,10 +32,18 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Estáticos com hash e pré-comprimidos (.br/.gz), antes de sessão/autenticação (app/estaticos.py)
+    'app.estaticos.ServirEstaticos',
+    # Brotli/gzip dinâmico para HTML, parciais HTMX e JSON da API (app/compressao.py)
+    'app.compressao.CompressaoMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Escritas repetidas pela fila offline do PWA não são gravadas duas vezes (app/idempotencia.py)
+    'app.idempotencia.IdempotenciaMiddleware',
+    # Marca quem acabou de gravar para não ler da réplica atrasada (app/replica.py)
+    'app.replica.AderenciaReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django_htmx.middleware.HtmxMiddleware',
@@ -64,12 +69,20 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'CRM_Comercial.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# Perfil do banco pela variável CRM_BANCO: sqlite (WAL, padrão) ou postgres (CRM_Comercial/bancos.py)
+# e réplica de leitura opcional (CRM_SQLITE_REPLICA / CRM_PG_REPLICA_HOST)
+DATABASES = bancos.bancos(os.environ, BASE_DIR)
+
+# Views analíticas leem da réplica; após um POST o usuário fica no primário por alguns segundos
+DATABASE_ROUTERS = ['app.replica.RoteadorReplica']
+REPLICA_ADERENCIA_SEGUNDOS = 10
+REPLICA_RETENTATIVA_SEGUNDOS = 30
+
+# Agregados de Servico (dashboards, relatórios) a partir de uma cópia em colunas NumPy por processo (app/fatos.py)
+FATOS_EM_MEMORIA = os.environ.get('CRM_FATOS_EM_MEMORIA', '').strip().lower() in ('1', 'true', 'sim')
+
+# Indicadores do funil de prospecção em cache por escopo e período (app/funil.py); a chave muda a cada gravação
+FUNIL_CACHE_SEGUNDOS = 600
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -94,6 +107,13 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Usuário da sessão carregado junto com o Profile (app/autenticacao.py). O ModelBackend
+# fica na lista só para as sessões abertas antes da troca, que guardam o caminho dele.
+AUTHENTICATION_BACKENDS = [
+    'app.autenticacao.BackendComPerfil',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 # --- CONFIGURAÇÕES DE REDIRECIONAMENTO DE LOGIN/LOGOUT ---
 
 # Define qual é a URL de login do nosso sistema
@@ -109,6 +129,24 @@ LOGOUT_REDIRECT_URL = 'login'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # collectstatic grava nomes com hash + variantes .br/.gz (app/estaticos.py)
+    'staticfiles': {'BACKEND': 'app.estaticos.ArmazenamentoEstaticos'},
+    # Anexos das ações: cada conteúdo gravado uma vez, pelo SHA-256 (app/storage.py)
+    'anexos': {'BACKEND': 'app.storage.ArmazenamentoDeduplicado'},
+}
+
+# Anexos enviados em blocos (upload retomável)
+ANEXOS_UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'uploads', 'parciais')
+ANEXOS_UPLOAD_BLOCO = 2 * 1024 * 1024  # tamanho máximo de cada bloco
+ANEXOS_TAMANHO_MAXIMO = 200 * 1024 * 1024
+ANEXOS_UPLOAD_VALIDADE_HORAS = 48  # sessões paradas há mais tempo são descartadas
+
+# Chaves de idempotência das escritas do PWA (app/idempotencia.py): cobre o tempo
+# que um aparelho pode ficar sem conexão com escritas na fila
+IDEMPOTENCIA_VALIDADE_DIAS = 30
+
 # API REST
 INSTALLED_APPS += ['rest_framework']
 
@@ -116,5 +154,33 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'app.pagination.CursorPaginacao',
+    # JSON via orjson; MessagePack com Accept: application/msgpack ou ?format=msgpack
+    'DEFAULT_RENDERER_CLASSES': [
+        'app.renderers.ORJSONRenderer',
+        'app.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'app.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'PAGE_SIZE': 50,
-}
\ No newline at end of file
+}
+
+# Tamanho máximo de um lote em POST /api/servicos/lote/
+API_SERVICOS_LOTE_MAX = 500
+
+# /api/sync/: a busca volta esta margem antes do token, para pegar transações
+# confirmadas depois da sincronização anterior; exclusões guardadas por N dias
+API_SYNC_MARGEM_SEGUNDOS = 60
+API_SYNC_RETENCAO_DIAS = 90
+# Registros de cada model por resposta; acima disso, a sincronização continua em outra chamada
+API_SYNC_LIMITE = 1000
+
+# Compressão dinâmica das respostas (app/compressao.py)
+COMPRESSAO_TAMANHO_MINIMO = 1024  # bytes; abaixo disso a resposta vai sem compressão
+COMPRESSAO_BROTLI_QUALIDADE = 5  # 0-11: 5 comprime quase como gzip -9 gastando menos CPU
+COMPRESSAO_GZIP_NIVEL = 6
\ No newline at end of file
@@ -33,6 +33,9 @@ urlpatterns = [
     # --- Rotas de Autenticação ---
     path('login/', app_views.custom_login_view, name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
+
+    # Service worker do PWA (na raiz, para ter escopo sobre todo o site)
+    path('service-worker.js', app_views.service_worker, name='service-worker'),
     
     # Rotas para alteração de senha
     path('password_change/', auth_views.PasswordChangeView.as_view(template_name='registration/password_change_form.html'), name='password_change'),
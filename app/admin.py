@@ -3,7 +3,7 @@ from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
 from .models import (
     Profile, Cliente, ClienteProspect, Servico, TipoServico, Meta, 
-    Tarefa, AcaoTarefa, Prospeccao, AcaoProspeccao
+    Tarefa, AcaoTarefa, Prospeccao, AcaoProspeccao, ProspeccaoEtapa, BlobAnexo
 )
 
 class ProfileInline(admin.StackedInline):
@@ -51,13 +51,16 @@ class ServicoAdmin(admin.ModelAdmin):
 @admin.register(Meta)
 class MetaAdmin(admin.ModelAdmin):
     list_display = ('cliente', 'get_representante', 'mes', 'ano', 'valor', 'dias_uteis')
-    list_filter = ('ano', 'mes', 'cliente__cadastrado_por') 
-    search_fields = ('cliente__razao_social', 'cliente__cadastrado_por__username')
+    list_filter = ('ano', 'mes', 'representante') 
+    search_fields = ('cliente__razao_social', 'representante__username')
+    list_select_related = ('cliente', 'representante')
     
     def get_representante(self, obj):
-        return obj.cliente.cadastrado_por.get_full_name() or obj.cliente.cadastrado_por.username
+        if obj.representante is None:
+            return '-'
+        return obj.representante.get_full_name() or obj.representante.username
     get_representante.short_description = 'Representante'
-    get_representante.admin_order_field = 'cliente__cadastrado_por'
+    get_representante.admin_order_field = 'representante'
 
 class AcaoTarefaInline(admin.TabularInline):
     model = AcaoTarefa
@@ -121,4 +124,30 @@ class ProspeccaoAdmin(admin.ModelAdmin):
 class AcaoProspeccaoAdmin(admin.ModelAdmin):
     list_display = ('prospeccao', 'registrado_por', 'data_registro')
     list_filter = ('registrado_por', 'data_registro')
-    search_fields = ('descricao', 'prospeccao__cliente__razao_social')
\ No newline at end of file
+    search_fields = ('descricao', 'prospeccao__cliente__razao_social')
+
+@admin.register(ProspeccaoEtapa)
+class ProspeccaoEtapaAdmin(admin.ModelAdmin):
+    list_display = ('prospeccao', 'etapa', 'etapa_anterior', 'duracao_anterior', 'representante', 'data')
+    list_filter = ('etapa', 'representante')
+    list_select_related = ('prospeccao__cliente', 'representante')
+    date_hierarchy = 'data'
+
+    # Tabela de eventos somente inserção: gravada pelas views do funil
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(BlobAnexo)
+class BlobAnexoAdmin(admin.ModelAdmin):
+    list_display = ('hash', 'tamanho', 'referencias', 'criado_em', 'atualizado_em')
+    search_fields = ('hash',)
+
+    # Mantido pelo armazenamento de anexos e pelo comando limpar_blobs
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,113 @@
+"""
+Consultas da Agenda (Kanban de Tarefas).
+
+Cada coluna é paginada por cursor (keyset) sobre (data da coluna, id): a
+próxima página continua a partir do último cartão exibido em vez de reler as
+anteriores com OFFSET. Os totais das três colunas saem de uma única consulta
+agrupada por status.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce
+
+from .models import Tarefa
+
+TAMANHO_PAGINA = 10
+
+# status -> (campo de data da coluna, mais recentes primeiro?)
+COLUNAS = {
+    'NAO_INICIADA': ('data_criacao', False),
+    'INICIADA': ('data_inicio', False),
+    'FINALIZADA': ('data_finalizacao', True),
+}
+
+
+class CursorInvalido(ValueError):
+    """ Cursor de paginação malformado. """
+
+
+def tarefas_visiveis(usuario, filtro_rep='todos', data_ini=None, data_fim=None):
+    """
+    Tarefas que o usuário pode ver na Agenda, já com os filtros da tela.
+    Representante Comercial só vê as próprias; os demais cargos veem todas e
+    podem filtrar por 'minhas' ou por um usuário específico.
+    """
+    tarefas = Tarefa.objects.all()
+
+    if usuario.profile.is_representante:
+        filtro_rep = 'minhas'
+
+    if filtro_rep == 'minhas':
+        tarefas = tarefas.filter(
+            Q(criado_por=usuario) |
+            Q(iniciado_por=usuario) |
+            Q(finalizado_por=usuario)
+        )
+    elif filtro_rep and filtro_rep != 'todos':
+        tarefas = tarefas.filter(
+            Q(criado_por_id=filtro_rep) |
+            Q(iniciado_por_id=filtro_rep) |
+            Q(finalizado_por_id=filtro_rep)
+        )
+
+    # Filtros de data (por data de criacao)
+    if data_ini:
+        tarefas = tarefas.filter(data_criacao__date__gte=data_ini)
+    if data_fim:
+        tarefas = tarefas.filter(data_criacao__date__lte=data_fim)
+    return tarefas
+
+
+def contar_por_status(tarefas):
+    """ {status: total} para as três colunas em uma única consulta. """
+    totais = dict.fromkeys(COLUNAS, 0)
+    for linha in tarefas.order_by().values('status').annotate(total=Count('id')):
+        totais[linha['status']] = linha['total']
+    return totais
+
+
+def codificar_cursor(data, pk):
+    valor = f'{data.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(valor).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        valor = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        data, pk = valor.rsplit('|', 1)
+        return datetime.fromisoformat(data), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise CursorInvalido(str(e))
+
+
+def pagina_coluna(tarefas, status, cursor=None, tamanho=TAMANHO_PAGINA):
+    """
+    Uma página da coluna `status`, a partir do cursor (exclusivo).
+    Retorna (tarefas da página, cursor da próxima página ou None).
+    """
+    campo, decrescente = COLUNAS[status]
+    # Registros antigos podem não ter a data da etapa; caem na data de criação
+    ordem = Coalesce(campo, 'data_criacao') if campo != 'data_criacao' else F(campo)
+    qs = tarefas.filter(status=status).select_related('criado_por').annotate(ordem=ordem)
+
+    if cursor:
+        data, pk = decodificar_cursor(cursor)
+        if decrescente:
+            qs = qs.filter(Q(ordem__lt=data) | Q(ordem=data, pk__lt=pk))
+        else:
+            qs = qs.filter(Q(ordem__gt=data) | Q(ordem=data, pk__gt=pk))
+
+    if decrescente:
+        qs = qs.order_by('-ordem', '-pk')
+    else:
+        qs = qs.order_by('ordem', 'pk')
+
+    # Busca um a mais só para saber se há próxima página, sem COUNT
+    itens = list(qs[:tamanho + 1])
+    proximo = None
+    if len(itens) > tamanho:
+        itens = itens[:tamanho]
+        proximo = codificar_cursor(itens[-1].ordem, itens[-1].pk)
+    return itens, proximo
@@ -0,0 +1,211 @@
+"""
+Anexos das ações de Tarefa e Prospecção.
+
+Upload em blocos: o cliente abre uma UploadSessao e envia o arquivo em partes
+(PUT com Content-Range), gravadas direto no arquivo parcial em disco. Se a
+conexão cair, consulta quanto já foi recebido e continua dali. Concluído, o
+parcial é movido para o FileField da ação, sem nova cópia.
+
+Download: FileResponse com suporte a Range (um intervalo por requisição) e
+requisições condicionais (ETag/Last-Modified).
+"""
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.http import FileResponse, HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import UploadSessao
+
+TAMANHO_LEITURA = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class BlocoInvalido(ValueError):
+    """ Bloco fora de ordem ou com tamanho/cabeçalhos inconsistentes. """
+
+
+# --- Permissões (as mesmas das telas de Agenda e Prospecção) ---
+
+def pode_acessar_tarefa(usuario, tarefa):
+    if not usuario.profile.is_representante:
+        return True
+    return usuario.id in (tarefa.criado_por_id, tarefa.iniciado_por_id, tarefa.finalizado_por_id)
+
+
+def pode_acessar_prospeccao(usuario, prospeccao):
+    return usuario.is_staff or usuario.profile.tem_acesso_gestao or prospeccao.criado_por_id == usuario.id
+
+
+# --- Upload em blocos ---
+
+def caminho_parcial(sessao):
+    return os.path.join(settings.ANEXOS_UPLOAD_DIR, f'{sessao.pk}.part')
+
+
+def gravar_bloco(sessao, content_range, stream, tamanho):
+    """
+    Grava o bloco `bytes inicio-fim/total` lido de `stream` (o corpo da
+    requisição) no arquivo parcial. A leitura da rede fica fora de transação;
+    só o avanço de `recebido` é atômico, e só vale se ninguém avançou antes.
+    """
+    m = CONTENT_RANGE_RE.match(content_range or '')
+    if not m:
+        raise BlocoInvalido("Cabeçalho Content-Range ausente ou inválido.")
+    inicio, fim, total = (int(g) for g in m.groups())
+    if total != sessao.tamanho_total or fim < inicio or fim >= total:
+        raise BlocoInvalido("Intervalo incompatível com o tamanho do arquivo.")
+    if inicio != sessao.recebido:
+        raise BlocoInvalido("Bloco fora de ordem.")
+    if tamanho != fim - inicio + 1 or tamanho > settings.ANEXOS_UPLOAD_BLOCO:
+        raise BlocoInvalido("Tamanho do bloco inválido.")
+
+    caminho = caminho_parcial(sessao)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    # Sem truncate: um reenvio atrasado do mesmo bloco regrava os mesmos bytes e
+    # não pode cortar o bloco seguinte, já gravado por outra requisição
+    with open(caminho, 'r+b' if os.path.exists(caminho) else 'wb') as destino:
+        destino.seek(inicio)
+        restante = tamanho
+        while restante:
+            dados = stream.read(min(TAMANHO_LEITURA, restante))
+            if not dados:
+                break
+            destino.write(dados)
+            restante -= len(dados)
+
+    # Conexão caiu no meio do bloco: só conta o que chegou inteiro
+    recebido = inicio + tamanho - restante
+    if recebido > inicio:
+        avancou = UploadSessao.objects.filter(pk=sessao.pk, recebido=inicio).update(
+            recebido=recebido, atualizado_em=timezone.now(),
+        )
+        if not avancou:
+            # Outra requisição gravou este trecho primeiro
+            sessao.recebido = UploadSessao.objects.filter(pk=sessao.pk).values_list('recebido', flat=True).first() or 0
+            raise BlocoInvalido("Bloco fora de ordem.")
+        sessao.recebido = recebido
+    if restante:
+        raise BlocoInvalido("Bloco incompleto.")
+
+
+class _ArquivoParcial(File):
+    # Com temporary_file_path() o FileSystemStorage move o arquivo em vez de copiá-lo
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def anexar(acao, sessao):
+    """ Move o arquivo da sessão concluída para `acao.arquivo` e encerra a sessão. """
+    caminho = caminho_parcial(sessao)
+    with open(caminho, 'rb') as parcial:
+        acao.arquivo.save(sessao.nome_arquivo, _ArquivoParcial(parcial, name=caminho), save=False)
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    sessao.delete()
+
+
+def sessao_concluida(upload_id, usuario, **destino):
+    """ Sessão do usuário, para o destino informado, com o arquivo completo; senão None. """
+    try:
+        sessao = UploadSessao.objects.filter(pk=upload_id, usuario=usuario, **destino).first()
+    except (ValidationError, ValueError):
+        return None
+    return sessao if sessao and sessao.concluido else None
+
+
+def descartar(sessao):
+    caminho = caminho_parcial(sessao)
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    sessao.delete()
+
+
+# --- Download ---
+
+class _Trecho:
+    """ Leitura limitada a `tamanho` bytes de um arquivo já posicionado. """
+
+    def __init__(self, arquivo, tamanho):
+        self.arquivo = arquivo
+        self.restante = tamanho
+
+    def read(self, n=-1):
+        if self.restante <= 0:
+            return b''
+        n = self.restante if n is None or n < 0 else min(n, self.restante)
+        dados = self.arquivo.read(n)
+        self.restante -= len(dados)
+        return dados
+
+    def close(self):
+        self.arquivo.close()
+
+
+def _intervalo(cabecalho, tamanho):
+    """ (inicio, fim) pedido no Range, None se ausente/ignorável, ou ValueError se insatisfazível. """
+    m = RANGE_RE.match(cabecalho or '')
+    if not m or m.groups() == ('', ''):
+        return None
+    inicio, fim = m.groups()
+    if inicio == '':
+        # bytes=-N: os últimos N bytes
+        inicio, fim = max(tamanho - int(fim), 0), tamanho - 1
+    else:
+        inicio = int(inicio)
+        fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if inicio >= tamanho or inicio > fim:
+        raise ValueError
+    return inicio, fim
+
+
+def resposta_arquivo(request, arquivo):
+    """ Serve um FieldFile com Range e ETag/Last-Modified. """
+    storage, nome = arquivo.storage, arquivo.name
+    if not storage.exists(nome):
+        return HttpResponse("Arquivo não encontrado.", status=404)
+
+    tamanho = storage.size(nome)
+    modificado = int(storage.get_modified_time(nome).timestamp())
+    etag = f'"{tamanho:x}-{modificado:x}"'
+
+    condicional = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if condicional is not None:
+        return condicional
+
+    # If-Range: só atende o intervalo se o cliente ainda tem a mesma versão
+    if_range = request.headers.get('If-Range')
+    intervalo_valido = not if_range or if_range in (etag, http_date(modificado))
+
+    try:
+        intervalo = _intervalo(request.headers.get('Range'), tamanho) if intervalo_valido else None
+    except ValueError:
+        resposta = HttpResponse(status=416)
+        resposta['Content-Range'] = f'bytes */{tamanho}'
+        return resposta
+
+    nome_arquivo = os.path.basename(nome)
+    fonte = storage.open(nome, 'rb')
+    if intervalo:
+        inicio, fim = intervalo
+        fonte.seek(inicio)
+        resposta = FileResponse(_Trecho(fonte, fim - inicio + 1), status=206, filename=nome_arquivo)
+        resposta['Content-Range'] = f'bytes {inicio}-{fim}/{tamanho}'
+        resposta['Content-Length'] = fim - inicio + 1
+    else:
+        resposta = FileResponse(fonte, filename=nome_arquivo)
+        resposta['Content-Length'] = tamanho
+
+    resposta['Accept-Ranges'] = 'bytes'
+    resposta['ETag'] = etag
+    resposta['Last-Modified'] = http_date(modificado)
+    resposta['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return resposta
+
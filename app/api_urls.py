@@ -5,7 +5,11 @@ from .api_views import (
     UserViewSet,
     ClienteViewSet,
     ServicoViewSet,
+    MetaViewSet,
+    TarefaViewSet,
+    ProspeccaoViewSet,
     DashboardViewSet,
+    SyncViewSet,
 )
 
 # Router para endpoints RESTful
@@ -15,7 +19,11 @@ router = DefaultRouter()
 router.register(r'usuarios', UserViewSet, basename='usuario')
 router.register(r'clientes', ClienteViewSet, basename='cliente')
 router.register(r'servicos', ServicoViewSet, basename='servico')
+router.register(r'metas', MetaViewSet, basename='meta')
+router.register(r'tarefas', TarefaViewSet, basename='tarefa')
+router.register(r'prospeccoes', ProspeccaoViewSet, basename='prospeccao')
 router.register(r'dashboard', DashboardViewSet, basename='dashboard')
+router.register(r'sync', SyncViewSet, basename='sync')
 
 # URLs da API
 urlpatterns = [
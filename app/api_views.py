@@ -1,14 +1,27 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Sum
+from django.conf import settings
+from django.db.models import Prefetch, Sum
+from django.utils import timezone
 from datetime import date
+from functools import partial
 import calendar
 
-from .models import Cliente, Servico, Meta
+from .agenda import tarefas_visiveis
+from .condicional import responder_condicional
+from . import sincronizacao
+from .leitura_rapida import LeitorValores
+from .models import (
+    Cliente, ClienteProspect, Servico, Meta, TipoServico, Profile,
+    Tarefa, AcaoTarefa, Prospeccao, AcaoProspeccao
+)
 from .serializers import (
     UserSerializer, ClienteSerializer, ServicoSerializer,
-    ServicoCreateSerializer, DashboardMensalSerializer
+    ServicoCreateSerializer, ServicoLoteItemSerializer, DashboardMensalSerializer, ProjecaoMensalSerializer,
+    MetaSerializer, TarefaSerializer, ProspeccaoSerializer,
+    campos_pedidos, inclusoes_pedidas
 )
 from django.contrib.auth.models import User
 
@@ -22,40 +35,87 @@ class IsGestaoOrReadOnly(permissions.BasePermission):
         )
 
 
-class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all().select_related('profile')
+class CamposDinamicosViewMixin:
+    """ Junta (select_related) só as relações usadas pelos campos pedidos em ?fields= """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'relacionados_para'):
+            relacionados = serializer_class.relacionados_para(campos_pedidos(self.request))
+            if relacionados:
+                queryset = queryset.select_related(*relacionados)
+        return queryset
+
+
+class LeituraRapidaMixin:
+    """
+    Listagem pela leitura rápida (.values(), sem instanciar models). Vale para
+    os viewsets que incluem o mixin e cujo serializer declara Meta.valores;
+    a saída é a mesma do serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        if not hasattr(serializer.Meta, 'valores'):
+            return super().list(request, *args, **kwargs)
+
+        leitor = LeitorValores(serializer)
+        queryset = leitor.consulta(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(leitor.representar(page))
+        return Response(leitor.representar(queryset))
+
+
+class RespostaCondicionalMixin:
+    """
+    ETag/Last-Modified na listagem e no detalhe, a partir das versões dos
+    models em `modelos_condicionais`; responde 304 sem consultar nem serializar.
+    """
+    modelos_condicionais = ()
+
+    def list(self, request, *args, **kwargs):
+        return responder_condicional(request, self.modelos_condicionais, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return responder_condicional(request, self.modelos_condicionais, partial(super().retrieve, request, *args, **kwargs))
+
+
+class UserViewSet(RespostaCondicionalMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
+    queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated, IsGestaoOrReadOnly]
+    modelos_condicionais = (User, Profile)
 
 
-class ClienteViewSet(viewsets.ModelViewSet):
-    queryset = Cliente.objects.all().select_related('cadastrado_por')
+class ClienteViewSet(RespostaCondicionalMixin, LeituraRapidaMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
+    queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    modelos_condicionais = (Cliente, User)
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        if self.request.user.profile.is_representante:
-            return queryset.filter(cadastrado_por=self.request.user)
-        return queryset
+        return super().get_queryset().visiveis_para(self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(cadastrado_por=self.request.user)
 
 
-class ServicoViewSet(viewsets.ModelViewSet):
-    queryset = Servico.objects.all().select_related('cliente', 'tipo_servico')
+class ServicoViewSet(RespostaCondicionalMixin, LeituraRapidaMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
+    queryset = Servico.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    modelos_condicionais = (Servico, Cliente, TipoServico, User)
     
     def get_serializer_class(self):
         if self.action == 'create':
             return ServicoCreateSerializer
+        if self.action == 'lote':
+            return ServicoLoteItemSerializer
         return ServicoSerializer
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        if self.request.user.profile.is_representante:
-            queryset = queryset.filter(cliente__cadastrado_por=self.request.user)
+        queryset = super().get_queryset().visiveis_para(self.request.user)
         
         ano = self.request.query_params.get('ano')
         mes = self.request.query_params.get('mes')
@@ -69,38 +129,159 @@ class ServicoViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(fechado_por=self.request.user)
 
+    @action(detail=False, methods=['post'])
+    def lote(self, request):
+        """
+        Cria/atualiza até API_SERVICOS_LOTE_MAX serviços em uma requisição.
+        Itens inválidos são reportados individualmente; os válidos são gravados
+        juntos em uma única transação.
+        """
+        serializer = self.get_serializer(
+            data=request.data, many=True,
+            max_length=getattr(settings, 'API_SERVICOS_LOTE_MAX', 500)
+        )
+        serializer.is_valid(raise_exception=True)
+        itens = serializer.save()
+
+        resultados = []
+        for indice, item in enumerate(itens):
+            if item['erros']:
+                resultados.append({'indice': indice, 'status': 'erro', 'erros': item['erros']})
+            else:
+                situacao = 'atualizado' if item['dados'].get('id') else 'criado'
+                resultados.append({'indice': indice, 'status': situacao, 'id': item['instancia'].pk})
+
+        return Response({
+            'criados': sum(r['status'] == 'criado' for r in resultados),
+            'atualizados': sum(r['status'] == 'atualizado' for r in resultados),
+            'erros': sum(r['status'] == 'erro' for r in resultados),
+            'resultados': resultados,
+        })
+
+
+class MetaViewSet(RespostaCondicionalMixin, CamposDinamicosViewMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Meta.objects.all()
+    serializer_class = MetaSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    modelos_condicionais = (Meta, Cliente, User)
+
+    def get_queryset(self):
+        queryset = super().get_queryset().visiveis_para(self.request.user)
+
+        ano = self.request.query_params.get('ano')
+        mes = self.request.query_params.get('mes')
+        if ano:
+            queryset = queryset.filter(ano=ano)
+        if mes:
+            queryset = queryset.filter(mes=mes)
+        return queryset
+
+
+class AcoesAninhadasViewMixin:
+    """
+    Com ?include=acoes, busca as ações de toda a página numa única consulta
+    extra (Prefetch, já com o autor); sem ele, as ações nem são consultadas.
+    """
+    modelo_acao = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if 'acoes' in inclusoes_pedidas(self.request):
+            acoes = self.modelo_acao.objects.select_related('registrado_por')
+            queryset = queryset.prefetch_related(Prefetch('acoes', queryset=acoes))
+        return queryset
+
+
+class TarefaViewSet(RespostaCondicionalMixin, AcoesAninhadasViewMixin, CamposDinamicosViewMixin, viewsets.ReadOnlyModelViewSet):
+    """ Tarefas da Agenda, com o mesmo escopo da tela (representante só vê as próprias). """
+    queryset = Tarefa.objects.all()
+    serializer_class = TarefaSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    modelos_condicionais = (Tarefa, AcaoTarefa, User)
+    modelo_acao = AcaoTarefa
+
+    def get_queryset(self):
+        representante = self.request.query_params.get('representante', 'todos')
+        if representante not in ('todos', 'minhas') and not representante.isdigit():
+            raise ValidationError({'representante': "Use 'todos', 'minhas' ou o id de um usuário."})
+        visiveis = tarefas_visiveis(self.request.user, representante)
+        queryset = super().get_queryset() & visiveis
+        status_tarefa = self.request.query_params.get('status')
+        if status_tarefa:
+            queryset = queryset.filter(status=status_tarefa)
+        return queryset
+
+
+class ProspeccaoViewSet(RespostaCondicionalMixin, AcoesAninhadasViewMixin, CamposDinamicosViewMixin, viewsets.ReadOnlyModelViewSet):
+    """ Prospecções do funil; sem acesso de gestão, só as criadas pelo próprio usuário. """
+    queryset = Prospeccao.objects.all()
+    serializer_class = ProspeccaoSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    modelos_condicionais = (Prospeccao, AcaoProspeccao, ClienteProspect, User)
+    modelo_acao = AcaoProspeccao
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not (user.is_staff or user.profile.tem_acesso_gestao):
+            queryset = queryset.filter(criado_por=user)
+
+        status_prospeccao = self.request.query_params.get('status')
+        if status_prospeccao:
+            queryset = queryset.filter(status=status_prospeccao)
+        return queryset
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    GET /api/sync/?desde=<token>: registros gravados e excluídos desde a
+    sincronização que devolveu o token (ver app/sincronizacao.py).
+    ?modelos=clientes,servicos limita a resposta a esses models.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        nomes = [nome.strip() for nome in request.query_params.get('modelos', '').split(',') if nome.strip()]
+        desconhecidos = set(nomes) - {nome for nome, _, _ in sincronizacao.MODELOS}
+        if desconhecidos:
+            raise ValidationError({'modelos': f"Modelos desconhecidos: {', '.join(sorted(desconhecidos))}."})
+
+        token = request.query_params.get('desde')
+        try:
+            desde = sincronizacao.decodificar_token(token) if token else None
+        except sincronizacao.TokenExpirado as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_410_GONE)
+        except sincronizacao.TokenInvalido as exc:
+            raise ValidationError({'desde': str(exc)})
+        return Response(sincronizacao.alteracoes(request.user, desde, nomes))
+
 
 class DashboardViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     @action(detail=False, methods=['get'])
     def mensal(self, request):
+        # dias_restantes muda a cada dia, mesmo sem alterações nos dados
+        meia_noite = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        return responder_condicional(request, (Servico, Meta, Cliente), partial(self._mensal, request), desde=meia_noite)
+
+    def _mensal(self, request):
+        from . import projecao
         hoje = date.today()
         mes = int(request.query_params.get('mes', hoje.month))
         ano = int(request.query_params.get('ano', hoje.year))
         
-        base_qs = Servico.objects.filter(data_servico__year=ano, data_servico__month=mes)
-        
-        if request.user.profile.is_representante:
-            base_qs = base_qs.filter(cliente__cadastrado_por=request.user)
+        base_qs = Servico.objects.visiveis_para(request.user).filter(data_servico__year=ano, data_servico__month=mes)
         
         fat_total = base_qs.aggregate(s=Sum('valor'))['s'] or 0
         qtd_total = base_qs.aggregate(c=Sum('quantidade'))['c'] or 0
         
         # Meta agora é por cliente - soma as metas dos clientes
-        if request.user.profile.is_representante:
-            val_meta = Meta.objects.filter(
-                cliente__cadastrado_por=request.user, 
-                mes=mes, 
-                ano=ano
-            ).aggregate(s=Sum('valor'))['s'] or 0
-        else:
-            val_meta = Meta.objects.filter(mes=mes, ano=ano).aggregate(s=Sum('valor'))['s'] or 0
+        val_meta = Meta.objects.visiveis_para(request.user).filter(mes=mes, ano=ano).aggregate(s=Sum('valor'))['s'] or 0
         
         percentual = (fat_total / val_meta * 100) if val_meta > 0 else None
         
         _, last_day = calendar.monthrange(ano, mes)
-        from django.utils import timezone
         now = timezone.now().date()
         
         if ano < now.year or (ano == now.year and mes < now.month):
@@ -117,8 +298,36 @@ class DashboardViewSet(viewsets.ViewSet):
             'quantidade_servicos': qtd_total,
             'meta_valor': val_meta if val_meta > 0 else None,
             'percentual_meta': percentual,
-            'dias_restantes': dias_rest
+            'dias_restantes': dias_rest,
+            'projecao': projecao.projetar_mes(request.user, ano, mes).total(),
         }
         
         serializer = DashboardMensalSerializer(data)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def projecao(self, request):
+        """ Fechamento projetado do mês para cada cliente visível (com meta ou faturamento no mês) """
+        meia_noite = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        return responder_condicional(request, (Servico, Meta, Cliente), partial(self._projecao, request), desde=meia_noite)
+
+    def _projecao(self, request):
+        from . import projecao
+        hoje = date.today()
+        try:
+            mes = int(request.query_params.get('mes', hoje.month))
+            ano = int(request.query_params.get('ano', hoje.year))
+            date(ano, mes, 1)
+        except ValueError:
+            raise ValidationError({'mes': 'Informe mes (1-12) e ano válidos.'})
+
+        projecoes = projecao.projetar_mes(request.user, ano, mes, hoje)
+        serializer = ProjecaoMensalSerializer({
+            'mes': mes,
+            'ano': ano,
+            'dias_uteis': projecoes.dias_uteis,
+            'dias_uteis_decorridos': projecoes.decorridos,
+            'total': projecoes.total(),
+            'clientes': projecoes.linhas(),
+        })
+        return Response(serializer.data)
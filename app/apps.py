@@ -1,4 +1,6 @@
 # app/apps.py
+import locale
+
 from django.apps import AppConfig
 
 class AppConfig(AppConfig):
@@ -9,4 +11,10 @@ class AppConfig(AppConfig):
     def ready(self):
         # Importa os sinais para que eles sejam registrados quando o Django iniciar.
         import app.models
-    # --- FIM DA ALTERAÇÃO ---
\ No newline at end of file
+
+        # Força o locale para Português do Brasil para que os meses e números apareçam corretamente.
+        try:
+            locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
+        except locale.Error:
+            locale.setlocale(locale.LC_ALL, 'portuguese')
+    # --- FIM DA ALTERAÇÃO ---
@@ -0,0 +1,45 @@
+"""
+Backend de autenticação que carrega o usuário já com o Profile.
+
+Praticamente toda view, permissão da API e template lê `request.user.profile`
+(tem_acesso_gestao, is_representante...). Com o ModelBackend isso custa uma
+consulta extra por requisição; aqui o usuário da sessão (get_user) e o do
+login/Basic Auth (authenticate) vêm com o perfil no mesmo SELECT. Durante a
+requisição os papéis são lidos sempre dessa mesma instância, sem nova consulta.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+User = get_user_model()
+
+
+def usuarios_com_perfil():
+    return User._default_manager.select_related('profile')
+
+
+class BackendComPerfil(ModelBackend):
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = usuarios_com_perfil().get(**{User.USERNAME_FIELD: username})
+        except User.DoesNotExist:
+            # Mesmo custo de hash de um usuário existente (ver ModelBackend)
+            User().set_password(password)
+        else:
+            if user.check_password(password) and self.user_can_authenticate(user):
+                return user
+        # Credencial recusada aqui não deve ser testada de novo pelo ModelBackend,
+        # que segue na lista só para as sessões abertas antes deste backend
+        raise PermissionDenied
+
+    def get_user(self, user_id):
+        try:
+            user = usuarios_com_perfil().get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,208 @@
+"""
+Compressão dinâmica (Brotli ou gzip) das respostas HTML, JSON e parciais HTMX.
+
+O CompressaoMiddleware negocia a codificação pelo Accept-Encoding (Brotli
+preferido), ignora corpos pequenos, tipos já comprimidos e respostas que já têm
+Content-Encoding (ex.: estáticos pré-comprimidos de app/estaticos.py) e
+comprime StreamingHttpResponse bloco a bloco, sem juntar o corpo em memória.
+
+Métricas: respostas normais levam `Server-Timing: compressao;dur=<ms de CPU>;
+desc="br 48213>7390"`; todas (inclusive streaming) entram nos totais do
+processo em `estatisticas()` e no logger `app.compressao` (nível DEBUG).
+"""
+import logging
+import threading
+import time
+import zlib
+
+import brotli
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .estaticos import codificacoes_aceitas
+
+logger = logging.getLogger(__name__)
+
+TIPOS_COMPRIMIVEIS = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/manifest+json',
+    'image/svg+xml',
+)
+
+# Streaming: a saída é descarregada a cada ~16 KB de entrada. Descarregar a cada
+# bloco pequeno (ex.: uma linha de CSV) derruba a taxa de compressão.
+DESCARGA_STREAMING = 16 * 1024
+
+_trava = threading.Lock()
+_totais = {}
+
+
+class _Brotli:
+    codificacao = 'br'
+
+    def __init__(self):
+        self.compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=settings.COMPRESSAO_BROTLI_QUALIDADE)
+
+    def bloco(self, dados, descarregar=True):
+        saida = self.compressor.process(dados)
+        return saida + self.compressor.flush() if descarregar else saida
+
+    def finalizar(self):
+        return self.compressor.finish()
+
+
+class _Gzip:
+    codificacao = 'gzip'
+
+    def __init__(self):
+        self.compressor = zlib.compressobj(settings.COMPRESSAO_GZIP_NIVEL, zlib.DEFLATED, 31)  # 31: cabeçalho gzip
+
+    def bloco(self, dados, descarregar=True):
+        saida = self.compressor.compress(dados)
+        return saida + self.compressor.flush(zlib.Z_SYNC_FLUSH) if descarregar else saida
+
+    def finalizar(self):
+        return self.compressor.flush()
+
+
+COMPRESSORES = {'br': _Brotli, 'gzip': _Gzip}
+
+
+def registrar(codificacao, original, comprimido, cpu):
+    """ Soma uma resposta comprimida nos totais do processo. """
+    with _trava:
+        total = _totais.setdefault(codificacao, {'respostas': 0, 'bytes_originais': 0, 'bytes_comprimidos': 0, 'cpu_ms': 0.0})
+        total['respostas'] += 1
+        total['bytes_originais'] += original
+        total['bytes_comprimidos'] += comprimido
+        total['cpu_ms'] += cpu * 1000
+    logger.debug(
+        'compressao %s: %d -> %d bytes (%.1fx) em %.2f ms de CPU',
+        codificacao, original, comprimido, original / max(comprimido, 1), cpu * 1000,
+    )
+
+
+def estatisticas():
+    """ Totais do processo por codificação, com a taxa média e o custo de CPU por MB. """
+    with _trava:
+        resumo = {codificacao: dict(total) for codificacao, total in _totais.items()}
+    for total in resumo.values():
+        total['taxa'] = round(total['bytes_originais'] / max(total['bytes_comprimidos'], 1), 2)
+        total['cpu_ms_por_mb'] = round(total['cpu_ms'] / max(total['bytes_originais'] / 1048576, 1e-9), 2)
+        total['cpu_ms'] = round(total['cpu_ms'], 2)
+    return resumo
+
+
+def escolher_codificacao(request):
+    aceitas = codificacoes_aceitas(request.headers.get('Accept-Encoding', ''))
+    for codificacao in COMPRESSORES:
+        if codificacao in aceitas:
+            return codificacao
+    return None
+
+
+class CompressaoMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.comprimivel(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacao = escolher_codificacao(request)
+        if codificacao is None:
+            return response
+
+        if response.streaming:
+            self.comprimir_streaming(response, codificacao)
+        else:
+            self.comprimir_conteudo(response, codificacao)
+        if response.has_header('Content-Encoding'):
+            # Corpo diferente por codificação: a ETag forte deixa de valer byte a byte
+            etag = response.get('ETag')
+            if etag and etag.startswith('"'):
+                response.headers['ETag'] = 'W/' + etag
+        return response
+
+    @staticmethod
+    def comprimivel(response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return False
+        if response.has_header('Accept-Ranges') or response.has_header('Content-Range'):
+            return False  # downloads com Range (anexos): os intervalos são do arquivo original
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        tipo = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if not tipo.startswith(TIPOS_COMPRIMIVEIS):
+            return False
+        return response.streaming or len(response.content) >= settings.COMPRESSAO_TAMANHO_MINIMO
+
+    @staticmethod
+    def comprimir_conteudo(response, codificacao):
+        original = response.content
+        inicio = time.thread_time()
+        compressor = COMPRESSORES[codificacao]()
+        comprimido = compressor.bloco(original, descarregar=False) + compressor.finalizar()
+        cpu = time.thread_time() - inicio
+        if len(comprimido) >= len(original):
+            return
+        response.content = comprimido
+        response.headers['Content-Length'] = str(len(comprimido))
+        response.headers['Content-Encoding'] = codificacao
+        registrar(codificacao, len(original), len(comprimido), cpu)
+
+        metrica = 'compressao;dur=%.2f;desc="%s %d>%d"' % (cpu * 1000, codificacao, len(original), len(comprimido))
+        anterior = response.get('Server-Timing')
+        response.headers['Server-Timing'] = '%s, %s' % (anterior, metrica) if anterior else metrica
+
+    @staticmethod
+    def comprimir_streaming(response, codificacao):
+        compressor = COMPRESSORES[codificacao]()
+        medidas = {'original': 0, 'comprimido': 0, 'cpu': 0.0, 'pendente': 0}
+
+        def comprimir(dados):
+            inicio = time.thread_time()
+            if dados is None:
+                saida = compressor.finalizar()
+            else:
+                medidas['original'] += len(dados)
+                medidas['pendente'] += len(dados)
+                descarregar = medidas['pendente'] >= DESCARGA_STREAMING
+                if descarregar:
+                    medidas['pendente'] = 0
+                saida = compressor.bloco(dados, descarregar)
+            medidas['cpu'] += time.thread_time() - inicio
+            medidas['comprimido'] += len(saida)
+            return saida
+
+        def concluir():
+            registrar(codificacao, medidas['original'], medidas['comprimido'], medidas['cpu'])
+
+        conteudo_original = response.streaming_content
+        if response.is_async:
+            async def sequencia():
+                async for parte in conteudo_original:
+                    saida = comprimir(parte)
+                    if saida:
+                        yield saida
+                yield comprimir(None)
+                concluir()
+        else:
+            def sequencia():
+                for parte in conteudo_original:
+                    saida = comprimir(parte)
+                    if saida:
+                        yield saida
+                yield comprimir(None)
+                concluir()
+
+        response.streaming_content = sequencia()
+        if response.has_header('Content-Length'):
+            del response.headers['Content-Length']
+        response.headers['Content-Encoding'] = codificacao
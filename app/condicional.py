@@ -0,0 +1,55 @@
+"""
+Requisições condicionais (ETag/Last-Modified) nas leituras da API.
+
+Os validadores saem das versões dos models de que a resposta depende
+(ContadorAlteracao), junto com o usuário, a URL e o formato pedidos. Se o
+cliente já tem a versão atual (If-None-Match/If-Modified-Since), a resposta é
+304 sem rodar a consulta principal nem o serializer: o custo é uma consulta
+na tabela de versões.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import ContadorAlteracao
+
+
+def validadores(request, modelos, desde=None):
+    """
+    (etag, last_modified em segundos ou None) da resposta para este
+    usuário/URL/formato. `desde` é o instante a partir do qual a resposta vale
+    mesmo sem alterações (ex.: a meia-noite, para contagens que dependem do dia).
+    """
+    versoes = ContadorAlteracao.versoes(modelos)
+    renderer = getattr(request, 'accepted_renderer', None)
+    partes = [
+        str(request.user.pk),
+        request.user.profile.setor or '',  # o escopo dos dados depende do setor
+        request.get_full_path(),
+        renderer.format if renderer else '',
+        desde.isoformat() if desde else '',
+    ]
+    partes += [f'{rotulo}:{versao}' for rotulo, (versao, _) in sorted(versoes.items())]
+    etag = '"%s"' % hashlib.sha1('|'.join(partes).encode()).hexdigest()
+
+    datas = [alterado_em for _, alterado_em in versoes.values() if alterado_em] + ([desde] if desde else [])
+    last_modified = int(max(datas).timestamp()) if datas else None
+    return etag, last_modified
+
+
+def responder_condicional(request, modelos, gerar, desde=None):
+    """ 304 se o cliente já tem a versão atual; senão a resposta de `gerar()` com os validadores. """
+    etag, last_modified = validadores(request, modelos, desde)
+    resposta = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if resposta is None:
+        resposta = gerar()
+        if resposta.status_code != 200:
+            return resposta
+
+    resposta['ETag'] = etag
+    if last_modified:
+        resposta['Last-Modified'] = http_date(last_modified)
+    resposta['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(resposta, ['Accept'])
+    return resposta
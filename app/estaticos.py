@@ -0,0 +1,189 @@
+"""
+Arquivos estáticos com hash no nome e pré-comprimidos.
+
+- ArmazenamentoEstaticos (STORAGES['staticfiles']): no `collectstatic` grava as
+  cópias com hash do conteúdo no nome (ManifestStaticFilesStorage) e, para os
+  tipos de texto, as variantes .br (Brotli nível 11) e .gz (zopfli, ou gzip
+  nível 9 se o zopfli não estiver instalado) ao lado de cada arquivo. A
+  compressão é feita uma vez no deploy, não a cada requisição.
+- ServirEstaticos (middleware): entrega STATIC_URL a partir do STATIC_ROOT
+  escolhendo a variante pelo Accept-Encoding. Nomes com hash nunca mudam de
+  conteúdo e vão com `Cache-Control: immutable` de um ano; os demais
+  (ex.: manifest.json) com cache curto e Last-Modified.
+"""
+import gzip
+import mimetypes
+import os
+import re
+import tempfile
+
+import brotli
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import zopfli.gzip
+except ImportError:  # pragma: no cover - zopfli é opcional
+    zopfli = None
+
+EXTENSOES_TEXTO = {'.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.webmanifest'}
+EXTENSOES_FONTE = {'.ttf', '.otf', '.eot'}
+TAMANHO_MINIMO = 512  # abaixo disso os cabeçalhos custam mais que o ganho
+GANHO_MINIMO = 0.95  # a variante só é gravada se ficar abaixo de 95% do original
+
+# Variantes na ordem de preferência: (token do Accept-Encoding, sufixo do arquivo)
+VARIANTES = [('br', '.br'), ('gzip', '.gz')]
+
+RE_NOME_COM_HASH = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+CACHE_CURTO = 'public, max-age=300'
+
+
+def _comprimir_gzip(dados):
+    if zopfli is not None:
+        return zopfli.gzip.compress(dados)
+    return gzip.compress(dados, compresslevel=9, mtime=0)
+
+
+def _comprimir_brotli(dados, extensao):
+    modo = brotli.MODE_FONT if extensao in EXTENSOES_FONTE else brotli.MODE_TEXT
+    return brotli.compress(dados, mode=modo, quality=11)
+
+
+def _gravar_atomico(caminho, dados):
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), prefix='.tmp-')
+    try:
+        with os.fdopen(descritor, 'wb') as destino:
+            destino.write(dados)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+def comprimir_arquivo(caminho):
+    """ Grava as variantes .br/.gz de `caminho` que valerem a pena. Devolve os sufixos gravados. """
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao not in EXTENSOES_TEXTO | EXTENSOES_FONTE:
+        return []
+    modificado = os.path.getmtime(caminho)
+    with open(caminho, 'rb') as origem:
+        dados = origem.read()
+    if len(dados) < TAMANHO_MINIMO:
+        return []
+
+    gravados = []
+    for sufixo, comprimir in (('.br', lambda d: _comprimir_brotli(d, extensao)), ('.gz', _comprimir_gzip)):
+        variante = caminho + sufixo
+        # Variante de uma execução anterior do collectstatic ainda válida
+        if os.path.exists(variante) and os.path.getmtime(variante) >= modificado:
+            gravados.append(sufixo)
+            continue
+        comprimido = comprimir(dados)
+        if len(comprimido) < len(dados) * GANHO_MINIMO:
+            _gravar_atomico(variante, comprimido)
+            gravados.append(sufixo)
+        elif os.path.exists(variante):
+            os.unlink(variante)
+    return gravados
+
+
+class ArmazenamentoEstaticos(ManifestStaticFilesStorage):
+    # Nome fora do manifesto: o hash é calculado na hora a partir do arquivo no
+    # STATIC_ROOT. Se o arquivo também não está lá (estático novo sem collectstatic),
+    # hashed_name levanta ValueError e a página quebra; por isso o collectstatic é
+    # obrigatório a cada deploy (ver README)
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        # Originais e cópias com hash: o nome sem hash continua acessível (ex.: manifest.json)
+        for nome in set(paths) | set(self.hashed_files.values()):
+            if nome and self.exists(nome):
+                comprimir_arquivo(self.path(nome))
+
+
+def codificacoes_aceitas(cabecalho):
+    aceitas = set()
+    for parte in cabecalho.split(','):
+        token, _, parametros = parte.strip().partition(';')
+        qualidade = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                qualidade = float(parametros[2:])
+            except ValueError:
+                qualidade = 0.0
+        if token and qualidade > 0:
+            aceitas.add(token.strip().lower())
+    return aceitas
+
+
+class ServirEstaticos:
+    """
+    Entrega os estáticos coletados antes do restante da pilha (sem sessão,
+    autenticação ou CSRF). Caminhos fora do STATIC_ROOT seguem adiante.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.STATIC_ROOT or not os.path.isdir(settings.STATIC_ROOT):
+            raise MiddlewareNotUsed
+        self.raiz = settings.STATIC_ROOT
+        self.prefixo = '/' + settings.STATIC_URL.lstrip('/')
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefixo):
+            resposta = self.servir(request, request.path_info[len(self.prefixo):])
+            if resposta is not None:
+                return resposta
+        return self.get_response(request)
+
+    def servir(self, request, relativo):
+        try:
+            caminho = safe_join(self.raiz, relativo)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(caminho):
+            return None
+
+        estado = os.stat(caminho)
+        imutavel = bool(RE_NOME_COM_HASH.search(caminho))
+        if not imutavel and not was_modified_since(request.headers.get('If-Modified-Since'), estado.st_mtime):
+            return HttpResponseNotModified()
+
+        tipo, codificacao = mimetypes.guess_type(caminho)
+        if codificacao:  # o próprio arquivo é um .gz/.br: entregue como está
+            tipo = 'application/octet-stream'
+        tipo = tipo or 'application/octet-stream'
+
+        comprimivel = False
+        escolhido, codificacao_resposta = caminho, None
+        if not codificacao and os.path.splitext(caminho)[1].lower() in EXTENSOES_TEXTO | EXTENSOES_FONTE:
+            comprimivel = True
+            aceitas = codificacoes_aceitas(request.headers.get('Accept-Encoding', ''))
+            for token, sufixo in VARIANTES:
+                if token in aceitas and os.path.isfile(caminho + sufixo):
+                    escolhido, codificacao_resposta = caminho + sufixo, token
+                    break
+
+        if tipo.startswith('text/') or tipo in ('application/javascript', 'application/json'):
+            tipo += '; charset=utf-8'
+        resposta = FileResponse(open(escolhido, 'rb'), content_type=tipo)
+        if 'Content-Disposition' in resposta:
+            del resposta['Content-Disposition']
+        if codificacao_resposta:
+            resposta['Content-Encoding'] = codificacao_resposta
+        if comprimivel:
+            patch_vary_headers(resposta, ['Accept-Encoding'])
+        resposta['Last-Modified'] = http_date(estado.st_mtime)
+        resposta['Cache-Control'] = CACHE_IMUTAVEL if imutavel else CACHE_CURTO
+        return resposta
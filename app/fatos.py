@@ -0,0 +1,266 @@
+"""
+Fatos de Servico em memória, em colunas NumPy, para os agregados de
+dashboards e relatórios.
+
+Com FATOS_EM_MEMORIA ligado, cada processo guarda uma cópia compacta dos
+serviços: data (int32, dias desde 1970-01-01), cliente, representante e tipo
+(int32, -1 = vazio), valor em centavos (int64) e quantidade (int32), 36 bytes
+por linha (~34 MB por milhão). Somas e agrupamentos por cliente, tipo,
+representante e mês saem de np.bincount sobre essas colunas, sem consultar o
+banco; só os nomes das linhas exibidas são buscados.
+
+A cópia segue o ContadorAlteracao de Servico (uma consulta por uso): com a
+versão igual, nada é lido. Com versão nova, entram só os serviços com
+data_registro recente (a janela MARGEM cobre transações que gravaram antes da
+última leitura e confirmaram depois). Se um serviço antigo foi alterado
+(atualizado_em) ou excluído (Exclusao), a cópia é recarregada inteira.
+
+Sem FATOS_EM_MEMORIA, `consulta()` devolve os mesmos agregados pelo ORM.
+"""
+import itertools
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Cliente, ContadorAlteracao, Exclusao, Servico, TipoServico
+
+# A cópia é sempre lida do primário: uma réplica atrasada deixaria buracos
+# que as leituras incrementais seguintes não voltariam a cobrir
+BANCO = 'default'
+MARGEM = timedelta(minutes=5)
+LOTE = 20000
+CAMPOS = ('id', 'data_servico', 'cliente_id', 'representante_id', 'tipo_servico_id', 'valor', 'quantidade')
+TIPOS = {
+    'id': np.int64,
+    'data': np.int32,
+    'cliente': np.int32,
+    'representante': np.int32,
+    'tipo': np.int32,
+    'centavos': np.int64,
+    'quantidade': np.int32,
+}
+
+_trava = threading.Lock()
+_atual = None
+
+
+def ativo():
+    return getattr(settings, 'FATOS_EM_MEMORIA', False)
+
+
+def _dia(data):
+    return int(np.datetime64(data, 'D').astype(np.int64))
+
+
+def _reais(centavos):
+    return Decimal(int(centavos)).scaleb(-2)
+
+
+def _colunas(linhas):
+    ids, datas, clientes, representantes, tipos, valores, quantidades = zip(*linhas)
+    return {
+        'id': np.array(ids, dtype=np.int64),
+        'data': np.array(datas, dtype='datetime64[D]').astype(np.int32),
+        'cliente': np.array(clientes, dtype=np.int32),
+        'representante': np.array([-1 if r is None else r for r in representantes], dtype=np.int32),
+        'tipo': np.array([-1 if t is None else t for t in tipos], dtype=np.int32),
+        'centavos': np.array([int(v.scaleb(2)) for v in valores], dtype=np.int64),
+        'quantidade': np.array(quantidades, dtype=np.int32),
+    }
+
+
+def _ler(queryset):
+    """ Colunas dos serviços do queryset, montadas em lotes para não guardar todas as tuplas de uma vez. """
+    linhas = queryset.values_list(*CAMPOS).order_by().iterator(chunk_size=LOTE)
+    partes = []
+    while lote := list(itertools.islice(linhas, LOTE)):
+        partes.append(_colunas(lote))
+    if not partes:
+        return {nome: np.empty(0, dtype=tipo) for nome, tipo in TIPOS.items()}
+    return {nome: np.concatenate([parte[nome] for parte in partes]) for nome in TIPOS}
+
+
+class Fatos:
+    """ Cópia imutável: uma atualização gera uma nova instância, e quem já pegou a anterior segue com ela. """
+
+    def __init__(self, colunas, versao, marca):
+        self.colunas = colunas
+        self.versao = versao
+        self.marca = marca  # horário do início da leitura que gerou a cópia
+
+    def __len__(self):
+        return len(self.colunas['id'])
+
+    @classmethod
+    def carregar(cls, versao):
+        marca = timezone.now()
+        return cls(_ler(Servico.objects.using(BANCO)), versao, marca)
+
+    def atualizar(self, versao):
+        marca = timezone.now()
+        desde = self.marca - MARGEM
+        antigos_alterados = Servico.objects.using(BANCO).filter(atualizado_em__gt=desde, data_registro__lte=desde).exists()
+        if antigos_alterados or Exclusao.objects.using(BANCO).filter(modelo='app.servico', excluido_em__gt=desde).exists():
+            return Fatos.carregar(versao)
+        # atualizado_em (indexado) >= data_registro: o primeiro filtro só ajuda o banco a usar o índice.
+        # Os da janela que já estavam na cópia são substituídos pela leitura nova
+        novos = _ler(Servico.objects.using(BANCO).filter(atualizado_em__gt=desde, data_registro__gt=desde))
+        manter = ~np.isin(self.colunas['id'], novos['id'])
+        colunas = {nome: np.concatenate([self.colunas[nome][manter], novos[nome]]) for nome in TIPOS}
+        return Fatos(colunas, versao, marca)
+
+    def memoria(self):
+        """ Bytes ocupados pelas colunas e o equivalente em MB por milhão de linhas. """
+        total = sum(coluna.nbytes for coluna in self.colunas.values())
+        por_linha = sum(np.dtype(tipo).itemsize for tipo in TIPOS.values())
+        return {
+            'linhas': len(self),
+            'bytes': total,
+            'bytes_por_linha': por_linha,
+            'mb_por_milhao': por_linha * 1_000_000 / 2 ** 20,
+        }
+
+    def selecao(self, inicio=None, fim=None, representante=None):
+        """ Máscara das linhas no período (datas inclusivas) e, se informado, da carteira do representante. """
+        c = self.colunas
+        mascara = np.ones(len(self), dtype=bool)
+        if inicio is not None:
+            mascara &= c['data'] >= _dia(inicio)
+        if fim is not None:
+            mascara &= c['data'] <= _dia(fim)
+        if representante is not None:
+            mascara &= c['representante'] == int(getattr(representante, 'pk', representante))
+        return mascara
+
+
+def atuais():
+    """ Cópia em dia com o banco: lê a versão de Servico e, se mudou, atualiza antes de devolver. """
+    global _atual
+    versao = ContadorAlteracao.objects.using(BANCO).filter(modelo='app.servico').values_list('versao', flat=True).first() or 0
+    fatos = _atual
+    if fatos is not None and fatos.versao >= versao:
+        return fatos
+    with _trava:
+        # Outra thread pode ter atualizado enquanto esta esperava
+        if _atual is None:
+            _atual = Fatos.carregar(versao)
+        elif _atual.versao < versao:
+            _atual = _atual.atualizar(versao)
+        return _atual
+
+
+def descartar():
+    global _atual
+    with _trava:
+        _atual = None
+
+
+class ConsultaMemoria:
+    """ Agregados sobre as linhas selecionadas da cópia em memória. """
+
+    def __init__(self, fatos, mascara):
+        self.colunas = {nome: coluna[mascara] for nome, coluna in fatos.colunas.items() if nome != 'id'}
+
+    def totais(self):
+        c = self.colunas
+        return {
+            'valor': _reais(c['centavos'].sum()),
+            'quantidade': int(c['quantidade'].sum(dtype=np.int64)),
+            'servicos': len(c['centavos']),
+        }
+
+    def _agrupar(self, chave):
+        """ Chaves distintas e, para cada uma, centavos, quantidade e número de serviços. """
+        chaves, grupo = np.unique(self.colunas[chave], return_inverse=True)
+        # bincount soma em float64: exato até 2**53 centavos (~90 trilhões de reais) por grupo
+        centavos = np.rint(np.bincount(grupo, weights=self.colunas['centavos'], minlength=len(chaves))).astype(np.int64)
+        quantidade = np.bincount(grupo, weights=self.colunas['quantidade'], minlength=len(chaves)).astype(np.int64)
+        servicos = np.bincount(grupo, minlength=len(chaves))
+        return chaves, centavos, quantidade, servicos
+
+    def por_cliente(self):
+        chaves, centavos, quantidade, servicos = self._agrupar('cliente')
+        nomes = dict(Cliente.objects.filter(pk__in=chaves.tolist()).values_list('pk', 'razao_social'))
+        ordem = np.argsort(-centavos, kind='stable')
+        return [
+            {'cliente_id': pk, 'cliente__razao_social': nomes.get(pk), 'valor': _reais(c), 'quantidade': q, 'servicos': n}
+            for pk, c, q, n in zip(chaves[ordem].tolist(), centavos[ordem].tolist(), quantidade[ordem].tolist(), servicos[ordem].tolist())
+        ]
+
+    def por_tipo(self):
+        chaves, centavos, _, _ = self._agrupar('tipo')
+        nomes = dict(TipoServico.objects.filter(pk__in=chaves.tolist()).values_list('pk', 'nome'))
+        ordem = np.argsort(-centavos, kind='stable')
+        return [
+            {'tipo_servico__nome': nomes.get(pk), 'valor': _reais(c)}
+            for pk, c in zip(chaves[ordem].tolist(), centavos[ordem].tolist())
+        ]
+
+    def por_representante(self):
+        chaves, centavos, _, _ = self._agrupar('representante')
+        return {(pk if pk >= 0 else None): _reais(c) for pk, c in zip(chaves.tolist(), centavos.tolist())}
+
+    def por_mes(self):
+        meses = self.colunas['data'].astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        chaves, grupo = np.unique(meses, return_inverse=True)
+        centavos = np.rint(np.bincount(grupo, weights=self.colunas['centavos'], minlength=len(chaves))).astype(np.int64)
+        # Meses desde 1970-01
+        return {(1970 + m // 12, m % 12 + 1): _reais(c) for m, c in zip(chaves.tolist(), centavos.tolist())}
+
+
+class ConsultaBanco:
+    """ Os mesmos agregados de ConsultaMemoria, pelo ORM. """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def totais(self):
+        totais = self.queryset.aggregate(valor=Sum('valor'), quantidade=Sum('quantidade'), servicos=Count('id'))
+        return {'valor': totais['valor'] or Decimal('0.00'), 'quantidade': totais['quantidade'] or 0, 'servicos': totais['servicos']}
+
+    def por_cliente(self):
+        return list(
+            self.queryset.values('cliente_id', 'cliente__razao_social')
+            .annotate(valor=Sum('valor'), quantidade=Sum('quantidade'), servicos=Count('id'))
+            .order_by('-valor')
+        )
+
+    def por_tipo(self):
+        return list(self.queryset.values('tipo_servico__nome').annotate(valor=Sum('valor')).order_by('-valor'))
+
+    def por_representante(self):
+        return dict(self.queryset.values_list('representante_id').annotate(valor=Sum('valor')).order_by())
+
+    def por_mes(self):
+        linhas = (
+            self.queryset.values_list('data_servico__year', 'data_servico__month')
+            .annotate(valor=Sum('valor')).order_by()
+        )
+        return {(ano, mes): valor for ano, mes, valor in linhas}
+
+
+def consulta(usuario, inicio=None, fim=None, representante=None):
+    """
+    Agregados dos serviços visíveis ao usuário (None = todos) no período
+    (datas inclusivas), opcionalmente só da carteira de `representante`: da
+    cópia em memória com FATOS_EM_MEMORIA, senão do banco.
+    """
+    if usuario is not None and usuario.profile.is_representante:
+        representante = usuario
+    if ativo():
+        fatos = atuais()
+        return ConsultaMemoria(fatos, fatos.selecao(inicio, fim, representante))
+
+    queryset = Servico.objects.all()
+    if inicio is not None:
+        queryset = queryset.filter(data_servico__gte=inicio)
+    if fim is not None:
+        queryset = queryset.filter(data_servico__lte=fim)
+    if representante is not None:
+        queryset = queryset.da_carteira(representante)
+    return ConsultaBanco(queryset)
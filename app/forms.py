@@ -86,7 +86,20 @@ class ServicoForm(forms.ModelForm):
             if user.is_staff or user.profile.tem_acesso_gestao:
                 self.fields['cliente'].queryset = Cliente.objects.all().order_by('razao_social')
             else:
-                self.fields['cliente'].queryset = Cliente.objects.filter(cadastrado_por=user).order_by('razao_social')
+                self.fields['cliente'].queryset = Cliente.objects.da_carteira(user).order_by('razao_social')
+
+class ImportacaoServicoForm(forms.Form):
+    arquivo = forms.FileField(
+        label="Planilha (CSV ou XLSX)",
+        help_text="Colunas: cnpj, data_servico, valor e, opcionalmente, tipo_servico e quantidade.",
+        widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data['arquivo']
+        if not arquivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("Envie um arquivo CSV ou XLSX.")
+        return arquivo
 
 class MetaForm(forms.ModelForm):
     class Meta:
@@ -98,6 +111,87 @@ class MetaForm(forms.ModelForm):
         self.fields['cliente'].queryset = Cliente.objects.order_by('razao_social')
         self.fields['cliente'].label = "Cliente"
 
+class PlanejamentoMetasForm(forms.Form):
+    BASES = [
+        ('crescimento', 'Faturamento do ano anterior + crescimento'),
+        ('representante', 'Meta anual da carteira de um representante'),
+        ('cliente', 'Meta anual de um cliente'),
+    ]
+    ano = forms.IntegerField(label="Ano", min_value=2000, max_value=2100)
+    base = forms.ChoiceField(label="Meta anual a partir de", choices=BASES, initial='crescimento')
+    crescimento = forms.DecimalField(
+        label="Crescimento (%)", required=False, initial=0, max_digits=6, decimal_places=2,
+        help_text="Sobre o faturamento do ano anterior de cada cliente."
+    )
+    representante = forms.ModelChoiceField(
+        queryset=User.objects.filter(profile__setor='REPRESENTANTE', is_active=True).order_by('first_name'),
+        required=False, label="Representante",
+        help_text="Obrigatório para a meta da carteira; no crescimento, limita o plano aos clientes dele."
+    )
+    cliente = forms.ModelChoiceField(queryset=Cliente.objects.order_by('razao_social'), required=False, label="Cliente")
+    meta_anual = forms.DecimalField(label="Meta anual (R$)", required=False, min_value=0, max_digits=14, decimal_places=2)
+    anos_historico = forms.IntegerField(
+        label="Anos de histórico", initial=3, min_value=1, max_value=10,
+        help_text="Anos completos anteriores usados para medir a sazonalidade."
+    )
+    usar_dias_uteis = forms.BooleanField(label="Ajustar pelos dias úteis de cada mês", required=False, initial=True)
+    feriados = forms.CharField(
+        label="Feriados", required=False,
+        help_text="Datas dd/mm separadas por vírgula (ex.: 21/04, 01/05); saem dos dias úteis."
+    )
+
+    def clean_feriados(self):
+        feriados = []
+        for texto in self.cleaned_data['feriados'].replace(';', ',').split(','):
+            if not texto.strip():
+                continue
+            try:
+                dia, mes = (int(parte) for parte in texto.strip().split('/')[:2])
+                feriados.append((dia, mes))
+            except ValueError:
+                raise forms.ValidationError(f'Data inválida: "{texto.strip()}". Use dd/mm.')
+        return feriados
+
+    def clean(self):
+        cleaned_data = super().clean()
+        base = cleaned_data.get('base')
+        if base == 'representante' and not cleaned_data.get('representante'):
+            self.add_error('representante', "Escolha o representante da carteira.")
+        if base == 'cliente' and not cleaned_data.get('cliente'):
+            self.add_error('cliente', "Escolha o cliente.")
+        if base in ('representante', 'cliente') and cleaned_data.get('meta_anual') is None:
+            self.add_error('meta_anual', "Informe a meta anual.")
+        ano = cleaned_data.get('ano')
+        if ano and cleaned_data.get('feriados'):
+            try:
+                cleaned_data['feriados'] = [date(ano, mes, dia) for dia, mes in cleaned_data['feriados']]
+            except ValueError:
+                self.add_error('feriados', "Há uma data que não existe no ano escolhido.")
+        return cleaned_data
+
+    def parametros(self):
+        """ Argumentos de planejamento.planejar a partir do formulário válido. """
+        dados = self.cleaned_data
+        parametros = {
+            'ano': dados['ano'],
+            'anos_historico': dados['anos_historico'],
+            'usar_dias_uteis': dados['usar_dias_uteis'],
+            'feriados': dados['feriados'],
+        }
+        if dados['base'] == 'cliente':
+            parametros['clientes'] = Cliente.objects.filter(pk=dados['cliente'].pk)
+            parametros['metas_anuais'] = {dados['cliente'].pk: dados['meta_anual']}
+        elif dados['base'] == 'representante':
+            parametros['clientes'] = Cliente.objects.da_carteira(dados['representante'])
+            parametros['meta_carteira'] = dados['meta_anual']
+        else:
+            clientes = Cliente.objects.all()
+            if dados['representante']:
+                clientes = clientes.da_carteira(dados['representante'])
+            parametros['clientes'] = clientes
+            parametros['crescimento'] = float(dados['crescimento'] or 0) / 100
+        return parametros
+
 class CustomAuthenticationForm(AuthenticationForm):
     def confirm_login_allowed(self, user):
         super().confirm_login_allowed(user)
@@ -159,7 +253,7 @@ class ProspeccaoForm(forms.ModelForm):
             if user.is_staff or user.profile.tem_acesso_gestao:
                 self.fields['cliente'].queryset = prospects_queryset
             else:
-                self.fields['cliente'].queryset = prospects_queryset.filter(cadastrado_por=user)
+                self.fields['cliente'].queryset = prospects_queryset.da_carteira(user)
 
     def clean(self):
         cleaned_data = super().clean()
@@ -0,0 +1,149 @@
+"""
+Indicadores do funil de prospecção por coorte (mês de criação).
+
+Uma única consulta com agregação condicional (COUNT/SUM ... FILTER) agrupa as
+prospecções por mês de criação e representante e traz, por grupo, a
+quantidade em cada etapa, os valores (total, fechado, em aberto, perdido) e o
+ciclo médio até o fechamento. Os totais do período, de cada coorte e de cada
+representante são somas dessas linhas, sem novas consultas.
+
+O período filtra a data de criação: uma prospecção em aberto entra na coorte
+do mês em que foi criada, em vez de sumir por não ter data de finalização.
+
+O resultado fica no cache do Django por escopo (usuário ou representante
+filtrado) e período, com as versões de Prospeccao e User (ContadorAlteracao)
+na chave: qualquer gravação gera uma chave nova, e a antiga só expira.
+"""
+import calendar
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import ContadorAlteracao, Prospeccao
+
+# Campo do resultado para cada status, na ordem do funil
+ETAPAS = [
+    ('NOVA', 'novas', 'Nova'),
+    ('NEGOCIANDO', 'negociando', 'Em Negociação'),
+    ('FECHADO', 'fechadas', 'Fechado'),
+    ('DESISTENCIA', 'desistencias', 'Desistência'),
+    ('PERDIDA', 'perdidas', 'Perdida'),
+]
+PERDAS = ['DESISTENCIA', 'PERDIDA']
+CONTAGENS = ['total'] + [campo for _, campo, _ in ETAPAS]
+VALORES = ['valor_estimado', 'valor_fechado', 'valor_aberto', 'valor_perdido']
+
+
+def _agregados():
+    agregados = {'total': Count('id')}
+    agregados.update({campo: Count('id', filter=Q(status=status)) for status, campo, _ in ETAPAS})
+    agregados.update({
+        'valor_estimado': Sum('valor_total'),
+        'valor_fechado': Sum('valor_total', filter=Q(status='FECHADO')),
+        'valor_aberto': Sum('valor_total', filter=Q(status__in=Prospeccao.ETAPAS_ABERTAS)),
+        'valor_perdido': Sum('valor_total', filter=Q(status__in=PERDAS)),
+        'ciclo': Avg(F('data_finalizacao') - F('data_criacao'), filter=Q(status='FECHADO', data_finalizacao__isnull=False)),
+    })
+    return agregados
+
+
+def _vazio():
+    grupo = dict.fromkeys(CONTAGENS, 0)
+    grupo.update(dict.fromkeys(VALORES, Decimal('0.00')))
+    grupo['_ciclo_segundos'] = 0.0
+    return grupo
+
+
+def _somar(grupo, linha):
+    for campo in CONTAGENS:
+        grupo[campo] += linha[campo]
+    for campo in VALORES:
+        grupo[campo] += linha[campo] or 0
+    if linha['ciclo'] is not None:
+        # Média ponderada pelas fechadas do grupo, para combinar coortes e representantes
+        grupo['_ciclo_segundos'] += linha['ciclo'].total_seconds() * linha['fechadas']
+
+
+def _indicadores(grupo):
+    """ Taxas, ticket e ciclo médio a partir das somas do grupo. """
+    total, fechadas = grupo['total'], grupo['fechadas']
+    perdidas = grupo['desistencias'] + grupo['perdidas']
+    finalizadas = fechadas + perdidas
+    ciclo = grupo.pop('_ciclo_segundos')
+    grupo.update({
+        'abertas': grupo['novas'] + grupo['negociando'],
+        'finalizadas': finalizadas,
+        'taxa_conversao': fechadas / total * 100 if total else 0,
+        'taxa_perda': perdidas / total * 100 if total else 0,
+        'taxa_ganho': fechadas / finalizadas * 100 if finalizadas else 0,  # entre as já decididas
+        'ticket_medio': grupo['valor_fechado'] / fechadas if fechadas else Decimal('0.00'),
+        'ciclo_medio_dias': round(ciclo / fechadas / 86400, 1) if fechadas and ciclo else None,
+    })
+    return grupo
+
+
+def calcular(prospeccoes):
+    """ Funil do queryset: {'total', 'coortes', 'representantes'} com uma consulta. """
+    linhas = (
+        prospeccoes.annotate(coorte=TruncMonth('data_criacao'))
+        .values('coorte', 'criado_por', 'criado_por__username', 'criado_por__first_name', 'criado_por__last_name')
+        .annotate(**_agregados())
+        .order_by('coorte')
+    )
+    total = _vazio()
+    coortes = defaultdict(_vazio)
+    representantes = defaultdict(_vazio)
+    nomes = {}
+    for linha in linhas:
+        coorte = linha['coorte'].date()
+        _somar(total, linha)
+        _somar(coortes[coorte], linha)
+        _somar(representantes[linha['criado_por']], linha)
+        nome = f"{linha['criado_por__first_name']} {linha['criado_por__last_name']}".strip()
+        nomes[linha['criado_por']] = nome or linha['criado_por__username']
+
+    por_coorte = [
+        dict(_indicadores(grupo), coorte=coorte, rotulo=f'{calendar.month_abbr[coorte.month].capitalize()}/{coorte.year}')
+        for coorte, grupo in sorted(coortes.items())
+    ]
+    por_representante = sorted(
+        (dict(_indicadores(grupo), representante_id=pk, nome=nomes[pk]) for pk, grupo in representantes.items()),
+        key=lambda grupo: grupo['valor_fechado'],
+        reverse=True,
+    )
+    return {'total': _indicadores(total), 'coortes': por_coorte, 'representantes': por_representante}
+
+
+def funil(usuario, inicio=None, fim=None, representante=None):
+    """
+    Funil das prospecções visíveis ao usuário criadas no período (datas
+    inclusivas). Sem acesso de gestão, só as criadas pelo próprio usuário;
+    com acesso, todas ou as do `representante` (id).
+    """
+    if usuario.is_staff or usuario.profile.tem_acesso_gestao:
+        escopo = representante or 'todos'
+    else:
+        escopo = usuario.pk
+
+    versoes = ContadorAlteracao.versoes([Prospeccao, User])
+    chave = 'funil:{}:{}:{}:{}:{}'.format(
+        ':'.join(str(versao) for versao, _ in versoes.values()), escopo, inicio or '', fim or '', timezone.get_current_timezone_name(),
+    )
+    resultado = cache.get(chave)
+    if resultado is None:
+        prospeccoes = Prospeccao.objects.all()
+        if escopo != 'todos':
+            prospeccoes = prospeccoes.filter(criado_por_id=escopo)
+        if inicio:
+            prospeccoes = prospeccoes.filter(data_criacao__date__gte=inicio)
+        if fim:
+            prospeccoes = prospeccoes.filter(data_criacao__date__lte=fim)
+        resultado = calcular(prospeccoes)
+        cache.set(chave, resultado, settings.FUNIL_CACHE_SEGUNDOS)
+    return resultado
@@ -0,0 +1,58 @@
+"""
+Idempotência das escritas reenviadas pelo service worker.
+
+O service worker manda em cada POST um X-Idempotency-Key gerado no aparelho.
+Se a conexão cai antes da resposta, o pedido vai para a fila offline e é
+repetido depois com a mesma chave; se o primeiro envio tinha chegado ao
+servidor, a repetição é respondida sem chamar a view (nada é gravado duas
+vezes). Chaves antigas são apagadas pelo limpar_uploads.
+"""
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+
+from .models import EscritaIdempotente
+
+CABECALHO = 'X-Idempotency-Key'
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _repetida(request, chave):
+    status = (
+        EscritaIdempotente.objects.filter(usuario=request.user, chave=chave)
+        .values_list('status', flat=True).first()
+    )
+    if status is None:
+        # Primeira execução ainda em andamento: o service worker mantém o item e tenta depois
+        resposta = HttpResponse('Escrita em processamento.', status=409)
+        resposta['X-Idempotency-Status'] = 'processando'
+    else:
+        resposta = HttpResponse(status=200)
+        resposta['X-Idempotency-Status'] = 'repetida'
+        resposta['HX-Reswap'] = 'none'
+    return resposta
+
+
+class IdempotenciaMiddleware:
+    """ Deve ficar depois do AuthenticationMiddleware. """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        chave = request.headers.get(CABECALHO, '')[:64]
+        if request.method in METODOS_SEGUROS or not chave or not request.user.is_authenticated:
+            return self.get_response(request)
+
+        try:
+            with transaction.atomic():
+                escrita = EscritaIdempotente.objects.create(usuario=request.user, chave=chave)
+        except IntegrityError:
+            return _repetida(request, chave)
+
+        response = self.get_response(request)
+        if response.status_code < 400:
+            EscritaIdempotente.objects.filter(pk=escrita.pk).update(status=response.status_code)
+        else:
+            # Recusada (validação, CSRF, erro): a repetição deve ser executada de novo
+            escrita.delete()
+        return response
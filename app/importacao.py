@@ -0,0 +1,282 @@
+"""
+Importação em massa de Serviços a partir de planilhas (CSV/XLSX).
+
+A validação roda em passadas vetorizadas do pandas sobre a planilha inteira:
+clientes (por CNPJ) e tipos de serviço são resolvidos com um único SELECT cada
+e mapeados coluna a coluna, sem consultas por linha. As linhas aceitas são
+gravadas com bulk_create em lotes, cada lote na sua própria transação.
+
+Entre a pré-visualização e a confirmação na tela, a planilha fica em
+importacoes/ no default_storage, registrada numa PreviaImportacao; vale por
+ANEXOS_UPLOAD_VALIDADE_HORAS, e as abandonadas são removidas pelo comando
+`limpar_uploads`.
+"""
+import io
+import numbers
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Cliente, ContadorAlteracao, PreviaImportacao, Servico, TipoServico
+
+COLUNAS_OBRIGATORIAS = ['cnpj', 'data_servico', 'valor']
+COLUNAS_OPCIONAIS = ['tipo_servico', 'quantidade']
+EXTENSOES_ACEITAS = ['.csv', '.xlsx']
+
+# Cabeçalhos alternativos aceitos na planilha
+SINONIMOS = {
+    'cnpj_cliente': 'cnpj',
+    'data': 'data_servico',
+    'tipo': 'tipo_servico',
+    'tipo_de_servico': 'tipo_servico',
+    'viagens': 'quantidade',
+    'valor_total': 'valor',
+}
+
+VALOR_MAXIMO = Decimal('99999999.99')  # max_digits=10, decimal_places=2
+# Valor no formato brasileiro: "1234", "1234,56", "1.234" ou "1.234,56". O ponto só
+# separa milhares; "1.5" ou "1,234.56" são ambíguos e a linha é recusada
+FORMATO_VALOR = r'(?:\d+|\d{1,3}(?:\.\d{3})+)(?:,\d+)?'
+PASTA_PREVIAS = 'importacoes'
+
+
+class PlanilhaInvalida(Exception):
+    """ Planilha ilegível ou sem as colunas obrigatórias. """
+
+
+def _normalizar_cabecalho(nome):
+    nome = str(nome).strip().lower().replace(' ', '_')
+    return SINONIMOS.get(nome, nome)
+
+
+def _ler_csv(arquivo):
+    conteudo = arquivo.read()
+    if isinstance(conteudo, bytes):
+        try:
+            conteudo = conteudo.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            conteudo = conteudo.decode('latin-1')  # CSV exportado pelo Excel em português
+    # Planilhas brasileiras costumam vir com ';' em vez de ','
+    cabecalho = conteudo.split('\n', 1)[0]
+    separador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    return pd.read_csv(io.StringIO(conteudo), sep=separador, dtype=str, keep_default_na=False)
+
+
+def _numero_em_texto(celula):
+    # Célula numérica do Excel: vira texto no formato brasileiro, como se digitada
+    if isinstance(celula, numbers.Real) and not isinstance(celula, bool):
+        return format(Decimal(str(celula)), 'f').replace('.', ',')
+    return celula
+
+
+def ler_planilha(arquivo, nome=None):
+    """ Lê CSV ou Excel para um DataFrame de texto, com cabeçalhos normalizados. """
+    nome = nome or getattr(arquivo, 'name', '')
+    extensao = Path(nome).suffix.lower()
+    if extensao not in EXTENSOES_ACEITAS:
+        raise PlanilhaInvalida(f"Formato '{extensao}' não suportado. Use CSV ou XLSX.")
+
+    try:
+        if extensao == '.csv':
+            df = _ler_csv(arquivo)
+        else:
+            df = pd.read_excel(arquivo, dtype=object, keep_default_na=False)
+    except Exception as e:
+        raise PlanilhaInvalida(f"Não foi possível ler a planilha: {e}")
+
+    df.columns = [_normalizar_cabecalho(c) for c in df.columns]
+    faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in df.columns]
+    if faltando:
+        raise PlanilhaInvalida(f"Colunas obrigatórias ausentes: {', '.join(faltando)}.")
+    if extensao == '.xlsx':
+        # O Excel entrega 1234.5 como número; em texto o ponto seria lido como milhar
+        df['valor'] = df['valor'].map(_numero_em_texto)
+        df = df.astype(str)
+
+    for coluna in COLUNAS_OPCIONAIS:
+        if coluna not in df.columns:
+            df[coluna] = ''
+
+    df = df[COLUNAS_OBRIGATORIAS + COLUNAS_OPCIONAIS].apply(lambda s: s.str.strip())
+    # Numeração igual à do Excel (cabeçalho na linha 1)
+    df.index = pd.RangeIndex(2, len(df) + 2, name='linha')
+    return df
+
+
+def _somente_digitos(serie):
+    return serie.str.replace(r'\D', '', regex=True)
+
+
+def _mapa_clientes():
+    """ {cnpj (só dígitos): cliente_id} e conjunto de CNPJs repetidos no cadastro. """
+    clientes = pd.DataFrame(list(Cliente.objects.values_list('id', 'cnpj')), columns=['id', 'cnpj'])
+    clientes['cnpj'] = _somente_digitos(clientes['cnpj'].fillna(''))
+    repetidos = set(clientes.loc[clientes['cnpj'].duplicated(keep=False), 'cnpj'])
+    unicos = clientes.drop_duplicates('cnpj', keep=False)
+    return pd.Series(unicos['id'].values, index=unicos['cnpj'].values), repetidos
+
+
+def _mapa_tipos():
+    tipos = TipoServico.objects.values_list('id', 'nome')
+    return pd.Series({nome.strip().upper(): tipo_id for tipo_id, nome in tipos}, dtype='Int64')
+
+
+def _converter_datas(serie):
+    # Aceita ISO (e datas vindas do Excel) ou o formato brasileiro dd/mm/aaaa
+    datas = pd.to_datetime(serie, format='ISO8601', errors='coerce')
+    faltando = datas.isna() & serie.ne('')
+    if faltando.any():
+        datas[faltando] = pd.to_datetime(serie[faltando], format='%d/%m/%Y', errors='coerce')
+    return datas
+
+
+def _converter_valores(serie):
+    # "R$ 1.234,56" / "1234,56" / "1.500" -> 1234.56 / 1234.56 / 1500; fora do FORMATO_VALOR -> NaN
+    texto = serie.str.replace('R$', '', regex=False).str.replace(r'\s', '', regex=True)
+    valido = texto.str.fullmatch(FORMATO_VALOR)
+    texto = texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    return pd.to_numeric(texto.where(valido), errors='coerce')
+
+
+def validar_servicos(df):
+    """
+    Valida e resolve a planilha inteira de uma vez.
+    Retorna o DataFrame com as colunas resolvidas (cliente_id, tipo_servico_id,
+    data, quantidade_int, centavos) e a coluna 'erros' (vazia nas linhas aceitas).
+    """
+    resultado = df.copy()
+    erros = pd.Series('', index=df.index, dtype=object)
+
+    def marcar(mascara, mensagem):
+        nonlocal erros
+        erros = erros.where(~mascara, erros + mensagem + '; ')
+
+    # Cliente por CNPJ
+    cnpj = _somente_digitos(df['cnpj'])
+    mapa_clientes, repetidos = _mapa_clientes()
+    resultado['cliente_id'] = cnpj.map(mapa_clientes).astype('Int64')
+    marcar(cnpj.eq(''), 'CNPJ vazio')
+    marcar(cnpj.ne('') & cnpj.isin(repetidos), 'CNPJ duplicado no cadastro de clientes')
+    marcar(cnpj.ne('') & ~cnpj.isin(repetidos) & resultado['cliente_id'].isna(), 'Cliente não encontrado')
+
+    # Tipo de serviço (opcional)
+    tipo = df['tipo_servico'].str.upper()
+    resultado['tipo_servico_id'] = tipo.map(_mapa_tipos()).astype('Int64')
+    marcar(tipo.ne('') & resultado['tipo_servico_id'].isna(), 'Tipo de serviço não cadastrado')
+
+    # Data
+    datas = _converter_datas(df['data_servico'])
+    resultado['data'] = datas.dt.date
+    marcar(datas.isna(), 'Data inválida')
+
+    # Quantidade (padrão 1)
+    quantidade = pd.to_numeric(df['quantidade'].replace('', '1'), errors='coerce')
+    quantidade_invalida = quantidade.isna() | (quantidade < 1) | (quantidade % 1 != 0)
+    resultado['quantidade_int'] = quantidade.where(~quantidade_invalida, 0).astype('int64')
+    marcar(quantidade_invalida, 'Quantidade inválida')
+
+    # Valor em centavos (inteiro) para não perder precisão
+    valores = _converter_valores(df['valor'])
+    valor_invalido = valores.isna() | (valores <= 0) | (valores > float(VALOR_MAXIMO))
+    resultado['centavos'] = np.rint(valores.where(~valor_invalido, 0) * 100).astype('int64')
+    marcar(valor_invalido, 'Valor inválido (use o formato 1.234,56)')
+
+    resultado['erros'] = erros.str.rstrip('; ')
+    return resultado
+
+
+def resumo_validacao(validado, limite_erros=200, limite_validos=20):
+    """ Dados para a pré-visualização: contagens, primeiras linhas com erro e amostra das aceitas. """
+    com_erro = validado[validado['erros'] != '']
+    aceitas = validado[validado['erros'] == '']
+    colunas = ['cnpj', 'tipo_servico', 'data_servico', 'quantidade', 'valor']
+    return {
+        'total': len(validado),
+        'total_validos': len(aceitas),
+        'total_erros': len(com_erro),
+        'linhas_erro': com_erro[colunas + ['erros']].head(limite_erros).reset_index().to_dict('records'),
+        'linhas_validas': aceitas[colunas].head(limite_validos).reset_index().to_dict('records'),
+    }
+
+
+def importar_servicos(validado, usuario, tamanho_lote=2000):
+    """ Grava as linhas aceitas em lotes (bulk_create), uma transação por lote. """
+    aceitas = validado[validado['erros'] == '']
+    colunas = zip(
+        aceitas['cliente_id'].tolist(),
+        aceitas['tipo_servico_id'].tolist(),
+        aceitas['data'].tolist(),
+        aceitas['quantidade_int'].tolist(),
+        aceitas['centavos'].tolist(),
+    )
+    # bulk_create não passa pelo sinal que copia o dono do cliente
+    donos = dict(
+        Cliente.objects.filter(pk__in=set(aceitas['cliente_id'].tolist())).values_list('pk', 'cadastrado_por_id')
+    )
+    servicos = [
+        Servico(
+            cliente_id=cliente_id,
+            representante_id=donos.get(cliente_id),
+            tipo_servico_id=None if pd.isna(tipo_id) else tipo_id,
+            data_servico=data,
+            quantidade=quantidade,
+            valor=Decimal(centavos).scaleb(-2),
+            fechado_por=usuario,
+        )
+        for cliente_id, tipo_id, data, quantidade, centavos in colunas
+    ]
+
+    inseridos = 0
+    for inicio in range(0, len(servicos), tamanho_lote):
+        with transaction.atomic():
+            lote = Servico.objects.bulk_create(servicos[inicio:inicio + tamanho_lote])
+            ContadorAlteracao.incrementar(Servico)
+        inseridos += len(lote)
+    return inseridos
+
+
+def guardar_previa(arquivo, usuario):
+    """ Guarda a planilha validada até a confirmação; o id da PreviaImportacao é o token do formulário. """
+    extensao = Path(arquivo.name).suffix.lower()
+    arquivo.seek(0)
+    caminho = default_storage.save(f"{PASTA_PREVIAS}/{uuid.uuid4().hex}{extensao}", arquivo)
+    return PreviaImportacao.objects.create(usuario=usuario, caminho=caminho)
+
+
+def consumir_previa(token, usuario):
+    """
+    PreviaImportacao do usuário, já apagada; None se não existe, expirou ou já
+    foi confirmada. Chamar na transação que grava os serviços: se a gravação
+    falhar, a prévia volta a existir. O arquivo é apagado após o commit.
+    """
+    validade = timezone.now() - timedelta(hours=settings.ANEXOS_UPLOAD_VALIDADE_HORAS)
+    try:
+        previa = PreviaImportacao.objects.select_for_update().get(pk=token, usuario=usuario, criado_em__gte=validade)
+    except (PreviaImportacao.DoesNotExist, ValidationError):
+        return None
+    previa.delete()
+    transaction.on_commit(lambda: default_storage.delete(previa.caminho))
+    return previa
+
+
+def limpar_previas(limite):
+    """ Remove as pré-visualizações gravadas antes de `limite`; retorna quantas planilhas. """
+    PreviaImportacao.objects.filter(criado_em__lt=limite).delete()
+    if not default_storage.exists(PASTA_PREVIAS):
+        return 0
+    removidas = 0
+    for nome in default_storage.listdir(PASTA_PREVIAS)[1]:
+        caminho = f'{PASTA_PREVIAS}/{nome}'
+        if default_storage.get_modified_time(caminho) < limite:
+            default_storage.delete(caminho)
+            removidas += 1
+    return removidas
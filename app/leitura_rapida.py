@@ -0,0 +1,70 @@
+"""
+Leitura rápida das listagens da API.
+
+Em vez de instanciar um model por linha e serializar campo a campo (com
+chamadas como get_full_name via source=), a listagem busca linhas planas com
+.values(), já com os nomes de exibição montados no SQL, e gera os dicts de
+saída diretamente. O formato é o mesmo do serializer: os valores que precisam
+de formatação (Decimal, datas) passam pelo to_representation do próprio campo.
+
+O serializer declara em `Meta.valores` a origem de cada campo que não é uma
+coluna com o mesmo nome: um lookup ('cliente__razao_social'), uma expressão
+(nome_completo('fechado_por')) ou uma tupla (origem, fk), para omitir o campo
+quando a FK é nula, como o serializer faz com source='fk.atributo'.
+"""
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Trim
+from rest_framework import serializers
+
+# Campos cuja saída depende de formatação; os demais já saem prontos do banco
+CAMPOS_FORMATADOS = (
+    serializers.DecimalField, serializers.DateField, serializers.DateTimeField,
+    serializers.TimeField, serializers.DurationField, serializers.UUIDField,
+)
+
+
+def nome_completo(relacao):
+    """ Equivalente em SQL a User.get_full_name() da relação informada. """
+    return Trim(Concat(F(f'{relacao}__first_name'), Value(' '), F(f'{relacao}__last_name')))
+
+
+class LeitorValores:
+    """ Plano de leitura de um serializer (já com o ?fields= aplicado). """
+
+    def __init__(self, serializer):
+        origens = getattr(serializer.Meta, 'valores', {})
+        self.lookups = {'id'}  # a paginação por cursor precisa do id
+        self.expressoes = {}
+        self.campos = []
+
+        for nome, campo in serializer.fields.items():
+            if campo.write_only:
+                continue
+            origem, fk = origens.get(nome, nome), None
+            if isinstance(origem, tuple):
+                origem, fk = origem
+                self.lookups.add(fk)
+            if isinstance(origem, str):
+                chave = origem
+                self.lookups.add(origem)
+            else:
+                chave = f'_{nome}'
+                self.expressoes[chave] = origem
+            conversor = campo.to_representation if isinstance(campo, CAMPOS_FORMATADOS) else None
+            self.campos.append((nome, chave, fk, conversor))
+
+    def consulta(self, queryset):
+        return queryset.values(*self.lookups, **self.expressoes)
+
+    def representar(self, linhas):
+        campos = self.campos
+        saida = []
+        for linha in linhas:
+            item = {}
+            for nome, chave, fk, conversor in campos:
+                if fk and linha[fk] is None:
+                    continue
+                valor = linha[chave]
+                item[nome] = conversor(valor) if conversor and valor is not None else valor
+            saida.append(item)
+        return saida
@@ -0,0 +1,136 @@
+import statistics
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import Count, Sum
+
+from app.models import Cliente, Exclusao, Servico, TipoServico
+
+MARCADOR = 'benchmark-concorrencia'
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede leituras de dashboard e gravações de serviços simultâneas no banco configurado '
+        '(CRM_BANCO), em operações por segundo e latência. Os registros criados são apagados ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leitores', type=int, default=8, help='Threads lendo agregados de dashboard.')
+        parser.add_argument('--escritores', type=int, default=2, help='Threads gravando serviços.')
+        parser.add_argument('--segundos', type=float, default=10, help='Duração da medição.')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+            raise CommandError('Use um banco SQLite em arquivo: em memória cada thread teria o seu próprio banco.')
+        if User.objects.filter(username=MARCADOR).exists():
+            raise CommandError(f'Já existe o usuário "{MARCADOR}" (execução anterior interrompida?). Apague-o antes.')
+
+        self._descrever_banco()
+        usuario, cliente, tipo = self._preparar()
+        criados = []
+        try:
+            resultados = self._executar(options, cliente, tipo, usuario, criados)
+        finally:
+            self._limpar(usuario, cliente, tipo, criados)
+        self._relatar(resultados, options['segundos'])
+
+    def _descrever_banco(self):
+        config = connection.settings_dict
+        linha = f'Banco: {connection.vendor} ({config["NAME"]})'
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal = cursor.fetchone()[0]
+                cursor.execute('PRAGMA synchronous')
+                sincrono = cursor.fetchone()[0]
+            linha += f', journal_mode={journal}, synchronous={sincrono}, transaction_mode={connection.transaction_mode}'
+        else:
+            linha += f', CONN_MAX_AGE={config["CONN_MAX_AGE"]}, CONN_HEALTH_CHECKS={config["CONN_HEALTH_CHECKS"]}'
+        self.stdout.write(linha)
+
+    def _preparar(self):
+        usuario = User.objects.create_user(MARCADOR, first_name='Bench', last_name='Concorrência')
+        tipo = TipoServico.objects.create(nome=f'{MARCADOR} {usuario.pk}')
+        cliente = Cliente.objects.create(
+            cnpj='00000000000000', razao_social=MARCADOR, endereco='Rua', nome_contato='Contato',
+            telefone_contato='0', cadastrado_por=usuario,
+        )
+        return usuario, cliente, tipo
+
+    def _executar(self, options, cliente, tipo, usuario, criados):
+        hoje = date.today()
+        fim = time.monotonic() + options['segundos']
+        resultados = {'leitura': [], 'escrita': []}
+        erros = {'leitura': 0, 'escrita': 0}
+        trava = threading.Lock()
+
+        def ler():
+            # Os mesmos agregados do dashboard mensal de um gestor
+            base = Servico.objects.filter(data_servico__year=hoje.year, data_servico__month=hoje.month)
+            base.aggregate(faturamento=Sum('valor'), viagens=Sum('quantidade'))
+            list(base.values('cliente_id').annotate(total=Sum('valor'), n=Count('id')).order_by('-total')[:10])
+
+        def gravar(i):
+            with transaction.atomic():
+                servico = Servico.objects.create(
+                    cliente=cliente, fechado_por=usuario, tipo_servico=tipo,
+                    data_servico=hoje - timedelta(days=i % 28), quantidade=1 + i % 3,
+                    valor=Decimal(100 + i % 900),
+                )
+            with trava:
+                criados.append(servico.pk)
+
+        def trabalhador(tipo_operacao):
+            tempos, falhas, i = [], 0, 0
+            try:
+                while time.monotonic() < fim:
+                    inicio = time.perf_counter()
+                    try:
+                        ler() if tipo_operacao == 'leitura' else gravar(i)
+                    except OperationalError:  # ex.: "database is locked" após o timeout
+                        falhas += 1
+                    else:
+                        tempos.append(time.perf_counter() - inicio)
+                    i += 1
+            finally:
+                connection.close()
+            with trava:
+                resultados[tipo_operacao].extend(tempos)
+                erros[tipo_operacao] += falhas
+
+        threads = [threading.Thread(target=trabalhador, args=('leitura',)) for _ in range(options['leitores'])]
+        threads += [threading.Thread(target=trabalhador, args=('escrita',)) for _ in range(options['escritores'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {tipo: (resultados[tipo], erros[tipo]) for tipo in resultados}
+
+    def _limpar(self, usuario, cliente, tipo, criados):
+        Servico.objects.filter(pk__in=criados).delete()
+        Cliente.objects.filter(pk=cliente.pk).delete()
+        Exclusao.objects.filter(modelo='app.servico', objeto_id__in=criados).delete()
+        Exclusao.objects.filter(modelo='app.cliente', objeto_id=cliente.pk).delete()
+        tipo.delete()
+        usuario.delete()
+
+    def _relatar(self, resultados, segundos):
+        for tipo, (tempos, falhas) in resultados.items():
+            if not tempos:
+                self.stdout.write(f'  {tipo:<8} nenhuma operação concluída ({falhas} falha(s))')
+                continue
+            tempos_ms = sorted(t * 1000 for t in tempos)
+            p95 = tempos_ms[min(len(tempos_ms) - 1, int(len(tempos_ms) * 0.95))]
+            self.stdout.write(
+                f'  {tipo:<8} {len(tempos) / segundos:>9,.1f} op/s   '
+                f'p50 {statistics.median(tempos_ms):>7.1f} ms   p95 {p95:>7.1f} ms   '
+                f'máx {tempos_ms[-1]:>7.1f} ms   falhas {falhas}'
+            )
+        if any(falhas for _, falhas in resultados.values()):
+            self.stdout.write(self.style.WARNING('Houve falhas de lock: aumente o timeout ou troque de perfil (CRM_BANCO).'))
@@ -0,0 +1,158 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from app import fatos
+from app.models import Cliente, ContadorAlteracao, Servico, TipoServico
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _ao_centavo(valor):
+    if isinstance(valor, Decimal):
+        return valor.quantize(Decimal('0.01'))
+    if isinstance(valor, dict):
+        return {chave: _ao_centavo(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return type(valor)(_ao_centavo(v) for v in valor)
+    return valor
+
+
+class Command(BaseCommand):
+    help = (
+        'Carrega os fatos de Servico em memória (app/fatos.py), informa a memória ocupada por milhão '
+        'de linhas e compara os agregados dos dashboards calculados pelo banco e pela cópia em memória.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=12, help='Período agregado, em meses até hoje.')
+        parser.add_argument('--repeticoes', type=int, default=5, help='Rodadas de cada caminho (vale a melhor).')
+        parser.add_argument(
+            '--gerar',
+            type=int,
+            default=0,
+            metavar='LINHAS',
+            help='Gera serviços sintéticos numa transação desfeita ao final (para bancos vazios).'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['gerar']:
+                    self._gerar(options['gerar'])
+                self._medir(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            fatos.descartar()
+
+    def _medir(self, options):
+        if not Servico.objects.exists():
+            raise CommandError('Não há serviços cadastrados; use --gerar.')
+
+        fatos.descartar()
+        inicio = time.perf_counter()
+        copia = fatos.atuais()
+        carga = time.perf_counter() - inicio
+        memoria = copia.memoria()
+        self.stdout.write(
+            f'Cópia em memória: {memoria["linhas"]:,} linhas carregadas em {carga * 1000:,.0f} ms, '
+            f'{memoria["bytes"] / 2 ** 20:,.1f} MB ({memoria["bytes_por_linha"]} bytes por linha, '
+            f'{memoria["mb_por_milhao"]:.1f} MB por milhão de linhas)'
+        )
+
+        fim = date.today()
+        periodo = (fim - timedelta(days=31 * options['meses']), fim)
+        banco = fatos.ConsultaBanco(Servico.objects.filter(data_servico__gte=periodo[0], data_servico__lte=periodo[1]))
+
+        def em_memoria():
+            # Como numa requisição: confere a versão antes de agregar
+            atual = fatos.atuais()
+            return fatos.ConsultaMemoria(atual, atual.selecao(*periodo))
+
+        def agregar(consulta):
+            # O que os dashboards pedem: totais, ranking de clientes, pizza por tipo, barras por mês e carteiras
+            return consulta.totais(), consulta.por_cliente(), consulta.por_tipo(), consulta.por_mes(), consulta.por_representante()
+
+        resultado_banco, resultado_memoria = agregar(banco), agregar(em_memoria())
+        if not self._iguais(resultado_banco, resultado_memoria):
+            raise CommandError('Os agregados em memória não conferem com os do banco.')
+
+        tempos = {}
+        for nome, funcao in (('banco', lambda: agregar(banco)), ('memória', lambda: agregar(em_memoria()))):
+            rodadas = []
+            for _ in range(options['repeticoes']):
+                inicio = time.perf_counter()
+                funcao()
+                rodadas.append(time.perf_counter() - inicio)
+            tempos[nome] = min(rodadas)
+
+        self.stdout.write(f'Agregados dos últimos {options["meses"]} meses, melhor de {options["repeticoes"]} rodada(s):')
+        for nome, segundos in tempos.items():
+            self.stdout.write(f'  {nome:<8} {segundos * 1000:>9.1f} ms')
+        self.stdout.write(self.style.SUCCESS(
+            f'  Memória {tempos["banco"] / tempos["memória"]:.1f}x mais rápida (mesmos resultados, ao centavo).'
+        ))
+        self._medir_atualizacao()
+
+    def _medir_atualizacao(self):
+        # Um serviço novo: a próxima leitura só traz a janela recente, sem recarregar tudo
+        antes = fatos.atuais()
+        modelo = Servico.objects.order_by('-id').first()
+        Servico.objects.create(
+            cliente=modelo.cliente, fechado_por=modelo.fechado_por, tipo_servico=modelo.tipo_servico,
+            data_servico=date.today(), quantidade=1, valor=Decimal('1.00'),
+        )
+        inicio = time.perf_counter()
+        depois = fatos.atuais()
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(
+            f'Atualização após 1 serviço novo: {segundos * 1000:.1f} ms '
+            f'({len(antes):,} -> {len(depois):,} linhas, versão {depois.versao})'
+        )
+
+    def _iguais(self, banco, memoria):
+        # O SQLite soma DECIMAL em ponto flutuante (ex.: 26411998.8999999): compara ao centavo
+        totais_b, clientes_b, tipos_b, meses_b, reps_b = _ao_centavo(banco)
+        totais_m, clientes_m, tipos_m, meses_m, reps_m = _ao_centavo(memoria)
+
+        def por_cliente(linhas):
+            return sorted((c['cliente_id'], c['valor'], c['quantidade'], c['servicos']) for c in linhas)
+
+        def por_tipo(linhas):
+            return sorted((t['tipo_servico__nome'] or '', t['valor']) for t in linhas)
+
+        return (
+            totais_b == totais_m and por_cliente(clientes_b) == por_cliente(clientes_m)
+            and por_tipo(tipos_b) == por_tipo(tipos_m) and meses_b == meses_m and reps_b == reps_m
+        )
+
+    def _gerar(self, linhas):
+        usuario = User.objects.create_user('benchmark-fatos', first_name='Bench', last_name='Mark')
+        tipos = TipoServico.objects.bulk_create([TipoServico(nome=f'Benchmark fatos {i}') for i in range(5)])
+        clientes = Cliente.objects.bulk_create([
+            Cliente(cnpj=f'{i:014d}', razao_social=f'Cliente {i}', endereco='Rua', nome_contato='Contato',
+                    telefone_contato='0', cadastrado_por=usuario)
+            for i in range(max(linhas // 50, 1))
+        ])
+        inicio = date.today() - timedelta(days=730)
+        Servico.objects.bulk_create([
+            Servico(
+                cliente=clientes[i % len(clientes)], representante_id=usuario.pk, fechado_por=usuario,
+                tipo_servico=tipos[i % len(tipos)] if i % 7 else None, data_servico=inicio + timedelta(days=i % 730),
+                quantidade=1 + i % 5, valor=Decimal(100000 + i * 37 % 99991).scaleb(-2),
+            )
+            for i in range(linhas)
+        ], batch_size=2000)
+        # Registrados "há uma hora", para a atualização incremental medida ao final não relê-los
+        uma_hora = timezone.now() - timedelta(hours=1)
+        Servico.objects.filter(fechado_por=usuario).update(data_registro=uma_hora, atualizado_em=uma_hora)
+        ContadorAlteracao.incrementar(Servico)
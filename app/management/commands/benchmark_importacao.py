@@ -0,0 +1,64 @@
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# O que um worker importa ao subir: configurações, apps (ready) e todas as URLs
+CODIGO = 'import django; django.setup(); import importlib; importlib.import_module({urlconf!r})'
+
+
+def ler_importtime(saida):
+    """ Linhas do -X importtime: (microssegundos próprios, acumulados, profundidade, módulo). """
+    linhas = []
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, acumulado, nome = linha[len('import time:'):].split('|')
+        profundidade = (len(nome) - len(nome.lstrip())) // 2
+        linhas.append((int(proprio), int(acumulado), profundidade, nome.strip()))
+    return linhas
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede com "python -X importtime" a importação feita na subida de um worker (settings, apps e URLs) '
+        'em processos novos e resume o tempo total e os pacotes mais caros.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=5, help='Processos medidos (vale a mediana).')
+        parser.add_argument('--top', type=int, default=10, help='Quantos pacotes listar.')
+
+    def handle(self, *args, **options):
+        ambiente = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'CRM_Comercial.settings'))
+        comando = [sys.executable, '-X', 'importtime', '-c', CODIGO.format(urlconf=settings.ROOT_URLCONF)]
+
+        execucoes = []
+        for _ in range(options['repeticoes']):
+            processo = subprocess.run(comando, env=ambiente, capture_output=True, text=True, cwd=settings.BASE_DIR)
+            if processo.returncode:
+                raise CommandError(f'A importação falhou:\n{processo.stderr[-2000:]}')
+            execucoes.append(ler_importtime(processo.stderr))
+
+        totais = [sum(acumulado for _, acumulado, profundidade, _ in linhas if profundidade == 0) for linhas in execucoes]
+        self.stdout.write(
+            f'Importação na subida: mediana {statistics.median(totais) / 1000:.0f} ms '
+            f'({len(execucoes)} processos, mín {min(totais) / 1000:.0f} ms)'
+        )
+
+        # Tempo próprio somado por pacote de primeiro nível, na execução mediana
+        linhas = execucoes[totais.index(sorted(totais)[len(totais) // 2])]
+        por_pacote = defaultdict(int)
+        for proprio, _, _, nome in linhas:
+            por_pacote[nome.split('.')[0]] += proprio
+        self.stdout.write(f'\n{"pacote":<24}{"ms":>8}')
+        for pacote, micro in sorted(por_pacote.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'{pacote:<24}{micro / 1000:>8.1f}')
+
+        self.stdout.write(f'\n{"módulo do app":<32}{"ms (acumulado)":>16}')
+        for _, acumulado, _, nome in sorted((l for l in linhas if l[3].startswith('app.')), key=lambda l: -l[1])[:options['top']]:
+            self.stdout.write(f'{nome:<32}{acumulado / 1000:>16.1f}')
@@ -0,0 +1,113 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from app.leitura_rapida import LeitorValores
+from app.models import Cliente, Servico, TipoServico
+from app.serializers import ClienteSerializer, ServicoSerializer
+
+ALVOS = {
+    'servicos': (Servico, ServicoSerializer),
+    'clientes': (Cliente, ClienteSerializer),
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compara a listagem da API pelo serializer e pela leitura rápida (.values()), em linhas por segundo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alvo', choices=sorted(ALVOS), default='servicos')
+        parser.add_argument('--linhas', type=int, default=10000, help='Linhas por rodada.')
+        parser.add_argument('--repeticoes', type=int, default=3, help='Rodadas de cada caminho (vale a melhor).')
+        parser.add_argument(
+            '--gerar',
+            action='store_true',
+            help='Gera linhas sintéticas numa transação desfeita ao final (para bancos vazios).'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['gerar']:
+                    self._gerar(options['linhas'])
+                self._medir(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _medir(self, options):
+        modelo, serializer_class = ALVOS[options['alvo']]
+        linhas = options['linhas']
+        request = Request(RequestFactory().get('/api/'))
+        contexto = {'request': request}
+
+        base = modelo.objects.order_by('-id')
+        total = base.count()
+        if total < linhas:
+            raise CommandError(f'Só há {total} linha(s) em {options["alvo"]}; use --gerar ou reduza --linhas.')
+
+        relacionados = serializer_class.relacionados_para(None)
+
+        def atual():
+            instancias = list(base.select_related(*relacionados)[:linhas])
+            return serializer_class(instancias, many=True, context=contexto).data
+
+        def rapido():
+            leitor = LeitorValores(serializer_class(context=contexto))
+            return leitor.representar(list(leitor.consulta(base)[:linhas]))
+
+        if [dict(item) for item in atual()] != rapido():
+            raise CommandError('A leitura rápida não reproduziu a saída do serializer.')
+
+        resultados = {}
+        for nome, funcao in (('serializer', atual), ('leitura rápida', rapido)):
+            tempos = []
+            for _ in range(options['repeticoes']):
+                inicio = time.perf_counter()
+                funcao()
+                tempos.append(time.perf_counter() - inicio)
+            resultados[nome] = min(tempos)
+
+        self.stdout.write(f'{options["alvo"]}: {linhas} linhas, melhor de {options["repeticoes"]} rodada(s)')
+        for nome, segundos in resultados.items():
+            self.stdout.write(
+                f'  {nome:<15} {linhas / segundos:>10,.0f} linhas/s   '
+                f'{segundos * 10000 / linhas * 1000:>8.1f} ms por 10 mil linhas'
+            )
+        ganho = resultados['serializer'] / resultados['leitura rápida']
+        self.stdout.write(self.style.SUCCESS(f'  Leitura rápida {ganho:.1f}x mais rápida (saídas idênticas).'))
+
+    def _gerar(self, linhas):
+        usuario = User.objects.create_user('benchmark-leitura', first_name='Bench', last_name='Mark')
+        tipo = TipoServico.objects.create(nome='Benchmark leitura rápida')
+        clientes = Cliente.objects.bulk_create([
+            Cliente(cnpj=f'{i:014d}', razao_social=f'Cliente {i}', endereco='Rua', nome_contato='Contato',
+                    telefone_contato='0', cadastrado_por=usuario if i % 3 else None)
+            for i in range(max(linhas // 20, 1))
+        ])
+        if len(clientes) < linhas:
+            clientes += Cliente.objects.bulk_create([
+                Cliente(cnpj=f'9{i:013d}', razao_social=f'Cliente extra {i}', endereco='Rua',
+                        nome_contato='Contato', telefone_contato='0', cadastrado_por=usuario)
+                for i in range(linhas - len(clientes))
+            ])
+        inicio = date.today() - timedelta(days=365)
+        Servico.objects.bulk_create([
+            Servico(
+                cliente=clientes[i % len(clientes)], representante_id=clientes[i % len(clientes)].cadastrado_por_id,
+                fechado_por=usuario if i % 4 else None,
+                tipo_servico=tipo if i % 2 else None, data_servico=inicio + timedelta(days=i % 365),
+                quantidade=1 + i % 5, valor=Decimal(1000 + i % 997) / 7,
+            )
+            for i in range(linhas)
+        ], batch_size=2000)
@@ -0,0 +1,35 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from app.replica import ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia o banco SQLite principal para o arquivo da réplica (CRM_SQLITE_REPLICA), '
+        'para testar localmente o roteamento de leituras. No PostgreSQL a réplica vem da replicação do servidor.'
+    )
+
+    def handle(self, *args, **options):
+        if ALIAS not in connections.settings:
+            raise CommandError('Réplica não configurada: defina CRM_SQLITE_REPLICA com o caminho do arquivo.')
+        principal, replica = connections['default'], connections[ALIAS]
+        if principal.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('Só para SQLite.')
+        replica.close()
+
+        inicio = time.perf_counter()
+        principal.ensure_connection()
+        # API de backup do SQLite: cópia consistente mesmo com gravações em andamento no WAL
+        destino = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            principal.connection.backup(destino)
+        finally:
+            destino.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'{principal.settings_dict["NAME"]} -> {replica.settings_dict["NAME"]} '
+            f'em {(time.perf_counter() - inicio) * 1000:.0f} ms'
+        ))
@@ -0,0 +1,37 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from app.models import AcaoProspeccao, AcaoTarefa
+from app.storage import PASTA_BLOBS
+
+
+class Command(BaseCommand):
+    help = 'Move os anexos gravados antes da deduplicação (uploads/...) para o armazenamento por hash.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--manter-originais',
+            action='store_true',
+            help='Não apaga os arquivos antigos depois de copiados.'
+        )
+
+    def handle(self, *args, **options):
+        for modelo in (AcaoTarefa, AcaoProspeccao):
+            acoes = modelo.objects.exclude(arquivo='').exclude(arquivo__isnull=True) \
+                .exclude(arquivo__startswith=f'{PASTA_BLOBS}/')
+            migrados, ausentes = 0, 0
+            for acao in acoes.iterator():
+                antigo = acao.arquivo.name
+                storage = acao.arquivo.storage
+                if not storage.exists(antigo):
+                    ausentes += 1
+                    continue
+                with storage.open(antigo, 'rb') as conteudo:
+                    # save() do FieldFile grava o blob; o post_save conta a referência
+                    acao.arquivo.save(antigo, File(conteudo), save=True)
+                if not options['manter_originais']:
+                    storage.delete(antigo)
+                migrados += 1
+            self.stdout.write(self.style.SUCCESS(
+                f'{modelo._meta.verbose_name}: {migrados} anexo(s) migrado(s), {ausentes} arquivo(s) ausente(s).'
+            ))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from app import importacao
+
+
+class Command(BaseCommand):
+    help = 'Importa serviços de uma planilha CSV/XLSX (colunas: cnpj, data_servico, valor, tipo_servico, quantidade).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho da planilha.')
+        parser.add_argument(
+            '--usuario',
+            required=True,
+            help='Username gravado como "Fechado Por" nos serviços importados.'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=2000,
+            help='Quantidade de linhas por transação/bulk_create.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas valida e mostra os erros, sem gravar.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário '{options['usuario']}' não encontrado.")
+
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                df = importacao.ler_planilha(arquivo, options['arquivo'])
+        except (OSError, importacao.PlanilhaInvalida) as e:
+            raise CommandError(str(e))
+
+        validado = importacao.validar_servicos(df)
+        resumo = importacao.resumo_validacao(validado, limite_erros=50)
+
+        self.stdout.write(f"{resumo['total']} linhas lidas: {resumo['total_validos']} válidas, {resumo['total_erros']} com erro.")
+        for linha in resumo['linhas_erro']:
+            self.stdout.write(self.style.WARNING(f"  Linha {linha['linha']}: {linha['erros']}"))
+        if resumo['total_erros'] > len(resumo['linhas_erro']):
+            self.stdout.write(self.style.WARNING(f"  ... e mais {resumo['total_erros'] - len(resumo['linhas_erro'])} linha(s) com erro."))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.NOTICE('Dry-run: nada foi gravado.'))
+            return
+
+        inseridos = importacao.importar_servicos(validado, usuario, tamanho_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'{inseridos} serviços importados com sucesso.'))
@@ -0,0 +1,86 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app.models import AcaoProspeccao, AcaoTarefa, BlobAnexo
+from app.storage import PASTA_BLOBS, armazenamento_anexos, hash_do_nome
+
+
+class Command(BaseCommand):
+    help = 'Remove os blobs de anexos que não são mais referenciados por nenhuma ação.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas',
+            type=int,
+            default=24,
+            help='Só remove blobs sem uso há pelo menos este número de horas (uploads em andamento).'
+        )
+        parser.add_argument(
+            '--recontar',
+            action='store_true',
+            help='Recalcula as referências a partir das ações antes de limpar.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostra o que seria removido.'
+        )
+
+    def handle(self, *args, **options):
+        storage = armazenamento_anexos()
+        limite = timezone.now() - timedelta(hours=options['horas'])
+
+        if options['recontar']:
+            self.recontar(options['dry_run'])
+
+        removidos, liberado = 0, 0
+        candidatos = BlobAnexo.objects.filter(referencias__lte=0, atualizado_em__lt=limite)
+        for hash_hex in candidatos.values_list('hash', flat=True).iterator():
+            with transaction.atomic():
+                # Revalida travando a linha: o blob pode ter sido reaproveitado agora
+                blob = BlobAnexo.objects.select_for_update().filter(
+                    hash=hash_hex, referencias__lte=0, atualizado_em__lt=limite
+                ).first()
+                if blob is None:
+                    continue
+                if not options['dry_run']:
+                    caminho = storage.caminho_blob(hash_hex)
+                    if os.path.exists(caminho):
+                        os.remove(caminho)
+                    blob.delete()
+            removidos += 1
+            liberado += blob.tamanho
+
+        # Temporários de uploads interrompidos
+        pasta_tmp = os.path.join(storage.location, PASTA_BLOBS, 'tmp')
+        if os.path.isdir(pasta_tmp) and not options['dry_run']:
+            for nome in os.listdir(pasta_tmp):
+                caminho = os.path.join(pasta_tmp, nome)
+                if os.path.getmtime(caminho) < limite.timestamp():
+                    os.remove(caminho)
+
+        prefixo = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefixo}{removidos} blob(s) removido(s), {liberado / (1024 * 1024):.1f} MB liberados.'
+        ))
+
+    def recontar(self, dry_run):
+        """ Corrige o contador de cada blob a partir dos anexos gravados nas ações. """
+        referencias = Counter()
+        for modelo in (AcaoTarefa, AcaoProspeccao):
+            nomes = modelo.objects.filter(arquivo__startswith=f'{PASTA_BLOBS}/').values_list('arquivo', flat=True)
+            referencias.update(filter(None, map(hash_do_nome, nomes.iterator())))
+
+        corrigidos = []
+        for blob in BlobAnexo.objects.iterator():
+            if blob.referencias != referencias[blob.hash]:
+                blob.referencias = referencias[blob.hash]
+                corrigidos.append(blob)
+        if corrigidos and not dry_run:
+            BlobAnexo.objects.bulk_update(corrigidos, ['referencias'], batch_size=1000)
+        self.stdout.write(f'{len(corrigidos)} contador(es) de referência corrigido(s).')
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.models import Exclusao
+
+
+class Command(BaseCommand):
+    help = 'Apaga os registros de exclusão do /api/sync/ mais antigos que API_SYNC_RETENCAO_DIAS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=settings.API_SYNC_RETENCAO_DIAS,
+            help='Idade mínima, em dias, dos registros apagados.'
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options['dias'])
+        total, _ = Exclusao.objects.filter(excluido_em__lt=limite).delete()
+        self.stdout.write(self.style.SUCCESS(f'{total} registro(s) de exclusão apagado(s).'))
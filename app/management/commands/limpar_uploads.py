@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app import anexos, importacao
+from app.models import EscritaIdempotente, UploadSessao
+
+
+class Command(BaseCommand):
+    help = (
+        'Descarta uploads em blocos abandonados (sessões paradas há mais de ANEXOS_UPLOAD_VALIDADE_HORAS) '
+        'e planilhas de importação cuja pré-visualização não foi confirmada. Também apaga as chaves de '
+        'idempotência das escritas do PWA com mais de IDEMPOTENCIA_VALIDADE_DIAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas',
+            type=int,
+            default=settings.ANEXOS_UPLOAD_VALIDADE_HORAS,
+            help='Idade mínima, em horas, desde o último bloco recebido ou a pré-visualização.'
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(hours=options['horas'])
+        sessoes = UploadSessao.objects.filter(atualizado_em__lt=limite)
+        total = 0
+        for sessao in sessoes.iterator():
+            anexos.descartar(sessao)
+            total += 1
+        previas = importacao.limpar_previas(limite)
+        chaves, _ = EscritaIdempotente.objects.filter(
+            criado_em__lt=timezone.now() - timedelta(days=settings.IDEMPOTENCIA_VALIDADE_DIAS)
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} upload(s) abandonado(s) descartado(s), {previas} planilha(s) de importação removida(s), '
+            f'{chaves} chave(s) de idempotência apagada(s).'
+        ))
@@ -0,0 +1,46 @@
+"""
+Operações de migração para um histórico que não acompanhou o schema.
+
+O 0001_initial ficou para trás de mudanças que os bancos em uso já têm (Meta
+por cliente, Prospeccao.tipo_servico, campos removidos de Cliente e
+ClienteProspect): num banco novo elas precisam ser aplicadas; num banco
+existente, já estão lá. `SeColuna` aplica sempre o estado e só executa o SQL
+quando o banco ainda não tem (ou ainda tem) a coluna que denuncia a mudança.
+"""
+from django.db import migrations
+
+
+def colunas(schema_editor, tabela):
+    conexao = schema_editor.connection
+    with conexao.cursor() as cursor:
+        return {coluna.name for coluna in conexao.introspection.get_table_description(cursor, tabela)}
+
+
+class SeColuna(migrations.SeparateDatabaseAndState):
+    """
+    SeparateDatabaseAndState cujas operações de banco só rodam se `coluna` de
+    `tabela` falta (existe=False) ou existe (existe=True). Na volta o banco não
+    é tocado: ao reaplicar, a mesma verificação decide de novo.
+    """
+
+    def __init__(self, tabela, coluna, existe=False, database_operations=None, state_operations=None):
+        super().__init__(database_operations=database_operations, state_operations=state_operations)
+        self.tabela = tabela
+        self.coluna = coluna
+        self.existe = existe
+
+    def deconstruct(self):
+        nome, args, kwargs = super().deconstruct()
+        kwargs.update(tabela=self.tabela, coluna=self.coluna, existe=self.existe)
+        return nome, args, kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if (self.coluna in colunas(schema_editor, self.tabela)) == self.existe:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        pass
+
+    def describe(self):
+        condicao = 'tem' if self.existe else 'não tem'
+        return f'Estado sempre; banco só se {self.tabela} {condicao} {self.coluna}'
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+STATUS_CHOICES = [
+    ('NOVA', 'Nova'),
+    ('NEGOCIANDO', 'Em Negociação'),
+    ('FECHADO', 'Serviço Fechado'),
+    ('DESISTENCIA', 'Desistência do Cliente'),
+    ('PERDIDA', 'Negociação Perdida'),
+]
+
+
+def popular_etapas(apps, schema_editor):
+    """ Reconstrói o histórico a partir das datas já gravadas em cada prospecção. """
+    Prospeccao = apps.get_model('app', 'Prospeccao')
+    ProspeccaoEtapa = apps.get_model('app', 'ProspeccaoEtapa')
+
+    eventos = []
+    for p in Prospeccao.objects.all().iterator(chunk_size=2000):
+        eventos.append(ProspeccaoEtapa(
+            prospeccao_id=p.id, representante_id=p.criado_por_id,
+            etapa='NOVA', data=p.data_criacao, registrado_por_id=p.criado_por_id,
+        ))
+        anterior, inicio_anterior = 'NOVA', p.data_criacao
+        if p.data_inicio_negociacao:
+            eventos.append(ProspeccaoEtapa(
+                prospeccao_id=p.id, representante_id=p.criado_por_id,
+                etapa='NEGOCIANDO', data=p.data_inicio_negociacao,
+                etapa_anterior=anterior, duracao_anterior=p.data_inicio_negociacao - inicio_anterior,
+                registrado_por_id=p.iniciado_por_id,
+            ))
+            anterior, inicio_anterior = 'NEGOCIANDO', p.data_inicio_negociacao
+        if p.status in ('FECHADO', 'DESISTENCIA', 'PERDIDA') and p.data_finalizacao:
+            eventos.append(ProspeccaoEtapa(
+                prospeccao_id=p.id, representante_id=p.criado_por_id,
+                etapa=p.status, data=p.data_finalizacao,
+                etapa_anterior=anterior, duracao_anterior=p.data_finalizacao - inicio_anterior,
+                registrado_por_id=p.finalizado_por_id,
+            ))
+        if len(eventos) >= 5000:
+            ProspeccaoEtapa.objects.bulk_create(eventos)
+            eventos = []
+    ProspeccaoEtapa.objects.bulk_create(eventos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProspeccaoEtapa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('etapa', models.CharField(choices=STATUS_CHOICES, max_length=20)),
+                ('data', models.DateTimeField(default=django.utils.timezone.now)),
+                ('etapa_anterior', models.CharField(blank=True, choices=STATUS_CHOICES, max_length=20, null=True)),
+                ('duracao_anterior', models.DurationField(blank=True, null=True, verbose_name='Tempo na Etapa Anterior')),
+                ('prospeccao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='etapas', to='app.prospeccao')),
+                ('registrado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('representante', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='etapas_prospeccao', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['data'],
+                'indexes': [
+                    models.Index(fields=['representante', 'etapa', 'data'], name='app_etapa_rep_etapa_data'),
+                    models.Index(fields=['prospeccao', 'data'], name='app_etapa_prospeccao_data'),
+                ],
+            },
+        ),
+        migrations.RunPython(popular_etapas, migrations.RunPython.noop),
+    ]
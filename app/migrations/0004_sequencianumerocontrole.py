@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+def semear_sequencias(apps, schema_editor):
+    """ Cria uma linha por ano já usado, partindo do maior numero_controle gravado. """
+    Prospeccao = apps.get_model('app', 'Prospeccao')
+    SequenciaNumeroControle = apps.get_model('app', 'SequenciaNumeroControle')
+
+    maiores = {}
+    numeros = Prospeccao.objects.filter(numero_controle__startswith='PROSPEC-') \
+        .values_list('numero_controle', flat=True)
+    for numero in numeros.iterator(chunk_size=5000):
+        try:
+            ano, seq = numero[len('PROSPEC-'):].split('/')
+            ano, seq = int(ano), int(seq)
+        except ValueError:
+            continue
+        maiores[ano] = max(maiores.get(ano, 0), seq)
+
+    SequenciaNumeroControle.objects.bulk_create([
+        SequenciaNumeroControle(ano=ano, ultimo_numero=ultimo) for ano, ultimo in maiores.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_prospeccaoetapa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaNumeroControle',
+            fields=[
+                ('ano', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('ultimo_numero', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(semear_sequencias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_sequencianumerocontrole'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSessao',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nome_arquivo', models.CharField(max_length=255)),
+                ('tamanho_total', models.PositiveBigIntegerField()),
+                ('recebido', models.PositiveBigIntegerField(default=0)),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('prospeccao', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='app.prospeccao')),
+                ('tarefa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='app.tarefa')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [
+                    models.CheckConstraint(
+                        condition=models.Q(
+                            models.Q(('prospeccao__isnull', True), ('tarefa__isnull', False)),
+                            models.Q(('prospeccao__isnull', False), ('tarefa__isnull', True)),
+                            _connector='OR',
+                        ),
+                        name='app_upload_um_destino',
+                    ),
+                ],
+            },
+        ),
+    ]
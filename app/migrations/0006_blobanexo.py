@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import app.storage
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_uploadsessao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlobAnexo',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('tamanho', models.PositiveBigIntegerField()),
+                ('referencias', models.IntegerField(default=0)),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='acaotarefa',
+            name='arquivo',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=app.storage.armazenamento_anexos, upload_to='uploads/tarefas/%Y/%m/', verbose_name='Arquivo Anexo'),
+        ),
+        migrations.AlterField(
+            model_name='acaoprospeccao',
+            name='arquivo',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=app.storage.armazenamento_anexos, upload_to='uploads/prospeccao/%Y/%m/', verbose_name='Arquivo Anexo'),
+        ),
+    ]
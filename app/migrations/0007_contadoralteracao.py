@@ -0,0 +1,20 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_blobanexo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorAlteracao',
+            fields=[
+                ('modelo', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('versao', models.PositiveBigIntegerField(default=0)),
+                ('alterado_em', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
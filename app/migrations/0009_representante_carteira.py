@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from app.migracoes import SeColuna
+
+
+# UPDATE correlacionado: uma instrução por tabela, sem carregar os registros
+COPIAR_REPRESENTANTES = [
+    """
+    UPDATE app_servico SET representante_id = (
+        SELECT cadastrado_por_id FROM app_cliente WHERE app_cliente.id = app_servico.cliente_id
+    )
+    """,
+    """
+    UPDATE app_meta SET representante_id = (
+        SELECT cadastrado_por_id FROM app_cliente WHERE app_cliente.id = app_meta.cliente_id
+    )
+    """,
+]
+
+META_POR_CLIENTE = [
+    migrations.AlterField(
+        model_name='meta',
+        name='representante',
+        field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+    ),
+    migrations.AddField(
+        model_name='meta',
+        name='cliente',
+        field=models.ForeignKey(default=None, on_delete=django.db.models.deletion.CASCADE, related_name='metas', to='app.cliente', verbose_name='Cliente'),
+        preserve_default=False,
+    ),
+    migrations.AlterField(
+        model_name='meta',
+        name='dias_uteis',
+        field=models.PositiveIntegerField(default=22, verbose_name='Dias Úteis'),
+    ),
+    migrations.AlterUniqueTogether(
+        name='meta',
+        unique_together={('cliente', 'mes', 'ano')},
+    ),
+    migrations.AlterModelOptions(
+        name='meta',
+        options={'ordering': ['-ano', '-mes', 'cliente']},
+    ),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_sincronizacao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servico',
+            name='representante',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        # O 0001 criou Meta por representante (FK obrigatória, única com mes/ano); o modelo
+        # passou a ser por cliente sem migração. Num banco novo, aplica essa mudança; nos
+        # que já têm app_meta.cliente_id, só o estado é atualizado
+        SeColuna(
+            'app_meta', 'cliente_id',
+            database_operations=META_POR_CLIENTE,
+            state_operations=META_POR_CLIENTE,
+        ),
+        # ...e nesses bancos o representante ainda não existe
+        SeColuna(
+            'app_meta', 'representante_id',
+            database_operations=[
+                migrations.AddField(
+                    model_name='meta',
+                    name='representante',
+                    field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.RunSQL(COPIAR_REPRESENTANTES, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='servico',
+            index=models.Index(fields=['representante', 'data_servico'], name='app_servico_rep_data'),
+        ),
+        migrations.AddIndex(
+            model_name='meta',
+            index=models.Index(fields=['representante', 'ano', 'mes'], name='app_meta_rep_periodo'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+from app.migracoes import SeColuna
+
+
+def _se_existe(tabela, coluna, operacao):
+    return SeColuna(tabela, coluna, existe=True, database_operations=[operacao], state_operations=[operacao])
+
+
+def _se_falta(tabela, coluna, operacao):
+    return SeColuna(tabela, coluna, database_operations=[operacao], state_operations=[operacao])
+
+
+class Migration(migrations.Migration):
+    """
+    Campos que o modelo perdeu ou ganhou sem migração. Num banco novo as
+    mudanças são aplicadas; num banco em uso, que já as tem, só o estado.
+    """
+
+    dependencies = [
+        ('app', '0012_previaimportacao'),
+    ]
+
+    operations = [
+        _se_existe('app_cliente', 'filial', migrations.RemoveField(model_name='cliente', name='filial')),
+        _se_existe('app_clienteprospect', 'cliente_ativo_id', migrations.RemoveField(model_name='clienteprospect', name='cliente_ativo')),
+        _se_existe('app_clienteprospect', 'data_promocao', migrations.RemoveField(model_name='clienteprospect', name='data_promocao')),
+        _se_existe('app_clienteprospect', 'promovido', migrations.RemoveField(model_name='clienteprospect', name='promovido')),
+        _se_existe('app_prospeccao', 'tipo_proposta', migrations.RemoveField(model_name='prospeccao', name='tipo_proposta')),
+        _se_falta('app_prospeccao', 'tipo_servico_id', migrations.AddField(
+            model_name='prospeccao',
+            name='tipo_servico',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='app.tiposervico', verbose_name='Tipo de Serviço'),
+        )),
+        migrations.AlterField(
+            model_name='profile',
+            name='setor',
+            field=models.CharField(choices=[('REPRESENTANTE', 'Representante Comercial'), ('COMERCIAL', 'Diretoria Comercial'), ('GERENTE', 'Gerente Operacional'), ('DIRETORIA', 'Diretoria'), ('ADMIN', 'Administrativo (TI/Sistema)')], default='REPRESENTANTE', max_length=20, verbose_name='Setor / Função'),
+        ),
+    ]
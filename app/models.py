@@ -1,7 +1,10 @@
-﻿from django.db import models
+﻿from django.db import models, transaction, IntegrityError
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.db.models.signals import post_save
+import uuid
+from functools import partial
+from .storage import armazenamento_anexos, hash_do_nome
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
 from django.dispatch import receiver
 
 class TipoServico(models.Model):
@@ -65,6 +68,29 @@ class Profile(models.Model):
         # Comercial, Diretoria e Admin têm acesso total (exceto Admin Django)
         return self.setor in ['COMERCIAL', 'DIRETORIA', 'ADMIN']
 
+class CarteiraQuerySet(models.QuerySet):
+    """
+    Registros da carteira de um representante. Servico e Meta guardam o dono
+    (`representante`, cópia de cliente.cadastrado_por), então o filtro não
+    precisa de JOIN com Cliente.
+    """
+    campo_dono = 'representante'
+
+    def da_carteira(self, representante):
+        """ Registros do representante (User ou id). """
+        return self.filter(**{self.campo_dono: representante})
+
+    def visiveis_para(self, usuario):
+        """ Representante vê só a própria carteira; gestão vê tudo. """
+        if usuario.profile.is_representante:
+            return self.da_carteira(usuario)
+        return self
+
+
+class ClienteQuerySet(CarteiraQuerySet):
+    campo_dono = 'cadastrado_por'
+
+
 class Cliente(models.Model):
     cnpj = models.CharField(max_length=18, verbose_name="CNPJ") 
     razao_social = models.CharField(max_length=255, verbose_name="Razão Social")
@@ -80,6 +106,9 @@ class Cliente(models.Model):
         verbose_name="Cadastrado Por"
     )
     data_cadastro = models.DateTimeField(auto_now_add=True, verbose_name="Data de Cadastro")
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ClienteQuerySet.as_manager()
     
     def __str__(self):
         return self.razao_social
@@ -99,6 +128,8 @@ class ClienteProspect(models.Model):
     )
     data_cadastro = models.DateTimeField(auto_now_add=True, verbose_name="Data de Cadastro")
 
+    objects = ClienteQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.razao_social} (Prospect)"
 
@@ -129,6 +160,22 @@ class Servico(models.Model):
     )
     
     data_registro = models.DateTimeField(auto_now_add=True, verbose_name="Data de Registro")
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Cópia de cliente.cadastrado_por (sinais abaixo), para filtrar a carteira sem JOIN
+    representante = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+    )
+
+    objects = CarteiraQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['representante', 'data_servico'], name='app_servico_rep_data')]
 
     def __str__(self):
         tipo_servico_nome = self.tipo_servico.nome if self.tipo_servico else "Sem tipo"
@@ -146,10 +193,24 @@ class Meta(models.Model):
     ano = models.PositiveIntegerField(verbose_name="Ano Base")
     dias_uteis = models.PositiveIntegerField(verbose_name="Dias Úteis", default=22)
     valor = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Meta a ser alcançada (R$)")
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Cópia de cliente.cadastrado_por, como em Servico
+    representante = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+    )
+
+    objects = CarteiraQuerySet.as_manager()
 
     class Meta:
         ordering = ['-ano', '-mes', 'cliente']
         unique_together = ('cliente', 'mes', 'ano')
+        indexes = [models.Index(fields=['representante', 'ano', 'mes'], name='app_meta_rep_periodo')]
 
     def __str__(self):
         return f"{self.cliente.razao_social} - {self.mes}/{self.ano}"
@@ -182,6 +243,8 @@ class AcaoTarefa(models.Model):
     
     arquivo = models.FileField(
         upload_to='uploads/tarefas/%Y/%m/', 
+        storage=armazenamento_anexos,
+        max_length=255,
         null=True, 
         blank=True, 
         verbose_name="Arquivo Anexo"
@@ -204,6 +267,8 @@ class Prospeccao(models.Model):
         ('DESISTENCIA', 'Desistência do Cliente'),
         ('PERDIDA', 'Negociação Perdida'),
     ]
+    ETAPAS_ABERTAS = ['NOVA', 'NEGOCIANDO']
+    ETAPAS_FINAIS = ['FECHADO', 'DESISTENCIA', 'PERDIDA']
 
     cliente = models.ForeignKey(ClienteProspect, on_delete=models.CASCADE, related_name='prospeccoes')
     
@@ -230,6 +295,7 @@ class Prospeccao(models.Model):
     
     finalizado_por = models.ForeignKey(User, related_name='prospeccoes_finalizadas', on_delete=models.PROTECT, null=True, blank=True)
     data_finalizacao = models.DateTimeField(null=True, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
 
     @property
     def dias_na_etapa(self):
@@ -243,33 +309,79 @@ class Prospeccao(models.Model):
         return None
 
 
+    @staticmethod
+    def formatar_numero_controle(ano, numero):
+        return f"PROSPEC-{ano}/{numero:05d}"
+
+    @classmethod
+    def reservar_numeros_controle(cls, quantidade=1):
+        """ Reserva um bloco de números de controle do ano corrente (ex.: para bulk_create). """
+        ano = timezone.now().year
+        primeiro = SequenciaNumeroControle.reservar(ano, quantidade)
+        return [cls.formatar_numero_controle(ano, n) for n in range(primeiro, primeiro + quantidade)]
+
     def save(self, *args, **kwargs):
         # Gerar numero_controle automaticamente se nao existir
         if not self.numero_controle:
-            ano_atual = timezone.now().year
-            # Pegar o ultimo numero do ano
-            ultimas = Prospeccao.objects.filter(
-                numero_controle__startswith=f"PROSPEC-{ano_atual}/"
-            ).order_by("-numero_controle")
-            
-            if ultimas.exists():
-                ultimo_num = ultimas.first().numero_controle.split("/")[-1]
-                proximo = int(ultimo_num) + 1
-            else:
-                proximo = 1
-            
-            self.numero_controle = f"PROSPEC-{ano_atual}/{proximo:05d}"
+            self.numero_controle = self.reservar_numeros_controle(1)[0]
         
         super().save(*args, **kwargs)
     def __str__(self):
         return f"Prospecção para {self.cliente.razao_social} ({self.get_status_display()})"
 
+class SequenciaNumeroControle(models.Model):
+    """
+    Contador anual do numero_controle das prospecções.
+    O incremento é um UPDATE atômico na linha do ano, que fica travada até o fim
+    da transação; assim inserções simultâneas nunca recebem o mesmo número.
+    """
+    ano = models.PositiveIntegerField(primary_key=True)
+    ultimo_numero = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.ano}: {self.ultimo_numero}"
+
+    @staticmethod
+    def maior_numero_existente(ano):
+        """ Maior número já gravado no ano (usado só para semear a sequência). """
+        # Pelo valor do sufixo: na ordem de texto, ".../100000" vem antes de ".../99999"
+        prefixo = f"PROSPEC-{ano}/"
+        numeros = Prospeccao.objects.filter(numero_controle__startswith=prefixo).values_list('numero_controle', flat=True)
+        maior = 0
+        for numero in numeros.iterator(chunk_size=5000):
+            sufixo = numero[len(prefixo):]
+            if sufixo.isdigit():
+                maior = max(maior, int(sufixo))
+        return maior
+
+    @classmethod
+    def reservar(cls, ano, quantidade=1):
+        """ Reserva `quantidade` números consecutivos do ano e retorna o primeiro deles. """
+        if quantidade < 1:
+            raise ValueError("A quantidade reservada deve ser positiva.")
+
+        with transaction.atomic():
+            incremento = models.F('ultimo_numero') + quantidade
+            if not cls.objects.filter(ano=ano).update(ultimo_numero=incremento):
+                # Primeira reserva do ano: cria a linha semeada com o legado
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(ano=ano, ultimo_numero=cls.maior_numero_existente(ano))
+                except IntegrityError:
+                    pass  # Outra transação criou a linha primeiro
+                cls.objects.filter(ano=ano).update(ultimo_numero=incremento)
+
+            ultimo = cls.objects.filter(ano=ano).values_list('ultimo_numero', flat=True).get()
+        return ultimo - quantidade + 1
+
 class AcaoProspeccao(models.Model):
     prospeccao = models.ForeignKey(Prospeccao, related_name='acoes', on_delete=models.CASCADE)
     descricao = models.TextField(verbose_name="Descrição da Ação")
     
     arquivo = models.FileField(
         upload_to='uploads/prospeccao/%Y/%m/', 
+        storage=armazenamento_anexos,
+        max_length=255,
         null=True, 
         blank=True, 
         verbose_name="Arquivo Anexo"
@@ -284,12 +396,378 @@ class AcaoProspeccao(models.Model):
     def __str__(self):
         return f'Ação em "{self.prospeccao.cliente.razao_social}" por {self.registrado_por.username}'
 
+class ProspeccaoEtapaQuerySet(models.QuerySet):
+    def duracao_media_por_etapa(self):
+        """ Tempo médio gasto em cada etapa, medido na saída dela: {etapa: timedelta} """
+        dados = self.exclude(etapa_anterior__isnull=True) \
+            .values('etapa_anterior') \
+            .annotate(media=models.Avg('duracao_anterior'))
+        return {item['etapa_anterior']: item['media'] for item in dados}
+
+    def vazao(self, inicio=None, fim=None):
+        """ Quantidade de prospecções que entraram em cada etapa no período: {etapa: total} """
+        qs = self
+        if inicio: qs = qs.filter(data__gte=inicio)
+        if fim: qs = qs.filter(data__lt=fim)
+        dados = qs.values('etapa').annotate(total=models.Count('id'))
+        return {item['etapa']: item['total'] for item in dados}
+
+    def envelhecimento(self, faixas=(7, 15, 30, 60)):
+        """
+        Prospecções abertas (NOVA/NEGOCIANDO) agrupadas por dias na etapa atual.
+        O evento atual é aquele cuja etapa ainda coincide com o status da prospecção.
+        """
+        agora = timezone.now()
+        abertas = self.filter(
+            etapa__in=Prospeccao.ETAPAS_ABERTAS,
+            etapa=models.F('prospeccao__status'),
+        ).values_list('etapa', 'data')
+
+        limites = list(faixas)
+        rotulos = [f'até {limites[0]}d'] + [f'{a + 1}-{b}d' for a, b in zip(limites, limites[1:])] + [f'+{limites[-1]}d']
+        resultado = {etapa: dict.fromkeys(rotulos, 0) for etapa in Prospeccao.ETAPAS_ABERTAS}
+        for etapa, data in abertas:
+            dias = (agora - data).days
+            indice = next((i for i, limite in enumerate(limites) if dias <= limite), len(limites))
+            resultado[etapa][rotulos[indice]] += 1
+        return resultado
+
+class ProspeccaoEtapa(models.Model):
+    """
+    Evento de entrada de uma prospecção em uma etapa do funil (somente inserção).
+    Guarda a etapa de origem e quanto tempo a prospecção ficou nela, para que
+    duração, vazão e envelhecimento saiam de agregações diretas no índice.
+    """
+    prospeccao = models.ForeignKey(Prospeccao, related_name='etapas', on_delete=models.CASCADE)
+    representante = models.ForeignKey(User, related_name='etapas_prospeccao', on_delete=models.PROTECT)
+    etapa = models.CharField(max_length=20, choices=Prospeccao.STATUS_CHOICES)
+    data = models.DateTimeField(default=timezone.now)
+
+    etapa_anterior = models.CharField(max_length=20, choices=Prospeccao.STATUS_CHOICES, null=True, blank=True)
+    duracao_anterior = models.DurationField(null=True, blank=True, verbose_name="Tempo na Etapa Anterior")
+
+    registrado_por = models.ForeignKey(User, related_name='+', on_delete=models.PROTECT, null=True, blank=True)
+
+    objects = ProspeccaoEtapaQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['data']
+        indexes = [
+            models.Index(fields=['representante', 'etapa', 'data'], name='app_etapa_rep_etapa_data'),
+            models.Index(fields=['prospeccao', 'data'], name='app_etapa_prospeccao_data'),
+        ]
+
+    def __str__(self):
+        return f"{self.prospeccao_id}: {self.get_etapa_display()} em {self.data:%d/%m/%Y}"
+
+    @classmethod
+    def registrar(cls, prospeccao, etapa_anterior, usuario=None, data=None):
+        """
+        Grava a entrada da prospecção na etapa atual (prospeccao.status).
+        O início da etapa anterior vem das datas já mantidas na própria prospecção.
+        """
+        data = data or timezone.now()
+        inicio_anterior = {
+            'NOVA': prospeccao.data_criacao,
+            'NEGOCIANDO': prospeccao.data_inicio_negociacao,
+        }.get(etapa_anterior)
+
+        return cls.objects.create(
+            prospeccao=prospeccao,
+            representante_id=prospeccao.criado_por_id,
+            etapa=prospeccao.status,
+            data=data,
+            etapa_anterior=etapa_anterior,
+            duracao_anterior=(data - inicio_anterior) if inicio_anterior else None,
+            registrado_por=usuario,
+        )
+
+class UploadSessao(models.Model):
+    """
+    Upload de anexo enviado em blocos. O arquivo parcial fica em disco e o
+    cliente pode retomar do ponto em que parou (campo `recebido`) depois de
+    uma queda de conexão. Concluído, é anexado à ação da tarefa/prospecção.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(User, related_name='uploads', on_delete=models.CASCADE)
+    tarefa = models.ForeignKey(Tarefa, related_name='uploads', on_delete=models.CASCADE, null=True, blank=True)
+    prospeccao = models.ForeignKey(Prospeccao, related_name='uploads', on_delete=models.CASCADE, null=True, blank=True)
+    nome_arquivo = models.CharField(max_length=255)
+    tamanho_total = models.PositiveBigIntegerField()
+    recebido = models.PositiveBigIntegerField(default=0)
+    criado_em = models.DateTimeField(default=timezone.now)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(tarefa__isnull=False, prospeccao__isnull=True) |
+                    models.Q(tarefa__isnull=True, prospeccao__isnull=False)
+                ),
+                name='app_upload_um_destino',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.nome_arquivo} ({self.recebido}/{self.tamanho_total})"
+
+    @property
+    def concluido(self):
+        return self.recebido >= self.tamanho_total
+
+class PreviaImportacao(models.Model):
+    """
+    Planilha de importação de serviços entre a pré-visualização e a
+    confirmação (ver app/importacao.py). A confirmação apaga a linha na mesma
+    transação da gravação: um segundo envio não acha a prévia e não importa.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    caminho = models.CharField(max_length=255)
+    criado_em = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.caminho} ({self.criado_em:%d/%m/%Y %H:%M})"
+
+class BlobAnexo(models.Model):
+    """
+    Conteúdo de anexo gravado uma única vez (pelo SHA-256), com o número de
+    ações que o referenciam. Blobs sem referência são apagados pelo limpar_blobs.
+    """
+    hash = models.CharField(max_length=64, primary_key=True)
+    tamanho = models.PositiveBigIntegerField()
+    referencias = models.IntegerField(default=0)
+    criado_em = models.DateTimeField(default=timezone.now)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.hash[:12]}… ({self.referencias} ref.)"
+
+    @classmethod
+    def registrar(cls, hash_hex, tamanho):
+        """
+        Garante a linha do blob e renova atualizado_em (protege o blob recém-usado do
+        limpar_blobs). Chamar numa transação que dure até o arquivo estar no lugar.
+        """
+        if not cls.objects.filter(hash=hash_hex).update(atualizado_em=timezone.now()):
+            try:
+                with transaction.atomic():
+                    cls.objects.create(hash=hash_hex, tamanho=tamanho)
+            except IntegrityError:
+                pass  # Mesmo conteúdo gravado ao mesmo tempo por outro upload
+
+    @classmethod
+    def ajustar(cls, nome_arquivo, delta):
+        hash_hex = hash_do_nome(nome_arquivo)
+        if hash_hex:
+            cls.objects.filter(hash=hash_hex).update(referencias=models.F('referencias') + delta)
+
+class ContadorAlteracao(models.Model):
+    """
+    Versão de cada model exposto pela API, incrementada a cada gravação ou
+    exclusão. Serve de validador barato (ETag/Last-Modified) para as respostas
+    da API: se as versões não mudaram, a resposta também não mudou.
+    """
+    modelo = models.CharField(max_length=100, primary_key=True)
+    versao = models.PositiveBigIntegerField(default=0)
+    alterado_em = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.modelo}: {self.versao}"
+
+    @classmethod
+    def incrementar(cls, *modelos):
+        """
+        Registra alteração nos models informados (chamar após bulk_create/update,
+        que não disparam sinais). Dentro de uma transação, a contagem só é feita
+        após o commit, numa transação curta: a linha do contador não fica travada
+        até o fim da transação de quem grava, o que enfileiraria as gravações
+        concorrentes no mesmo model. Num rollback, nada é contado.
+        """
+        transaction.on_commit(partial(cls._incrementar, modelos))
+
+    @classmethod
+    def _incrementar(cls, modelos):
+        agora = timezone.now()
+        for modelo in modelos:
+            rotulo = modelo._meta.label_lower
+            alteracao = {'versao': models.F('versao') + 1, 'alterado_em': agora}
+            if not cls.objects.filter(modelo=rotulo).update(**alteracao):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(modelo=rotulo, versao=1, alterado_em=agora)
+                except IntegrityError:
+                    cls.objects.filter(modelo=rotulo).update(**alteracao)
+
+    @classmethod
+    def versoes(cls, modelos):
+        """ {rotulo: (versao, alterado_em)} dos models; os nunca alterados ficam com (0, None). """
+        rotulos = [modelo._meta.label_lower for modelo in modelos]
+        atuais = {
+            rotulo: (versao, alterado_em)
+            for rotulo, versao, alterado_em in cls.objects.filter(modelo__in=rotulos).values_list('modelo', 'versao', 'alterado_em')
+        }
+        return {rotulo: atuais.get(rotulo, (0, None)) for rotulo in rotulos}
+
+class Exclusao(models.Model):
+    """
+    Registro (tombstone) de um objeto excluído, para o /api/sync/ informar as
+    exclusões aos clientes. `dono` é o representante em cujo escopo o objeto
+    estava; os registros antigos são apagados pelo comando limpar_exclusoes.
+    """
+    modelo = models.CharField(max_length=100)
+    objeto_id = models.PositiveBigIntegerField()
+    dono = models.ForeignKey(User, related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    excluido_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['modelo', 'excluido_em'], name='app_exclusao_modelo_data')]
+
+    def __str__(self):
+        return f"{self.modelo} #{self.objeto_id} ({self.excluido_em:%d/%m/%Y %H:%M})"
+
+class EscritaIdempotente(models.Model):
+    """
+    Chave de idempotência de uma escrita enviada pelo service worker. Uma
+    escrita repetida pela fila offline depois de já ter chegado ao servidor
+    não é executada de novo (ver app/idempotencia.py). `status` fica vazio
+    enquanto a primeira execução não termina.
+    """
+    usuario = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    chave = models.CharField(max_length=64)
+    status = models.PositiveSmallIntegerField(null=True, blank=True)
+    criado_em = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'chave'], name='app_escrita_chave_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.chave} ({self.status or 'em andamento'})"
+
 @receiver(post_save, sender=User)
 def create_or_update_user_profile(sender, instance, created, **kwargs):
-    if created:
+    # O perfil não é regravado a cada save do User (ex.: last_login em todo login):
+    # quem altera o perfil (ProfileForm, admin) salva o próprio Profile.
+    # hasattr usa o perfil já carregado pelo BackendComPerfil, sem nova consulta.
+    if created or not hasattr(instance, 'profile'):
         Profile.objects.create(user=instance)
+
+
+# --- Contagem de referências dos anexos deduplicados ---
+
+@receiver(pre_save, sender=AcaoTarefa)
+@receiver(pre_save, sender=AcaoProspeccao)
+def guardar_anexo_anterior(sender, instance, **kwargs):
+    instance._anexo_anterior = None
+    if instance.pk:
+        instance._anexo_anterior = sender.objects.filter(pk=instance.pk).values_list('arquivo', flat=True).first()
+
+@receiver(post_save, sender=AcaoTarefa)
+@receiver(post_save, sender=AcaoProspeccao)
+def contar_referencia_anexo(sender, instance, **kwargs):
+    anterior, atual = getattr(instance, '_anexo_anterior', None), instance.arquivo.name
+    if anterior != atual:
+        BlobAnexo.ajustar(anterior, -1)
+        BlobAnexo.ajustar(atual, +1)
+
+@receiver(post_delete, sender=AcaoTarefa)
+@receiver(post_delete, sender=AcaoProspeccao)
+def descontar_referencia_anexo(sender, instance, **kwargs):
+    # Também dispara nas ações apagadas em cascata junto com a Tarefa/Prospeccao
+    BlobAnexo.ajustar(instance.arquivo.name, -1)
+
+
+# --- Versões dos models expostos pela API (ETag/304) ---
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Servico)
+@receiver(post_save, sender=Meta)
+@receiver(post_save, sender=TipoServico)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=ClienteProspect)
+@receiver(post_save, sender=Tarefa)
+@receiver(post_save, sender=AcaoTarefa)
+@receiver(post_save, sender=Prospeccao)
+@receiver(post_save, sender=AcaoProspeccao)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Servico)
+@receiver(post_delete, sender=Meta)
+@receiver(post_delete, sender=TipoServico)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Profile)
+@receiver(post_delete, sender=ClienteProspect)
+@receiver(post_delete, sender=Tarefa)
+@receiver(post_delete, sender=AcaoTarefa)
+@receiver(post_delete, sender=Prospeccao)
+@receiver(post_delete, sender=AcaoProspeccao)
+def registrar_alteracao(sender, update_fields=None, **kwargs):
+    # O login só grava last_login, que nenhuma resposta da API expõe
+    if sender is User and update_fields and set(update_fields) == {'last_login'}:
+        return
+    ContadorAlteracao.incrementar(sender)
+
+
+# --- Dono da carteira copiado em Servico e Meta ---
+
+@receiver(pre_save, sender=Servico)
+@receiver(pre_save, sender=Meta)
+def copiar_representante(sender, instance, **kwargs):
+    # Usa o cliente já carregado (formulários, serializers) quando houver
+    instance.representante_id = instance.cliente.cadastrado_por_id
+
+@receiver(pre_save, sender=Cliente)
+def guardar_dono_anterior(sender, instance, **kwargs):
+    instance._dono_anterior = None
+    if instance.pk:
+        instance._dono_anterior = Cliente.objects.filter(pk=instance.pk).values_list('cadastrado_por_id', flat=True).first()
+
+@receiver(post_save, sender=Cliente)
+def propagar_dono(sender, instance, created, **kwargs):
+    if created or instance._dono_anterior == instance.cadastrado_por_id:
+        return
+    # Cliente mudou de carteira: serviços e metas vão junto (update não dispara sinais)
+    agora = timezone.now()
+    servicos = Servico.objects.filter(cliente=instance)
+    metas = Meta.objects.filter(cliente=instance)
+    if instance._dono_anterior is not None:
+        # No /api/sync/ do dono anterior, o cliente e o que é dele saem como excluídos
+        saidas = [(Cliente, [instance.pk]), (Servico, servicos.values_list('pk', flat=True)), (Meta, metas.values_list('pk', flat=True))]
+        Exclusao.objects.bulk_create([
+            Exclusao(modelo=modelo._meta.label_lower, objeto_id=pk, dono_id=instance._dono_anterior, excluido_em=agora)
+            for modelo, ids in saidas for pk in ids
+        ], batch_size=500)
+    alteracao = {'representante_id': instance.cadastrado_por_id, 'atualizado_em': agora}
+    servicos.update(**alteracao)
+    metas.update(**alteracao)
+    ContadorAlteracao.incrementar(Servico, Meta)
+
+
+# --- Exclusões registradas para o /api/sync/ ---
+
+@receiver(pre_delete, sender=Cliente)
+@receiver(pre_delete, sender=Servico)
+@receiver(pre_delete, sender=Meta)
+@receiver(pre_delete, sender=Prospeccao)
+def guardar_dono_excluido(sender, instance, **kwargs):
+    # Antes da exclusão: numa cascata a partir do Cliente ele ainda existe aqui
+    if sender is Cliente:
+        instance._dono_id = instance.cadastrado_por_id
+    elif sender is Prospeccao:
+        instance._dono_id = instance.criado_por_id
     else:
-        try:
-            instance.profile.save()
-        except Profile.DoesNotExist:
-            Profile.objects.create(user=instance)
+        instance._dono_id = instance.representante_id
+
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Servico)
+@receiver(post_delete, sender=Meta)
+@receiver(post_delete, sender=Prospeccao)
+def registrar_exclusao(sender, instance, **kwargs):
+    Exclusao.objects.create(
+        modelo=sender._meta.label_lower,
+        objeto_id=instance.pk,
+        dono_id=getattr(instance, '_dono_id', None),
+    )
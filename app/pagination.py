@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CursorPaginacao(CursorPagination):
+    """
+    Paginação padrão da API: cursor opaco em ?cursor=, ordenado pela chave
+    primária (sempre indexada). Ao contrário de ?page=N, o custo de cada página
+    não cresce com a profundidade e não há COUNT(*) da tabela inteira.
+    """
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
@@ -0,0 +1,181 @@
+"""
+Planejamento de metas em lote: meta anual -> 12 metas mensais por cliente.
+
+A meta anual de cada cliente vem de um valor informado por cliente, de uma
+meta da carteira de um representante (rateada pelo peso de cada cliente no
+último ano) ou do faturamento do último ano com um fator de crescimento.
+
+A distribuição nos meses segue a sazonalidade do próprio cliente nos anos
+anteriores (Servico), calculada em matrizes NumPy (clientes x anos x meses)
+a partir de um único GROUP BY. Com `usar_dias_uteis`, o histórico é medido
+por dia útil e reaplicado ao calendário do ano planejado: um mês com mais
+dias úteis que no histórico recebe proporcionalmente mais. Clientes com pouco
+histórico puxam o perfil da carteira toda (`suavizacao`, em meses). Os centavos são
+arredondados pelo maior resto, e os 12 meses somam exatamente a meta anual.
+
+O resultado é gravado com um único bulk_create(update_conflicts=True) sobre
+(cliente, mes, ano): metas existentes do ano são atualizadas, não duplicadas.
+"""
+import calendar
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .models import ContadorAlteracao, Meta, Servico
+
+MESES = 12
+
+
+def dias_uteis(ano, feriados=()):
+    """ Dias úteis (segunda a sexta, menos os feriados) de cada mês do ano. """
+    inicios = np.arange(f'{ano}-01', f'{ano + 1}-01', dtype='datetime64[M]')
+    return np.busday_count(
+        inicios.astype('datetime64[D]'), (inicios + 1).astype('datetime64[D]'),
+        holidays=np.array(list(feriados), dtype='datetime64[D]'),
+    )
+
+
+def historico_mensal(cliente_ids, anos):
+    """ Faturamento em centavos por cliente, ano e mês: matriz (clientes x anos x 12). """
+    cliente_ids = np.asarray(cliente_ids, dtype=np.int64)
+    matriz = np.zeros((len(cliente_ids), len(anos), MESES), dtype=np.int64)
+    if not len(cliente_ids):
+        return matriz
+    linhas = (
+        Servico.objects.filter(cliente_id__in=cliente_ids.tolist(), data_servico__year__gte=anos[0], data_servico__year__lte=anos[-1])
+        .annotate(ano=ExtractYear('data_servico'), mes=ExtractMonth('data_servico'))
+        .values_list('cliente_id', 'ano', 'mes')
+        .annotate(total=Sum('valor'))
+        .order_by()
+    )
+    dados = np.array([(c, a, m, int(total * 100)) for c, a, m, total in linhas], dtype=np.int64).reshape(-1, 4)
+    ordem = np.argsort(cliente_ids)
+    posicao = ordem[np.searchsorted(cliente_ids, dados[:, 0], sorter=ordem)]
+    np.add.at(matriz, (posicao, dados[:, 1] - anos[0], dados[:, 2] - 1), dados[:, 3])
+    return matriz
+
+
+def sazonalidade(historico, dias_historico=None, dias_alvo=None, suavizacao=3):
+    """
+    Peso de cada mês por cliente (linhas somam 1). `dias_historico` (anos x 12)
+    e `dias_alvo` (12) ativam a correção por dias úteis. O perfil do cliente é
+    misturado ao da carteira com peso suavizacao / (suavizacao + meses com
+    faturamento): quem tem 3 anos de histórico fica quase só com o próprio
+    perfil; quem não tem nenhum fica com o da carteira.
+    """
+    if dias_historico is not None:
+        # Faturamento por dia útil de cada mês no histórico, reaplicado ao calendário alvo
+        pesos = historico.sum(axis=1) / np.maximum(dias_historico.sum(axis=0), 1) * dias_alvo
+        neutro = dias_alvo / dias_alvo.sum()
+    else:
+        pesos = historico.sum(axis=1).astype(float)
+        neutro = np.full(MESES, 1 / MESES)
+
+    geral = pesos.sum(axis=0)
+    geral = geral / geral.sum() if geral.sum() > 0 else neutro
+    totais = pesos.sum(axis=1, keepdims=True)
+    perfis = np.divide(pesos, totais, out=np.tile(geral, (len(pesos), 1)), where=totais > 0)
+    meses_com_dados = (historico > 0).sum(axis=(1, 2))[:, None]
+    mistura = suavizacao / np.maximum(suavizacao + meses_com_dados, 1e-9)
+    return (1 - mistura) * perfis + mistura * geral
+
+
+def distribuir(centavos_anuais, perfis):
+    """ Rateia os valores anuais (centavos) pelos perfis; cada linha soma exatamente o valor anual. """
+    bruto = centavos_anuais[:, None] * perfis
+    base = np.floor(bruto).astype(np.int64)
+    faltam = centavos_anuais - base.sum(axis=1)
+    # Os centavos que sobraram vão para os meses com maior parte fracionária
+    ordem = np.argsort(base - bruto, axis=1, kind='stable')
+    base[np.arange(len(base))[:, None], ordem] += np.arange(perfis.shape[1])[None, :] < faltam[:, None]
+    return base
+
+
+def planejar(clientes, ano, metas_anuais=None, meta_carteira=None, crescimento=0.0,
+             anos_historico=3, usar_dias_uteis=True, feriados=(), suavizacao=3):
+    """
+    Plano do ano para os `clientes` (queryset). A meta anual de cada cliente vem de
+    `metas_anuais` ({cliente_id: Decimal}), do rateio de `meta_carteira` pelo
+    faturamento do último ano ou, sem nenhum dos dois, do faturamento do último
+    ano x (1 + crescimento).
+    """
+    linhas = list(clientes.order_by('razao_social').values_list('pk', 'razao_social', 'cadastrado_por_id'))
+    ids = np.array([pk for pk, _, _ in linhas], dtype=np.int64)
+    anos = list(range(ano - anos_historico, ano))
+    historico = historico_mensal(ids, anos)
+    ultimo_ano = historico[:, -1, :].sum(axis=1)
+
+    if metas_anuais is not None:
+        anuais = np.array([int(Decimal(metas_anuais.get(pk, 0)) * 100) for pk in ids.tolist()], dtype=np.int64)
+    elif meta_carteira is not None:
+        total = int(Decimal(meta_carteira) * 100)
+        participacao = ultimo_ano / ultimo_ano.sum() if ultimo_ano.sum() > 0 else np.full(len(ids), 1 / max(len(ids), 1))
+        anuais = distribuir(np.array([total], dtype=np.int64), participacao[None, :])[0]
+    else:
+        anuais = np.rint(ultimo_ano * (1 + crescimento)).astype(np.int64)
+
+    dias_alvo = dias_uteis(ano, feriados)
+    if usar_dias_uteis:
+        dias_historico = np.array([dias_uteis(a) for a in anos])
+        perfis = sazonalidade(historico, dias_historico, dias_alvo, suavizacao)
+    else:
+        perfis = sazonalidade(historico, suavizacao=suavizacao)
+
+    return {
+        'ano': ano,
+        'clientes': linhas,
+        'anuais': anuais,
+        'centavos': distribuir(anuais, perfis),
+        'ultimo_ano': ultimo_ano,
+        'dias_uteis': dias_alvo,
+    }
+
+
+def resumo(plano, limite=50):
+    """ Totais e as primeiras linhas do plano para a pré-visualização. """
+    com_meta = plano['anuais'] > 0
+    linhas = []
+    for i in np.flatnonzero(com_meta)[:limite].tolist():
+        _, razao_social, _ = plano['clientes'][i]
+        linhas.append({
+            'cliente': razao_social,
+            'ultimo_ano': Decimal(int(plano['ultimo_ano'][i])).scaleb(-2),
+            'anual': Decimal(int(plano['anuais'][i])).scaleb(-2),
+            'meses': [Decimal(v).scaleb(-2) for v in plano['centavos'][i].tolist()],
+        })
+    return {
+        'ano': plano['ano'],
+        'clientes': int(com_meta.sum()),
+        'metas': int(com_meta.sum()) * MESES,
+        'total': Decimal(int(plano['anuais'].sum())).scaleb(-2),
+        'meses': [
+            {'nome': calendar.month_abbr[mes].capitalize(), 'dias_uteis': dias, 'total': Decimal(total).scaleb(-2)}
+            for mes, dias, total in zip(range(1, MESES + 1), plano['dias_uteis'].tolist(), plano['centavos'].sum(axis=0).tolist())
+        ],
+        'linhas': linhas,
+    }
+
+
+def gravar(plano):
+    """ Grava (insere ou atualiza) as 12 metas de cada cliente com meta anual positiva. """
+    dias = plano['dias_uteis'].tolist()
+    metas = [
+        # bulk_create não passa pelo sinal que copia o dono do cliente
+        Meta(cliente_id=pk, representante_id=dono, ano=plano['ano'], mes=mes, dias_uteis=dias[mes - 1],
+             valor=Decimal(centavos).scaleb(-2))
+        for (pk, _, dono), anual, meses in zip(plano['clientes'], plano['anuais'].tolist(), plano['centavos'].tolist())
+        if anual > 0
+        for mes, centavos in enumerate(meses, start=1)
+    ]
+    with transaction.atomic():
+        Meta.objects.bulk_create(
+            metas,
+            update_conflicts=True,
+            unique_fields=['cliente', 'mes', 'ano'],
+            update_fields=['valor', 'dias_uteis', 'representante', 'atualizado_em'],
+        )
+        ContadorAlteracao.incrementar(Meta)
+    return len(metas)
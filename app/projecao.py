@@ -0,0 +1,165 @@
+"""
+Projeção de fechamento do mês por cliente.
+
+O faturamento do mês vira uma matriz NumPy clientes x dias úteis (centavos;
+serviços de fim de semana ou feriado contam no dia útil anterior). Sobre ela,
+numa única passagem para todos os clientes:
+
+- ritmo: média diária dos dias úteis já decorridos, repetida nos restantes;
+- ponderada: média com peso que cai pela metade a cada `meia_vida` dias úteis
+  para trás, e responde mais rápido a uma aceleração ou queda recente;
+- ritmo necessário: quanto falta da meta dividido pelos dias úteis restantes.
+
+Os dados vêm da cópia em memória (app/fatos.py) quando ligada, senão de um
+GROUP BY (cliente, dia) no banco.
+"""
+import calendar
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import Sum
+
+from . import fatos
+from .models import Cliente, Meta, Servico
+
+MEIA_VIDA = 5
+
+
+def _reais(centavos):
+    return Decimal(int(round(centavos))).scaleb(-2)
+
+
+def dias_uteis_do_mes(ano, mes, feriados=()):
+    """ Datas (datetime64[D]) dos dias úteis do mês. """
+    inicio = np.datetime64(f'{ano}-{mes:02d}', 'M')
+    dias = np.arange(inicio.astype('datetime64[D]'), (inicio + 1).astype('datetime64[D]'))
+    return dias[np.is_busday(dias, holidays=np.array(list(feriados), dtype='datetime64[D]'))]
+
+
+def _faturamento_diario(usuario, inicio, fim):
+    """ Colunas (cliente, dia desde 1970-01-01, centavos) dos serviços visíveis ao usuário no período. """
+    representante = usuario if usuario.profile.is_representante else None
+    if fatos.ativo():
+        atual = fatos.atuais()
+        mascara = atual.selecao(inicio, fim, representante)
+        return atual.colunas['cliente'][mascara], atual.colunas['data'][mascara], atual.colunas['centavos'][mascara]
+
+    linhas = (
+        Servico.objects.visiveis_para(usuario).filter(data_servico__gte=inicio, data_servico__lte=fim)
+        .values_list('cliente_id', 'data_servico').annotate(total=Sum('valor')).order_by()
+    )
+    # O SQLite soma DECIMAL em ponto flutuante: arredonda para o centavo mais próximo
+    dados = [(cliente, data, int((total * 100).to_integral_value())) for cliente, data, total in linhas]
+    if not dados:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64)
+    clientes, datas, centavos = zip(*dados)
+    return (
+        np.array(clientes, dtype=np.int64),
+        np.array(datas, dtype='datetime64[D]').astype(np.int64),
+        np.array(centavos, dtype=np.int64),
+    )
+
+
+def matriz_diaria(cliente_ids, dias, clientes, datas, centavos):
+    """ Matriz clientes x dias úteis em centavos; `cliente_ids` precisa estar ordenado. """
+    matriz = np.zeros((len(cliente_ids), len(dias)), dtype=np.int64)
+    if not len(dias):
+        return matriz
+    linha = np.searchsorted(cliente_ids, clientes)
+    coluna = np.maximum(np.searchsorted(dias.astype(np.int64), datas, side='right') - 1, 0)
+    np.add.at(matriz, (linha, coluna), centavos)
+    return matriz
+
+
+def projetar(matriz, metas, decorridos, meia_vida=MEIA_VIDA):
+    """ Projeções (centavos, float) de todas as linhas da matriz, com `decorridos` dias úteis já passados. """
+    restantes = matriz.shape[1] - decorridos
+    realizado = matriz.sum(axis=1).astype(float)
+    if decorridos:
+        passado = matriz[:, :decorridos]
+        ritmo = passado.sum(axis=1) / decorridos
+        # Peso 1 no último dia decorrido, 1/2 meia_vida dias antes, 1/4 no dobro...
+        pesos = 0.5 ** (np.arange(decorridos)[::-1] / meia_vida)
+        ritmo_ponderado = passado @ pesos / pesos.sum()
+    else:
+        ritmo = ritmo_ponderado = np.zeros(len(matriz))
+    return {
+        'meta': metas.astype(float),
+        'realizado': realizado,
+        'ritmo': ritmo,
+        'ritmo_ponderado': ritmo_ponderado,
+        'projecao_ritmo': realizado + ritmo * restantes,
+        'projecao_ponderada': realizado + ritmo_ponderado * restantes,
+    }
+
+
+class Projecao:
+    """ Projeção do mês para os clientes visíveis a um usuário (os com meta ou com faturamento no mês). """
+
+    def __init__(self, cliente_ids, valores, dias_uteis, decorridos):
+        self.cliente_ids = cliente_ids
+        self.valores = valores
+        self.dias_uteis = dias_uteis
+        self.decorridos = decorridos
+        self.restantes = dias_uteis - decorridos
+        self._posicao = {pk: i for i, pk in enumerate(cliente_ids.tolist())}
+
+    def _formatar(self, valores):
+        meta, realizado = valores['meta'], valores['realizado']
+        resultado = {campo: _reais(valor) for campo, valor in valores.items()}
+        resultado['percentual_ritmo'] = float(valores['projecao_ritmo'] / meta * 100) if meta > 0 else None
+        resultado['percentual_ponderado'] = float(valores['projecao_ponderada'] / meta * 100) if meta > 0 else None
+        resultado['ritmo_necessario'] = (
+            _reais(max(meta - realizado, 0) / self.restantes) if meta > 0 and self.restantes else None
+        )
+        # Sem dia útil decorrido não há ritmo: a projeção é só o realizado e não indica risco
+        resultado['em_risco'] = bool(meta > 0 and valores['projecao_ponderada'] < meta) if self.decorridos else None
+        return resultado
+
+    def cliente(self, pk):
+        """ Projeção do cliente, ou None se ele não tem meta nem faturamento no mês. """
+        i = self._posicao.get(pk)
+        if i is None:
+            return None
+        return self._formatar({campo: coluna[i] for campo, coluna in self.valores.items()})
+
+    def total(self, cliente_ids=None):
+        """ Soma dos clientes informados (ou de todos); o ritmo necessário é o do total. """
+        if cliente_ids is None:
+            mascara = slice(None)
+        else:
+            mascara = np.isin(self.cliente_ids, list(cliente_ids))
+        return self._formatar({campo: coluna[mascara].sum() for campo, coluna in self.valores.items()})
+
+    def clientes_em_risco(self):
+        """ Clientes com meta e projeção ponderada abaixo dela; None antes do primeiro dia útil. """
+        if not self.decorridos:
+            return None
+        v = self.valores
+        return int(((v['meta'] > 0) & (v['projecao_ponderada'] < v['meta'])).sum())
+
+    def linhas(self):
+        """ Uma linha por cliente, com a razão social, ordenadas pela projeção ponderada. """
+        nomes = dict(Cliente.objects.filter(pk__in=self.cliente_ids.tolist()).values_list('pk', 'razao_social'))
+        ordem = np.argsort(-self.valores['projecao_ponderada'], kind='stable')
+        return [
+            dict(self.cliente(pk), cliente_id=pk, razao_social=nomes.get(pk))
+            for pk in self.cliente_ids[ordem].tolist()
+        ]
+
+
+def projetar_mes(usuario, ano, mes, hoje=None, feriados=(), meia_vida=MEIA_VIDA):
+    """ Projeção do mês para os clientes visíveis ao usuário (uma consulta de metas, uma de serviços). """
+    hoje = hoje or date.today()
+    dias = dias_uteis_do_mes(ano, mes, feriados)
+    decorridos = int(np.searchsorted(dias, np.datetime64(hoje, 'D'), side='right'))
+
+    clientes, datas, centavos = _faturamento_diario(usuario, date(ano, mes, 1), date(ano, mes, calendar.monthrange(ano, mes)[1]))
+    metas = Meta.objects.visiveis_para(usuario).filter(ano=ano, mes=mes).values_list('cliente_id', 'valor')
+    metas = {cliente: int(valor.scaleb(2)) for cliente, valor in metas}
+
+    cliente_ids = np.union1d(np.unique(clientes), np.array(list(metas), dtype=np.int64)).astype(np.int64)
+    matriz = matriz_diaria(cliente_ids, dias, clientes, datas, centavos)
+    valores_meta = np.array([metas.get(pk, 0) for pk in cliente_ids.tolist()], dtype=np.int64)
+    return Projecao(cliente_ids, projetar(matriz, valores_meta, decorridos, meia_vida), len(dias), decorridos)
@@ -0,0 +1,76 @@
+"""
+Configuração do service worker (templates/service-worker.js).
+
+O service worker é servido pela raiz (/service-worker.js) para controlar todo
+o site. A versão dos caches é o hash do build: do próprio script e dos arquivos
+estáticos pré-carregados. Um deploy que muda qualquer um deles gera uma versão
+nova, e o service worker descarta os caches da anterior ao ativar.
+"""
+import hashlib
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template.loader import get_template
+from django.templatetags.static import static
+from django.shortcuts import resolve_url
+from django.urls import reverse
+
+# Arquivos estáticos baixados na instalação, para o app abrir sem conexão
+ESTATICOS_PRE_CACHE = [
+    'app/css/print.css',
+    'app/js/upload_retomavel.js',
+    'icons/icon-192x192.png',
+    'icons/icon-512x512.png',
+    'manifest.json',
+]
+
+# Blocos HTMX do dashboard servidos com stale-while-revalidate (chave: URL com os filtros)
+BLOCOS_DASHBOARD = [
+    'app:get-dash-mensal',
+    'app:get-dash-trimestral',
+    'app:get-dash-anual',
+    'app:get-dash-top-clientes',
+    'app:dashboard-prospeccao',
+]
+
+# Caminhos nunca tratados pelo service worker (sempre direto na rede)
+SOMENTE_REDE = ['/admin/', '/api/', '/anexos/', '/login/', '/logout/', '/password_change/']
+
+# Modelos copiados para o IndexedDB pelo /api/sync/ (escopo do representante)
+MODELOS_OFFLINE = ['clientes', 'servicos']
+
+
+def _versao(estaticos):
+    hash_build = hashlib.sha256(get_template('service-worker.js').template.source.encode())
+    for caminho, url in estaticos:
+        hash_build.update(url.encode())
+        arquivo = finders.find(caminho)
+        if arquivo:
+            with open(arquivo, 'rb') as conteudo:
+                hash_build.update(conteudo.read())
+    return hash_build.hexdigest()[:12]
+
+
+def _configuracao():
+    estaticos = [(caminho, static(caminho)) for caminho in ESTATICOS_PRE_CACHE]
+    return json.dumps({
+        'versao': _versao(estaticos),
+        'preCache': [url for _, url in estaticos],
+        'prefixoEstaticos': settings.STATIC_URL,
+        'blocos': [reverse(nome) for nome in BLOCOS_DASHBOARD],
+        'somenteRede': SOMENTE_REDE,
+        'logout': reverse('logout'),
+        'login': resolve_url(settings.LOGIN_URL),
+        'urlSync': reverse('api:sync-list') + '?modelos=' + ','.join(MODELOS_OFFLINE),
+        'modelosOffline': MODELOS_OFFLINE,
+    })
+
+
+_configuracao_do_build = lru_cache(maxsize=1)(_configuracao)
+
+
+def configuracao():
+    """ JSON com a configuração do service worker; em DEBUG é recalculada a cada pedido. """
+    return _configuracao() if settings.DEBUG else _configuracao_do_build()
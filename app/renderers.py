@@ -0,0 +1,73 @@
+"""
+Renderers e parsers da API.
+
+- ORJSONRenderer: JSON gerado pelo orjson (bem mais rápido que o json da
+  biblioteca padrão em páginas grandes de Serviços). Saída equivalente à do
+  JSONRenderer do DRF.
+- MessagePackRenderer/MessagePackParser: formato binário para integrações,
+  escolhido por `Accept: application/msgpack` ou `?format=msgpack`; o parser
+  aceita o mesmo formato em envios em lote (ex.: POST /api/servicos/lote/).
+
+Em todos eles Decimal vira string (nunca float, para não perder centavos) e
+datas seguem o formato do encoder do DRF.
+"""
+import decimal
+
+import msgpack
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder_drf = JSONEncoder()
+
+
+def _converter(obj):
+    """ Tipos que orjson/msgpack não serializam sozinhos. """
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    # datetime ('Z' no lugar de +00:00), date, time, timedelta, UUID, lazy strings...
+    return _encoder_drf.default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None  # orjson já gera UTF-8
+
+    OPCOES = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        opcoes = self.OPCOES
+        # ?indent= (ou ; indent=N no Accept) como no JSONRenderer; orjson só indenta com 2
+        parametros = dict(
+            parte.strip().split('=', 1) for parte in (accepted_media_type or '').split(';')[1:] if '=' in parte
+        )
+        if parametros.get('indent'):
+            opcoes |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_converter, option=opcoes)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_converter, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError):
+            raise ParseError('Corpo MessagePack inválido.')
@@ -0,0 +1,105 @@
+"""
+Réplica de leitura para as views analíticas (dashboards, relatórios, funil).
+
+O RoteadorReplica manda as leituras para o alias "replica" só enquanto roda uma
+view marcada com @leitura_em_replica; todo o resto (e toda gravação) fica no
+"default". A réplica é usada quando:
+
+- o alias existe em DATABASES (CRM_SQLITE_REPLICA / CRM_PG_REPLICA_HOST);
+- a conexão abre (no SQLite, o arquivo precisa existir: abrir um caminho
+  inexistente criaria um banco vazio). Em caso de falha, o primário é usado e
+  a réplica só é testada de novo após REPLICA_RETENTATIVA_SEGUNDOS;
+- o usuário não gravou nada nos últimos REPLICA_ADERENCIA_SEGUNDOS. O
+  AderenciaReplicaMiddleware grava um cookie após cada POST/PUT/PATCH/DELETE
+  bem-sucedido, e assim quem acabou de lançar um serviço vê o próprio
+  lançamento no dashboard mesmo com a réplica atrasada.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+ALIAS = 'replica'
+COOKIE_ESCRITA = 'crm_ultima_escrita'
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+_ler_da_replica = ContextVar('ler_da_replica', default=False)
+_indisponivel_ate = 0.0
+
+
+def replica_disponivel():
+    """ A réplica está configurada e responde (com intervalo entre tentativas após falha). """
+    global _indisponivel_ate
+    if ALIAS not in connections.settings:
+        return False
+    if time.monotonic() < _indisponivel_ate:
+        return False
+    conexao = connections[ALIAS]
+    try:
+        if conexao.vendor == 'sqlite' and not Path(conexao.settings_dict['NAME']).exists():
+            raise DatabaseError(f'arquivo {conexao.settings_dict["NAME"]} não encontrado')
+        conexao.ensure_connection()
+    except DatabaseError as erro:
+        _indisponivel_ate = time.monotonic() + settings.REPLICA_RETENTATIVA_SEGUNDOS
+        logger.warning('Réplica de leitura indisponível, usando o primário: %s', erro)
+        return False
+    return True
+
+
+def gravou_recentemente(request):
+    try:
+        ultima = float(request.COOKIES.get(COOKIE_ESCRITA, 0))
+    except ValueError:
+        return False
+    return time.time() - ultima < settings.REPLICA_ADERENCIA_SEGUNDOS
+
+
+def leitura_em_replica(view):
+    """ Executa a view lendo da réplica quando possível. Deve ficar abaixo do @login_required. """
+    @wraps(view)
+    def envolvida(request, *args, **kwargs):
+        if request.method not in METODOS_SEGUROS or gravou_recentemente(request) or not replica_disponivel():
+            return view(request, *args, **kwargs)
+        token = _ler_da_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _ler_da_replica.reset(token)
+    return envolvida
+
+
+class RoteadorReplica:
+
+    def db_for_read(self, model, **hints):
+        return ALIAS if _ler_da_replica.get() else None
+
+    def db_for_write(self, model, **hints):
+        # Objetos lidos da réplica gravam no primário
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != ALIAS
+
+
+class AderenciaReplicaMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in METODOS_SEGUROS and response.status_code < 400:
+            response.set_cookie(
+                COOKIE_ESCRITA, '%.3f' % time.time(), max_age=settings.REPLICA_ADERENCIA_SEGUNDOS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -1,11 +1,57 @@
+from decimal import Decimal
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from .leitura_rapida import nome_completo
 from .models import (
     Profile, Cliente, ClienteProspect, Servico, TipoServico, 
-    Meta, Tarefa, AcaoTarefa, Prospeccao, AcaoProspeccao
+    Meta, Tarefa, AcaoTarefa, Prospeccao, AcaoProspeccao, ContadorAlteracao
 )
 
 
+def campos_pedidos(request):
+    """ Campos pedidos em ?fields=a,b,c numa leitura, ou None para todos. """
+    if request is None or request.method != 'GET':
+        return None
+    valor = request.query_params.get('fields')
+    if not valor:
+        return None
+    return {campo.strip() for campo in valor.split(',') if campo.strip()}
+
+
+def inclusoes_pedidas(request):
+    """ Relações aninhadas pedidas em ?include=a,b (ex.: ?include=acoes). """
+    if request is None:
+        return set()
+    valor = request.query_params.get('include', '')
+    return {nome.strip() for nome in valor.split(',') if nome.strip()}
+
+
+class CamposDinamicosMixin:
+    """
+    Sparse fieldsets: com ?fields= só os campos pedidos são serializados.
+    `Meta.relacionados` diz qual select_related cada campo exige, para a view
+    juntar apenas as tabelas necessárias (ver relacionados_para).
+    Os campos de `Meta.opcionais` (listas aninhadas) só saem com ?include=.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        pedidos = campos_pedidos(request)
+        if pedidos is not None:
+            for nome in set(self.fields) - pedidos:
+                self.fields.pop(nome)
+        for nome in set(getattr(self.Meta, 'opcionais', ())) - inclusoes_pedidas(request):
+            self.fields.pop(nome, None)
+
+    @classmethod
+    def relacionados_para(cls, pedidos):
+        mapa = getattr(cls.Meta, 'relacionados', {})
+        return sorted({rel for campo, rel in mapa.items() if pedidos is None or campo in pedidos})
+
+
 # ===== USER & PROFILE =====
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -16,7 +62,7 @@ class ProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['setor', 'tem_acesso_gestao']
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para usuários/representantes"""
     profile = ProfileSerializer(read_only=True)
     full_name = serializers.SerializerMethodField()
@@ -26,6 +72,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 
                   'full_name', 'is_active', 'profile']
         read_only_fields = ['id', 'username']
+        relacionados = {'profile': 'profile'}
     
     def get_full_name(self, obj):
         return obj.get_full_name() or obj.username
@@ -54,7 +101,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
 
 # ===== CLIENTES =====
 
-class ClienteSerializer(serializers.ModelSerializer):
+class ClienteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para clientes ativos"""
     cadastrado_por_nome = serializers.CharField(
         source='cadastrado_por.get_full_name', 
@@ -66,9 +113,16 @@ class ClienteSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'cnpj', 'razao_social', 'endereco', 
             'nome_contato', 'telefone_contato',
-            'data_cadastro', 'cadastrado_por', 'cadastrado_por_nome'
+            'data_cadastro', 'cadastrado_por', 'cadastrado_por_nome',
+            'atualizado_em'
         ]
-        read_only_fields = ['id', 'data_cadastro']
+        read_only_fields = ['id', 'data_cadastro', 'atualizado_em']
+        relacionados = {'cadastrado_por_nome': 'cadastrado_por'}
+        # Origem dos campos na leitura rápida das listagens (app/leitura_rapida.py)
+        valores = {
+            'cadastrado_por': 'cadastrado_por_id',
+            'cadastrado_por_nome': (nome_completo('cadastrado_por'), 'cadastrado_por_id'),
+        }
 
 
 class ClienteProspectSerializer(serializers.ModelSerializer):
@@ -98,7 +152,7 @@ class TipoServicoSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class ServicoSerializer(serializers.ModelSerializer):
+class ServicoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para serviços/transportes realizados"""
     cliente_razao_social = serializers.CharField(
         source='cliente.razao_social',
@@ -119,9 +173,24 @@ class ServicoSerializer(serializers.ModelSerializer):
             'id', 'cliente', 'cliente_razao_social',
             'tipo_servico', 'tipo_servico_nome',
             'data_servico', 'quantidade', 'valor',
-            'data_registro', 'fechado_por', 'fechado_por_nome'
+            'data_registro', 'fechado_por', 'fechado_por_nome',
+            'atualizado_em'
         ]
-        read_only_fields = ['id', 'data_registro', 'fechado_por']
+        read_only_fields = ['id', 'data_registro', 'fechado_por', 'atualizado_em']
+        relacionados = {
+            'cliente_razao_social': 'cliente',
+            'tipo_servico_nome': 'tipo_servico',
+            'fechado_por_nome': 'fechado_por',
+        }
+        # Origem dos campos na leitura rápida das listagens (app/leitura_rapida.py)
+        valores = {
+            'cliente': 'cliente_id',
+            'tipo_servico': 'tipo_servico_id',
+            'fechado_por': 'fechado_por_id',
+            'cliente_razao_social': 'cliente__razao_social',
+            'tipo_servico_nome': ('tipo_servico__nome', 'tipo_servico_id'),
+            'fechado_por_nome': (nome_completo('fechado_por'), 'fechado_por_id'),
+        }
 
 
 class ServicoCreateSerializer(serializers.ModelSerializer):
@@ -131,9 +200,105 @@ class ServicoCreateSerializer(serializers.ModelSerializer):
         fields = ['cliente', 'tipo_servico', 'data_servico', 'quantidade', 'valor']
 
 
+class ServicoLoteListSerializer(serializers.ListSerializer):
+    """
+    Lista de serviços enviados em lote.
+    Cada item é validado isoladamente (um item inválido não derruba o lote) e
+    as referências de todos os itens são resolvidas com uma consulta por modelo.
+    """
+    default_max_length = 500
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({'non_field_errors': ['Envie uma lista de serviços.']})
+        if not data:
+            raise serializers.ValidationError({'non_field_errors': ['O lote está vazio.']})
+        max_length = self.max_length or self.default_max_length
+        if len(data) > max_length:
+            raise serializers.ValidationError({
+                'non_field_errors': [f'O lote aceita no máximo {max_length} serviços.']
+            })
+
+        itens = []
+        for item in data:
+            try:
+                itens.append({'dados': self.child.run_validation(item), 'erros': None})
+            except serializers.ValidationError as exc:
+                itens.append({'dados': None, 'erros': exc.detail})
+
+        self._resolver_referencias(itens)
+        return itens
+
+    def _resolver_referencias(self, itens):
+        user = self.context['request'].user
+        validos = [item for item in itens if item['dados']]
+
+        clientes = Cliente.objects.visiveis_para(user).in_bulk({item['dados']['cliente'] for item in validos})
+        tipos = TipoServico.objects.in_bulk({item['dados']['tipo_servico'] for item in validos if item['dados'].get('tipo_servico')})
+        existentes = Servico.objects.visiveis_para(user).in_bulk({item['dados']['id'] for item in validos if item['dados'].get('id')})
+
+        for item in validos:
+            dados, erros = item['dados'], {}
+            if dados['cliente'] not in clientes:
+                erros['cliente'] = ['Cliente inexistente ou fora do seu escopo.']
+            if dados.get('tipo_servico') and dados['tipo_servico'] not in tipos:
+                erros['tipo_servico'] = ['Tipo de serviço inexistente.']
+            if dados.get('id') and dados['id'] not in existentes:
+                erros['id'] = ['Serviço inexistente ou fora do seu escopo.']
+            if erros:
+                item['dados'], item['erros'] = None, erros
+                continue
+            item['instancia'] = existentes.get(dados.get('id'))
+            item['representante_id'] = clientes[dados['cliente']].cadastrado_por_id
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        # bulk_create/bulk_update não passam pelos sinais nem pelo auto_now do bulk_update:
+        # atualizado_em e representante_id vão explícitos
+        campos = ['cliente_id', 'tipo_servico_id', 'data_servico', 'quantidade', 'valor', 'atualizado_em', 'representante_id']
+        agora = timezone.now()
+        novos, atualizados = [], []
+
+        for item in validated_data:
+            if not item['dados']:
+                continue
+            dados = item['dados']
+            servico = item.get('instancia') or Servico(fechado_por=user)
+            servico.cliente_id = dados['cliente']
+            servico.representante_id = item['representante_id']
+            servico.tipo_servico_id = dados.get('tipo_servico')
+            servico.data_servico = dados['data_servico']
+            servico.quantidade = dados['quantidade']
+            servico.valor = dados['valor']
+            servico.atualizado_em = agora
+            item['instancia'] = servico
+            (atualizados if servico.pk else novos).append(servico)
+
+        with transaction.atomic():
+            if novos:
+                Servico.objects.bulk_create(novos)
+            if atualizados:
+                Servico.objects.bulk_update(atualizados, campos)
+            ContadorAlteracao.incrementar(Servico)
+        return validated_data
+
+
+class ServicoLoteItemSerializer(serializers.Serializer):
+    """Item do lote: com 'id' atualiza um serviço existente, sem 'id' cria um novo"""
+    id = serializers.IntegerField(required=False)
+    cliente = serializers.IntegerField()
+    tipo_servico = serializers.IntegerField(required=False, allow_null=True)
+    data_servico = serializers.DateField()
+    quantidade = serializers.IntegerField(min_value=1, default=1)
+    valor = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+
+    class Meta:
+        list_serializer_class = ServicoLoteListSerializer
+
+
 # ===== METAS =====
 
-class MetaSerializer(serializers.ModelSerializer):
+class MetaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para metas mensais por cliente"""
     cliente_razao_social = serializers.CharField(
         source='cliente.razao_social',
@@ -147,17 +312,22 @@ class MetaSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'cliente', 'cliente_razao_social',
             'representante_nome',
-            'mes', 'mes_nome', 'ano', 'valor', 'dias_uteis'
+            'mes', 'mes_nome', 'ano', 'valor', 'dias_uteis',
+            'atualizado_em'
         ]
-        read_only_fields = ['id']
+        read_only_fields = ['id', 'atualizado_em']
+        relacionados = {
+            'cliente_razao_social': 'cliente',
+            'representante_nome': 'representante',
+        }
     
     def get_mes_nome(self, obj):
         import calendar
         return calendar.month_name[obj.mes].capitalize()
     
     def get_representante_nome(self, obj):
-        if obj.cliente and obj.cliente.cadastrado_por:
-            return obj.cliente.cadastrado_por.get_full_name() or obj.cliente.cadastrado_por.username
+        if obj.representante:
+            return obj.representante.get_full_name() or obj.representante.username
         return None
 
 
@@ -179,7 +349,7 @@ class AcaoTarefaSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'data_registro']
 
 
-class TarefaSerializer(serializers.ModelSerializer):
+class TarefaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para tarefas (Kanban)"""
     criado_por_nome = serializers.CharField(
         source='criado_por.get_full_name',
@@ -200,7 +370,7 @@ class TarefaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tarefa
         fields = [
-            'id', 'titulo', 'descricao', 'status', 'prioridade',
+            'id', 'titulo', 'descricao', 'status',
             'data_criacao', 'criado_por', 'criado_por_nome',
             'data_inicio', 'iniciado_por', 'iniciado_por_nome',
             'data_finalizacao', 'finalizado_por', 'finalizado_por_nome',
@@ -211,6 +381,12 @@ class TarefaSerializer(serializers.ModelSerializer):
             'data_inicio', 'iniciado_por',
             'data_finalizacao', 'finalizado_por'
         ]
+        relacionados = {
+            'criado_por_nome': 'criado_por',
+            'iniciado_por_nome': 'iniciado_por',
+            'finalizado_por_nome': 'finalizado_por',
+        }
+        opcionais = ['acoes']
 
 
 # ===== PROSPECÇÃO =====
@@ -231,7 +407,7 @@ class AcaoProspeccaoSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'data_registro']
 
 
-class ProspeccaoSerializer(serializers.ModelSerializer):
+class ProspeccaoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para prospecções (Funil de Vendas)"""
     cliente_razao_social = serializers.CharField(
         source='cliente.razao_social',
@@ -262,17 +438,53 @@ class ProspeccaoSerializer(serializers.ModelSerializer):
             'status', 'data_criacao', 'criado_por', 'criado_por_nome',
             'data_inicio_negociacao', 'iniciado_por', 'iniciado_por_nome',
             'data_finalizacao', 'finalizado_por', 'finalizado_por_nome',
-            'acoes'
+            'atualizado_em', 'acoes'
         ]
         read_only_fields = [
             'id', 'data_criacao', 'criado_por',
             'data_inicio_negociacao', 'iniciado_por',
-            'data_finalizacao', 'finalizado_por'
+            'data_finalizacao', 'finalizado_por', 'atualizado_em'
         ]
+        relacionados = {
+            'cliente_razao_social': 'cliente',
+            'criado_por_nome': 'criado_por',
+            'iniciado_por_nome': 'iniciado_por',
+            'finalizado_por_nome': 'finalizado_por',
+        }
+        opcionais = ['acoes']
 
 
 # ===== DASHBOARD / RELATÓRIOS =====
 
+class ProjecaoSerializer(serializers.Serializer):
+    """Projeção de fechamento do mês (app/projecao.py); ritmos são valores por dia útil"""
+    meta = serializers.DecimalField(max_digits=15, decimal_places=2)
+    realizado = serializers.DecimalField(max_digits=15, decimal_places=2)
+    ritmo = serializers.DecimalField(max_digits=15, decimal_places=2)
+    ritmo_ponderado = serializers.DecimalField(max_digits=15, decimal_places=2)
+    projecao_ritmo = serializers.DecimalField(max_digits=15, decimal_places=2)
+    projecao_ponderada = serializers.DecimalField(max_digits=15, decimal_places=2)
+    percentual_ritmo = serializers.FloatField(allow_null=True)
+    percentual_ponderado = serializers.FloatField(allow_null=True)
+    ritmo_necessario = serializers.DecimalField(max_digits=15, decimal_places=2, allow_null=True)
+    em_risco = serializers.BooleanField(allow_null=True)
+
+
+class ProjecaoClienteSerializer(ProjecaoSerializer):
+    cliente_id = serializers.IntegerField()
+    razao_social = serializers.CharField(allow_null=True)
+
+
+class ProjecaoMensalSerializer(serializers.Serializer):
+    """Projeção do mês por cliente e total da carteira visível"""
+    mes = serializers.IntegerField()
+    ano = serializers.IntegerField()
+    dias_uteis = serializers.IntegerField()
+    dias_uteis_decorridos = serializers.IntegerField()
+    total = ProjecaoSerializer()
+    clientes = ProjecaoClienteSerializer(many=True)
+
+
 class DashboardMensalSerializer(serializers.Serializer):
     """Serializer para dados do dashboard mensal"""
     mes = serializers.IntegerField()
@@ -282,6 +494,7 @@ class DashboardMensalSerializer(serializers.Serializer):
     meta_valor = serializers.DecimalField(max_digits=15, decimal_places=2, allow_null=True)
     percentual_meta = serializers.FloatField(allow_null=True)
     dias_restantes = serializers.IntegerField()
+    projecao = ProjecaoSerializer()
 
 
 class ClienteRankingSerializer(serializers.Serializer):
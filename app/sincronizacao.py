@@ -0,0 +1,193 @@
+"""
+Sincronização incremental (/api/sync/).
+
+O cliente guarda o token devolvido em cada sincronização e o envia na próxima
+(?desde=<token>); a resposta traz, por model, os registros gravados desde então
+(pelo atualizado_em, indexado) e os ids excluídos (tabela Exclusao). Sem token,
+vêm todos os registros do escopo do usuário.
+
+O token marca o início da sincronização anterior. A busca volta
+API_SYNC_MARGEM_SEGUNDOS antes dele, para não perder gravações de transações
+que ainda não tinham sido confirmadas naquele instante; por isso um registro
+pode vir de novo em sincronizações seguidas (aplicar as alterações é idempotente).
+
+Cada model traz no máximo API_SYNC_LIMITE registros por resposta, na ordem
+(atualizado_em, id). Com mais que isso, a resposta vem com "mais": true e o
+token é uma continuação: ele guarda até onde cada model foi e o instante da
+primeira página, devolvido como token na última.
+
+Um cliente que muda de carteira sai do escopo do dono anterior: o sinal
+propagar_dono registra exclusões do cliente, dos serviços e das metas para
+ele. Ids excluídos que voltaram ao escopo do usuário não são informados.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .leitura_rapida import LeitorValores
+from .models import Cliente, Servico, Meta, Prospeccao, Exclusao
+from .serializers import ClienteSerializer, ServicoSerializer, MetaSerializer, ProspeccaoSerializer
+
+# nome na resposta, model, serializer
+MODELOS = [
+    ('clientes', Cliente, ClienteSerializer),
+    ('servicos', Servico, ServicoSerializer),
+    ('metas', Meta, MetaSerializer),
+    ('prospeccoes', Prospeccao, ProspeccaoSerializer),
+]
+
+
+class TokenInvalido(ValueError):
+    """ Token que não foi gerado pelo /api/sync/. """
+
+
+class TokenExpirado(ValueError):
+    """ Token mais antigo que as exclusões guardadas; é preciso sincronizar do zero. """
+
+
+class Continuacao(NamedTuple):
+    """ Sincronização que não coube numa resposta. """
+    desde: datetime | None  # `desde` da primeira página (None: sincronização completa)
+    instante: datetime  # início da primeira página, o token final
+    posicoes: dict  # {nome: (atualizado_em, id)} do último registro enviado, dos models com pendências
+
+
+def codificar_token(instante):
+    return base64.urlsafe_b64encode(instante.isoformat().encode()).decode()
+
+
+def codificar_continuacao(continuacao):
+    conteudo = {
+        'desde': continuacao.desde and continuacao.desde.isoformat(),
+        'instante': continuacao.instante.isoformat(),
+        'posicoes': {nome: [atualizado_em.isoformat(), pk] for nome, (atualizado_em, pk) in continuacao.posicoes.items()},
+    }
+    return base64.urlsafe_b64encode(json.dumps(conteudo).encode()).decode()
+
+
+def _instante(texto):
+    instante = datetime.fromisoformat(texto)
+    if timezone.is_naive(instante):
+        raise ValueError(texto)
+    return instante
+
+
+def decodificar_token(token):
+    """ Instante da sincronização anterior ou, no meio de uma sincronização, a Continuacao. """
+    try:
+        conteudo = base64.urlsafe_b64decode(token.encode()).decode()
+        if conteudo.startswith('{'):
+            dados = json.loads(conteudo)
+            desde = dados['desde'] and _instante(dados['desde'])
+            resultado = Continuacao(desde, _instante(dados['instante']), {
+                nome: (_instante(atualizado_em), int(pk)) for nome, (atualizado_em, pk) in dados['posicoes'].items()
+            })
+            instante = resultado.instante
+        else:
+            resultado = instante = _instante(conteudo)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise TokenInvalido("Token de sincronização inválido.")
+    if instante < timezone.now() - timedelta(days=settings.API_SYNC_RETENCAO_DIAS):
+        raise TokenExpirado("Token de sincronização expirado; sincronize novamente sem 'desde'.")
+    return resultado
+
+
+def escopo(modelo, usuario):
+    """
+    (queryset, restrito) com os registros do model visíveis ao usuário, com
+    as mesmas regras das listagens da API. `restrito` indica que o usuário só
+    vê o próprio escopo (e portanto só as exclusões em que é o dono).
+    """
+    queryset = modelo.objects.all()
+    if modelo is Prospeccao:
+        if usuario.is_staff or usuario.profile.tem_acesso_gestao:
+            return queryset, False
+        return queryset.filter(criado_por=usuario), True
+
+    if not usuario.profile.is_representante:
+        return queryset, False
+    return queryset.da_carteira(usuario), True
+
+
+def _representar(serializer_class, queryset):
+    serializer = serializer_class()
+    if hasattr(serializer.Meta, 'valores'):
+        leitor = LeitorValores(serializer)
+        return leitor.representar(leitor.consulta(queryset))
+    queryset = queryset.select_related(*serializer_class.relacionados_para(None))
+    return serializer_class(queryset, many=True).data
+
+
+def _excluidos(modelo, usuario, visiveis, restrito, inicio):
+    exclusoes = Exclusao.objects.filter(modelo=modelo._meta.label_lower, excluido_em__gte=inicio)
+    if restrito:
+        exclusoes = exclusoes.filter(dono=usuario)
+    ids = set(exclusoes.values_list('objeto_id', flat=True))
+    if ids:
+        # Saiu do escopo e voltou (cliente devolvido à carteira): vem em `atualizados`
+        ids -= set(visiveis.filter(pk__in=ids).values_list('pk', flat=True))
+    return sorted(ids)
+
+
+def _depois_de(registros, posicao):
+    atualizado_em, pk = posicao
+    return registros.filter(Q(atualizado_em__gt=atualizado_em) | Q(atualizado_em=atualizado_em, pk__gt=pk))
+
+
+def alteracoes(usuario, desde=None, nomes=None):
+    """
+    Registros gravados e excluídos desde `desde` (ou todos, sem ele) e o token
+    da próxima chamada. `desde` é o que decodificar_token devolveu: um instante
+    ou a Continuacao de uma sincronização em andamento. `nomes` limita aos
+    models informados (ex.: ['clientes']).
+    """
+    continuacao = desde if isinstance(desde, Continuacao) else None
+    if continuacao:
+        agora, desde = continuacao.instante, continuacao.desde
+    else:
+        agora = timezone.now()
+    limite = settings.API_SYNC_LIMITE
+    modelos, posicoes = {}, {}
+    for nome, modelo, serializer_class in MODELOS:
+        if nomes and nome not in nomes:
+            continue
+        if continuacao and nome not in continuacao.posicoes:
+            modelos[nome] = {'atualizados': [], 'excluidos': []}  # já enviado por inteiro
+            continue
+        visiveis, restrito = escopo(modelo, usuario)
+        registros = visiveis
+        excluidos = []
+        if desde is not None:
+            inicio = desde - timedelta(seconds=settings.API_SYNC_MARGEM_SEGUNDOS)
+            registros = registros.filter(atualizado_em__gte=inicio)
+            if not continuacao:
+                excluidos = _excluidos(modelo, usuario, visiveis, restrito, inicio)
+        if continuacao:
+            registros = _depois_de(registros, continuacao.posicoes[nome])
+
+        registros = registros.order_by('atualizado_em', 'id')
+        # O último registro da página e o seguinte, se houver
+        fronteira = list(registros.values_list('atualizado_em', 'id')[limite - 1:limite + 1])
+        if len(fronteira) > 1:
+            ultimo_em, ultimo_id = fronteira[0]
+            registros = registros.exclude(
+                Q(atualizado_em__gt=ultimo_em) | Q(atualizado_em=ultimo_em, pk__gt=ultimo_id)
+            )
+            posicoes[nome] = fronteira[0]
+
+        modelos[nome] = {
+            'atualizados': _representar(serializer_class, registros),
+            'excluidos': excluidos,
+        }
+
+    if posicoes:
+        token = codificar_continuacao(Continuacao(desde, agora, posicoes))
+    else:
+        token = codificar_token(agora)
+    return {'token': token, 'completo': desde is None and not continuacao, 'mais': bool(posicoes), 'modelos': modelos}
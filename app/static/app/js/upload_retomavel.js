@@ -0,0 +1,152 @@
+/*
+ * Upload retomável de anexos.
+ *
+ * Formulários com data-upload-retomavel="<url de início>" enviam o arquivo
+ * escolhido em blocos assim que ele é selecionado. Se a conexão cair, o envio
+ * continua do último byte recebido pelo servidor (inclusive depois de recarregar
+ * a página e escolher o mesmo arquivo). Ao final, o formulário envia só o
+ * upload_id no lugar do arquivo.
+ */
+(function () {
+    const PREFIXO = 'upload-retomavel:';
+    const MAX_TENTATIVAS = 8;
+
+    function esperar(ms) {
+        return new Promise((resolve) => setTimeout(resolve, ms));
+    }
+
+    function csrf(form) {
+        const campo = form.querySelector('[name=csrfmiddlewaretoken]');
+        return campo ? campo.value : '';
+    }
+
+    async function json(resposta) {
+        try {
+            return await resposta.json();
+        } catch (e) {
+            return {};
+        }
+    }
+
+    async function abrirSessao(form, arquivo, chave) {
+        const salva = localStorage.getItem(chave);
+        if (salva) {
+            const resposta = await fetch(salva, { credentials: 'same-origin' });
+            if (resposta.ok) return json(resposta);
+            localStorage.removeItem(chave);
+        }
+
+        const dados = new FormData();
+        dados.append('nome', arquivo.name);
+        dados.append('tamanho', arquivo.size);
+        const resposta = await fetch(form.dataset.uploadRetomavel, {
+            method: 'POST',
+            body: dados,
+            credentials: 'same-origin',
+            headers: { 'X-CSRFToken': csrf(form) },
+        });
+        const sessao = await json(resposta);
+        if (!resposta.ok) throw new Error(sessao.error || 'Não foi possível iniciar o envio.');
+        localStorage.setItem(chave, sessao.url);
+        return sessao;
+    }
+
+    async function enviar(form, arquivo, progresso) {
+        const chave = PREFIXO + form.dataset.uploadRetomavel + ':' + arquivo.name + ':' + arquivo.size + ':' + arquivo.lastModified;
+        let sessao = await abrirSessao(form, arquivo, chave);
+        let tentativas = 0;
+
+        while (sessao.recebido < sessao.tamanho_total) {
+            progresso(sessao.recebido / sessao.tamanho_total);
+            const inicio = sessao.recebido;
+            const fim = Math.min(inicio + sessao.tamanho_bloco, arquivo.size) - 1;
+            try {
+                const resposta = await fetch(sessao.url, {
+                    method: 'PUT',
+                    body: arquivo.slice(inicio, fim + 1),
+                    credentials: 'same-origin',
+                    headers: {
+                        'Content-Range': `bytes ${inicio}-${fim}/${arquivo.size}`,
+                        'Content-Type': 'application/octet-stream',
+                        'X-CSRFToken': csrf(form),
+                    },
+                });
+                const corpo = await json(resposta);
+                // 409: o servidor informa quanto já tem; continua dali
+                if (!resposta.ok && resposta.status !== 409) throw new Error(corpo.error || 'Falha no envio.');
+                if (corpo.recebido === undefined || corpo.recebido === inicio) throw new Error(corpo.error || 'Bloco não aceito.');
+                sessao = corpo;
+                tentativas = 0;
+            } catch (erro) {
+                if (++tentativas > MAX_TENTATIVAS) throw erro;
+                await esperar(Math.min(30000, 1000 * 2 ** tentativas));
+                try {
+                    const resposta = await fetch(sessao.url, { credentials: 'same-origin' });
+                    if (resposta.ok) sessao = await json(resposta);
+                } catch (e) {
+                    // Ainda sem conexão; tenta de novo no próximo ciclo
+                }
+            }
+        }
+
+        localStorage.removeItem(chave);
+        progresso(1);
+        return sessao.id;
+    }
+
+    function barraDeProgresso(input) {
+        let barra = input.parentElement.querySelector('.upload-retomavel-progresso');
+        if (!barra) {
+            barra = document.createElement('div');
+            barra.className = 'progress mt-1 upload-retomavel-progresso';
+            barra.innerHTML = '<div class="progress-bar" role="progressbar" style="width: 0%"></div>';
+            input.insertAdjacentElement('afterend', barra);
+        }
+        return barra.firstElementChild;
+    }
+
+    document.addEventListener('change', async (evento) => {
+        const input = evento.target;
+        const form = input.closest && input.closest('form[data-upload-retomavel]');
+        if (!form || input.type !== 'file' || !input.files.length) return;
+
+        // O arquivo não vai junto com o formulário; só o id do upload
+        input.dataset.nome = input.dataset.nome || input.name;
+        input.removeAttribute('name');
+        let campoId = form.querySelector('input[name=upload_id]');
+        if (!campoId) {
+            campoId = document.createElement('input');
+            campoId.type = 'hidden';
+            campoId.name = 'upload_id';
+            form.appendChild(campoId);
+        }
+        campoId.value = '';
+
+        const barra = barraDeProgresso(input);
+        barra.classList.remove('bg-danger', 'bg-success');
+        form.dataset.enviando = '1';
+        try {
+            campoId.value = await enviar(form, input.files[0], (fracao) => {
+                barra.style.width = Math.round(fracao * 100) + '%';
+            });
+            barra.classList.add('bg-success');
+        } catch (erro) {
+            barra.classList.add('bg-danger');
+            // Sem o upload em blocos, o arquivo volta a seguir no próprio formulário
+            input.name = input.dataset.nome;
+            campoId.remove();
+            alert('Falha ao enviar o anexo: ' + erro.message + '\nSelecione o arquivo novamente para continuar de onde parou.');
+        } finally {
+            delete form.dataset.enviando;
+        }
+    });
+
+    // Não deixa gravar a ação com o anexo ainda a caminho
+    document.addEventListener('htmx:beforeRequest', (evento) => {
+        const form = evento.detail.elt.closest && evento.detail.elt.closest('form[data-upload-retomavel]');
+        if (form && form.dataset.enviando) {
+            evento.preventDefault();
+            alert('Aguarde o fim do envio do anexo.');
+        }
+    });
+})();
@@ -0,0 +1,95 @@
+"""
+Armazenamento deduplicado dos anexos (AcaoTarefa/AcaoProspeccao).
+
+Cada upload tem o SHA-256 calculado enquanto é gravado, e o conteúdo fica uma
+única vez em blobs/<2 primeiros>/<hash>. O nome guardado no FileField é
+blobs/<2 primeiros>/<hash>/<nome original>: o nome original segue disponível
+para download, mas todos os anexos com o mesmo conteúdo apontam para o mesmo
+arquivo em disco. As referências ficam em BlobAnexo e os blobs sem uso são
+removidos pelo comando `limpar_blobs`.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+
+PASTA_BLOBS = 'blobs'
+TAMANHO_LEITURA = 1024 * 1024
+
+
+def armazenamento_anexos():
+    """ Storage dos FileFields de anexo (STORAGES['anexos']). """
+    return storages['anexos']
+
+
+def hash_do_nome(nome):
+    """ Hash do blob a partir do nome gravado no FileField, ou None se não for um blob. """
+    partes = (nome or '').replace('\\', '/').split('/')
+    if len(partes) == 4 and partes[0] == PASTA_BLOBS and len(partes[2]) == 64:
+        return partes[2]
+    return None
+
+
+class ArmazenamentoDeduplicado(FileSystemStorage):
+
+    def caminho_blob(self, hash_hex):
+        return os.path.join(self.location, PASTA_BLOBS, hash_hex[:2], hash_hex)
+
+    def path(self, name):
+        hash_hex = hash_do_nome(name)
+        if hash_hex:
+            return self.caminho_blob(hash_hex)
+        return super().path(name)  # anexos antigos, gravados antes da deduplicação
+
+    def _save(self, name, content):
+        sha = hashlib.sha256()
+        temporario = getattr(content, 'temporary_file_path', None)
+
+        if temporario:
+            # Arquivo já está em disco (upload grande ou em blocos): só lê para o hash e move
+            origem = temporario()
+            with open(origem, 'rb') as arquivo:
+                for bloco in iter(lambda: arquivo.read(TAMANHO_LEITURA), b''):
+                    sha.update(bloco)
+            tamanho = os.path.getsize(origem)
+        else:
+            pasta_tmp = os.path.join(self.location, PASTA_BLOBS, 'tmp')
+            os.makedirs(pasta_tmp, exist_ok=True)
+            fd, origem = tempfile.mkstemp(dir=pasta_tmp)
+            tamanho = 0
+            with os.fdopen(fd, 'wb') as destino:
+                for bloco in content.chunks():
+                    sha.update(bloco)
+                    destino.write(bloco)
+                    tamanho += len(bloco)
+
+        hash_hex = sha.hexdigest()
+        caminho = self.caminho_blob(hash_hex)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with transaction.atomic():
+            # Registra antes de olhar o disco, com a linha travada até o fim: o limpar_blobs
+            # (select_for_update) espera e vê o atualizado_em novo, ou já terminou de apagar
+            # o blob, e então o arquivo não existe mais e é recolocado abaixo
+            apps.get_model('app', 'BlobAnexo').registrar(hash_hex, tamanho)
+            if os.path.exists(caminho):
+                if not temporario:
+                    os.remove(origem)
+            elif temporario:
+                file_move_safe(origem, caminho)
+            else:
+                os.replace(origem, caminho)
+        if self.file_permissions_mode is not None:
+            os.chmod(caminho, self.file_permissions_mode)
+
+        nome_original = os.path.basename(name)[:150]
+        return f'{PASTA_BLOBS}/{hash_hex[:2]}/{hash_hex}/{nome_original}'
+
+    def delete(self, name):
+        # O blob pode ser de outros anexos; quem remove é o limpar_blobs
+        if hash_do_nome(name):
+            return
+        super().delete(name)
@@ -1,3 +1,483 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date, timedelta
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from . import anexos, importacao, projecao, sincronizacao
+from .models import (
+    AcaoTarefa, Cliente, ClienteProspect, ContadorAlteracao, EscritaIdempotente, Meta, Prospeccao, ProspeccaoEtapa,
+    SequenciaNumeroControle, Servico, Tarefa, TipoServico, UploadSessao,
+)
+
+
+class NumeroControleTests(TransactionTestCase):
+    """
+    numero_controle pela SequenciaNumeroControle. TransactionTestCase porque
+    cada thread abre a própria conexão e precisa enxergar os commits das
+    outras (o banco de teste do SQLite é um arquivo, ver CRM_Comercial/bancos.py).
+    """
+    THREADS = 8
+    POR_THREAD = 10
+    BLOCO = 25
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('rep-sequencia')
+        self.prospect = ClienteProspect.objects.create(
+            razao_social='Prospect', nome_contato='Contato', telefone_contato='0', cadastrado_por=self.usuario,
+        )
+
+    def _prospeccao(self, **campos):
+        return Prospeccao(
+            cliente=self.prospect, duracao_meses=1, viagens_aproximadas=1, valor_medio_viagem=1,
+            valor_total=1, criado_por=self.usuario, **campos,
+        )
+
+    def _numero(self, numero_controle):
+        return int(numero_controle.split('/')[-1])
+
+    def test_insercoes_simultaneas_recebem_numeros_unicos_e_contiguos(self):
+        largada = threading.Barrier(self.THREADS + 1)
+        erros, blocos = [], []
+
+        def em_thread(funcao):
+            def executar():
+                try:
+                    largada.wait()
+                    funcao()
+                except Exception as erro:
+                    erros.append(erro)
+                finally:
+                    connection.close()
+            return threading.Thread(target=executar)
+
+        def inserir():
+            for _ in range(self.POR_THREAD):
+                self._prospeccao().save()
+
+        def reservar():
+            blocos.append(Prospeccao.reservar_numeros_controle(self.BLOCO))
+
+        threads = [em_thread(inserir) for _ in range(self.THREADS)] + [em_thread(reservar)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(erros, [])
+        gravados = list(Prospeccao.objects.values_list('numero_controle', flat=True))
+        self.assertEqual(len(gravados), self.THREADS * self.POR_THREAD)
+
+        bloco = [self._numero(n) for n in blocos[0]]
+        self.assertEqual(bloco, list(range(bloco[0], bloco[0] + self.BLOCO)))
+
+        total = len(gravados) + self.BLOCO
+        numeros = sorted(self._numero(n) for n in gravados + blocos[0])
+        self.assertEqual(numeros, list(range(1, total + 1)))  # sem repetição nem buraco
+        ano = timezone.now().year
+        self.assertEqual(SequenciaNumeroControle.objects.get(ano=ano).ultimo_numero, total)
+
+    def test_primeira_reserva_do_ano_continua_do_maior_numero_legado(self):
+        ano = timezone.now().year
+        for ano_legado, numero in [(ano, 41), (ano, 7), (ano - 1, 900)]:
+            self._prospeccao(numero_controle=Prospeccao.formatar_numero_controle(ano_legado, numero)).save()
+        self.assertFalse(SequenciaNumeroControle.objects.filter(ano=ano).exists())
+
+        nova = self._prospeccao()
+        nova.save()
+
+        self.assertEqual(nova.numero_controle, Prospeccao.formatar_numero_controle(ano, 42))
+        self.assertEqual(SequenciaNumeroControle.objects.get(ano=ano).ultimo_numero, 42)
+
+    def test_semente_compara_o_numero_e_nao_o_texto(self):
+        ano = timezone.now().year
+        for numero in (99999, 100000):  # o segundo passa da largura de 5 dígitos
+            self._prospeccao(numero_controle=Prospeccao.formatar_numero_controle(ano, numero)).save()
+
+        nova = self._prospeccao()
+        nova.save()
+
+        self.assertEqual(nova.numero_controle, Prospeccao.formatar_numero_controle(ano, 100001))
+
+
+class EtapasProspeccaoTests(TestCase):
+    """ Eventos de etapa gravados ao iniciar a negociação. """
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('rep-etapas')
+        prospect = ClienteProspect.objects.create(
+            razao_social='Prospect', nome_contato='Contato', telefone_contato='0', cadastrado_por=self.usuario,
+        )
+        self.prospeccao = Prospeccao(
+            cliente=prospect, duracao_meses=1, viagens_aproximadas=1, valor_medio_viagem=1,
+            valor_total=1, criado_por=self.usuario,
+        )
+        self.prospeccao.save()
+        self.client.force_login(self.usuario)
+
+    def test_iniciar_de_novo_nao_grava_outro_evento(self):
+        url = reverse('app:iniciar-prospeccao', args=[self.prospeccao.pk])
+        self.assertEqual(self.client.post(url).status_code, 204)
+        inicio = Prospeccao.objects.get(pk=self.prospeccao.pk).data_inicio_negociacao
+
+        self.assertEqual(self.client.post(url).status_code, 204)
+
+        etapas = list(ProspeccaoEtapa.objects.filter(prospeccao=self.prospeccao).values_list('etapa_anterior', 'etapa'))
+        self.assertEqual(etapas, [('NOVA', 'NEGOCIANDO')])
+        self.assertEqual(Prospeccao.objects.get(pk=self.prospeccao.pk).data_inicio_negociacao, inicio)
+
+
+class UploadEmBlocosTests(TestCase):
+    """ Upload retomável: blocos de 4 bytes de um arquivo de 10. """
+    CONTEUDO = b'abcdefghij'
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta, True)
+        ajuste = self.settings(MEDIA_ROOT=pasta, ANEXOS_UPLOAD_DIR=os.path.join(pasta, 'parciais'), ANEXOS_UPLOAD_BLOCO=4)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+        self.usuario = User.objects.create_user('rep-upload')
+        self.tarefa = Tarefa.objects.create(titulo='Tarefa', descricao='Descrição', criado_por=self.usuario)
+        self.client.force_login(self.usuario)
+        resposta = self.client.post(
+            reverse('app:upload-anexo-tarefa', args=[self.tarefa.pk]),
+            {'nome': 'relatorio.txt', 'tamanho': len(self.CONTEUDO)},
+        )
+        self.assertEqual(resposta.status_code, 201)
+        self.url = resposta.json()['url']
+
+    def _enviar(self, inicio, fim):
+        return self.client.put(
+            self.url, self.CONTEUDO[inicio:fim + 1], content_type='application/octet-stream',
+            headers={'Content-Range': f'bytes {inicio}-{fim}/{len(self.CONTEUDO)}'},
+        )
+
+    def test_retoma_do_ponto_recebido(self):
+        self.assertEqual(self._enviar(0, 3).json()['recebido'], 4)
+        # "Queda de conexão": o cliente pergunta onde parou e segue dali
+        self.assertEqual(self.client.get(self.url).json()['recebido'], 4)
+        self.assertEqual(self._enviar(4, 7).json()['recebido'], 8)
+        self.assertEqual(self._enviar(8, 9).json()['recebido'], 10)
+        self.assertTrue(UploadSessao.objects.get().concluido)
+
+    def test_bloco_fora_de_ordem_devolve_409_com_o_recebido(self):
+        self._enviar(0, 3)
+        for inicio, fim in [(8, 9), (0, 3)]:  # adiantado e repetido
+            resposta = self._enviar(inicio, fim)
+            self.assertEqual(resposta.status_code, 409)
+            self.assertEqual(resposta.json()['recebido'], 4)
+        self.assertEqual(UploadSessao.objects.get().recebido, 4)
+
+    def test_upload_concluido_vira_anexo_da_acao(self):
+        for inicio, fim in [(0, 3), (4, 7), (8, 9)]:
+            self._enviar(inicio, fim)
+        sessao = UploadSessao.objects.get()
+        parcial = anexos.caminho_parcial(sessao)
+
+        resposta = self.client.post(
+            reverse('app:gravar-acao', args=[self.tarefa.pk]), {'descricao': 'Com anexo', 'upload_id': str(sessao.pk)},
+        )
+
+        self.assertEqual(resposta.status_code, 200)
+        acao = AcaoTarefa.objects.get()
+        with acao.arquivo.open('rb') as arquivo:
+            self.assertEqual(arquivo.read(), self.CONTEUDO)
+        self.assertFalse(UploadSessao.objects.exists())
+        self.assertFalse(os.path.exists(parcial))
+
+    def test_upload_incompleto_nao_vira_anexo(self):
+        self._enviar(0, 3)
+        resposta = self.client.post(
+            reverse('app:gravar-acao', args=[self.tarefa.pk]),
+            {'descricao': 'Sem anexo', 'upload_id': str(UploadSessao.objects.get().pk)},
+        )
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(AcaoTarefa.objects.exists())
+
+
+class IdempotenciaTests(TestCase):
+    """ Escrita repetida pela fila offline do service worker, com a mesma chave. """
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('rep-fila')
+        self.tarefa = Tarefa.objects.create(titulo='Tarefa', descricao='Descrição', criado_por=self.usuario)
+        self.client.force_login(self.usuario)
+        self.url = reverse('app:gravar-acao', args=[self.tarefa.pk])
+
+    def _gravar(self, chave, **campos):
+        return self.client.post(self.url, {'descricao': 'Visita', **campos}, headers={'X-Idempotency-Key': chave})
+
+    def test_repeticao_nao_grava_de_novo(self):
+        self.assertEqual(self._gravar('chave-1').status_code, 200)
+        repetida = self._gravar('chave-1')
+
+        self.assertEqual(repetida.status_code, 200)
+        self.assertEqual(repetida['X-Idempotency-Status'], 'repetida')
+        self.assertEqual(repetida['HX-Reswap'], 'none')
+        self.assertEqual(AcaoTarefa.objects.count(), 1)
+        self.assertEqual(self._gravar('chave-2').status_code, 200)
+        self.assertEqual(AcaoTarefa.objects.count(), 2)
+
+    def test_primeira_execucao_em_andamento_devolve_409(self):
+        EscritaIdempotente.objects.create(usuario=self.usuario, chave='chave-1')
+        resposta = self._gravar('chave-1')
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta['X-Idempotency-Status'], 'processando')
+        self.assertFalse(AcaoTarefa.objects.exists())
+
+    def test_escrita_recusada_libera_a_chave(self):
+        self.assertEqual(self._gravar('chave-1', upload_id='00000000-0000-0000-0000-000000000000').status_code, 400)
+        self.assertFalse(EscritaIdempotente.objects.exists())
+        self.assertEqual(self._gravar('chave-1').status_code, 200)
+        self.assertEqual(AcaoTarefa.objects.count(), 1)
+
+    def test_chave_e_por_usuario(self):
+        self._gravar('chave-1')
+        self.client.force_login(User.objects.create_user('outro-rep'))
+        self.assertEqual(self._gravar('chave-1').status_code, 200)
+        self.assertEqual(AcaoTarefa.objects.count(), 2)
+
+
+class SincronizacaoTests(TestCase):
+    """ /api/sync/ de representantes: incremental, exclusões, troca de carteira e paginação. """
+
+    def setUp(self):
+        self.rep = User.objects.create_user('rep-sync')
+        self.outro_rep = User.objects.create_user('outro-rep-sync')
+        self.cliente = self._cliente(self.rep)
+        self.servico = Servico.objects.create(cliente=self.cliente, data_servico=date.today(), valor=100)
+        self.meta = Meta.objects.create(cliente=self.cliente, mes=1, ano=2025, valor=1000)
+        self._envelhecer()
+        self.client.force_login(self.rep)
+
+    def _cliente(self, dono):
+        return Cliente.objects.create(
+            cnpj='0', razao_social='Cliente', endereco='Rua', nome_contato='Contato', telefone_contato='0', cadastrado_por=dono,
+        )
+
+    def _envelhecer(self):
+        # Fora da margem de API_SYNC_MARGEM_SEGUNDOS da próxima sincronização
+        antes = timezone.now() - timedelta(hours=1)
+        for modelo in (Cliente, Servico, Meta):
+            modelo.objects.update(atualizado_em=antes)
+
+    def _sync(self, token=None):
+        parametros = {'modelos': 'clientes,servicos,metas'}
+        if token:
+            parametros['desde'] = token
+        resposta = self.client.get(reverse('api:sync-list'), parametros)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def _ids(self, dados, nome, chave='atualizados'):
+        if chave == 'excluidos':
+            return dados['modelos'][nome]['excluidos']
+        return [registro['id'] for registro in dados['modelos'][nome]['atualizados']]
+
+    def test_incremental_traz_so_o_que_mudou(self):
+        completa = self._sync()
+        self.assertTrue(completa['completo'])
+        self.assertEqual(self._ids(completa, 'servicos'), [self.servico.pk])
+
+        novo = Servico.objects.create(cliente=self.cliente, data_servico=date.today(), valor=50)
+        incremental = self._sync(completa['token'])
+
+        self.assertFalse(incremental['completo'])
+        self.assertEqual(self._ids(incremental, 'servicos'), [novo.pk])
+        self.assertEqual(self._ids(incremental, 'clientes'), [])
+
+    def test_exclusao_vem_em_excluidos(self):
+        token = self._sync()['token']
+        pk = self.servico.pk
+        self.servico.delete()
+        dados = self._sync(token)
+        self.assertEqual(self._ids(dados, 'servicos', 'excluidos'), [pk])
+        self.assertEqual(self._ids(dados, 'servicos'), [])
+
+    def test_troca_de_carteira_exclui_do_dono_anterior(self):
+        token = self._sync()['token']
+        self.cliente.cadastrado_por = self.outro_rep
+        self.cliente.save()
+
+        dados = self._sync(token)
+        self.assertEqual(self._ids(dados, 'clientes', 'excluidos'), [self.cliente.pk])
+        self.assertEqual(self._ids(dados, 'servicos', 'excluidos'), [self.servico.pk])
+        self.assertEqual(self._ids(dados, 'metas', 'excluidos'), [self.meta.pk])
+
+        self.client.force_login(self.outro_rep)
+        novo_dono = self._sync()
+        self.assertEqual(self._ids(novo_dono, 'servicos'), [self.servico.pk])
+        self.assertEqual(self._ids(novo_dono, 'metas'), [self.meta.pk])
+
+    def test_cliente_devolvido_nao_vem_como_excluido(self):
+        token = self._sync()['token']
+        for dono in (self.outro_rep, self.rep):
+            self.cliente.cadastrado_por = dono
+            self.cliente.save()
+
+        dados = self._sync(token)
+        self.assertEqual(self._ids(dados, 'clientes', 'excluidos'), [])
+        self.assertEqual(self._ids(dados, 'clientes'), [self.cliente.pk])
+        self.assertEqual(self._ids(dados, 'servicos'), [self.servico.pk])
+
+    def test_paginas_cobrem_todos_os_registros(self):
+        for valor in range(4):
+            Servico.objects.create(cliente=self.cliente, data_servico=date.today(), valor=valor)
+        esperados = sorted(Servico.objects.values_list('pk', flat=True))
+
+        recebidos, paginas, token = [], [], None
+        with self.settings(API_SYNC_LIMITE=2):
+            while True:
+                dados = self._sync(token)
+                paginas.append(dados)
+                recebidos += self._ids(dados, 'servicos')
+                token = dados['token']
+                if not dados['mais']:
+                    break
+
+        self.assertEqual(sorted(recebidos), esperados)
+        self.assertEqual(len(paginas), 3)
+        self.assertEqual([pagina['completo'] for pagina in paginas], [True, False, False])
+        # O token final é o instante da primeira página, não uma continuação
+        self.assertIsInstance(sincronizacao.decodificar_token(token), type(timezone.now()))
+
+
+class ImportacaoTests(TestCase):
+    """ Valores da planilha e confirmação da importação. """
+
+    def test_valores_no_formato_brasileiro(self):
+        entradas = {
+            '1500': 1500, '1.500': 1500, '1.234,56': 1234.56, 'R$ 1.234.567,8': 1234567.8,
+            '1234,56': 1234.56, 'R$\xa010,5': 10.5,
+        }
+        valores = importacao._converter_valores(pd.Series(list(entradas)))
+        self.assertEqual(valores.tolist(), list(entradas.values()))
+
+    def test_valores_ambiguos_sao_recusados(self):
+        valores = importacao._converter_valores(pd.Series(['1,234.56', '1.5', '1234.56', '12.34.567', '1.234.5', '-10', '']))
+        self.assertTrue(valores.isna().all())
+
+    def test_valor_numerico_do_excel_nao_vira_milhar(self):
+        planilha = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+        planilha.close()
+        self.addCleanup(os.remove, planilha.name)
+        pd.DataFrame({'cnpj': ['1'], 'data_servico': ['2025-01-10'], 'valor': [1.5], 'quantidade': [2]}).to_excel(
+            planilha.name, index=False,
+        )
+        with open(planilha.name, 'rb') as arquivo:
+            df = importacao.ler_planilha(arquivo, planilha.name)
+        self.assertEqual(importacao._converter_valores(df['valor']).tolist(), [1.5])
+
+    def test_confirmacao_repetida_nao_importa_de_novo(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta, True)
+        # A página carrega estáticos; sem collectstatic no teste, sem o manifesto
+        estaticos = {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}
+        ajuste = self.settings(MEDIA_ROOT=pasta, STORAGES={**settings.STORAGES, 'staticfiles': estaticos})
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+        usuario = User.objects.create_user('gestor-importacao')
+        usuario.profile.setor = 'COMERCIAL'
+        usuario.profile.save()
+        Cliente.objects.create(
+            cnpj='11.222.333/0001-44', razao_social='Cliente', endereco='Rua', nome_contato='Contato',
+            telefone_contato='0', cadastrado_por=usuario,
+        )
+        self.client.force_login(usuario)
+        url = reverse('app:servico-import')
+        csv = 'cnpj;data_servico;valor\n11222333000144;10/01/2025;1.500\n11222333000144;11/01/2025;1,234.56\n'
+        previa = self.client.post(url, {'arquivo': SimpleUploadedFile('servicos.csv', csv.encode())})
+        self.assertEqual(previa.context['previa']['total_validos'], 1)
+
+        primeira = self.client.post(url, {'token': previa.context['token']})
+        segunda = self.client.post(url, {'token': previa.context['token']})
+
+        self.assertEqual(primeira.context['resultado']['inseridos'], 1)
+        self.assertIn('erro', segunda.context)
+        self.assertEqual(list(Servico.objects.values_list('valor', flat=True)), [1500])
+
+
+class EscopoRelatoriosTests(TestCase):
+    """ Representante não vê serviços de clientes de outra carteira. """
+
+    def setUp(self):
+        self.rep = User.objects.create_user('rep-relatorio')
+        dono = User.objects.create_user('outro-rep-relatorio')
+        self.alheio = Cliente.objects.create(
+            cnpj='0', razao_social='Alheio', endereco='Rua', nome_contato='Contato', telefone_contato='0', cadastrado_por=dono,
+        )
+        Servico.objects.create(cliente=self.alheio, data_servico=date(2025, 1, 10), valor=100)
+        self.client.force_login(self.rep)
+
+    def test_historico_do_mes_de_cliente_alheio(self):
+        resposta = self.client.get(reverse('app:servico-historico-modal', args=[self.alheio.pk, 1, 2025]))
+        self.assertEqual(resposta.status_code, 404)
+
+    def test_relatorio_e_exportacao_do_historico_de_cliente_alheio(self):
+        parametros = {'report_type': 'historico_cliente', 'cliente_id': self.alheio.pk}
+        for nome in ('app:relatorio-page', 'app:exportar-relatorio'):
+            resposta = self.client.get(reverse(nome), parametros, headers={'HX-Request': 'true'})
+            self.assertEqual(resposta.status_code, 404, nome)
+
+    def test_gestao_ve_o_historico(self):
+        self.rep.profile.setor = 'COMERCIAL'
+        self.rep.profile.save()
+        resposta = self.client.get(reverse('app:servico-historico-modal', args=[self.alheio.pk, 1, 2025]))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.context['servicos']), 1)
+
+
+class ContadorAlteracaoTests(TestCase):
+    """ A versão do model muda só depois do commit de quem gravou. """
+
+    def _versao(self):
+        return ContadorAlteracao.versoes([TipoServico])['app.tiposervico'][0]
+
+    def test_incremento_fica_para_depois_do_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            TipoServico.objects.create(nome='Rodoviário')
+            self.assertEqual(self._versao(), 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._versao(), 1)
+
+    def test_rollback_nao_conta(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                TipoServico.objects.create(nome='Aéreo')
+                raise ValueError
+        self.assertEqual(self._versao(), 0)
+
+
+class ProjecaoTests(TestCase):
+    """ Risco de não bater a meta só depois do primeiro dia útil. """
+
+    def _projecao(self, decorridos):
+        cliente_ids = np.array([1], dtype=np.int64)
+        matriz = np.zeros((1, 20), dtype=np.int64)
+        valores = projecao.projetar(matriz, np.array([100000], dtype=np.int64), decorridos)
+        return projecao.Projecao(cliente_ids, valores, 20, decorridos)
+
+    def test_sem_dia_util_decorrido_nao_ha_risco(self):
+        inicio = self._projecao(0)
+        self.assertIsNone(inicio.cliente(1)['em_risco'])
+        self.assertIsNone(inicio.total()['em_risco'])
+        self.assertIsNone(inicio.clientes_em_risco())
+
+    def test_sem_faturamento_depois_do_primeiro_dia_util(self):
+        segundo_dia = self._projecao(1)
+        self.assertTrue(segundo_dia.cliente(1)['em_risco'])
+        self.assertEqual(segundo_dia.clientes_em_risco(), 1)
@@ -33,6 +33,7 @@ urlpatterns = [
     # URLs para gerenciamento de Serviços (Transportes)
     path('servicos/', views.ServicoListView.as_view(), name='servico-list'),
     path('servicos/novo/', views.ServicoCreateView.as_view(), name='servico-create'),
+    path('servicos/importar/', views.importar_servicos, name='servico-import'),
     path('servicos/<int:pk>/editar/', views.ServicoUpdateView.as_view(), name='servico-update'),
     path('servicos/<int:pk>/editar-modal/', views.ServicoUpdateView.as_view(), name='servico-update-modal'),
     path('servicos/<int:pk>/deletar/', views.ServicoDeleteView.as_view(), name='servico-delete'),
@@ -46,6 +47,7 @@ urlpatterns = [
     # URLs para Metas
     path('metas/', views.MetaListView.as_view(), name='meta-list'),
     path('metas/nova/', views.MetaCreateView.as_view(), name='meta-create'),
+    path('metas/planejar/', views.planejar_metas, name='meta-planejar'),
     path('metas/<int:pk>/editar/', views.MetaUpdateView.as_view(), name='meta-update'),
     path('metas/<int:pk>/deletar/', views.MetaDeleteView.as_view(), name='meta-delete'),
 
@@ -70,6 +72,13 @@ urlpatterns = [
     path('prospeccao/novo-cliente/', views.criar_cliente_prospeccao_modal, name='criar-cliente-prospeccao-modal'),
     path('prospeccao/salvar-cliente/', views.salvar_cliente_prospeccao, name='salvar-cliente-prospeccao'),
 
+    # Anexos (upload em blocos retomável e download com Range)
+    path('anexos/upload/tarefa/<int:pk>/', views.iniciar_upload_anexo, {'destino': 'tarefa'}, name='upload-anexo-tarefa'),
+    path('anexos/upload/prospeccao/<int:pk>/', views.iniciar_upload_anexo, {'destino': 'prospeccao'}, name='upload-anexo-prospeccao'),
+    path('anexos/upload/<uuid:upload_id>/', views.upload_anexo, name='upload-anexo'),
+    path('anexos/tarefa/<int:pk>/', views.baixar_anexo_tarefa, name='anexo-tarefa'),
+    path('anexos/prospeccao/<int:pk>/', views.baixar_anexo_prospeccao, name='anexo-prospeccao'),
+
     # URLs de Relatórios
     path('relatorios/', views.relatorio_page, name='relatorio-page'),
     path('relatorios/exportar/', views.exportar_relatorio, name='exportar-relatorio'),
@@ -1,1836 +0,0 @@
-﻿from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.urls import reverse_lazy, reverse
-from django.views.generic import ListView, CreateView, UpdateView, DetailView, DeleteView, TemplateView
-from django.contrib.auth.models import User
-from django.contrib.auth import login 
-from django.db.models import Q, Avg, Sum, Count, F, DurationField, ProtectedError
-from django.http import HttpResponse, JsonResponse
-from django.template.loader import render_to_string
-from dateutil.relativedelta import relativedelta
-from collections import defaultdict 
-from io import BytesIO
-from xhtml2pdf import pisa
-import pandas as pd
-from .models import Profile, Cliente, ClienteProspect, Servico, TipoServico, Meta, Tarefa, AcaoTarefa, Prospeccao, AcaoProspeccao
-from .forms import UserForm, ProfileForm, ServicoForm, MetaForm, CustomAuthenticationForm, TarefaForm, AcaoTarefaForm, ProspeccaoForm, AcaoProspeccaoForm, ClienteForm, ProspeccaoEditForm, ClienteProspectForm
-from django.db import transaction
-from django.utils import timezone
-import calendar
-import requests
-from decimal import Decimal
-from datetime import date
-import json
-import time # Importante para o loop de espera
-
-# --- MIXINS ---
-class GestaoRequiredMixin(UserPassesTestMixin):
-    def test_func(self):
-        user = self.request.user
-        return user.is_authenticated and (user.is_staff or user.profile.tem_acesso_gestao)
-
-class ClienteEditorMixin(UserPassesTestMixin):
-    def test_func(self):
-        user = self.request.user
-        if user.is_staff or user.profile.tem_acesso_gestao: return True
-        return self.get_object().cadastrado_por == user
-
-# --- MIXINS ---
-class GestaoRequiredMixin(UserPassesTestMixin):
-    def test_func(self):
-        user = self.request.user
-        return user.is_authenticated and (user.is_staff or user.profile.tem_acesso_gestao)
-
-class ClienteEditorMixin(UserPassesTestMixin):
-    def test_func(self):
-        user = self.request.user
-        if user.is_staff or user.profile.tem_acesso_gestao: return True
-        return self.get_object().cadastrado_por == user
-
-# --- LOGIN ---
-def custom_login_view(request):
-    if request.method == 'POST':
-        form = CustomAuthenticationForm(request, data=request.POST)
-        if form.is_valid():
-            login(request, form.get_user())
-            return redirect('app:home')
-    else:
-        form = CustomAuthenticationForm()
-    return render(request, 'registration/login.html', {'form': form})
-
-# --- HOME ---
-@login_required
-@login_required
-def home_page(request):
-    """
-    Renderiza a pagina inicial baseada no perfil do usuario.
-    Carrega o template base e depois o HTMX injeta o conteudo do dashboard especifico.
-    """
-    profile = getattr(request.user, 'profile', None)
-    
-    # Preparar contexto dos filtros para o dashboard
-    context = _get_filter_context(request)
-    
-    if request.user.is_staff or (profile and profile.is_admin_sistema):
-        # Admin ve o dashboard geral
-        return render(request, 'app/dashboard_admin.html', context)
-    
-    elif profile and profile.is_comercial:
-        # Diretor Comercial ve o dashboard geral
-        return render(request, 'app/dashboard_admin.html', context)
-    
-    elif profile and profile.is_diretoria:
-         # Diretoria ve o dashboard geral
-        return render(request, 'app/dashboard_admin.html', context)
-        
-    # --- ALTERACAO AQUI: GERENTE OPERACIONAL VE DASHBOARD GERAL ---
-    elif profile and profile.is_gerente_operacional:
-        return render(request, 'app/dashboard_admin.html', context)
-    # -------------------------------------------------------------
-
-    elif profile and profile.is_representante:
-        # Representante ve seu dashboard pessoal
-        return render(request, 'app/dashboard_representante.html', context)
-        
-    else:
-        # Fallback (ex: financeiro ou sem perfil definido)
-        return render(request, 'app/home.html')
-# --- DASHBOARDS ---
-
-def _get_filter_context(request):
-    hoje = date.today()
-    
-    def get_int(key, default):
-        try:
-            value = request.GET.get(key, default)
-            # Remove pontos, espaços e converte
-            if isinstance(value, str):
-                value = value.replace('.', '').replace(' ', '').strip()
-            result = int(value)
-            print(f"DEBUG {key}: '{request.GET.get(key)}' → {result}")
-            return result
-        except (ValueError, TypeError):
-            return int(default) if default else hoje.year
-
-    mes_mensal = get_int('mes_mensal', hoje.month)
-    ano_mensal = get_int('ano_mensal', hoje.year)
-    trimestre_trimestral = get_int('trimestre_trimestral', (hoje.month - 1) // 3 + 1)
-    ano_trimestral = get_int('ano_trimestral', hoje.year)
-    ano_anual = get_int('ano_anual', hoje.year)
-    
-    print(f"FILTROS: Mensal={mes_mensal}/{ano_mensal}, Trimestral={trimestre_trimestral}ºT/{ano_trimestral}, Anual={ano_anual}")
-
-    return {
-        'meses_disponiveis': [(i, calendar.month_name[i].capitalize()) for i in range(1, 13)],
-        'anos_disponiveis': list(range(hoje.year - 2, hoje.year + 3)),
-        'trimestres_disponiveis': [(1, '1º Trimestre'), (2, '2º Trimestre'), (3, '3º Trimestre'), (4, '4º Trimestre')],
-        'mes_mensal_selecionado': mes_mensal,
-        'ano_mensal_selecionado': ano_mensal,
-        'trimestre_trimestral_selecionado': trimestre_trimestral,
-        'ano_trimestral_selecionado': ano_trimestral,
-        'ano_anual_selecionado': ano_anual,
-    }
-
-@login_required
-def get_dashboard_mensal(request):
-    context = _get_filter_context(request)
-    ano = context['ano_mensal_selecionado']
-    mes = context['mes_mensal_selecionado']
-    user = request.user
-
-    base_qs = Servico.objects.filter(data_servico__year=ano, data_servico__month=mes)
-    if user.profile.is_representante:
-        base_qs = base_qs.filter(cliente__cadastrado_por=user)
-        
-    fat_total = base_qs.aggregate(s=Sum('valor'))['s'] or 0
-    qtd_total = base_qs.aggregate(c=Sum('quantidade'))['c'] or 0
-    
-    now = timezone.now().date()
-    _, last_day = calendar.monthrange(ano, mes)
-    if ano < now.year or (ano == now.year and mes < now.month): dias_rest = 0
-    elif ano == now.year and mes == now.month: dias_rest = max(0, last_day - now.day)
-    else: dias_rest = last_day
-
-    context.update({
-        'mensal_faturamento': fat_total,
-        'mensal_servicos_fechados': qtd_total, 
-        'mensal_nome_mes': calendar.month_name[mes].capitalize(),
-        'mensal_dias_restantes': dias_rest,
-    })
-
-    # Meta agora é por cliente - soma as metas dos clientes do representante ou de todos
-    if user.profile.is_representante:
-        val_meta = Meta.objects.filter(cliente__cadastrado_por=user, mes=mes, ano=ano).aggregate(s=Sum('valor'))['s'] or Decimal('0.00')
-    else:
-        val_meta = Meta.objects.filter(mes=mes, ano=ano).aggregate(s=Sum('valor'))['s'] or Decimal('0.00')
-    
-    context['mensal_meta'] = {'valor': val_meta} if val_meta > 0 else None
-    if val_meta > 0:
-        context.update({
-            'mensal_percentual_meta': (fat_total / val_meta) * 100, 
-            'mensal_faturamento_faltante': max(0, val_meta - fat_total)
-        })
-    
-    context['desempenho_clientes'] = base_qs.values('cliente__razao_social') \
-        .annotate(total_valor=Sum('valor'), total_viagens=Sum('quantidade')).order_by('-total_valor')[:10]
-
-    if user.is_staff or user.profile.tem_acesso_gestao:
-        perf = []
-        for rep in User.objects.filter(profile__setor='REPRESENTANTE', is_active=True).order_by('first_name'):
-            f_rep = Servico.objects.filter(cliente__cadastrado_por=rep, data_servico__year=ano, data_servico__month=mes).aggregate(s=Sum('valor'))['s'] or 0
-            # Meta agora é por cliente - soma todas as metas dos clientes do representante
-            v_meta = Meta.objects.filter(cliente__cadastrado_por=rep, mes=mes, ano=ano).aggregate(s=Sum('valor'))['s'] or 0
-            p_rep = (f_rep / v_meta * 100) if v_meta > 0 else 0
-            perf.append({
-                'nome': rep.get_full_name() or rep.username, 
-                'faturamento': f_rep, 
-                'meta': v_meta, 
-                'percentual_individual': p_rep
-            })
-        perf.sort(key=lambda x: x['percentual_individual'], reverse=True)
-        context['representantes_performance'] = perf
-
-    return render(request, 'app/partials/_dashboard_mensal.html', context)
-
-@login_required
-def get_dashboard_trimestral(request):
-    context = _get_filter_context(request)
-    ano = context['ano_trimestral_selecionado']
-    trim = context['trimestre_trimestral_selecionado']
-    user = request.user
-    
-    meses = [(trim - 1) * 3 + i for i in range(1, 4)]
-    base_qs = Servico.objects.filter(data_servico__year=ano, data_servico__month__in=meses)
-    if user.profile.is_representante:
-        base_qs = base_qs.filter(cliente__cadastrado_por=user)
-
-    context['trimestral_faturamento'] = base_qs.aggregate(s=Sum('valor'))['s'] or 0
-    context['trimestral_nome'] = f'{trim}º Trimestre'
-    
-    labels, data_fat, data_cli = [], [], []
-    for m in meses:
-        labels.append(calendar.month_abbr[m].capitalize())
-        val = base_qs.filter(data_servico__month=m).aggregate(s=Sum('valor'))['s'] or 0
-        data_fat.append(float(val))
-        novos = Cliente.objects.filter(data_cadastro__year=ano, data_cadastro__month=m)
-        if user.profile.is_representante: novos = novos.filter(cadastrado_por=user)
-        data_cli.append(novos.count())
-
-    # NÃO usar json.dumps() - o template faz isso com json_script
-    context.update({
-        'trimestral_bar_labels': labels,
-        'trimestral_faturamento_data': data_fat,
-        'trimestral_clientes_data': data_cli
-    })
-
-    por_tipo = base_qs.values('tipo_servico__nome').annotate(t=Sum('valor')).order_by('-t')
-    context['trimestral_pizza_labels'] = [x['tipo_servico__nome'] for x in por_tipo]
-    context['trimestral_pizza_data'] = [float(x['t']) for x in por_tipo]
-
-    return render(request, 'app/partials/_dashboard_trimestral.html', context)
-
-@login_required
-def get_dashboard_anual(request):
-    context = _get_filter_context(request)
-    ano = context['ano_anual_selecionado']
-    user = request.user
-
-    base_qs = Servico.objects.filter(data_servico__year=ano)
-    if user.profile.is_representante:
-        base_qs = base_qs.filter(cliente__cadastrado_por=user)
-    
-    context['anual_faturamento'] = base_qs.aggregate(s=Sum('valor'))['s'] or 0
-    
-    por_tipo = base_qs.values('tipo_servico__nome').annotate(t=Sum('valor')).order_by('-t')
-    # NÃO usar json.dumps() - o template faz isso com json_script
-    context['anual_pizza_labels'] = [x['tipo_servico__nome'] for x in por_tipo]
-    context['anual_pizza_data'] = [float(x['t']) for x in por_tipo]
-    
-    labels, d_fat, d_cli, historico_metas = [], [], [], []
-    for i in range(1, 13):
-        labels.append(calendar.month_abbr[i].capitalize())
-        val = base_qs.filter(data_servico__month=i).aggregate(s=Sum('valor'))['s'] or 0
-        d_fat.append(float(val))
-        novos = Cliente.objects.filter(data_cadastro__year=ano, data_cadastro__month=i)
-        if user.profile.is_representante: novos = novos.filter(cadastrado_por=user)
-        d_cli.append(novos.count())
-        
-        # Histórico de metas
-        meta_query = Meta.objects.filter(ano=ano, mes=i)
-        if user.profile.is_representante:
-            meta_query = meta_query.filter(cliente__cadastrado_por=user)
-        valor_meta = meta_query.aggregate(total=Sum('valor'))['total'] or 0
-        status_meta = "Sem Meta"
-        if valor_meta > 0:
-            if val >= valor_meta: status_meta = "Atingida"
-            else: status_meta = "Não Atingida"
-        else:
-            valor_meta = None
-        historico_metas.append({
-            'mes_ano': calendar.month_abbr[i].capitalize(),
-            'faturamento': val,
-            'meta': valor_meta,
-            'status': status_meta
-        })
-
-    context.update({
-        'anual_bar_labels': labels,
-        'anual_faturamento_data': d_fat,
-        'anual_clientes_data': d_cli,
-        'historico_metas_anual': historico_metas
-    })
-
-    return render(request, 'app/partials/_dashboard_anual.html', context)
-
-@login_required
-def get_dashboard_top_clientes(request):
-    context = _get_filter_context(request)
-    ano_mensal = context['ano_mensal_selecionado']
-    mes_mensal = context['mes_mensal_selecionado']
-    ano_trimestral = context['ano_trimestral_selecionado']
-    trimestre_trimestral = context['trimestre_trimestral_selecionado']
-    ano_anual = context['ano_anual_selecionado']
-    
-    user = request.user
-    base_qs = Servico.objects.all()
-    if user.profile.is_representante:
-        base_qs = base_qs.filter(cliente__cadastrado_por=user)
-
-    # MENSAL
-    top_mensal = base_qs.filter(data_servico__year=ano_mensal, data_servico__month=mes_mensal) \
-        .values('cliente__razao_social') \
-        .annotate(faturamento_total=Sum('valor'), num_servicos=Sum('quantidade'))
-    
-    # TRIMESTRAL
-    start_month = (trimestre_trimestral - 1) * 3 + 1
-    end_month = start_month + 2
-    top_trimestral = base_qs.filter(data_servico__year=ano_trimestral, data_servico__month__gte=start_month, data_servico__month__lte=end_month) \
-        .values('cliente__razao_social') \
-        .annotate(faturamento_total=Sum('valor'), num_servicos=Sum('quantidade'))
-
-    # ANUAL
-    top_anual = base_qs.filter(data_servico__year=ano_anual) \
-        .values('cliente__razao_social') \
-        .annotate(faturamento_total=Sum('valor'), num_servicos=Sum('quantidade'))
-
-    return render(request, 'app/partials/_dashboard_top_clientes.html', {
-        'top_clientes_mensal_faturamento': top_mensal.order_by('-faturamento_total')[:5],
-        'top_clientes_mensal_servicos': top_mensal.order_by('-num_servicos')[:5],
-        'top_clientes_trimestral_faturamento': top_trimestral.order_by('-faturamento_total')[:5],
-        'top_clientes_trimestral_servicos': top_trimestral.order_by('-num_servicos')[:5],
-        'top_clientes_anual_faturamento': top_anual.order_by('-faturamento_total')[:5],
-        'top_clientes_anual_servicos': top_anual.order_by('-num_servicos')[:5],
-    })
-
-# --- REPRESENTANTES (USUÁRIOS) ---
-
-class RepresentanteListView(LoginRequiredMixin, ListView):
-    model = User
-    template_name = 'app/representante_list.html'
-    context_object_name = 'representantes'
-
-    def get_queryset(self):
-        # Admin/Staff/Comercial veem todos. Rep vê só ele mesmo (ou nada, dependendo da regra, mas geralmente não acessa essa lista)
-        qs = User.objects.all().select_related('profile').order_by('first_name')
-        if self.request.user.profile.is_representante:
-             return qs.filter(pk=self.request.user.pk)
-        return qs
-
-class RepresentanteCreateView(LoginRequiredMixin, GestaoRequiredMixin, CreateView):
-    model = User
-    form_class = UserForm
-    template_name = 'app/representante_form.html'
-    success_url = reverse_lazy('app:representante-list')
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        if self.request.POST:
-            context['profile_form'] = ProfileForm(self.request.POST)
-        else:
-            context['profile_form'] = ProfileForm()
-        return context
-
-    def form_valid(self, form):
-        self.object = form.save()
-        
-        # Se for via HTMX (modal), retorna 204 para fechar modal e recarregar
-        if self.request.htmx:
-            return HttpResponse(status=204)
-        
-        # Se for form normal, faz redirect padrao
-        return super().form_valid(form)
-
-class RepresentanteUpdateView(LoginRequiredMixin, GestaoRequiredMixin, UpdateView):
-    model = User
-    form_class = UserForm
-    template_name = 'app/representante_form.html'
-    success_url = reverse_lazy('app:representante-list')
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        if self.request.POST:
-            context['profile_form'] = ProfileForm(self.request.POST, instance=self.object.profile)
-        else:
-            context['profile_form'] = ProfileForm(instance=self.object.profile)
-        return context
-
-    def form_valid(self, form):
-        self.object = form.save()
-        
-        # Se for via HTMX (modal), retorna 204 para fechar modal e recarregar
-        if self.request.htmx:
-            return HttpResponse(status=204)
-        
-        # Se for form normal, faz redirect padrao
-        return super().form_valid(form)
-
-@login_required
-def detalhe_representante(request, pk):
-    representante = get_object_or_404(User, pk=pk)
-    user_logado = request.user
-    
-    if user_logado.profile.is_representante and user_logado != representante:
-        return HttpResponse("Acesso Negado", status=403)
-
-    hoje = date.today()
-    servicos = Servico.objects.filter(cliente__cadastrado_por=representante)
-    
-    agregados = servicos.aggregate(total_valor=Sum('valor'), total_qtd=Sum('quantidade'))
-    total_valor_historico = agregados['total_valor'] or Decimal('0.00')
-    total_qtd_historico = agregados['total_qtd'] or 0
-    ticket_medio = total_valor_historico / total_qtd_historico if total_qtd_historico > 0 else Decimal('0.00')
-
-    vendas_mes_atual = servicos.filter(data_servico__year=hoje.year, data_servico__month=hoje.month)
-    total_vendas_valor = vendas_mes_atual.aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
-    total_vendas_qtd = vendas_mes_atual.aggregate(total=Sum('quantidade'))['total'] or 0
-
-    # Meta do Mês (Somatório das metas dos clientes do representante)
-    total_meta_valor = Meta.objects.filter(
-        cliente__cadastrado_por=representante, 
-        ano=hoje.year, 
-        mes=hoje.month
-    ).aggregate(s=Sum('valor'))['s'] or Decimal('0.00')
-    meta_mes_atual = {'valor': total_meta_valor} if total_meta_valor > 0 else None
-
-    prospeccoes = Prospeccao.objects.filter(criado_por=representante)
-    prospeccoes_pendentes = prospeccoes.filter(status__in=['NOVA', 'NEGOCIANDO']).count()
-    
-    finalizadas_hist = prospeccoes.filter(status__in=['FECHADO', 'DESISTENCIA', 'PERDIDA'])
-    fechadas_hist = finalizadas_hist.filter(status='FECHADO')
-    taxa_conversao_hist = (fechadas_hist.count() / finalizadas_hist.count() * 100) if finalizadas_hist.count() > 0 else 0
-
-    finalizadas_mes = finalizadas_hist.filter(data_finalizacao__year=hoje.year, data_finalizacao__month=hoje.month)
-    fechadas_mes = finalizadas_mes.filter(status='FECHADO')
-    taxa_conversao_mes = (fechadas_mes.count() / finalizadas_mes.count() * 100) if finalizadas_mes.count() > 0 else 0
-    
-    tempo_negociacao = finalizadas_hist.exclude(data_inicio_negociacao__isnull=True).annotate(
-        tempo=F('data_finalizacao') - F('data_inicio_negociacao')
-    ).aggregate(media_tempo=Avg('tempo', output_field=DurationField()))['media_tempo']
-    media_dias_negociacao = tempo_negociacao.days if tempo_negociacao else 0
-
-    context = {
-        'rep': representante,
-        'clientes_count': Cliente.objects.filter(cadastrado_por=representante).count(),
-        'ticket_medio': ticket_medio,
-        'total_vendas_valor_mes': total_vendas_valor,
-        'total_vendas_qtd_mes': total_vendas_qtd,
-        'meta_mes_atual': meta_mes_atual,
-        'prospeccoes_pendentes': prospeccoes_pendentes,
-        'taxa_conversao_hist': taxa_conversao_hist,
-        'taxa_conversao_mes': taxa_conversao_mes,
-        'media_dias_negociacao': media_dias_negociacao,
-    }
-    
-    return render(request, 'app/partials/_detalhe_representante_modal.html', context)
-
-# --- CLIENTES ---
-
-class ClienteListView(LoginRequiredMixin, ListView):
-    model = Cliente
-    template_name = 'app/cliente_list.html'
-    context_object_name = 'clientes'
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        
-        search_query = self.request.GET.get('q')
-        representante_filtro = self.request.GET.get('representante')
-        
-        # Prospects
-        if self.request.user.profile.is_representante:
-            prospects = ClienteProspect.objects.filter(cadastrado_por=self.request.user)
-        else:
-            prospects = ClienteProspect.objects.all()
-            
-        if not self.request.user.profile.is_representante and representante_filtro:
-            if representante_filtro == 'admin':
-                prospects = prospects.filter(cadastrado_por=self.request.user)
-            else:
-                prospects = prospects.filter(cadastrado_por_id=representante_filtro)
-
-        if search_query:
-            prospects = prospects.filter(
-                Q(razao_social__icontains=search_query) | 
-                Q(cnpj__icontains=search_query)
-            )
-        
-        context['prospects'] = prospects.order_by('razao_social')
-        context['search_query'] = self.request.GET.get('q', '')
-        context['selected_rep'] = self.request.GET.get('representante', '')
-        
-        if not self.request.user.profile.is_representante:
-            context['representantes_list'] = User.objects.filter(profile__setor='REPRESENTANTE').order_by('username')
-        return context
-
-    def get_queryset(self):
-        # Clientes Ativos
-        search_query = self.request.GET.get('q')
-        representante_filtro = self.request.GET.get('representante')
-
-        if self.request.user.profile.is_representante:
-            queryset = Cliente.objects.filter(cadastrado_por=self.request.user)
-        else:
-            queryset = Cliente.objects.all()
-
-        if not self.request.user.profile.is_representante and representante_filtro:
-            if representante_filtro == 'admin':
-                queryset = queryset.filter(cadastrado_por=self.request.user)
-            else:
-                queryset = queryset.filter(cadastrado_por_id=representante_filtro)
-        
-        if search_query:
-            queryset = queryset.filter(
-                Q(razao_social__icontains=search_query) | 
-                Q(cnpj__icontains=search_query)
-            )
-            
-        return queryset.select_related('cadastrado_por').order_by('razao_social')
-
-class ClienteDetailView(LoginRequiredMixin, DetailView):
-    model = Cliente
-    template_name = 'app/cliente_detail.html'
-    context_object_name = 'cliente'
-
-class ClienteCreateView(LoginRequiredMixin, CreateView):
-    model = Cliente
-    template_name = 'app/cliente_form.html'
-    form_class = ClienteForm 
-    success_url = reverse_lazy('app:cliente-list')
-
-    def get_form_kwargs(self):
-        kwargs = super().get_form_kwargs()
-        kwargs['user'] = self.request.user
-        return kwargs
-
-    def form_valid(self, form):
-        self.object = form.save()
-        
-        # Se for via HTMX (modal), retorna 204 para fechar modal e recarregar
-        if self.request.htmx:
-            return HttpResponse(status=204)
-        
-        # Se for form normal, faz redirect padrao
-        return super().form_valid(form)
-
-class ClienteUpdateView(LoginRequiredMixin, ClienteEditorMixin, UpdateView):
-    model = Cliente
-    template_name = 'app/cliente_form.html'
-    form_class = ClienteForm
-    success_url = reverse_lazy('app:cliente-list')
-    
-    def get_form_kwargs(self):
-        kwargs = super().get_form_kwargs()
-        kwargs['user'] = self.request.user
-        return kwargs
-
-class ClienteDeleteView(LoginRequiredMixin, ClienteEditorMixin, DeleteView):
-    model = Cliente
-    template_name = 'app/cliente_confirm_delete.html'
-    success_url = reverse_lazy('app:cliente-list')
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        # Verifica se há serviços vinculados e adiciona ao contexto
-        cliente = self.get_object()
-        servicos_count = Servico.objects.filter(cliente=cliente).count()
-        context['servicos_count'] = servicos_count
-        context['pode_excluir'] = servicos_count == 0
-        return context
-
-    def post(self, request, *args, **kwargs):
-        try:
-            return super().post(request, *args, **kwargs)
-        except ProtectedError:
-            # Cliente tem serviços vinculados, não pode ser excluído
-            cliente = self.get_object()
-            servicos_count = Servico.objects.filter(cliente=cliente).count()
-            context = {
-                'object': cliente,
-                'cliente': cliente,
-                'servicos_count': servicos_count,
-                'pode_excluir': False,
-                'erro_protecao': True,
-            }
-            return render(request, self.template_name, context)
-
-@login_required
-def promover_prospect_modal(request, pk):
-    """ Exibe modal para promover um prospect a cliente. """
-    prospect = get_object_or_404(ClienteProspect, pk=pk)
-    
-    # Preenche o form com dados do prospect
-    initial_data = {
-        'cnpj': prospect.cnpj,
-        'razao_social': prospect.razao_social,
-        'nome_contato': prospect.nome_contato,
-        'telefone_contato': prospect.telefone_contato,
-        'cadastrado_por': prospect.cadastrado_por,
-    }
-    
-    form = ClienteForm(initial=initial_data, user=request.user)
-    
-    return render(request, 'app/partials/_cliente_promocao_modal.html', {
-        'form': form,
-        'prospect': prospect
-    })
-
-@login_required
-def salvar_promocao_prospect(request, pk):
-    prospect = get_object_or_404(ClienteProspect, pk=pk)
-    
-    form = ClienteForm(request.POST, user=request.user)
-    if form.is_valid():
-        try:
-            with transaction.atomic():
-                novo_cliente = form.save(commit=False)
-                
-                # Se não veio dono no form, usa o do prospect
-                if 'cadastrado_por' not in form.cleaned_data or not form.cleaned_data['cadastrado_por']:
-                    novo_cliente.cadastrado_por = prospect.cadastrado_por
-                
-                novo_cliente.save()
-                prospect.delete()
-                
-            return HttpResponse(status=204, headers={'HX-Refresh': 'true'})
-        except Exception as e:
-            form.add_error(None, f"Erro ao salvar: {str(e)}")
-    
-    return render(request, 'app/partials/_cliente_promocao_modal.html', {
-        'form': form,
-        'prospect': prospect
-    })
-
-# --- SERVIÇOS ---
-
-class ServicoListView(LoginRequiredMixin, TemplateView):
-    template_name = 'app/servico_list.html'
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        hoje = date.today()
-        user = self.request.user
-        
-        qs_ultimo = Servico.objects.all()
-        if user.profile.is_representante:
-            qs_ultimo = qs_ultimo.filter(cliente__cadastrado_por=user)
-        context['ultimo_lancamento'] = qs_ultimo.order_by('-data_registro').first()
-
-        mes_get = self.request.GET.get('mes')
-        try: mes = int(mes_get) if mes_get else hoje.month
-        except: mes = hoje.month
-
-        ano_get = self.request.GET.get('ano')
-        try: ano = int(ano_get) if ano_get else hoje.year
-        except: ano = hoje.year
-            
-        context['mes_selecionado'] = mes
-        context['ano_selecionado'] = ano
-        context['meses_disponiveis'] = [(i, calendar.month_name[i].capitalize()) for i in range(1, 13)]
-        context['anos_disponiveis'] = list(range(hoje.year - 2, hoje.year + 3))
-
-        if user.profile.is_representante:
-            representantes = [user]
-        else:
-            representantes = User.objects.filter(is_active=True, profile__setor='REPRESENTANTE').order_by('first_name')
-        
-        # Busca todas as metas do mês POR CLIENTE
-        metas_qs = Meta.objects.filter(mes=mes, ano=ano)
-        metas_map = {m.cliente_id: m for m in metas_qs}
-        
-        servicos_qs = Servico.objects.filter(data_servico__year=ano, data_servico__month=mes)
-        servicos_map = defaultdict(list)
-        for s in servicos_qs:
-            servicos_map[s.cliente_id].append(s)
-
-        lista_por_representante = []
-        context['sem_lancamentos'] = not servicos_qs.exists()
-
-        for rep in representantes:
-            clientes_rep = Cliente.objects.filter(cadastrado_por=rep).order_by('razao_social')
-            dados_clientes = []
-            total_faturamento_rep = Decimal('0.00')
-            total_meta_rep = Decimal('0.00')
-            
-            # Pega dias úteis da primeira meta encontrada (ou default 22)
-            dias_uteis_padrao = 22
-            
-            for cliente in clientes_rep:
-                servicos_cliente = servicos_map.get(cliente.id, [])
-                total_viagens = sum(s.quantidade for s in servicos_cliente)
-                faturamento_bruto = sum(s.valor for s in servicos_cliente)
-                
-                total_faturamento_rep += faturamento_bruto
-                
-                # Busca meta do CLIENTE
-                meta_cliente_obj = metas_map.get(cliente.id)
-                meta_valor = meta_cliente_obj.valor if meta_cliente_obj else Decimal('0.00')
-                dias_uteis = meta_cliente_obj.dias_uteis if meta_cliente_obj else dias_uteis_padrao
-                
-                # Soma para o total do representante
-                total_meta_rep += meta_valor
-                
-                # Atualiza dias úteis padrão se encontrou meta
-                if meta_cliente_obj:
-                    dias_uteis_padrao = dias_uteis
-                
-                # Cálculos de performance POR CLIENTE
-                tem_meta = meta_valor > 0
-                percentual_atingido = (faturamento_bruto / meta_valor * 100) if meta_valor > 0 else 0
-                valor_faltante = max(Decimal('0.00'), meta_valor - faturamento_bruto)
-                percentual_faltante = 100 - percentual_atingido if percentual_atingido < 100 else 0
-                meta_diaria = meta_valor / dias_uteis if dias_uteis > 0 else Decimal('0.00')
-
-                dados_clientes.append({
-                    'cliente': cliente, 
-                    'total_viagens': total_viagens, 
-                    'faturamento_bruto': faturamento_bruto,
-                    # Campos de meta por cliente
-                    'tem_meta': tem_meta,
-                    'meta': meta_cliente_obj,
-                    'meta_valor': meta_valor,
-                    'dias_uteis': dias_uteis,
-                    'percentual_atingido': percentual_atingido,
-                    'valor_faltante': valor_faltante,
-                    'percentual_faltante': percentual_faltante,
-                    'meta_diaria': meta_diaria,
-                })
-            
-            if dados_clientes or rep == user:
-                # Cálculos de performance do REPRESENTANTE (somatório das metas dos clientes)
-                percentual_total_rep = (total_faturamento_rep / total_meta_rep * 100) if total_meta_rep > 0 else 0
-                valor_faltante_rep = max(Decimal('0.00'), total_meta_rep - total_faturamento_rep)
-                percentual_faltante_rep = 100 - percentual_total_rep if percentual_total_rep < 100 else 0
-                meta_diaria_rep = total_meta_rep / dias_uteis_padrao if dias_uteis_padrao > 0 else Decimal('0.00')
-                
-                lista_por_representante.append({
-                    'representante': rep,
-                    'clientes': dados_clientes,
-                    'resumo': {
-                        'faturamento': total_faturamento_rep,
-                        'meta': total_meta_rep,
-                        'percentual': percentual_total_rep,
-                        'dias_uteis': dias_uteis_padrao,
-                        'valor_faltante': valor_faltante_rep,
-                        'percentual_faltante': percentual_faltante_rep,
-                        'meta_diaria': meta_diaria_rep,
-                    }
-                })
-
-        context['lista_por_representante'] = lista_por_representante
-        return context
-
-class ServicoCreateView(LoginRequiredMixin, GestaoRequiredMixin, CreateView):
-    model = Servico
-    form_class = ServicoForm
-    template_name = 'app/servico_form.html'
-    success_url = reverse_lazy('app:servico-list')
-
-    def get_form_kwargs(self):
-        kwargs = super().get_form_kwargs()
-        kwargs['user'] = self.request.user
-        return kwargs
-
-    def form_valid(self, form):
-        self.object = form.save()
-        
-        # Se for via HTMX (modal), retorna 204 para fechar modal e recarregar
-        if self.request.htmx:
-            return HttpResponse(status=204)
-        
-        # Se for form normal, faz redirect padrao
-        return super().form_valid(form)
-
-# --- CORREÇÃO AQUI: Renomeado para ServicoUpdateView para bater com o urls.py ---
-class ServicoUpdateView(LoginRequiredMixin, GestaoRequiredMixin, UpdateView):
-    model = Servico
-    form_class = ServicoForm
-    # Se for chamado via HTMX (modal), usa o template parcial, senão usa o form padrão
-    def get_template_names(self):
-        if self.request.htmx:
-            return ['app/partials/_servico_form_modal.html']
-        return ['app/servico_form.html']
-
-    def get_success_url(self):
-        # Nao usado quando via HTMX (retorna 204)
-        return reverse_lazy('app:servico-list')
-
-    def form_valid(self, form):
-        self.object = form.save()
-        
-        # Se for via HTMX (modal), retorna 204 para fechar modal e recarregar
-        if self.request.htmx:
-            return HttpResponse(status=204)
-        
-        # Se for form normal, faz redirect padrao
-        return super().form_valid(form)
-    def get_form_kwargs(self):
-        kwargs = super().get_form_kwargs()
-        kwargs['user'] = self.request.user
-        return kwargs
-
-class ServicoDeleteView(DeleteView):
-    model = Servico
-    template_name = 'app/servico_confirm_delete.html'
-    success_url = reverse_lazy('app:servico-list')
-
-    def form_valid(self, form):
-        self.object = form.save()
-        
-        # Se for via HTMX (modal), retorna 204 para fechar modal e recarregar
-        if self.request.htmx:
-            return HttpResponse(status=204)
-        
-        # Se for form normal, faz redirect padrao
-        return super().form_valid(form)
-
-@login_required
-def servico_historico_modal(request, cliente_id, mes, ano):
-    """ Modal HTMX para ver histórico de viagens de um cliente num mês específico """
-    cliente = get_object_or_404(Cliente, pk=cliente_id)
-    
-    servicos = Servico.objects.filter(
-        cliente=cliente,
-        data_servico__year=ano,
-        data_servico__month=mes
-    ).order_by('data_servico')
-
-    context = {
-        'cliente': cliente,
-        'servicos': servicos,
-        'mes': mes,
-        'ano': ano,
-        'nome_mes': calendar.month_name[mes].capitalize(),
-    }
-    return render(request, 'app/partials/_servico_historico_modal.html', context)
-
-@login_required
-def add_tipo_servico_ajax(request):
-    if request.method == "POST":
-        try:
-            data = json.loads(request.body)
-            nome = data.get('nome')
-            if not nome:
-                return JsonResponse({'error': 'Nome não fornecido'}, status=400)
-            
-            tipo, created = TipoServico.objects.get_or_create(nome=nome.upper())
-            return JsonResponse({'id': tipo.id, 'nome': tipo.nome})
-        except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
-    return JsonResponse({'error': 'Método inválido'}, status=405)
-
-# --- METAS ---
-
-class MetaListView(LoginRequiredMixin, ListView):
-    model = Meta
-    template_name = 'app/meta_list.html'
-    context_object_name = 'metas'
-
-    def get_queryset(self):
-        try:
-            year_str = self.request.GET.get('year', str(date.today().year))
-            self.selected_year = int(year_str.replace('.', ''))
-        except (ValueError, TypeError):
-            self.selected_year = date.today().year
-
-        queryset = Meta.objects.filter(ano=self.selected_year).select_related('cliente', 'cliente__cadastrado_por')
-        
-        # Rep vê apenas metas dos seus clientes
-        if self.request.user.profile.is_representante:
-            queryset = queryset.filter(cliente__cadastrado_por=self.request.user)
-            
-        return queryset.order_by('-mes', 'cliente__razao_social')
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        anos_com_metas = Meta.objects.values_list('ano', flat=True).distinct().order_by('-ano')
-        context['anos_disponiveis'] = list(anos_com_metas)
-        if self.selected_year not in context['anos_disponiveis']:
-             context['anos_disponiveis'].insert(0, self.selected_year)
-        context['selected_year'] = self.selected_year
-        return context
-
-class MetaCreateView(LoginRequiredMixin, GestaoRequiredMixin, CreateView):
-    model = Meta
-    form_class = MetaForm
-    template_name = 'app/meta_form.html'
-    success_url = reverse_lazy('app:meta-list')
-
-class MetaUpdateView(LoginRequiredMixin, GestaoRequiredMixin, UpdateView):
-    model = Meta
-    form_class = MetaForm
-    template_name = 'app/meta_form.html'
-    success_url = reverse_lazy('app:meta-list')
-
-class MetaDeleteView(LoginRequiredMixin, GestaoRequiredMixin, DeleteView):
-    model = Meta
-    template_name = 'app/meta_confirm_delete.html'
-    success_url = reverse_lazy('app:meta-list')
-
-# --- TAREFAS / AGENDA ---
-
-@login_required
-def agenda_view(request):
-    """ Exibe o Kanban de Tarefas """
-    
-    # Filtros (mesma estrutura de Prospeccao)
-    data_ini = request.GET.get('data_inicial')
-    data_fim = request.GET.get('data_final')
-    filtro_rep = request.GET.get('representante_filtro', 'todos')
-    
-    tarefas = Tarefa.objects.all().select_related('criado_por', 'iniciado_por', 'finalizado_por')
-
-    # Representante Comercial so ve as proprias tarefas
-    # Demais cargos (Comercial, Diretoria, Admin, Staff) veem todas com filtro
-    if request.user.profile.is_representante:
-        tarefas = tarefas.filter(
-            Q(criado_por=request.user) | 
-            Q(iniciado_por=request.user) | 
-            Q(finalizado_por=request.user)
-        )
-    else:
-        # Todos que nao sao representantes podem filtrar
-        if filtro_rep == 'minhas':
-            tarefas = tarefas.filter(
-                Q(criado_por=request.user) | 
-                Q(iniciado_por=request.user) | 
-                Q(finalizado_por=request.user)
-            )
-        elif filtro_rep and filtro_rep != 'todos':
-            tarefas = tarefas.filter(
-                Q(criado_por_id=filtro_rep) | 
-                Q(iniciado_por_id=filtro_rep) | 
-                Q(finalizado_por_id=filtro_rep)
-            )
-    
-    # Filtros de data (por data de criacao)
-    if data_ini:
-        tarefas = tarefas.filter(data_criacao__date__gte=data_ini)
-    if data_fim:
-        tarefas = tarefas.filter(data_criacao__date__lte=data_fim)
-
-    # Paginacao das finalizadas
-    finalizadas_qs = tarefas.filter(status='FINALIZADA').order_by('-data_finalizacao')
-    page_num = request.GET.get('page', 1)
-    # Paginacao simples (fatia)
-    ITEMS_PER_PAGE = 10
-    start = 0
-    end = int(page_num) * ITEMS_PER_PAGE
-    finalizadas_page = finalizadas_qs[start:end]
-    tem_mais = finalizadas_qs.count() > end
-
-    context = {
-        'nao_iniciadas': tarefas.filter(status='NAO_INICIADA').order_by('data_criacao'),
-        'iniciadas': tarefas.filter(status='INICIADA').order_by('data_inicio'),
-        'finalizadas': finalizadas_page,
-        'representantes': User.objects.filter(is_active=True).order_by('username'),
-        'filtro_selecionado': filtro_rep,
-        'tem_mais_finalizadas': tem_mais,
-        'proxima_pagina': int(page_num) + 1,
-    }
-    return render(request, 'app/agenda.html', context)
-
-
-@login_required
-def carregar_mais_tarefas(request):
-    """ Endpoint HTMX para paginacao infinita de tarefas finalizadas """
-    filtro_rep = request.GET.get('representante_filtro', 'todos')
-    data_ini = request.GET.get('data_inicial')
-    data_fim = request.GET.get('data_final')
-    page_num = int(request.GET.get('page', 2))
-    
-    tarefas = Tarefa.objects.filter(status='FINALIZADA')
-    
-    # Representante Comercial so ve as proprias tarefas
-    if request.user.profile.is_representante:
-        tarefas = tarefas.filter(
-            Q(criado_por=request.user) | 
-            Q(iniciado_por=request.user) | 
-            Q(finalizado_por=request.user)
-        )
-    else:
-        # Demais cargos podem filtrar
-        if filtro_rep == 'minhas':
-            tarefas = tarefas.filter(
-                Q(criado_por=request.user) | 
-                Q(iniciado_por=request.user) | 
-                Q(finalizado_por=request.user)
-            )
-        elif filtro_rep and filtro_rep != 'todos':
-            tarefas = tarefas.filter(
-                Q(criado_por_id=filtro_rep) | 
-                Q(iniciado_por_id=filtro_rep) | 
-                Q(finalizado_por_id=filtro_rep)
-            )
-    
-    # Filtros de data
-    if data_ini:
-        tarefas = tarefas.filter(data_criacao__date__gte=data_ini)
-    if data_fim:
-        tarefas = tarefas.filter(data_criacao__date__lte=data_fim)
-
-    tarefas = tarefas.order_by('-data_finalizacao')
-    
-    ITEMS_PER_PAGE = 10
-    start = (page_num - 1) * ITEMS_PER_PAGE
-    end = page_num * ITEMS_PER_PAGE
-    
-    page_obj = tarefas[start:end]
-    tem_mais = tarefas.count() > end
-    
-    context = {
-        'finalizadas_paginadas': page_obj,
-        'tem_mais_finalizadas': tem_mais,
-        'proxima_pagina': page_num + 1,
-        'filtro_selecionado': filtro_rep
-    }
-    return render(request, 'app/partials/_tarefas_finalizadas_paginadas.html', context)
-
-
-@login_required
-def detalhe_tarefa(request, pk):
-    tarefa = get_object_or_404(Tarefa, pk=pk)
-    
-    if request.method == 'POST': # Novo comentário
-        acao_form = AcaoTarefaForm(request.POST, request.FILES)
-        if acao_form.is_valid():
-            acao = acao_form.save(commit=False)
-            acao.tarefa = tarefa
-            acao.registrado_por = request.user
-            acao.save()
-            return redirect('app:agenda')
-    else:
-        acao_form = AcaoTarefaForm()
-    
-    context = {
-        'tarefa': tarefa,
-        'acao_form': acao_form,
-    }
-    return render(request, 'app/partials/_detalhe_tarefa_modal.html', context)
-
-@login_required
-def criar_tarefa(request):
-    if request.method == 'POST':
-        form = TarefaForm(request.POST)
-        if form.is_valid():
-            tarefa = form.save(commit=False)
-            tarefa.criado_por = request.user
-            tarefa.save()
-            # Retorna 204 (No Content) para HTMX entender que deve apenas recarregar
-            return HttpResponse(status=204)
-    else:
-        form = TarefaForm()
-    return render(request, 'app/partials/_tarefa_form_modal.html', {'form': form})
-
-@login_required
-def gravar_acao(request, pk):
-    tarefa = get_object_or_404(Tarefa, pk=pk)
-    if request.method == 'POST':
-        form = AcaoTarefaForm(request.POST, request.FILES)
-        if form.is_valid():
-            acao = form.save(commit=False)
-            acao.tarefa = tarefa
-            acao.registrado_por = request.user
-            acao.save()
-            # Retorna apenas a lista atualizada
-            return render(request, 'app/partials/_acoes_list.html', {'tarefa': tarefa})
-    return HttpResponse("Erro", status=400)
-
-@login_required
-def iniciar_tarefa(request, pk):
-    tarefa = get_object_or_404(Tarefa, pk=pk)
-    tarefa.status = 'INICIADA'
-    tarefa.iniciado_por = request.user
-    tarefa.data_inicio = timezone.now()
-    tarefa.save()
-    return HttpResponse(status=204)
-
-@login_required
-def finalizar_tarefa(request, pk):
-    tarefa = get_object_or_404(Tarefa, pk=pk)
-    tarefa.status = 'FINALIZADA'
-    tarefa.finalizado_por = request.user
-    tarefa.data_finalizacao = timezone.now()
-    tarefa.save()
-    return HttpResponse(status=204)
-
-# --- PROSPECÇÃO / FUNIL ---
-
-@login_required
-def prospeccao_view(request):
-    """
-    Exibe o quadro Kanban de Prospecção com filtros.
-    """
-    from django.db.models import Sum, Count
-    
-    # Base da Query
-    qs = Prospeccao.objects.select_related('cliente', 'criado_por', 'tipo_servico').all()
-
-    # --- LÓGICA DE PERMISSÃO ---
-    # Se NÃO for Gestão (Comercial/Diretoria/Admin), vê apenas as suas
-    if not (request.user.is_staff or request.user.profile.tem_acesso_gestao):
-        qs = qs.filter(criado_por=request.user)
-    
-    # --- LÓGICA DO FILTRO (CORREÇÃO AQUI) ---
-    representante_id = request.GET.get('representante_filtro')
-
-    # Tratar valores especiais do filtro
-    if representante_id == 'minhas':
-        qs = qs.filter(criado_por=request.user)
-        representante_id = 'minhas'  # Manter para o template
-    elif representante_id == 'todos':
-        representante_id = 'todos'  # NÃ£o filtra, mostra todos
-    
-    # Se o usuário tem permissão de gestão e selecionou um filtro
-    # Se o usuario tem permissao de gestao e selecionou um ID numerico
-    if (request.user.is_staff or request.user.profile.tem_acesso_gestao) and representante_id and representante_id not in ['minhas', 'todos']:
-        qs = qs.filter(criado_por_id=representante_id)
-
-    # Separacao por Status (Colunas do Kanban)
-    # Separação por Status (Colunas do Kanban)
-    novas = qs.filter(status='NOVA').order_by('-data_criacao')
-    negociando = qs.filter(status='NEGOCIANDO').order_by('-data_inicio_negociacao')
-    
-    
-    # Para Finalizadas, separamos por tipo (ultimos 50 de cada para nao poluir)
-    finalizadas_fechado = qs.filter(status='FECHADO').order_by('-data_finalizacao')[:50]
-    finalizadas_desistencia = qs.filter(status='DESISTENCIA').order_by('-data_finalizacao')[:50]
-    finalizadas_perdida = qs.filter(status='PERDIDA').order_by('-data_finalizacao')[:50]
-    # Dados para o Dropdown de Filtro (Apenas usuários do setor comercial/representantes)
-    representantes = User.objects.filter(profile__setor='REPRESENTANTE', is_active=True)
-
-    # Totais para o cabeçalho (Resumo rápido)
-    total_em_negociacao = negociando.aggregate(Sum('valor_total'))['valor_total__sum'] or 0
-    count_em_negociacao = negociando.count()
-
-    context = {
-        'novas': novas,
-        'negociando': negociando,
-        'finalizadas_fechado': finalizadas_fechado,
-        'finalizadas_desistencia': finalizadas_desistencia,
-        'finalizadas_perdida': finalizadas_perdida,
-        'representantes': representantes,
-        'filtro_selecionado': representante_id,  # Para manter o select marcado
-        'total_em_negociacao': total_em_negociacao,
-        'count_em_negociacao': count_em_negociacao,
-    }
-    # Se for uma requisicao HTMX vinda do filtro, renderiza apenas o Kanban (sem o layout base)
-    if request.headers.get('HX-Request'):
-        return render(request, 'app/partials/_prospeccao_kanban_content.html', context)
-
-    return render(request, 'app/prospeccao.html', context)
-
-@login_required
-def criar_cliente_prospeccao_modal(request):
-    form = ClienteProspectForm(request.POST or None)
-    if request.method == 'POST' and form.is_valid():
-        return salvar_cliente_prospeccao(request) # Reutiliza lógica
-    
-    return render(request, 'app/partials/_cliente_form_modal.html', {'form': form})
-
-@login_required
-@login_required
-@login_required
-def salvar_cliente_prospeccao(request):
-    if request.method == 'POST':
-        form = ClienteProspectForm(request.POST)
-        if form.is_valid():
-            # Salva na tabela ClienteProspect
-            cliente = form.save(commit=False)
-            cliente.cadastrado_por = request.user
-            cliente.save()
-            
-            # Retorna o ProspeccaoForm com o novo prospect selecionado
-            prospeccao_form = ProspeccaoForm(user=request.user, initial={'cliente': cliente.id})
-            return render(request, 'app/partials/_prospeccao_form_modal.html', {'form': prospeccao_form})
-    return render(request, 'app/partials/_cliente_form_modal.html', {'form': form})
-
-@login_required
-def criar_prospeccao(request):
-    if request.method == 'POST':
-        form = ProspeccaoForm(request.POST, user=request.user)
-        if form.is_valid():
-            prospeccao = form.save(commit=False)
-            prospeccao.criado_por = request.user
-            prospeccao.save()
-            # Retorna 204 com header para recarregar a pagina
-            response = HttpResponse(status=204)
-            response['HX-Trigger'] = 'closeModal'
-            return response
-    else:
-        form = ProspeccaoForm(user=request.user)
-    
-    return render(request, 'app/partials/_prospeccao_form_modal.html', {'form': form})
-
-
-@login_required
-def detalhe_prospeccao(request, pk):
-    prospeccao = get_object_or_404(Prospeccao, pk=pk)
-    
-    if not request.user.is_staff and not request.user.profile.tem_acesso_gestao and prospeccao.criado_por != request.user:
-        return HttpResponse("Acesso Negado", status=403)
-        
-    acao_form = AcaoProspeccaoForm()
-    
-    context = {
-        'prospeccao': prospeccao,
-        'acao_form': acao_form,
-    }
-    return render(request, 'app/partials/_detalhe_prospeccao_modal.html', context)
-    prospeccao = get_object_or_404(Prospeccao, pk=pk)
-@login_required
-def editar_prospeccao(request, pk):
-    prospeccao = get_object_or_404(Prospeccao, pk=pk)
-
-    if (not request.user.is_staff and not request.user.profile.tem_acesso_gestao and prospeccao.criado_por != request.user) or prospeccao.status not in ['NOVA', 'NEGOCIANDO']:
-        return HttpResponse(status=403)
-
-    if request.method == 'POST':
-        form = ProspeccaoEditForm(request.POST, instance=prospeccao)
-        if form.is_valid():
-            
-            changes = []
-            if form.has_changed():
-                for field_name in form.changed_data:
-                    old_value = form.initial.get(field_name)
-                    new_value = form.cleaned_data.get(field_name)
-                    field_label = Prospeccao._meta.get_field(field_name).verbose_name
-                    changes.append(f'"{field_label}" alterado de "{old_value}" para "{new_value}".') 
-            
-            updated_prospeccao = form.save()
-
-            if 'valor_total' in form.cleaned_data and prospeccao.valor_total != updated_prospeccao.valor_total:
-                 changes.append(f'"Valor Total Estimado" recalculado para "R$ {updated_prospeccao.valor_total}".') 
-
-            if changes:
-                descricao_acao = "Dados da prospeccao foram atualizados: " + " | ".join(changes)
-                AcaoProspeccao.objects.create(
-                    prospeccao=updated_prospeccao,
-                    descricao=descricao_acao,
-                    registrado_por=request.user
-                )
-
-            return HttpResponse(status=204, headers={'HX-Refresh': 'true'})
-    else:
-        form = ProspeccaoEditForm(instance=prospeccao)
-    
-    return render(request, 'app/partials/_prospeccao_edit_form_modal.html', {
-        'form': form,
-        'prospeccao': prospeccao
-    })
-
-@login_required
-def iniciar_prospeccao(request, pk):
-    prospeccao = get_object_or_404(Prospeccao, pk=pk)
-    if request.method == 'POST':
-        prospeccao.status = 'NEGOCIANDO'
-        prospeccao.iniciado_por = request.user
-        prospeccao.data_inicio_negociacao = timezone.now()
-        prospeccao.save()
-        return HttpResponse(status=204, headers={'HX-Refresh': 'true'})
-    return HttpResponse(status=405)
-
-    prospeccao = get_object_or_404(Prospeccao, pk=pk)
-    prospeccao.status = 'NEGOCIANDO'
-    prospeccao.iniciado_por = request.user
-    prospeccao.data_inicio_negociacao = timezone.now()
-    prospeccao.save()
-    return HttpResponse(status=204)
-
-@login_required
-def finalizar_prospeccao(request, pk):
-    prospeccao = get_object_or_404(Prospeccao, pk=pk)
-    novo_status = request.POST.get('status')
-    
-    if novo_status in ['FECHADO', 'DESISTENCIA', 'PERDIDA']:
-        prospeccao.status = novo_status
-        prospeccao.finalizado_por = request.user
-        prospeccao.data_finalizacao = timezone.now()
-        prospeccao.save()
-        
-    return HttpResponse(status=204)
-
-@login_required
-@login_required
-def gravar_acao_prospeccao(request, pk):
-    prospeccao = get_object_or_404(Prospeccao, pk=pk)
-    if request.method == 'POST':
-        form = AcaoProspeccaoForm(request.POST, request.FILES)
-        if form.is_valid():
-            acao = form.save(commit=False)
-            acao.prospeccao = prospeccao
-            acao.registrado_por = request.user
-            acao.save()
-            
-            # Retorna 204 sem conteudo
-            return HttpResponse(status=204)
-    return HttpResponse("Erro", status=400)
-@login_required
-def dashboard_prospeccao(request):
-    """ Retorna o HTML do dashboard de prospecção para carregar via HTMX """
-    qs = Prospeccao.objects.all()
-    
-    # Filtros
-    data_ini = request.GET.get('data_inicial')
-    data_fim = request.GET.get('data_final')
-    rep_id = request.GET.get('representante_id')
-    
-    if not request.user.is_staff and not request.user.profile.tem_acesso_gestao:
-        qs = qs.filter(criado_por=request.user)
-    elif rep_id:
-        qs = qs.filter(criado_por_id=rep_id)
-
-    if data_ini: qs = qs.filter(data_finalizacao__date__gte=data_ini)
-    if data_fim: qs = qs.filter(data_finalizacao__date__lte=data_fim)
-    
-    # 1. Funil (Status)
-    funil_data = qs.values('status').annotate(count=Count('id'))
-    funil_map = {item['status']: item['count'] for item in funil_data}
-    
-    labels_funil = ['Nova', 'Em Negociação', 'Fechado', 'Desistência', 'Perdida']
-    data_funil = [
-        funil_map.get('NOVA', 0),
-        funil_map.get('NEGOCIANDO', 0),
-        funil_map.get('FECHADO', 0),
-        funil_map.get('DESISTENCIA', 0),
-        funil_map.get('PERDIDA', 0),
-    ]
-
-    # 2. Performance (Valor Fechado por Rep) - Apenas Gestão
-    labels_perf = []
-    data_perf = []
-    
-    if request.user.is_staff or request.user.profile.tem_acesso_gestao:
-        perf_data = qs.filter(status='FECHADO').values('criado_por__username') \
-                      .annotate(total=Sum('valor_total')).order_by('-total')
-        
-        labels_perf = [item['criado_por__username'] for item in perf_data]
-        data_perf = [float(item['total']) for item in perf_data]
-
-    context = {
-        'funil_labels': json.dumps(labels_funil),
-        'funil_data': json.dumps(data_funil),
-        'performance_labels': json.dumps(labels_perf),
-        'performance_data': json.dumps(data_perf),
-        'total_fechado': sum(data_perf),
-        'taxa_conversao': 0 # Pode calcular se quiser
-    }
-    
-    return render(request, 'app/partials/_dashboard_prospeccao_content.html', context)
-
-# --- RELATÓRIOS ---
-
-@login_required
-def cliente_search_api(request):
-    """ API JSON para o Select do TomSelect nos Relatórios """
-    query = request.GET.get('q', '')
-    clientes = Cliente.objects.filter(razao_social__icontains=query)[:20]
-    data = [{'value': c.id, 'text': f"{c.razao_social} - {c.cnpj}"} for c in clientes]
-    return JsonResponse(data, safe=False)
-
-@login_required
-def relatorio_page(request):
-    report_type = request.GET.get('report_type')
-    context = {'report_type': report_type}
-    
-    if report_type:
-        data_ini = request.GET.get('data_inicial')
-        data_fim = request.GET.get('data_final')
-        rep_id = request.GET.get('representante_id')
-        cliente_id = request.GET.get('cliente_id')
-        
-        if report_type == 'faturamento_periodo':
-            qs = Servico.objects.all()
-            if data_ini: qs = qs.filter(data_servico__gte=data_ini)
-            if data_fim: qs = qs.filter(data_servico__lte=data_fim)
-            
-            if request.user.profile.is_representante:
-                qs = qs.filter(cliente__cadastrado_por=request.user)
-            elif rep_id:
-                qs = qs.filter(cliente__cadastrado_por_id=rep_id)
-
-            res = qs.values('cliente__razao_social') \
-                    .annotate(num_servicos=Count('id'), faturamento_total=Sum('valor')) \
-                    .order_by('-faturamento_total')
-            
-            context['resultados'] = res
-            context['total_faturamento'] = qs.aggregate(t=Sum('valor'))['t'] or 0
-            context['total_servicos'] = qs.count()
-
-        elif report_type == 'clientes_cadastrados':
-            qs = Cliente.objects.all()
-            if request.user.profile.is_representante:
-                qs = qs.filter(cadastrado_por=request.user)
-            elif rep_id:
-                qs = qs.filter(cadastrado_por_id=rep_id)
-            
-            context['resultados'] = qs.order_by('-data_cadastro')
-            context['total_clientes'] = qs.count()
-        
-        elif report_type == 'historico_cliente':
-            if cliente_id:
-                qs = Servico.objects.filter(cliente_id=cliente_id).order_by('-data_servico')
-                context['resultados'] = qs
-                context['total_faturamento'] = qs.aggregate(t=Sum('valor'))['t'] or 0
-                context['total_servicos'] = qs.count()
-                context['cliente_selecionado'] = Cliente.objects.get(pk=cliente_id)
-
-    # Se for htmx, retorna só a parte dos resultados
-    if request.htmx:
-        return render(request, 'app/partials/_relatorio_resultados.html', context)
-    
-    # Se for acesso normal, carrega a página completa com os filtros
-    # Carrega lista de representantes para o filtro (apenas se for admin/staff)
-    if not request.user.profile.is_representante:
-        context['representantes'] = User.objects.filter(profile__setor='REPRESENTANTE')
-        
-    return render(request, 'app/relatorios.html', context)
-
-@login_required
-def exportar_relatorio(request):
-    """ Gera PDF ou Excel """
-    report_type = request.GET.get('report_type')
-    fmt = request.GET.get('format', 'pdf')
-    
-    # --- REUTILIZAR LÓGICA DE FILTRO DA relatorio_page ---
-    # (Para simplificar, copiando lógica básica)
-    data_ini = request.GET.get('data_inicial')
-    data_fim = request.GET.get('data_final')
-    rep_id = request.GET.get('representante_id')
-    cliente_id = request.GET.get('cliente_id')
-    
-    context = {
-        'data_inicial': date.fromisoformat(data_ini) if data_ini else None,
-        'data_final': date.fromisoformat(data_fim) if data_fim else None,
-        'user': request.user,
-    }
-    
-    if rep_id:
-        context['representante_selecionado'] = User.objects.get(pk=rep_id)
-
-    if report_type == 'faturamento_periodo':
-        qs = Servico.objects.all()
-        if data_ini: qs = qs.filter(data_servico__gte=data_ini)
-        if data_fim: qs = qs.filter(data_servico__lte=data_fim)
-        if request.user.profile.is_representante:
-            qs = qs.filter(cliente__cadastrado_por=request.user)
-        elif rep_id:
-            qs = qs.filter(cliente__cadastrado_por_id=rep_id)
-
-        res = qs.values('cliente__razao_social') \
-                .annotate(num_servicos=Count('id'), faturamento_total=Sum('valor')) \
-                .order_by('-faturamento_total')
-        
-        context['resultados'] = res
-        context['total_faturamento'] = qs.aggregate(t=Sum('valor'))['t'] or 0
-        context['total_servicos'] = qs.count()
-        template = 'app/partials/_relatorio_pdf_faturamento.html'
-
-    elif report_type == 'clientes_cadastrados':
-        qs = Cliente.objects.all()
-        if request.user.profile.is_representante:
-            qs = qs.filter(cadastrado_por=request.user)
-        elif rep_id:
-            qs = qs.filter(cadastrado_por_id=rep_id)
-        
-        context['resultados'] = qs.order_by('-data_cadastro')
-        context['total_clientes'] = qs.count()
-        template = 'app/partials/_relatorio_pdf_clientes.html'
-
-    elif report_type == 'historico_cliente':
-        if cliente_id:
-            qs = Servico.objects.filter(cliente_id=cliente_id).order_by('data_servico')
-            context['resultados'] = qs
-            context['total_faturamento'] = qs.aggregate(t=Sum('valor'))['t'] or 0
-            context['total_servicos'] = qs.count()
-            context['cliente_selecionado'] = Cliente.objects.get(pk=cliente_id)
-        template = 'app/partials/_relatorio_pdf_historico.html'
-
-    else:
-        return HttpResponse("Tipo de relatório inválido", status=400)
-
-    # --- GERAR PDF ---
-    html_string = render_to_string(template, context)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="relatorio_{report_type}.pdf"'
-    pisa_status = pisa.CreatePDF(html_string, dest=response)
-    if pisa_status.err:
-        return HttpResponse('Erro ao gerar PDF', status=500)
-    return response
-
-# --- DIREITOS ---
-
-def direitos_page(request):
-    return render(request, 'app/direitos.html')
-
-# --- API DE CONSULTA DE CNPJ (NOVO LOOP 40X) ---
-
-@login_required
-def consulta_cnpj_api(request, cnpj):
-    cnpj = ''.join(filter(str.isdigit, cnpj))
-    if len(cnpj) != 14:
-        return JsonResponse({'error': 'CNPJ deve ter 14 dÃ­gitos.'}, status=400)
-    
-    url = f"https://brasilapi.com.br/api/cnpj/v1/{cnpj}"
-    
-    # Tentativa com Retries manuais para lidar com a instabilidade da BrasilAPI
-    max_tentativas = 20 
-    
-    for tentativa in range(1, max_tentativas + 1):
-        try:
-            response = requests.get(url, timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                endereco = f"{data.get('logradouro', '')}, {data.get('numero', '')} - {data.get('bairro', '')}, {data.get('municipio', '')}/{data.get('uf', '')}"
-                return JsonResponse({'razao_social': data.get('razao_social', ''), 'endereco': endereco})
-            
-            if tentativa < max_tentativas:
-                time.sleep(1) 
-                continue
-
-        except requests.RequestException:
-            if tentativa < max_tentativas:
-                time.sleep(1)
-                continue
-            return JsonResponse({'error': 'Erro de comunicaÃ§Ã£o com a API.'}, status=500)
-
-    return JsonResponse({'error': 'CNPJ nÃ£o encontrado ou API instÃ¡vel apÃ³s vÃ¡rias tentativas.'}, status=404)
-
-@login_required
-def api_documentation(request):
-    """Página de documentação da API REST para integração com sistemas externos"""
-    # Apenas administradores
-    if not request.user.is_staff:
-        return HttpResponse("Acesso Negado", status=403)
-    
-    return render(request, 'app/api_documentation.html')
-
-@login_required
-def servico_update_modal(request, pk):
-    """
-    Exibe o formulário de edição de serviço dentro de um Modal e processa a atualização.
-    """
-    servico = get_object_or_404(Servico, pk=pk)
-    
-    # Segurança: Apenas Gestão/Admin pode editar
-    if not (request.user.is_staff or request.user.profile.tem_acesso_gestao):
-        return HttpResponse("Acesso negado", status=403)
-
-    if request.method == 'POST':
-        form = ServicoForm(request.POST, instance=servico)
-        if form.is_valid():
-            servico_salvo = form.save()
-            
-            # Após salvar com sucesso, chamamos a view do histórico novamente
-            # para recarregar a tabela atualizada no modal principal
-            return servico_historico_modal(
-                request, 
-                cliente_id=servico_salvo.cliente.id, 
-                mes=servico_salvo.data_servico.month, 
-                ano=servico_salvo.data_servico.year
-            )
-    else:
-        form = ServicoForm(instance=servico)
-    
-    context = {
-        'form': form,
-        'servico': servico
-    }
-    return render(request, 'app/partials/_servico_form_modal.html', context)
-
-@login_required
-def add_tipo_servico_api(request):
-    """
-    Endpoint API para adicionar um novo Tipo de Serviço via AJAX (Fetch API).
-    Usado no modal de 'Novo Serviço'.
-    """
-    import json
-    if request.method == 'POST':
-        try:
-            data = json.loads(request.body)
-            nome = data.get('nome', '').strip()
-            
-            if not nome:
-                return JsonResponse({'error': 'O nome do serviço não pode ser vazio.'}, status=400)
-            
-            # Verifica se já existe (ignorando maiúsculas/minúsculas)
-            if TipoServico.objects.filter(nome__iexact=nome).exists():
-                return JsonResponse({'error': 'Este tipo de serviço já está cadastrado.'}, status=400)
-            
-            # Cria o novo tipo
-            novo_tipo = TipoServico.objects.create(nome=nome)
-            
-            return JsonResponse({
-                'id': novo_tipo.id,
-                'nome': novo_tipo.nome
-            })
-            
-        except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
-            
-    return JsonResponse({'error': 'Método não permitido.'}, status=405)
-
-@login_required
-def gravar_acao_tarefa(request, pk):
-    """Grava uma nova ação/histórico em uma tarefa existente."""
-    tarefa = get_object_or_404(Tarefa, pk=pk)
-    
-    if request.method == 'POST':
-        form = AcaoTarefaForm(request.POST, request.FILES)
-        if form.is_valid():
-            acao = form.save(commit=False)
-            acao.tarefa = tarefa
-            acao.registrado_por = request.user
-            acao.save()
-            
-            # Se a tarefa não estiver iniciada, inicia automaticamente
-            if tarefa.status == 'NAO_INICIADA':
-                tarefa.status = 'INICIADA'
-                tarefa.iniciado_por = request.user
-                tarefa.data_inicio = timezone.now()
-                tarefa.save()
-                
-            return render(request, 'app/partials/_acoes_list.html', {'tarefa': tarefa})
-            
-    return HttpResponse("Erro ao gravar ação", status=400)
-
-@login_required
-def carregar_mais_tarefas(request):
-    """Paginação infinita para tarefas finalizadas (HTMX)."""
-    page = int(request.GET.get('page', 1))
-    representante_id = request.GET.get('representante_filtro')
-    data_inicial = request.GET.get('data_inicial')
-    data_final = request.GET.get('data_final')
-    
-    tasks_list = Tarefa.objects.filter(status='FINALIZADA').order_by('-data_finalizacao')
-    
-    # Aplica filtros se existirem
-    if representante_id and representante_id != 'todos':
-        tasks_list = tasks_list.filter(criado_por_id=representante_id)
-        
-    if data_inicial:
-        tasks_list = tasks_list.filter(data_finalizacao__date__gte=data_inicial)
-    if data_final:
-        tasks_list = tasks_list.filter(data_finalizacao__date__lte=data_final)
-        
-    # Paginação (10 por vez)
-    from django.core.paginator import Paginator
-    paginator = Paginator(tasks_list, 10)
-    finalizadas_page = paginator.get_page(page)
-    
-    context = {
-        'finalizadas_paginadas': finalizadas_page,
-        'tem_mais_finalizadas': finalizadas_page.has_next(),
-        'proxima_pagina': page + 1,
-        'filtro_selecionado': representante_id
-    }
-    return render(request, 'app/partials/_tarefas_finalizadas_paginadas.html', context)
-
-@login_required
-def gravar_acao_prospeccao(request, pk):
-    """Grava uma ação no histórico da prospecção."""
-    prospeccao = get_object_or_404(Prospeccao, pk=pk)
-    
-    if request.method == 'POST':
-        form = AcaoProspeccaoForm(request.POST, request.FILES)
-        if form.is_valid():
-            acao = form.save(commit=False)
-            acao.prospeccao = prospeccao
-            acao.registrado_por = request.user
-            acao.save()
-            
-            # Atualiza status se for NOVA para NEGOCIANDO
-            if prospeccao.status == 'NOVA':
-                prospeccao.status = 'NEGOCIANDO'
-                prospeccao.iniciado_por = request.user
-                prospeccao.data_inicio_negociacao = timezone.now()
-                prospeccao.save()
-                
-            return render(request, 'app/partials/_acoes_prospeccao_list.html', {'prospeccao': prospeccao})
-            
-    return HttpResponse("Erro ao gravar ação", status=400)
-
-@login_required
-def criar_cliente_prospeccao_modal(request):
-    """Modal para criar um cliente (Prospect) rápido dentro da tela de prospecção."""
-    form = ClienteProspectForm(request.POST or None)
-    context = {'form': form}
-    return render(request, 'app/partials/_cliente_form_modal.html', context)
-
-@login_required
-def promover_prospect_modal(request, pk):
-    """Exibe modal para converter Prospect em Cliente Real."""
-    prospect = get_object_or_404(ClienteProspect, pk=pk)
-    
-    initial_data = {
-        'cnpj': prospect.cnpj,
-        'razao_social': prospect.razao_social,
-        'nome_contato': prospect.nome_contato,
-        'telefone_contato': prospect.telefone_contato,
-        'cadastrado_por': request.user 
-    }
-    
-    form = ClienteForm(initial=initial_data)
-    context = {'form': form, 'prospect': prospect}
-    return render(request, 'app/partials/_cliente_promocao_modal.html', context)
-
-@login_required
-def salvar_promocao_prospect(request, pk):
-    """Salva a conversão de Prospect para Cliente e remove o Prospect."""
-    prospect = get_object_or_404(ClienteProspect, pk=pk)
-    
-    if request.method == 'POST':
-        form = ClienteForm(request.POST)
-        if form.is_valid():
-            with transaction.atomic():
-                # 1. Cria o Cliente novo
-                novo_cliente = form.save()
-                
-                # 2. Migra as prospecções antigas para este novo cliente?
-                # Como a FK é para ClienteProspect, não dá para migrar direto se a FK for rígida.
-                # Geralmente mantemos o histórico no prospect ou criamos uma lógica de migração complexa.
-                # Por simplicidade, apenas criamos o cliente e excluímos o prospect da lista de prospects.
-                
-                prospect.delete()
-                
-                # Fecha o modal e recarrega a pÃ¡gina
-                response = HttpResponse(status=204)
-                response['HX-Trigger'] = 'closeModal'
-                return response
-                
-    return HttpResponse("Erro ao promover", status=400)
-
-@login_required
-def relatorios_page(request):
-    """Página principal de relatórios e geração de resultados via HTMX."""
-    
-    # Se for requisição HTMX (filtros)
-    if request.headers.get('HX-Request'):
-        report_type = request.GET.get('report_type')
-        data_ini = request.GET.get('data_range_filter')
-        data_fim = request.GET.get('data_range_filter_end')
-        rep_id = request.GET.get('representante_filter')
-        cliente_id = request.GET.get('cliente_filter')
-        
-        context = {'report_type': report_type}
-        
-        if report_type == 'faturamento_periodo':
-            qs = Servico.objects.all().select_related('cliente')
-            if data_ini: qs = qs.filter(data_servico__gte=data_ini)
-            if data_fim: qs = qs.filter(data_servico__lte=data_fim)
-            if rep_id: qs = qs.filter(cliente__cadastrado_por_id=rep_id)
-            elif not (request.user.is_staff or request.user.profile.tem_acesso_gestao):
-                qs = qs.filter(cliente__cadastrado_por=request.user)
-                
-            agrupado = qs.values('cliente__razao_social').annotate(
-                num_servicos=Count('id'),
-                faturamento_total=Sum('valor')
-            ).order_by('-faturamento_total')
-            
-            context['resultados'] = agrupado
-            context['total_faturamento'] = qs.aggregate(Sum('valor'))['valor__sum']
-            context['total_servicos'] = qs.count()
-            
-        elif report_type == 'clientes_cadastrados':
-            qs = Cliente.objects.all()
-            if rep_id: qs = qs.filter(cadastrado_por_id=rep_id)
-            elif not (request.user.is_staff or request.user.profile.tem_acesso_gestao):
-                qs = qs.filter(cadastrado_por=request.user)
-                
-            context['resultados'] = qs
-            context['total_clientes'] = qs.count()
-            
-        elif report_type == 'historico_cliente':
-            qs = Servico.objects.none()
-            if cliente_id:
-                qs = Servico.objects.filter(cliente_id=cliente_id).order_by('-data_servico')
-                context['resultados'] = qs
-                context['total_faturamento'] = qs.aggregate(Sum('valor'))['valor__sum']
-                context['total_servicos'] = qs.count()
-        
-        return render(request, 'app/partials/_relatorio_resultados.html', context)
-
-    # Se for GET normal, renderiza a página base
-    reps = User.objects.filter(profile__setor='REPRESENTANTE')
-    return render(request, 'app/relatorios.html', {'representantes': reps})
-
-@login_required
-def exportar_relatorio(request):
-    """Gera PDF ou Excel dos relatórios."""
-    import pandas as pd
-    from django.http import HttpResponse
-    from django.template.loader import render_to_string
-    from xhtml2pdf import pisa
-    from io import BytesIO
-
-    fmt = request.GET.get('format', 'pdf')
-    report_type = request.GET.get('report_type')
-    
-    # ... (Lógica simplificada de recuperação de dados - Repete a query do relatorios_page) ...
-    # Para economizar espaço aqui, vou assumir que você implementará a query completa
-    # Se precisar do código completo de exportação com queries, me avise.
-    
-    # Placeholder simples para evitar erro 500
-    return HttpResponse("Funcionalidade de exportação pronta para implementação detalhada.")
-
-@login_required
-def consulta_cnpj(request, cnpj):
-    """Consulta CNPJ na BrasilAPI."""
-    import requests
-    import time
-    
-    clean_cnpj = ''.join(filter(str.isdigit, cnpj))
-    if len(clean_cnpj) != 14:
-        return JsonResponse({'error': 'CNPJ inválido'}, status=400)
-        
-    try:
-        resp = requests.get(f'https://brasilapi.com.br/api/cnpj/v1/{clean_cnpj}', timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            endereco = f"{data.get('logradouro','')}, {data.get('numero','')} - {data.get('bairro','')}, {data.get('municipio','')}/{data.get('uf','')}"
-            return JsonResponse({
-                'razao_social': data.get('razao_social'),
-                'endereco': endereco
-            })
-    except:
-        pass
-    return JsonResponse({'error': 'CNPJ não encontrado'}, status=404)
-
-@login_required
-def cliente_search_api(request):
-    """Busca clientes para o Select2 (JSON)."""
-    q = request.GET.get('q', '')
-    clientes = Cliente.objects.filter(razao_social__icontains=q)[:10]
-    data = [{'id': c.id, 'text': c.razao_social} for c in clientes]
-    return JsonResponse(data, safe=False)
-
-@login_required
-def api_documentation(request):
-    """Página de documentação da API."""
-    return render(request, 'app/api_documentation.html')
-
-@login_required
-def direitos_view(request):
-    """Renderiza a página de Direitos e Propriedade."""
-    return render(request, 'app/direitos.html')
@@ -0,0 +1,36 @@
+"""
+Views do app, separadas por subsistema.
+
+Os módulos só importam o que é leve; dependências pesadas (xhtml2pdf, requests,
+pandas/NumPy via app.importacao e app.planejamento) são importadas dentro da view que as usa, para não
+pesar na subida dos workers nem no autoreload. `views.<nome>` continua valendo
+para o urls.py.
+"""
+from .agenda import (
+    agenda_view, carregar_mais_tarefas, criar_tarefa, detalhe_tarefa, finalizar_tarefa, gravar_acao,
+    gravar_acao_tarefa, iniciar_tarefa,
+)
+from .anexos import baixar_anexo_prospeccao, baixar_anexo_tarefa, iniciar_upload_anexo, upload_anexo
+from .clientes import (
+    ClienteCreateView, ClienteDeleteView, ClienteDetailView, ClienteListView, ClienteUpdateView,
+    cliente_search_api, promover_prospect_modal, salvar_promocao_prospect,
+)
+from .dashboards import (
+    get_dashboard_anual, get_dashboard_mensal, get_dashboard_top_clientes, get_dashboard_trimestral, home_page,
+)
+from .integracoes import consulta_cnpj, consulta_cnpj_api
+from .metas import MetaCreateView, MetaDeleteView, MetaListView, MetaUpdateView, planejar_metas
+from .mixins import ClienteEditorMixin, GestaoRequiredMixin
+from .paginas import api_documentation, custom_login_view, direitos_page, direitos_view, service_worker
+from .prospeccao import (
+    criar_cliente_prospeccao_modal, criar_prospeccao, dashboard_prospeccao, detalhe_prospeccao, editar_prospeccao,
+    finalizar_prospeccao, gravar_acao_prospeccao, iniciar_prospeccao, prospeccao_view, salvar_cliente_prospeccao,
+)
+from .relatorios import exportar_relatorio, relatorio_page, relatorios_page
+from .representantes import (
+    RepresentanteCreateView, RepresentanteListView, RepresentanteUpdateView, detalhe_representante,
+)
+from .servicos import (
+    ServicoCreateView, ServicoDeleteView, ServicoListView, ServicoUpdateView, add_tipo_servico_ajax,
+    add_tipo_servico_api, importar_servicos, servico_historico_modal, servico_update_modal,
+)
@@ -0,0 +1,171 @@
+""" Agenda: Kanban de tarefas e histórico de ações. """
+from urllib.parse import urlencode
+
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+
+from .. import agenda, anexos
+from ..forms import AcaoTarefaForm, TarefaForm
+from ..models import Tarefa
+
+
+@login_required
+def agenda_view(request):
+    """ Exibe o Kanban de Tarefas """
+    filtro_rep = request.GET.get('representante_filtro', 'todos')
+    tarefas = agenda.tarefas_visiveis(
+        request.user, filtro_rep,
+        request.GET.get('data_inicial'), request.GET.get('data_final'),
+    )
+
+    colunas = {}
+    for status in agenda.COLUNAS:
+        itens, proximo = agenda.pagina_coluna(tarefas, status)
+        colunas[status] = {'tarefas': itens, 'proximo_cursor': proximo, 'status': status}
+
+    context = {
+        'colunas': colunas,
+        'totais': agenda.contar_por_status(tarefas),
+        'filtros_url': _filtros_agenda_url(request),
+        'representantes': User.objects.filter(is_active=True).order_by('username'),
+        'filtro_selecionado': filtro_rep,
+    }
+    return render(request, 'app/agenda.html', context)
+
+
+def _filtros_agenda_url(request):
+    """ Filtros da tela repassados aos botões de 'carregar mais'. """
+    return urlencode({
+        chave: request.GET[chave]
+        for chave in ('representante_filtro', 'data_inicial', 'data_final')
+        if request.GET.get(chave)
+    })
+
+
+@login_required
+def carregar_mais_tarefas(request):
+    """ Endpoint HTMX: próxima página de uma coluna da Agenda (cursor) """
+    status = request.GET.get('status', 'FINALIZADA')
+    if status not in agenda.COLUNAS:
+        return HttpResponseBadRequest("Coluna inválida.")
+
+    tarefas = agenda.tarefas_visiveis(
+        request.user, request.GET.get('representante_filtro', 'todos'),
+        request.GET.get('data_inicial'), request.GET.get('data_final'),
+    )
+    try:
+        itens, proximo = agenda.pagina_coluna(tarefas, status, request.GET.get('cursor'))
+    except agenda.CursorInvalido:
+        return HttpResponseBadRequest("Cursor inválido.")
+
+    context = {
+        'coluna': {'tarefas': itens, 'proximo_cursor': proximo, 'status': status},
+        'filtros_url': _filtros_agenda_url(request),
+    }
+    return render(request, 'app/partials/_tarefas_pagina.html', context)
+
+
+@login_required
+def detalhe_tarefa(request, pk):
+    tarefa = get_object_or_404(Tarefa, pk=pk)
+
+    if request.method == 'POST': # Novo comentário
+        acao_form = AcaoTarefaForm(request.POST, request.FILES)
+        if acao_form.is_valid():
+            acao = acao_form.save(commit=False)
+            acao.tarefa = tarefa
+            acao.registrado_por = request.user
+            acao.save()
+            return redirect('app:agenda')
+    else:
+        acao_form = AcaoTarefaForm()
+
+    context = {
+        'tarefa': tarefa,
+        'acao_form': acao_form,
+    }
+    return render(request, 'app/partials/_detalhe_tarefa_modal.html', context)
+
+
+@login_required
+def criar_tarefa(request):
+    if request.method == 'POST':
+        form = TarefaForm(request.POST)
+        if form.is_valid():
+            tarefa = form.save(commit=False)
+            tarefa.criado_por = request.user
+            tarefa.save()
+            # Retorna 204 (No Content) para HTMX entender que deve apenas recarregar
+            return HttpResponse(status=204)
+    else:
+        form = TarefaForm()
+    return render(request, 'app/partials/_tarefa_form_modal.html', {'form': form})
+
+
+@login_required
+def gravar_acao(request, pk):
+    tarefa = get_object_or_404(Tarefa, pk=pk)
+    if request.method == 'POST':
+        form = AcaoTarefaForm(request.POST, request.FILES)
+        if form.is_valid():
+            acao = form.save(commit=False)
+            acao.tarefa = tarefa
+            acao.registrado_por = request.user
+            # Anexo enviado antes, em blocos (upload retomável)
+            if request.POST.get('upload_id'):
+                sessao = anexos.sessao_concluida(request.POST['upload_id'], request.user, tarefa=tarefa)
+                if sessao is None:
+                    return HttpResponse("Anexo não encontrado ou incompleto.", status=400)
+                anexos.anexar(acao, sessao)
+            acao.save()
+            # Retorna apenas a lista atualizada
+            return render(request, 'app/partials/_acoes_list.html', {'tarefa': tarefa})
+    return HttpResponse("Erro", status=400)
+
+
+@login_required
+def gravar_acao_tarefa(request, pk):
+    """Grava uma nova ação/histórico em uma tarefa existente."""
+    tarefa = get_object_or_404(Tarefa, pk=pk)
+
+    if request.method == 'POST':
+        form = AcaoTarefaForm(request.POST, request.FILES)
+        if form.is_valid():
+            acao = form.save(commit=False)
+            acao.tarefa = tarefa
+            acao.registrado_por = request.user
+            acao.save()
+
+            # Se a tarefa não estiver iniciada, inicia automaticamente
+            if tarefa.status == 'NAO_INICIADA':
+                tarefa.status = 'INICIADA'
+                tarefa.iniciado_por = request.user
+                tarefa.data_inicio = timezone.now()
+                tarefa.save()
+
+            return render(request, 'app/partials/_acoes_list.html', {'tarefa': tarefa})
+
+    return HttpResponse("Erro ao gravar ação", status=400)
+
+
+@login_required
+def iniciar_tarefa(request, pk):
+    tarefa = get_object_or_404(Tarefa, pk=pk)
+    tarefa.status = 'INICIADA'
+    tarefa.iniciado_por = request.user
+    tarefa.data_inicio = timezone.now()
+    tarefa.save()
+    return HttpResponse(status=204)
+
+
+@login_required
+def finalizar_tarefa(request, pk):
+    tarefa = get_object_or_404(Tarefa, pk=pk)
+    tarefa.status = 'FINALIZADA'
+    tarefa.finalizado_por = request.user
+    tarefa.data_finalizacao = timezone.now()
+    tarefa.save()
+    return HttpResponse(status=204)
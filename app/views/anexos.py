@@ -0,0 +1,100 @@
+""" Anexos de tarefas e prospecções: upload em blocos retomável e download. """
+import os
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from .. import anexos
+from ..models import AcaoProspeccao, AcaoTarefa, Prospeccao, Tarefa, UploadSessao
+
+
+def _upload_status(sessao):
+    return {
+        'id': str(sessao.pk),
+        'recebido': sessao.recebido,
+        'tamanho_total': sessao.tamanho_total,
+        'tamanho_bloco': settings.ANEXOS_UPLOAD_BLOCO,
+        'url': reverse('app:upload-anexo', args=[sessao.pk]),
+    }
+
+
+@login_required
+@require_POST
+def iniciar_upload_anexo(request, destino, pk):
+    """ Abre uma sessão de upload em blocos para um anexo de tarefa ou prospecção """
+    if destino == 'tarefa':
+        objeto = get_object_or_404(Tarefa, pk=pk)
+        permitido = anexos.pode_acessar_tarefa(request.user, objeto)
+    else:
+        objeto = get_object_or_404(Prospeccao, pk=pk)
+        permitido = anexos.pode_acessar_prospeccao(request.user, objeto)
+    if not permitido:
+        return JsonResponse({'error': 'Acesso negado.'}, status=403)
+
+    nome = os.path.basename(request.POST.get('nome', '').replace('\\', '/')).strip()[:255]
+    try:
+        tamanho = int(request.POST.get('tamanho', ''))
+    except ValueError:
+        tamanho = 0
+    if not nome or tamanho <= 0:
+        return JsonResponse({'error': 'Informe o nome e o tamanho do arquivo.'}, status=400)
+    if tamanho > settings.ANEXOS_TAMANHO_MAXIMO:
+        return JsonResponse({'error': 'Arquivo maior que o limite permitido.'}, status=413)
+
+    sessao = UploadSessao.objects.create(
+        usuario=request.user, nome_arquivo=nome, tamanho_total=tamanho, **{destino: objeto}
+    )
+    return JsonResponse(_upload_status(sessao), status=201)
+
+
+@login_required
+def upload_anexo(request, upload_id):
+    """
+    GET: quanto já foi recebido (para retomar). PUT: grava o próximo bloco
+    (cabeçalho Content-Range). DELETE: cancela o upload.
+    """
+    sessao = get_object_or_404(UploadSessao, pk=upload_id, usuario=request.user)
+
+    if request.method == 'GET':
+        return JsonResponse(_upload_status(sessao))
+    if request.method == 'DELETE':
+        anexos.descartar(sessao)
+        return HttpResponse(status=204)
+    if request.method != 'PUT':
+        return JsonResponse({'error': 'Método não permitido.'}, status=405)
+
+    # Sem transação em volta: o bloco pode levar segundos para chegar, e o SQLite
+    # (transações IMMEDIATE) travaria todas as gravações enquanto isso
+    try:
+        anexos.gravar_bloco(
+            sessao, request.headers.get('Content-Range'), request,
+            int(request.META.get('CONTENT_LENGTH') or 0),
+        )
+    except anexos.BlocoInvalido as e:
+        # O cliente usa 'recebido' para reenviar a partir do ponto certo
+        return JsonResponse({'error': str(e), **_upload_status(sessao)}, status=409)
+    return JsonResponse(_upload_status(sessao))
+
+
+@login_required
+def baixar_anexo_tarefa(request, pk):
+    acao = get_object_or_404(AcaoTarefa.objects.select_related('tarefa'), pk=pk)
+    if not anexos.pode_acessar_tarefa(request.user, acao.tarefa):
+        return HttpResponse("Acesso Negado", status=403)
+    if not acao.arquivo:
+        return HttpResponse("Esta ação não tem anexo.", status=404)
+    return anexos.resposta_arquivo(request, acao.arquivo)
+
+
+@login_required
+def baixar_anexo_prospeccao(request, pk):
+    acao = get_object_or_404(AcaoProspeccao.objects.select_related('prospeccao'), pk=pk)
+    if not anexos.pode_acessar_prospeccao(request.user, acao.prospeccao):
+        return HttpResponse("Acesso Negado", status=403)
+    if not acao.arquivo:
+        return HttpResponse("Esta ação não tem anexo.", status=404)
+    return anexos.resposta_arquivo(request, acao.arquivo)
@@ -0,0 +1,195 @@
+""" Clientes, promoção de prospects a clientes e a busca de clientes (JSON). """
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import ProtectedError, Q
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse_lazy
+from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
+
+from ..forms import ClienteForm
+from ..models import Cliente, ClienteProspect, Servico
+from .mixins import ClienteEditorMixin
+
+
+class ClienteListView(LoginRequiredMixin, ListView):
+    model = Cliente
+    template_name = 'app/cliente_list.html'
+    context_object_name = 'clientes'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+
+        search_query = self.request.GET.get('q')
+        representante_filtro = self.request.GET.get('representante')
+
+        # Prospects
+        prospects = ClienteProspect.objects.visiveis_para(self.request.user)
+
+        if not self.request.user.profile.is_representante and representante_filtro:
+            if representante_filtro == 'admin':
+                prospects = prospects.da_carteira(self.request.user)
+            else:
+                prospects = prospects.da_carteira(representante_filtro)
+
+        if search_query:
+            prospects = prospects.filter(
+                Q(razao_social__icontains=search_query) | 
+                Q(cnpj__icontains=search_query)
+            )
+
+        context['prospects'] = prospects.order_by('razao_social')
+        context['search_query'] = self.request.GET.get('q', '')
+        context['selected_rep'] = self.request.GET.get('representante', '')
+
+        if not self.request.user.profile.is_representante:
+            context['representantes_list'] = User.objects.filter(profile__setor='REPRESENTANTE').order_by('username')
+        return context
+
+    def get_queryset(self):
+        # Clientes Ativos
+        search_query = self.request.GET.get('q')
+        representante_filtro = self.request.GET.get('representante')
+
+        queryset = Cliente.objects.visiveis_para(self.request.user)
+
+        if not self.request.user.profile.is_representante and representante_filtro:
+            if representante_filtro == 'admin':
+                queryset = queryset.da_carteira(self.request.user)
+            else:
+                queryset = queryset.da_carteira(representante_filtro)
+
+        if search_query:
+            queryset = queryset.filter(
+                Q(razao_social__icontains=search_query) | 
+                Q(cnpj__icontains=search_query)
+            )
+
+        return queryset.select_related('cadastrado_por').order_by('razao_social')
+
+
+class ClienteDetailView(LoginRequiredMixin, DetailView):
+    model = Cliente
+    template_name = 'app/cliente_detail.html'
+    context_object_name = 'cliente'
+
+
+class ClienteCreateView(LoginRequiredMixin, CreateView):
+    model = Cliente
+    template_name = 'app/cliente_form.html'
+    form_class = ClienteForm 
+    success_url = reverse_lazy('app:cliente-list')
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        self.object = form.save()
+
+        # Se for via HTMX (modal), retorna 204 para fechar modal e recarregar
+        if self.request.htmx:
+            return HttpResponse(status=204)
+
+        # Se for form normal, faz redirect padrao
+        return super().form_valid(form)
+
+
+class ClienteUpdateView(LoginRequiredMixin, ClienteEditorMixin, UpdateView):
+    model = Cliente
+    template_name = 'app/cliente_form.html'
+    form_class = ClienteForm
+    success_url = reverse_lazy('app:cliente-list')
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+
+class ClienteDeleteView(LoginRequiredMixin, ClienteEditorMixin, DeleteView):
+    model = Cliente
+    template_name = 'app/cliente_confirm_delete.html'
+    success_url = reverse_lazy('app:cliente-list')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Verifica se há serviços vinculados e adiciona ao contexto
+        cliente = self.get_object()
+        servicos_count = Servico.objects.filter(cliente=cliente).count()
+        context['servicos_count'] = servicos_count
+        context['pode_excluir'] = servicos_count == 0
+        return context
+
+    def post(self, request, *args, **kwargs):
+        try:
+            return super().post(request, *args, **kwargs)
+        except ProtectedError:
+            # Cliente tem serviços vinculados, não pode ser excluído
+            cliente = self.get_object()
+            servicos_count = Servico.objects.filter(cliente=cliente).count()
+            context = {
+                'object': cliente,
+                'cliente': cliente,
+                'servicos_count': servicos_count,
+                'pode_excluir': False,
+                'erro_protecao': True,
+            }
+            return render(request, self.template_name, context)
+
+
+@login_required
+def promover_prospect_modal(request, pk):
+    """Exibe modal para converter Prospect em Cliente Real."""
+    prospect = get_object_or_404(ClienteProspect, pk=pk)
+
+    initial_data = {
+        'cnpj': prospect.cnpj,
+        'razao_social': prospect.razao_social,
+        'nome_contato': prospect.nome_contato,
+        'telefone_contato': prospect.telefone_contato,
+        'cadastrado_por': request.user 
+    }
+
+    form = ClienteForm(initial=initial_data)
+    context = {'form': form, 'prospect': prospect}
+    return render(request, 'app/partials/_cliente_promocao_modal.html', context)
+
+
+@login_required
+def salvar_promocao_prospect(request, pk):
+    """Salva a conversão de Prospect para Cliente e remove o Prospect."""
+    prospect = get_object_or_404(ClienteProspect, pk=pk)
+
+    if request.method == 'POST':
+        form = ClienteForm(request.POST)
+        if form.is_valid():
+            with transaction.atomic():
+                # 1. Cria o Cliente novo
+                novo_cliente = form.save()
+
+                # 2. Migra as prospecções antigas para este novo cliente?
+                # Como a FK é para ClienteProspect, não dá para migrar direto se a FK for rígida.
+                # Geralmente mantemos o histórico no prospect ou criamos uma lógica de migração complexa.
+                # Por simplicidade, apenas criamos o cliente e excluímos o prospect da lista de prospects.
+
+                prospect.delete()
+
+                # Fecha o modal e recarrega a pÃ¡gina
+                response = HttpResponse(status=204)
+                response['HX-Trigger'] = 'closeModal'
+                return response
+
+    return HttpResponse("Erro ao promover", status=400)
+
+
+@login_required
+def cliente_search_api(request):
+    """Busca clientes para o Select2 (JSON)."""
+    q = request.GET.get('q', '')
+    clientes = Cliente.objects.filter(razao_social__icontains=q)[:10]
+    data = [{'id': c.id, 'text': c.razao_social} for c in clientes]
+    return JsonResponse(data, safe=False)
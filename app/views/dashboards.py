@@ -0,0 +1,287 @@
+""" Página inicial e blocos HTMX do dashboard (mensal, trimestral, anual, top clientes). """
+import calendar
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from django.shortcuts import render
+from django.utils import timezone
+
+from ..models import Cliente, Meta
+from ..replica import leitura_em_replica
+
+
+@login_required
+def home_page(request):
+    """
+    Renderiza a pagina inicial baseada no perfil do usuario.
+    Carrega o template base e depois o HTMX injeta o conteudo do dashboard especifico.
+    """
+    profile = getattr(request.user, 'profile', None)
+
+    # Preparar contexto dos filtros para o dashboard
+    context = _get_filter_context(request)
+
+    if request.user.is_staff or (profile and profile.is_admin_sistema):
+        # Admin ve o dashboard geral
+        return render(request, 'app/dashboard_admin.html', context)
+
+    elif profile and profile.is_comercial:
+        # Diretor Comercial ve o dashboard geral
+        return render(request, 'app/dashboard_admin.html', context)
+
+    elif profile and profile.is_diretoria:
+         # Diretoria ve o dashboard geral
+        return render(request, 'app/dashboard_admin.html', context)
+
+    # --- ALTERACAO AQUI: GERENTE OPERACIONAL VE DASHBOARD GERAL ---
+    elif profile and profile.is_gerente_operacional:
+        return render(request, 'app/dashboard_admin.html', context)
+    # -------------------------------------------------------------
+
+    elif profile and profile.is_representante:
+        # Representante ve seu dashboard pessoal
+        return render(request, 'app/dashboard_representante.html', context)
+
+    else:
+        # Fallback (ex: financeiro ou sem perfil definido)
+        return render(request, 'app/home.html')
+
+
+def _periodo(ano, mes_inicial, mes_final):
+    """ Primeiro e último dia dos meses informados. """
+    return date(ano, mes_inicial, 1), date(ano, mes_final, calendar.monthrange(ano, mes_final)[1])
+
+
+def _get_filter_context(request):
+    hoje = date.today()
+
+    def get_int(key, default):
+        try:
+            value = request.GET.get(key, default)
+            # Remove pontos, espaços e converte
+            if isinstance(value, str):
+                value = value.replace('.', '').replace(' ', '').strip()
+            result = int(value)
+            print(f"DEBUG {key}: '{request.GET.get(key)}' → {result}")
+            return result
+        except (ValueError, TypeError):
+            return int(default) if default else hoje.year
+
+    mes_mensal = get_int('mes_mensal', hoje.month)
+    ano_mensal = get_int('ano_mensal', hoje.year)
+    trimestre_trimestral = get_int('trimestre_trimestral', (hoje.month - 1) // 3 + 1)
+    ano_trimestral = get_int('ano_trimestral', hoje.year)
+    ano_anual = get_int('ano_anual', hoje.year)
+
+    print(f"FILTROS: Mensal={mes_mensal}/{ano_mensal}, Trimestral={trimestre_trimestral}ºT/{ano_trimestral}, Anual={ano_anual}")
+
+    return {
+        'meses_disponiveis': [(i, calendar.month_name[i].capitalize()) for i in range(1, 13)],
+        'anos_disponiveis': list(range(hoje.year - 2, hoje.year + 3)),
+        'trimestres_disponiveis': [(1, '1º Trimestre'), (2, '2º Trimestre'), (3, '3º Trimestre'), (4, '4º Trimestre')],
+        'mes_mensal_selecionado': mes_mensal,
+        'ano_mensal_selecionado': ano_mensal,
+        'trimestre_trimestral_selecionado': trimestre_trimestral,
+        'ano_trimestral_selecionado': ano_trimestral,
+        'ano_anual_selecionado': ano_anual,
+    }
+
+
+@login_required
+@leitura_em_replica
+def get_dashboard_mensal(request):
+    from .. import fatos, projecao  # NumPy só quando um dashboard é aberto
+    context = _get_filter_context(request)
+    ano = context['ano_mensal_selecionado']
+    mes = context['mes_mensal_selecionado']
+    user = request.user
+
+    inicio, fim = _periodo(ano, mes, mes)
+    servicos = fatos.consulta(user, inicio, fim)
+    totais = servicos.totais()
+    fat_total = totais['valor']
+    qtd_total = totais['quantidade']
+
+    now = timezone.now().date()
+    _, last_day = calendar.monthrange(ano, mes)
+    if ano < now.year or (ano == now.year and mes < now.month): dias_rest = 0
+    elif ano == now.year and mes == now.month: dias_rest = max(0, last_day - now.day)
+    else: dias_rest = last_day
+
+    context.update({
+        'mensal_faturamento': fat_total,
+        'mensal_servicos_fechados': qtd_total, 
+        'mensal_nome_mes': calendar.month_name[mes].capitalize(),
+        'mensal_dias_restantes': dias_rest,
+    })
+
+    # Meta agora é por cliente - soma as metas dos clientes do representante ou de todos
+    val_meta = Meta.objects.visiveis_para(user).filter(mes=mes, ano=ano).aggregate(s=Sum('valor'))['s'] or Decimal('0.00')
+
+    context['mensal_meta'] = {'valor': val_meta} if val_meta > 0 else None
+    if val_meta > 0:
+        context.update({
+            'mensal_percentual_meta': (fat_total / val_meta) * 100, 
+            'mensal_faturamento_faltante': max(0, val_meta - fat_total)
+        })
+        projecoes = projecao.projetar_mes(user, ano, mes)
+        context.update({
+            'mensal_projecao': projecoes.total(),
+            'mensal_clientes_em_risco': projecoes.clientes_em_risco(),
+            'mensal_dias_uteis': projecoes.dias_uteis,
+            'mensal_dias_uteis_decorridos': projecoes.decorridos,
+        })
+
+    context['desempenho_clientes'] = [
+        {'cliente__razao_social': c['cliente__razao_social'], 'total_valor': c['valor'], 'total_viagens': c['quantidade']}
+        for c in servicos.por_cliente()[:10]
+    ]
+
+    if user.is_staff or user.profile.tem_acesso_gestao:
+        perf = []
+        # Faturamento de todas as carteiras de uma vez (a seleção do usuário pode estar restrita à dele)
+        faturamento_por_rep = fatos.consulta(None, inicio, fim).por_representante()
+        for rep in User.objects.filter(profile__setor='REPRESENTANTE', is_active=True).order_by('first_name'):
+            f_rep = faturamento_por_rep.get(rep.pk, 0)
+            # Meta agora é por cliente - soma todas as metas dos clientes do representante
+            v_meta = Meta.objects.da_carteira(rep).filter(mes=mes, ano=ano).aggregate(s=Sum('valor'))['s'] or 0
+            p_rep = (f_rep / v_meta * 100) if v_meta > 0 else 0
+            perf.append({
+                'nome': rep.get_full_name() or rep.username, 
+                'faturamento': f_rep, 
+                'meta': v_meta, 
+                'percentual_individual': p_rep
+            })
+        perf.sort(key=lambda x: x['percentual_individual'], reverse=True)
+        context['representantes_performance'] = perf
+
+    return render(request, 'app/partials/_dashboard_mensal.html', context)
+
+
+@login_required
+@leitura_em_replica
+def get_dashboard_trimestral(request):
+    from .. import fatos
+    context = _get_filter_context(request)
+    ano = context['ano_trimestral_selecionado']
+    trim = context['trimestre_trimestral_selecionado']
+    user = request.user
+
+    meses = [(trim - 1) * 3 + i for i in range(1, 4)]
+    servicos = fatos.consulta(user, *_periodo(ano, meses[0], meses[-1]))
+
+    context['trimestral_faturamento'] = servicos.totais()['valor']
+    context['trimestral_nome'] = f'{trim}º Trimestre'
+
+    por_mes = servicos.por_mes()
+    labels, data_fat, data_cli = [], [], []
+    for m in meses:
+        labels.append(calendar.month_abbr[m].capitalize())
+        val = por_mes.get((ano, m), 0)
+        data_fat.append(float(val))
+        novos = Cliente.objects.visiveis_para(user).filter(data_cadastro__year=ano, data_cadastro__month=m)
+        data_cli.append(novos.count())
+
+    # NÃO usar json.dumps() - o template faz isso com json_script
+    context.update({
+        'trimestral_bar_labels': labels,
+        'trimestral_faturamento_data': data_fat,
+        'trimestral_clientes_data': data_cli
+    })
+
+    por_tipo = servicos.por_tipo()
+    context['trimestral_pizza_labels'] = [x['tipo_servico__nome'] for x in por_tipo]
+    context['trimestral_pizza_data'] = [float(x['valor']) for x in por_tipo]
+
+    return render(request, 'app/partials/_dashboard_trimestral.html', context)
+
+
+@login_required
+@leitura_em_replica
+def get_dashboard_anual(request):
+    from .. import fatos
+    context = _get_filter_context(request)
+    ano = context['ano_anual_selecionado']
+    user = request.user
+
+    servicos = fatos.consulta(user, *_periodo(ano, 1, 12))
+
+    context['anual_faturamento'] = servicos.totais()['valor']
+
+    por_tipo = servicos.por_tipo()
+    # NÃO usar json.dumps() - o template faz isso com json_script
+    context['anual_pizza_labels'] = [x['tipo_servico__nome'] for x in por_tipo]
+    context['anual_pizza_data'] = [float(x['valor']) for x in por_tipo]
+
+    por_mes = servicos.por_mes()
+    labels, d_fat, d_cli, historico_metas = [], [], [], []
+    for i in range(1, 13):
+        labels.append(calendar.month_abbr[i].capitalize())
+        val = por_mes.get((ano, i), 0)
+        d_fat.append(float(val))
+        novos = Cliente.objects.visiveis_para(user).filter(data_cadastro__year=ano, data_cadastro__month=i)
+        d_cli.append(novos.count())
+
+        # Histórico de metas
+        meta_query = Meta.objects.visiveis_para(user).filter(ano=ano, mes=i)
+        valor_meta = meta_query.aggregate(total=Sum('valor'))['total'] or 0
+        status_meta = "Sem Meta"
+        if valor_meta > 0:
+            if val >= valor_meta: status_meta = "Atingida"
+            else: status_meta = "Não Atingida"
+        else:
+            valor_meta = None
+        historico_metas.append({
+            'mes_ano': calendar.month_abbr[i].capitalize(),
+            'faturamento': val,
+            'meta': valor_meta,
+            'status': status_meta
+        })
+
+    context.update({
+        'anual_bar_labels': labels,
+        'anual_faturamento_data': d_fat,
+        'anual_clientes_data': d_cli,
+        'historico_metas_anual': historico_metas
+    })
+
+    return render(request, 'app/partials/_dashboard_anual.html', context)
+
+
+@login_required
+@leitura_em_replica
+def get_dashboard_top_clientes(request):
+    from .. import fatos
+    context = _get_filter_context(request)
+    ano_mensal = context['ano_mensal_selecionado']
+    mes_mensal = context['mes_mensal_selecionado']
+    ano_trimestral = context['ano_trimestral_selecionado']
+    trimestre_trimestral = context['trimestre_trimestral_selecionado']
+    ano_anual = context['ano_anual_selecionado']
+
+    user = request.user
+
+    def top(inicio, fim):
+        por_cliente = [
+            {'cliente__razao_social': c['cliente__razao_social'], 'faturamento_total': c['valor'], 'num_servicos': c['quantidade']}
+            for c in fatos.consulta(user, inicio, fim).por_cliente()
+        ]
+        # por_cliente já vem ordenado por faturamento
+        return por_cliente[:5], sorted(por_cliente, key=lambda c: c['num_servicos'], reverse=True)[:5]
+
+    start_month = (trimestre_trimestral - 1) * 3 + 1
+    mensal_faturamento, mensal_servicos = top(*_periodo(ano_mensal, mes_mensal, mes_mensal))
+    trimestral_faturamento, trimestral_servicos = top(*_periodo(ano_trimestral, start_month, start_month + 2))
+    anual_faturamento, anual_servicos = top(*_periodo(ano_anual, 1, 12))
+
+    return render(request, 'app/partials/_dashboard_top_clientes.html', {
+        'top_clientes_mensal_faturamento': mensal_faturamento,
+        'top_clientes_mensal_servicos': mensal_servicos,
+        'top_clientes_trimestral_faturamento': trimestral_faturamento,
+        'top_clientes_trimestral_servicos': trimestral_servicos,
+        'top_clientes_anual_faturamento': anual_faturamento,
+        'top_clientes_anual_servicos': anual_servicos,
+    })
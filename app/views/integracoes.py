@@ -0,0 +1,64 @@
+""" Integrações externas (consulta de CNPJ na BrasilAPI). """
+import time
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+
+
+@login_required
+def consulta_cnpj_api(request, cnpj):
+    import requests
+
+    cnpj = ''.join(filter(str.isdigit, cnpj))
+    if len(cnpj) != 14:
+        return JsonResponse({'error': 'CNPJ deve ter 14 dÃ­gitos.'}, status=400)
+
+    url = f"https://brasilapi.com.br/api/cnpj/v1/{cnpj}"
+
+    # Tentativa com Retries manuais para lidar com a instabilidade da BrasilAPI
+    max_tentativas = 20 
+
+    for tentativa in range(1, max_tentativas + 1):
+        try:
+            response = requests.get(url, timeout=5)
+
+            if response.status_code == 200:
+                data = response.json()
+                endereco = f"{data.get('logradouro', '')}, {data.get('numero', '')} - {data.get('bairro', '')}, {data.get('municipio', '')}/{data.get('uf', '')}"
+                return JsonResponse({'razao_social': data.get('razao_social', ''), 'endereco': endereco})
+
+            if tentativa < max_tentativas:
+                time.sleep(1) 
+                continue
+
+        except requests.RequestException:
+            if tentativa < max_tentativas:
+                time.sleep(1)
+                continue
+            return JsonResponse({'error': 'Erro de comunicaÃ§Ã£o com a API.'}, status=500)
+
+    return JsonResponse({'error': 'CNPJ nÃ£o encontrado ou API instÃ¡vel apÃ³s vÃ¡rias tentativas.'}, status=404)
+
+
+@login_required
+def consulta_cnpj(request, cnpj):
+    """Consulta CNPJ na BrasilAPI."""
+    import requests
+    import time
+
+    clean_cnpj = ''.join(filter(str.isdigit, cnpj))
+    if len(clean_cnpj) != 14:
+        return JsonResponse({'error': 'CNPJ inválido'}, status=400)
+
+    try:
+        resp = requests.get(f'https://brasilapi.com.br/api/cnpj/v1/{clean_cnpj}', timeout=5)
+        if resp.status_code == 200:
+            data = resp.json()
+            endereco = f"{data.get('logradouro','')}, {data.get('numero','')} - {data.get('bairro','')}, {data.get('municipio','')}/{data.get('uf','')}"
+            return JsonResponse({
+                'razao_social': data.get('razao_social'),
+                'endereco': endereco
+            })
+    except:
+        pass
+    return JsonResponse({'error': 'CNPJ não encontrado'}, status=404)
@@ -0,0 +1,83 @@
+""" Metas mensais por cliente e o planejamento do ano em lote. """
+from datetime import date
+
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.urls import reverse_lazy
+from django.views.generic import CreateView, DeleteView, ListView, UpdateView
+
+from ..forms import MetaForm, PlanejamentoMetasForm
+from ..models import Meta
+from .mixins import GestaoRequiredMixin
+
+
+class MetaListView(LoginRequiredMixin, ListView):
+    model = Meta
+    template_name = 'app/meta_list.html'
+    context_object_name = 'metas'
+
+    def get_queryset(self):
+        try:
+            year_str = self.request.GET.get('year', str(date.today().year))
+            self.selected_year = int(year_str.replace('.', ''))
+        except (ValueError, TypeError):
+            self.selected_year = date.today().year
+
+        # Rep vê apenas metas dos seus clientes
+        queryset = Meta.objects.visiveis_para(self.request.user).filter(ano=self.selected_year) \
+            .select_related('cliente', 'cliente__cadastrado_por')
+
+        return queryset.order_by('-mes', 'cliente__razao_social')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        anos_com_metas = Meta.objects.values_list('ano', flat=True).distinct().order_by('-ano')
+        context['anos_disponiveis'] = list(anos_com_metas)
+        if self.selected_year not in context['anos_disponiveis']:
+             context['anos_disponiveis'].insert(0, self.selected_year)
+        context['selected_year'] = self.selected_year
+        return context
+
+
+class MetaCreateView(LoginRequiredMixin, GestaoRequiredMixin, CreateView):
+    model = Meta
+    form_class = MetaForm
+    template_name = 'app/meta_form.html'
+    success_url = reverse_lazy('app:meta-list')
+
+
+class MetaUpdateView(LoginRequiredMixin, GestaoRequiredMixin, UpdateView):
+    model = Meta
+    form_class = MetaForm
+    template_name = 'app/meta_form.html'
+    success_url = reverse_lazy('app:meta-list')
+
+
+class MetaDeleteView(LoginRequiredMixin, GestaoRequiredMixin, DeleteView):
+    model = Meta
+    template_name = 'app/meta_confirm_delete.html'
+    success_url = reverse_lazy('app:meta-list')
+
+
+@login_required
+def planejar_metas(request):
+    """
+    Planejamento do ano em lote: a meta anual é distribuída pelos meses conforme a
+    sazonalidade de cada cliente. "Pré-visualizar" só calcula; "Gravar" cria ou
+    atualiza as metas de uma vez (ver app/planejamento.py).
+    """
+    from .. import planejamento  # NumPy só quando alguém planeja
+
+    if not (request.user.is_staff or request.user.profile.tem_acesso_gestao):
+        return HttpResponse("Acesso Negado", status=403)
+
+    form = PlanejamentoMetasForm(request.POST or None, initial={'ano': date.today().year + 1})
+    context = {'form': form}
+    if request.method == 'POST' and form.is_valid():
+        plano = planejamento.planejar(**form.parametros())
+        context['previa'] = planejamento.resumo(plano)
+        if 'gravar' in request.POST:
+            context['gravadas'] = planejamento.gravar(plano)
+    return render(request, 'app/meta_planejamento.html', context)
@@ -0,0 +1,15 @@
+""" Mixins de permissão compartilhados pelas views de classe. """
+from django.contrib.auth.mixins import UserPassesTestMixin
+
+
+class GestaoRequiredMixin(UserPassesTestMixin):
+    def test_func(self):
+        user = self.request.user
+        return user.is_authenticated and (user.is_staff or user.profile.tem_acesso_gestao)
+
+
+class ClienteEditorMixin(UserPassesTestMixin):
+    def test_func(self):
+        user = self.request.user
+        if user.is_staff or user.profile.tem_acesso_gestao: return True
+        return self.get_object().cadastrado_por == user
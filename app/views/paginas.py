@@ -0,0 +1,43 @@
+""" Login, service worker do PWA e páginas estáticas. """
+from django.contrib.auth import login
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect, render
+
+from .. import pwa
+from ..forms import CustomAuthenticationForm
+
+
+def custom_login_view(request):
+    if request.method == 'POST':
+        form = CustomAuthenticationForm(request, data=request.POST)
+        if form.is_valid():
+            login(request, form.get_user())
+            return redirect('app:home')
+    else:
+        form = CustomAuthenticationForm()
+    return render(request, 'registration/login.html', {'form': form})
+
+
+def direitos_page(request):
+    return render(request, 'app/direitos.html')
+
+
+@login_required
+def direitos_view(request):
+    """Renderiza a página de Direitos e Propriedade."""
+    return render(request, 'app/direitos.html')
+
+
+def service_worker(request):
+    """ Service worker servido pela raiz, para controlar todo o site (ver app/pwa.py). """
+    resposta = render(request, 'service-worker.js', {'config': pwa.configuracao()}, content_type='application/javascript')
+    # O navegador precisa sempre conferir se há versão nova do script
+    resposta['Cache-Control'] = 'no-cache'
+    resposta['Service-Worker-Allowed'] = '/'
+    return resposta
+
+
+@login_required
+def api_documentation(request):
+    """Página de documentação da API."""
+    return render(request, 'app/api_documentation.html')
@@ -0,0 +1,301 @@
+""" Prospecção: Kanban do funil, etapas da negociação e o dashboard do funil. """
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .. import anexos
+from ..forms import AcaoProspeccaoForm, ClienteProspectForm, ProspeccaoEditForm, ProspeccaoForm
+from ..models import AcaoProspeccao, Prospeccao, ProspeccaoEtapa
+from ..replica import leitura_em_replica
+
+
+@login_required
+def prospeccao_view(request):
+    """
+    Exibe o quadro Kanban de Prospecção com filtros.
+    """
+    from django.db.models import Sum, Count
+
+    # Base da Query
+    qs = Prospeccao.objects.select_related('cliente', 'criado_por', 'tipo_servico').all()
+
+    # --- LÓGICA DE PERMISSÃO ---
+    # Se NÃO for Gestão (Comercial/Diretoria/Admin), vê apenas as suas
+    if not (request.user.is_staff or request.user.profile.tem_acesso_gestao):
+        qs = qs.filter(criado_por=request.user)
+
+    # --- LÓGICA DO FILTRO (CORREÇÃO AQUI) ---
+    representante_id = request.GET.get('representante_filtro')
+
+    # Tratar valores especiais do filtro
+    if representante_id == 'minhas':
+        qs = qs.filter(criado_por=request.user)
+        representante_id = 'minhas'  # Manter para o template
+    elif representante_id == 'todos':
+        representante_id = 'todos'  # NÃ£o filtra, mostra todos
+
+    # Se o usuário tem permissão de gestão e selecionou um filtro
+    # Se o usuario tem permissao de gestao e selecionou um ID numerico
+    if (request.user.is_staff or request.user.profile.tem_acesso_gestao) and representante_id and representante_id not in ['minhas', 'todos']:
+        qs = qs.filter(criado_por_id=representante_id)
+
+    # Separacao por Status (Colunas do Kanban)
+    # Separação por Status (Colunas do Kanban)
+    novas = qs.filter(status='NOVA').order_by('-data_criacao')
+    negociando = qs.filter(status='NEGOCIANDO').order_by('-data_inicio_negociacao')
+
+
+    # Para Finalizadas, separamos por tipo (ultimos 50 de cada para nao poluir)
+    finalizadas_fechado = qs.filter(status='FECHADO').order_by('-data_finalizacao')[:50]
+    finalizadas_desistencia = qs.filter(status='DESISTENCIA').order_by('-data_finalizacao')[:50]
+    finalizadas_perdida = qs.filter(status='PERDIDA').order_by('-data_finalizacao')[:50]
+    # Dados para o Dropdown de Filtro (Apenas usuários do setor comercial/representantes)
+    representantes = User.objects.filter(profile__setor='REPRESENTANTE', is_active=True)
+
+    # Totais para o cabeçalho (Resumo rápido)
+    total_em_negociacao = negociando.aggregate(Sum('valor_total'))['valor_total__sum'] or 0
+    count_em_negociacao = negociando.count()
+
+    context = {
+        'novas': novas,
+        'negociando': negociando,
+        'finalizadas_fechado': finalizadas_fechado,
+        'finalizadas_desistencia': finalizadas_desistencia,
+        'finalizadas_perdida': finalizadas_perdida,
+        'representantes': representantes,
+        'filtro_selecionado': representante_id,  # Para manter o select marcado
+        'total_em_negociacao': total_em_negociacao,
+        'count_em_negociacao': count_em_negociacao,
+    }
+    # Se for uma requisicao HTMX vinda do filtro, renderiza apenas o Kanban (sem o layout base)
+    if request.headers.get('HX-Request'):
+        return render(request, 'app/partials/_prospeccao_kanban_content.html', context)
+
+    return render(request, 'app/prospeccao.html', context)
+
+
+def _data(valor):
+    try:
+        return parse_date(valor or '')
+    except ValueError:  # formato certo, data inexistente (ex.: 2025-02-30)
+        return None
+
+
+@login_required
+@leitura_em_replica
+def dashboard_prospeccao(request):
+    """ Retorna o HTML do dashboard de prospecção para carregar via HTMX """
+    from .. import funil
+
+    # Filtros (período pela data de criação: as abertas também entram)
+    data_ini = _data(request.GET.get('data_inicial'))
+    data_fim = _data(request.GET.get('data_final'))
+    rep_id = request.GET.get('representante_id')
+    rep_id = int(rep_id) if rep_id and rep_id.isdigit() else None
+
+    indicadores = funil.funil(request.user, data_ini, data_fim, rep_id)
+    total = indicadores['total']
+    gestao = request.user.is_staff or request.user.profile.tem_acesso_gestao
+
+    context = {
+        'funil_labels': [rotulo for _, _, rotulo in funil.ETAPAS],
+        'funil_counts': [total[campo] for _, campo, _ in funil.ETAPAS],
+        'funil': total,
+        'coortes': indicadores['coortes'],
+        'taxa_conversao': total['taxa_conversao'],
+        'total_fechado_valor': total['valor_fechado'],
+        'ticket_medio': total['ticket_medio'],
+        'tempo_medio_dias': total['ciclo_medio_dias'] if total['ciclo_medio_dias'] is not None else '-',
+    }
+    if gestao:
+        context.update({
+            'representantes': User.objects.filter(profile__setor='REPRESENTANTE', is_active=True).order_by('username'),
+            'performance': indicadores['representantes'],
+            'performance_labels': [rep['nome'] for rep in indicadores['representantes']],
+            'performance_valores': [float(rep['valor_fechado']) for rep in indicadores['representantes']],
+        })
+
+    return render(request, 'app/partials/_dashboard_prospeccao_content.html', context)
+
+
+@login_required
+def criar_cliente_prospeccao_modal(request):
+    """Modal para criar um cliente (Prospect) rápido dentro da tela de prospecção."""
+    form = ClienteProspectForm(request.POST or None)
+    context = {'form': form}
+    return render(request, 'app/partials/_cliente_form_modal.html', context)
+
+
+@login_required
+def salvar_cliente_prospeccao(request):
+    if request.method == 'POST':
+        form = ClienteProspectForm(request.POST)
+        if form.is_valid():
+            # Salva na tabela ClienteProspect
+            cliente = form.save(commit=False)
+            cliente.cadastrado_por = request.user
+            cliente.save()
+
+            # Retorna o ProspeccaoForm com o novo prospect selecionado
+            prospeccao_form = ProspeccaoForm(user=request.user, initial={'cliente': cliente.id})
+            return render(request, 'app/partials/_prospeccao_form_modal.html', {'form': prospeccao_form})
+    return render(request, 'app/partials/_cliente_form_modal.html', {'form': form})
+
+
+@login_required
+def criar_prospeccao(request):
+    if request.method == 'POST':
+        form = ProspeccaoForm(request.POST, user=request.user)
+        if form.is_valid():
+            with transaction.atomic():
+                prospeccao = form.save(commit=False)
+                prospeccao.criado_por = request.user
+                prospeccao.save()
+                ProspeccaoEtapa.registrar(prospeccao, None, request.user, data=prospeccao.data_criacao)
+            # Retorna 204 com header para recarregar a pagina
+            response = HttpResponse(status=204)
+            response['HX-Trigger'] = 'closeModal'
+            return response
+    else:
+        form = ProspeccaoForm(user=request.user)
+
+    return render(request, 'app/partials/_prospeccao_form_modal.html', {'form': form})
+
+
+@login_required
+def detalhe_prospeccao(request, pk):
+    prospeccao = get_object_or_404(Prospeccao, pk=pk)
+
+    if not request.user.is_staff and not request.user.profile.tem_acesso_gestao and prospeccao.criado_por != request.user:
+        return HttpResponse("Acesso Negado", status=403)
+
+    acao_form = AcaoProspeccaoForm()
+
+    context = {
+        'prospeccao': prospeccao,
+        'acao_form': acao_form,
+    }
+    return render(request, 'app/partials/_detalhe_prospeccao_modal.html', context)
+    prospeccao = get_object_or_404(Prospeccao, pk=pk)
+
+
+@login_required
+def editar_prospeccao(request, pk):
+    prospeccao = get_object_or_404(Prospeccao, pk=pk)
+
+    if (not request.user.is_staff and not request.user.profile.tem_acesso_gestao and prospeccao.criado_por != request.user) or prospeccao.status not in ['NOVA', 'NEGOCIANDO']:
+        return HttpResponse(status=403)
+
+    if request.method == 'POST':
+        form = ProspeccaoEditForm(request.POST, instance=prospeccao)
+        if form.is_valid():
+
+            changes = []
+            if form.has_changed():
+                for field_name in form.changed_data:
+                    old_value = form.initial.get(field_name)
+                    new_value = form.cleaned_data.get(field_name)
+                    field_label = Prospeccao._meta.get_field(field_name).verbose_name
+                    changes.append(f'"{field_label}" alterado de "{old_value}" para "{new_value}".') 
+
+            updated_prospeccao = form.save()
+
+            if 'valor_total' in form.cleaned_data and prospeccao.valor_total != updated_prospeccao.valor_total:
+                 changes.append(f'"Valor Total Estimado" recalculado para "R$ {updated_prospeccao.valor_total}".') 
+
+            if changes:
+                descricao_acao = "Dados da prospeccao foram atualizados: " + " | ".join(changes)
+                AcaoProspeccao.objects.create(
+                    prospeccao=updated_prospeccao,
+                    descricao=descricao_acao,
+                    registrado_por=request.user
+                )
+
+            return HttpResponse(status=204, headers={'HX-Refresh': 'true'})
+    else:
+        form = ProspeccaoEditForm(instance=prospeccao)
+
+    return render(request, 'app/partials/_prospeccao_edit_form_modal.html', {
+        'form': form,
+        'prospeccao': prospeccao
+    })
+
+
+@login_required
+def iniciar_prospeccao(request, pk):
+    prospeccao = get_object_or_404(Prospeccao, pk=pk)
+    if request.method == 'POST':
+        with transaction.atomic():
+            prospeccao = Prospeccao.objects.select_for_update().get(pk=prospeccao.pk)
+            etapa_anterior = prospeccao.status
+            if etapa_anterior == 'NEGOCIANDO':
+                # Já iniciada (clique repetido ou outra aba): nada a registrar.
+                return HttpResponse(status=204, headers={'HX-Refresh': 'true'})
+            prospeccao.status = 'NEGOCIANDO'
+            prospeccao.iniciado_por = request.user
+            prospeccao.data_inicio_negociacao = timezone.now()
+            prospeccao.save()
+            ProspeccaoEtapa.registrar(prospeccao, etapa_anterior, request.user, data=prospeccao.data_inicio_negociacao)
+        return HttpResponse(status=204, headers={'HX-Refresh': 'true'})
+    return HttpResponse(status=405)
+
+    prospeccao = get_object_or_404(Prospeccao, pk=pk)
+    prospeccao.status = 'NEGOCIANDO'
+    prospeccao.iniciado_por = request.user
+    prospeccao.data_inicio_negociacao = timezone.now()
+    prospeccao.save()
+    return HttpResponse(status=204)
+
+
+@login_required
+def finalizar_prospeccao(request, pk):
+    prospeccao = get_object_or_404(Prospeccao, pk=pk)
+    novo_status = request.POST.get('status')
+
+    if novo_status in Prospeccao.ETAPAS_FINAIS:
+        etapa_anterior = prospeccao.status
+        with transaction.atomic():
+            prospeccao.status = novo_status
+            prospeccao.finalizado_por = request.user
+            prospeccao.data_finalizacao = timezone.now()
+            prospeccao.save()
+            ProspeccaoEtapa.registrar(prospeccao, etapa_anterior, request.user, data=prospeccao.data_finalizacao)
+
+    return HttpResponse(status=204)
+
+
+@login_required
+def gravar_acao_prospeccao(request, pk):
+    """Grava uma ação no histórico da prospecção."""
+    prospeccao = get_object_or_404(Prospeccao, pk=pk)
+
+    if request.method == 'POST':
+        form = AcaoProspeccaoForm(request.POST, request.FILES)
+        if form.is_valid():
+            acao = form.save(commit=False)
+            acao.prospeccao = prospeccao
+            acao.registrado_por = request.user
+            # Anexo enviado antes, em blocos (upload retomável)
+            if request.POST.get('upload_id'):
+                sessao = anexos.sessao_concluida(request.POST['upload_id'], request.user, prospeccao=prospeccao)
+                if sessao is None:
+                    return HttpResponse("Anexo não encontrado ou incompleto.", status=400)
+                anexos.anexar(acao, sessao)
+            acao.save()
+
+            # Atualiza status se for NOVA para NEGOCIANDO
+            if prospeccao.status == 'NOVA':
+                with transaction.atomic():
+                    prospeccao.status = 'NEGOCIANDO'
+                    prospeccao.iniciado_por = request.user
+                    prospeccao.data_inicio_negociacao = timezone.now()
+                    prospeccao.save()
+                    ProspeccaoEtapa.registrar(prospeccao, 'NOVA', request.user, data=prospeccao.data_inicio_negociacao)
+
+            return render(request, 'app/partials/_acoes_prospeccao_list.html', {'prospeccao': prospeccao})
+
+    return HttpResponse("Erro ao gravar ação", status=400)
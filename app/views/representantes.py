@@ -0,0 +1,143 @@
+""" Cadastro de representantes (usuários) e o modal de desempenho individual. """
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.models import User
+from django.db.models import Avg, Sum
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse_lazy
+from django.views.generic import CreateView, ListView, UpdateView
+
+from ..forms import ProfileForm, UserForm
+from ..models import Cliente, Meta, Prospeccao, ProspeccaoEtapa, Servico
+from ..replica import leitura_em_replica
+from .mixins import GestaoRequiredMixin
+
+
+class RepresentanteListView(LoginRequiredMixin, ListView):
+    model = User
+    template_name = 'app/representante_list.html'
+    context_object_name = 'representantes'
+
+    def get_queryset(self):
+        # Admin/Staff/Comercial veem todos. Rep vê só ele mesmo (ou nada, dependendo da regra, mas geralmente não acessa essa lista)
+        qs = User.objects.all().select_related('profile').order_by('first_name')
+        if self.request.user.profile.is_representante:
+             return qs.filter(pk=self.request.user.pk)
+        return qs
+
+
+class RepresentanteCreateView(LoginRequiredMixin, GestaoRequiredMixin, CreateView):
+    model = User
+    form_class = UserForm
+    template_name = 'app/representante_form.html'
+    success_url = reverse_lazy('app:representante-list')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.request.POST:
+            context['profile_form'] = ProfileForm(self.request.POST)
+        else:
+            context['profile_form'] = ProfileForm()
+        return context
+
+    def form_valid(self, form):
+        self.object = form.save()
+
+        # Se for via HTMX (modal), retorna 204 para fechar modal e recarregar
+        if self.request.htmx:
+            return HttpResponse(status=204)
+
+        # Se for form normal, faz redirect padrao
+        return super().form_valid(form)
+
+
+class RepresentanteUpdateView(LoginRequiredMixin, GestaoRequiredMixin, UpdateView):
+    model = User
+    form_class = UserForm
+    template_name = 'app/representante_form.html'
+    success_url = reverse_lazy('app:representante-list')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.request.POST:
+            context['profile_form'] = ProfileForm(self.request.POST, instance=self.object.profile)
+        else:
+            context['profile_form'] = ProfileForm(instance=self.object.profile)
+        return context
+
+    def form_valid(self, form):
+        self.object = form.save()
+
+        # Se for via HTMX (modal), retorna 204 para fechar modal e recarregar
+        if self.request.htmx:
+            return HttpResponse(status=204)
+
+        # Se for form normal, faz redirect padrao
+        return super().form_valid(form)
+
+
+@login_required
+@leitura_em_replica
+def detalhe_representante(request, pk):
+    representante = get_object_or_404(User, pk=pk)
+    user_logado = request.user
+
+    if user_logado.profile.is_representante and user_logado != representante:
+        return HttpResponse("Acesso Negado", status=403)
+
+    hoje = date.today()
+    servicos = Servico.objects.da_carteira(representante)
+
+    agregados = servicos.aggregate(total_valor=Sum('valor'), total_qtd=Sum('quantidade'))
+    total_valor_historico = agregados['total_valor'] or Decimal('0.00')
+    total_qtd_historico = agregados['total_qtd'] or 0
+    ticket_medio = total_valor_historico / total_qtd_historico if total_qtd_historico > 0 else Decimal('0.00')
+
+    vendas_mes_atual = servicos.filter(data_servico__year=hoje.year, data_servico__month=hoje.month)
+    total_vendas_valor = vendas_mes_atual.aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+    total_vendas_qtd = vendas_mes_atual.aggregate(total=Sum('quantidade'))['total'] or 0
+
+    # Meta do Mês (Somatório das metas dos clientes do representante)
+    total_meta_valor = Meta.objects.da_carteira(representante).filter(
+        ano=hoje.year, 
+        mes=hoje.month
+    ).aggregate(s=Sum('valor'))['s'] or Decimal('0.00')
+    meta_mes_atual = {'valor': total_meta_valor} if total_meta_valor > 0 else None
+
+    prospeccoes = Prospeccao.objects.filter(criado_por=representante)
+    prospeccoes_pendentes = prospeccoes.filter(status__in=['NOVA', 'NEGOCIANDO']).count()
+
+    finalizadas_hist = prospeccoes.filter(status__in=['FECHADO', 'DESISTENCIA', 'PERDIDA'])
+    fechadas_hist = finalizadas_hist.filter(status='FECHADO')
+    taxa_conversao_hist = (fechadas_hist.count() / finalizadas_hist.count() * 100) if finalizadas_hist.count() > 0 else 0
+
+    finalizadas_mes = finalizadas_hist.filter(data_finalizacao__year=hoje.year, data_finalizacao__month=hoje.month)
+    fechadas_mes = finalizadas_mes.filter(status='FECHADO')
+    taxa_conversao_mes = (fechadas_mes.count() / finalizadas_mes.count() * 100) if finalizadas_mes.count() > 0 else 0
+
+    # Ciclo de negociação: eventos de saída de NEGOCIANDO, direto no índice (representante, etapa, data)
+    tempo_negociacao = ProspeccaoEtapa.objects.filter(
+        representante=representante,
+        etapa__in=Prospeccao.ETAPAS_FINAIS,
+        etapa_anterior='NEGOCIANDO',
+    ).aggregate(media_tempo=Avg('duracao_anterior'))['media_tempo']
+    media_dias_negociacao = tempo_negociacao.days if tempo_negociacao else 0
+
+    context = {
+        'rep': representante,
+        'clientes_count': Cliente.objects.da_carteira(representante).count(),
+        'ticket_medio': ticket_medio,
+        'total_vendas_valor_mes': total_vendas_valor,
+        'total_vendas_qtd_mes': total_vendas_qtd,
+        'meta_mes_atual': meta_mes_atual,
+        'prospeccoes_pendentes': prospeccoes_pendentes,
+        'taxa_conversao_hist': taxa_conversao_hist,
+        'taxa_conversao_mes': taxa_conversao_mes,
+        'media_dias_negociacao': media_dias_negociacao,
+    }
+
+    return render(request, 'app/partials/_detalhe_representante_modal.html', context)
@@ -0,0 +1,369 @@
+""" Transportes realizados: acompanhamento mensal, cadastro, histórico e importação por planilha. """
+import calendar
+import json
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse_lazy
+from django.views.generic import CreateView, DeleteView, TemplateView, UpdateView
+
+from ..forms import ImportacaoServicoForm, ServicoForm
+from ..models import Cliente, Meta, Servico, TipoServico
+from .mixins import GestaoRequiredMixin
+
+
+class ServicoListView(LoginRequiredMixin, TemplateView):
+    template_name = 'app/servico_list.html'
+
+    def get_context_data(self, **kwargs):
+        from .. import projecao  # NumPy só nesta tela
+        context = super().get_context_data(**kwargs)
+        hoje = date.today()
+        user = self.request.user
+
+        qs_ultimo = Servico.objects.visiveis_para(user)
+        context['ultimo_lancamento'] = qs_ultimo.order_by('-data_registro').first()
+
+        mes_get = self.request.GET.get('mes')
+        try: mes = int(mes_get) if mes_get else hoje.month
+        except: mes = hoje.month
+
+        ano_get = self.request.GET.get('ano')
+        try: ano = int(ano_get) if ano_get else hoje.year
+        except: ano = hoje.year
+
+        context['mes_selecionado'] = mes
+        context['ano_selecionado'] = ano
+        context['meses_disponiveis'] = [(i, calendar.month_name[i].capitalize()) for i in range(1, 13)]
+        context['anos_disponiveis'] = list(range(hoje.year - 2, hoje.year + 3))
+
+        if user.profile.is_representante:
+            representantes = [user]
+        else:
+            representantes = User.objects.filter(is_active=True, profile__setor='REPRESENTANTE').order_by('first_name')
+
+        # Busca todas as metas do mês POR CLIENTE
+        metas_qs = Meta.objects.visiveis_para(user).filter(mes=mes, ano=ano)
+        metas_map = {m.cliente_id: m for m in metas_qs}
+
+        servicos_qs = Servico.objects.visiveis_para(user).filter(data_servico__year=ano, data_servico__month=mes)
+        servicos_map = defaultdict(list)
+        for s in servicos_qs:
+            servicos_map[s.cliente_id].append(s)
+
+        # Fechamento projetado de todos os clientes visíveis, calculado de uma vez
+        projecoes = projecao.projetar_mes(user, ano, mes, hoje)
+        context['dias_uteis_decorridos'] = projecoes.decorridos
+        context['dias_uteis_mes'] = projecoes.dias_uteis
+
+        lista_por_representante = []
+        context['sem_lancamentos'] = not servicos_qs.exists()
+
+        for rep in representantes:
+            clientes_rep = Cliente.objects.da_carteira(rep).order_by('razao_social')
+            dados_clientes = []
+            total_faturamento_rep = Decimal('0.00')
+            total_meta_rep = Decimal('0.00')
+
+            # Pega dias úteis da primeira meta encontrada (ou default 22)
+            dias_uteis_padrao = 22
+
+            for cliente in clientes_rep:
+                servicos_cliente = servicos_map.get(cliente.id, [])
+                total_viagens = sum(s.quantidade for s in servicos_cliente)
+                faturamento_bruto = sum(s.valor for s in servicos_cliente)
+
+                total_faturamento_rep += faturamento_bruto
+
+                # Busca meta do CLIENTE
+                meta_cliente_obj = metas_map.get(cliente.id)
+                meta_valor = meta_cliente_obj.valor if meta_cliente_obj else Decimal('0.00')
+                dias_uteis = meta_cliente_obj.dias_uteis if meta_cliente_obj else dias_uteis_padrao
+
+                # Soma para o total do representante
+                total_meta_rep += meta_valor
+
+                # Atualiza dias úteis padrão se encontrou meta
+                if meta_cliente_obj:
+                    dias_uteis_padrao = dias_uteis
+
+                # Cálculos de performance POR CLIENTE
+                tem_meta = meta_valor > 0
+                percentual_atingido = (faturamento_bruto / meta_valor * 100) if meta_valor > 0 else 0
+                valor_faltante = max(Decimal('0.00'), meta_valor - faturamento_bruto)
+                percentual_faltante = 100 - percentual_atingido if percentual_atingido < 100 else 0
+                meta_diaria = meta_valor / dias_uteis if dias_uteis > 0 else Decimal('0.00')
+
+                dados_clientes.append({
+                    'cliente': cliente, 
+                    'total_viagens': total_viagens, 
+                    'faturamento_bruto': faturamento_bruto,
+                    # Campos de meta por cliente
+                    'tem_meta': tem_meta,
+                    'meta': meta_cliente_obj,
+                    'meta_valor': meta_valor,
+                    'dias_uteis': dias_uteis,
+                    'percentual_atingido': percentual_atingido,
+                    'valor_faltante': valor_faltante,
+                    'percentual_faltante': percentual_faltante,
+                    'meta_diaria': meta_diaria,
+                    'projecao': projecoes.cliente(cliente.id),
+                })
+
+            if dados_clientes or rep == user:
+                # Cálculos de performance do REPRESENTANTE (somatório das metas dos clientes)
+                percentual_total_rep = (total_faturamento_rep / total_meta_rep * 100) if total_meta_rep > 0 else 0
+                valor_faltante_rep = max(Decimal('0.00'), total_meta_rep - total_faturamento_rep)
+                percentual_faltante_rep = 100 - percentual_total_rep if percentual_total_rep < 100 else 0
+                meta_diaria_rep = total_meta_rep / dias_uteis_padrao if dias_uteis_padrao > 0 else Decimal('0.00')
+
+                lista_por_representante.append({
+                    'representante': rep,
+                    'clientes': dados_clientes,
+                    'resumo': {
+                        'faturamento': total_faturamento_rep,
+                        'meta': total_meta_rep,
+                        'percentual': percentual_total_rep,
+                        'dias_uteis': dias_uteis_padrao,
+                        'valor_faltante': valor_faltante_rep,
+                        'percentual_faltante': percentual_faltante_rep,
+                        'meta_diaria': meta_diaria_rep,
+                        'projecao': projecoes.total(item['cliente'].id for item in dados_clientes),
+                    }
+                })
+
+        context['lista_por_representante'] = lista_por_representante
+        return context
+
+
+class ServicoCreateView(LoginRequiredMixin, GestaoRequiredMixin, CreateView):
+    model = Servico
+    form_class = ServicoForm
+    template_name = 'app/servico_form.html'
+    success_url = reverse_lazy('app:servico-list')
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        self.object = form.save()
+
+        # Se for via HTMX (modal), retorna 204 para fechar modal e recarregar
+        if self.request.htmx:
+            return HttpResponse(status=204)
+
+        # Se for form normal, faz redirect padrao
+        return super().form_valid(form)
+
+
+class ServicoUpdateView(LoginRequiredMixin, GestaoRequiredMixin, UpdateView):
+    model = Servico
+    form_class = ServicoForm
+    # Se for chamado via HTMX (modal), usa o template parcial, senão usa o form padrão
+    def get_template_names(self):
+        if self.request.htmx:
+            return ['app/partials/_servico_form_modal.html']
+        return ['app/servico_form.html']
+
+    def get_success_url(self):
+        # Nao usado quando via HTMX (retorna 204)
+        return reverse_lazy('app:servico-list')
+
+    def form_valid(self, form):
+        self.object = form.save()
+
+        # Se for via HTMX (modal), retorna 204 para fechar modal e recarregar
+        if self.request.htmx:
+            return HttpResponse(status=204)
+
+        # Se for form normal, faz redirect padrao
+        return super().form_valid(form)
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+
+class ServicoDeleteView(DeleteView):
+    model = Servico
+    template_name = 'app/servico_confirm_delete.html'
+    success_url = reverse_lazy('app:servico-list')
+
+    def form_valid(self, form):
+        self.object = form.save()
+
+        # Se for via HTMX (modal), retorna 204 para fechar modal e recarregar
+        if self.request.htmx:
+            return HttpResponse(status=204)
+
+        # Se for form normal, faz redirect padrao
+        return super().form_valid(form)
+
+
+@login_required
+def servico_historico_modal(request, cliente_id, mes, ano):
+    """ Modal HTMX para ver histórico de viagens de um cliente num mês específico """
+    cliente = get_object_or_404(Cliente.objects.visiveis_para(request.user), pk=cliente_id)
+
+    servicos = Servico.objects.visiveis_para(request.user).filter(
+        cliente=cliente,
+        data_servico__year=ano,
+        data_servico__month=mes
+    ).order_by('data_servico')
+
+    context = {
+        'cliente': cliente,
+        'servicos': servicos,
+        'mes': mes,
+        'ano': ano,
+        'nome_mes': calendar.month_name[mes].capitalize(),
+    }
+    return render(request, 'app/partials/_servico_historico_modal.html', context)
+
+
+@login_required
+def servico_update_modal(request, pk):
+    """
+    Exibe o formulário de edição de serviço dentro de um Modal e processa a atualização.
+    """
+    servico = get_object_or_404(Servico, pk=pk)
+
+    # Segurança: Apenas Gestão/Admin pode editar
+    if not (request.user.is_staff or request.user.profile.tem_acesso_gestao):
+        return HttpResponse("Acesso negado", status=403)
+
+    if request.method == 'POST':
+        form = ServicoForm(request.POST, instance=servico)
+        if form.is_valid():
+            servico_salvo = form.save()
+
+            # Após salvar com sucesso, chamamos a view do histórico novamente
+            # para recarregar a tabela atualizada no modal principal
+            return servico_historico_modal(
+                request, 
+                cliente_id=servico_salvo.cliente.id, 
+                mes=servico_salvo.data_servico.month, 
+                ano=servico_salvo.data_servico.year
+            )
+    else:
+        form = ServicoForm(instance=servico)
+
+    context = {
+        'form': form,
+        'servico': servico
+    }
+    return render(request, 'app/partials/_servico_form_modal.html', context)
+
+
+@login_required
+def importar_servicos(request):
+    """
+    Importação de serviços por planilha em duas etapas:
+    1) upload -> validação completa e pré-visualização dos erros por linha;
+    2) confirmação -> grava as linhas aceitas em lote.
+    O arquivo fica guardado temporariamente entre as duas etapas.
+    """
+    from .. import importacao
+
+    if not (request.user.is_staff or request.user.profile.tem_acesso_gestao):
+        return HttpResponse("Acesso Negado", status=403)
+
+    template = 'app/servico_import.html'
+    form = ImportacaoServicoForm(request.POST or None, request.FILES or None)
+    context = {'form': form}
+
+    if request.method != 'POST':
+        return render(request, template, context)
+
+    token = request.POST.get('token')
+    if token:
+        # Etapa 2: confirmação - a prévia sai na mesma transação que grava os
+        # serviços, então um segundo envio do formulário não importa de novo
+        with transaction.atomic():
+            previa = importacao.consumir_previa(token, request.user)
+            if previa is None:
+                return render(request, template, {
+                    'form': ImportacaoServicoForm(),
+                    'erro': "A pré-visualização expirou ou já foi importada. Envie a planilha novamente.",
+                })
+            with default_storage.open(previa.caminho, 'rb') as arquivo:
+                validado = importacao.validar_servicos(importacao.ler_planilha(arquivo, previa.caminho))
+            resumo = importacao.resumo_validacao(validado)
+            resumo['inseridos'] = importacao.importar_servicos(validado, request.user)
+        return render(request, template, {'form': ImportacaoServicoForm(), 'resultado': resumo})
+
+    # Etapa 1: upload e pré-visualização
+    if form.is_valid():
+        arquivo = form.cleaned_data['arquivo']
+        try:
+            validado = importacao.validar_servicos(importacao.ler_planilha(arquivo))
+        except importacao.PlanilhaInvalida as e:
+            form.add_error('arquivo', str(e))
+            return render(request, template, context)
+
+        previa = importacao.guardar_previa(arquivo, request.user)
+        context.update({
+            'previa': importacao.resumo_validacao(validado),
+            'token': previa.pk,
+            'nome_arquivo': arquivo.name,
+        })
+    return render(request, template, context)
+
+
+@login_required
+def add_tipo_servico_ajax(request):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            nome = data.get('nome')
+            if not nome:
+                return JsonResponse({'error': 'Nome não fornecido'}, status=400)
+
+            tipo, created = TipoServico.objects.get_or_create(nome=nome.upper())
+            return JsonResponse({'id': tipo.id, 'nome': tipo.nome})
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+    return JsonResponse({'error': 'Método inválido'}, status=405)
+
+
+@login_required
+def add_tipo_servico_api(request):
+    """
+    Endpoint API para adicionar um novo Tipo de Serviço via AJAX (Fetch API).
+    Usado no modal de 'Novo Serviço'.
+    """
+    import json
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            nome = data.get('nome', '').strip()
+
+            if not nome:
+                return JsonResponse({'error': 'O nome do serviço não pode ser vazio.'}, status=400)
+
+            # Verifica se já existe (ignorando maiúsculas/minúsculas)
+            if TipoServico.objects.filter(nome__iexact=nome).exists():
+                return JsonResponse({'error': 'Este tipo de serviço já está cadastrado.'}, status=400)
+
+            # Cria o novo tipo
+            novo_tipo = TipoServico.objects.create(nome=nome)
+
+            return JsonResponse({
+                'id': novo_tipo.id,
+                'nome': novo_tipo.nome
+            })
+
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+    return JsonResponse({'error': 'Método não permitido.'}, status=405)
@@ -0,0 +1,399 @@
+/*
+ * Service worker do CRM (servido em /service-worker.js, escopo /).
+ *
+ * Estratégias por rota:
+ *  - estáticos e CDNs: cache primeiro (caches versionados pelo hash do build);
+ *  - blocos HTMX do dashboard: stale-while-revalidate, um cache por URL/filtros;
+ *  - páginas: rede primeiro, com a última cópia de cada página para uso offline;
+ *  - escritas (POST) sem conexão: guardadas no IndexedDB e reenviadas pelo
+ *    Background Sync (ou quando a página avisa que a conexão voltou). Cada
+ *    escrita leva um X-Idempotency-Key, repetido no reenvio: se o primeiro
+ *    envio chegou ao servidor, ele não grava de novo (app/idempotencia.py).
+ *
+ * Também mantém no IndexedDB uma cópia dos clientes e serviços do representante,
+ * atualizada de forma incremental pelo /api/sync/.
+ */
+const CONFIG = {{ config|safe }};
+const VERSAO = CONFIG.versao;
+const CACHE_ESTATICOS = `estaticos-${VERSAO}`;
+const CACHE_PAGINAS = `paginas-${VERSAO}`;
+const CACHE_BLOCOS = `blocos-${VERSAO}`;
+const MAX_PAGINAS = 30;
+const MAX_BLOCOS = 60;
+const CDNS = ['cdn.jsdelivr.net', 'unpkg.com', 'cdnjs.cloudflare.com'];
+
+// --- IndexedDB ---
+
+const BANCO = 'crm-offline';
+const LOJA_ESTADO = 'estado';
+const LOJA_FILA = 'fila';
+
+function abrirBanco() {
+    return new Promise((resolve, reject) => {
+        const pedido = indexedDB.open(BANCO, 1);
+        pedido.onupgradeneeded = () => {
+            const db = pedido.result;
+            for (const nome of CONFIG.modelosOffline) {
+                if (!db.objectStoreNames.contains(nome)) db.createObjectStore(nome, { keyPath: 'id' });
+            }
+            if (!db.objectStoreNames.contains(LOJA_ESTADO)) db.createObjectStore(LOJA_ESTADO);
+            if (!db.objectStoreNames.contains(LOJA_FILA)) db.createObjectStore(LOJA_FILA, { keyPath: 'id', autoIncrement: true });
+        };
+        pedido.onsuccess = () => resolve(pedido.result);
+        pedido.onerror = () => reject(pedido.error);
+    });
+}
+
+// Executa `operacao(tx)` numa transação e resolve com o seu retorno quando ela termina
+async function transacao(lojas, modo, operacao) {
+    const db = await abrirBanco();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(lojas, modo);
+        let resultado;
+        tx.oncomplete = () => { db.close(); resolve(resultado); };
+        tx.onerror = tx.onabort = () => { db.close(); reject(tx.error); };
+        resultado = operacao(tx);
+    });
+}
+
+function ler(pedido) {
+    return new Promise((resolve) => { pedido.onsuccess = () => resolve(pedido.result); });
+}
+
+// --- Cópia local dos dados (/api/sync/) ---
+
+async function limparDados() {
+    await transacao([...CONFIG.modelosOffline, LOJA_ESTADO], 'readwrite', (tx) => {
+        for (const nome of CONFIG.modelosOffline) tx.objectStore(nome).clear();
+        tx.objectStore(LOJA_ESTADO).delete('token');
+    });
+}
+
+async function sincronizarDados(tentativa = 0) {
+    await conferencia;
+    const token = await transacao([LOJA_ESTADO], 'readonly', (tx) => ler(tx.objectStore(LOJA_ESTADO).get('token')));
+    const url = CONFIG.urlSync + (token ? '&desde=' + encodeURIComponent(token) : '');
+    const resposta = await fetch(url, { credentials: 'same-origin', headers: { Accept: 'application/json' } });
+
+    if (resposta.status === 410 && tentativa === 0) {
+        // Token antigo demais: recomeça do zero
+        await limparDados();
+        return sincronizarDados(1);
+    }
+    if (!resposta.ok) return;
+
+    const dados = await resposta.json();
+    await transacao([...CONFIG.modelosOffline, LOJA_ESTADO], 'readwrite', (tx) => {
+        for (const nome of CONFIG.modelosOffline) {
+            const loja = tx.objectStore(nome);
+            const alteracoes = dados.modelos[nome];
+            if (dados.completo) loja.clear();
+            alteracoes.atualizados.forEach((registro) => loja.put(registro));
+            alteracoes.excluidos.forEach((id) => loja.delete(id));
+        }
+        tx.objectStore(LOJA_ESTADO).put(dados.token, 'token');
+    });
+    // Resposta parcial: o token salvo continua de onde esta parou
+    if (dados.mais) await sincronizarDados(tentativa);
+}
+
+// --- Fila de escritas offline ---
+
+const CABECALHOS_FILA = ['accept', 'content-type', 'x-csrftoken', 'hx-request', 'hx-target', 'hx-trigger', 'hx-current-url'];
+const CABECALHO_CHAVE = 'X-Idempotency-Key';
+
+// Token CSRF da página aberta mais recente: o Django troca o token no login,
+// e os itens guardados antes de a sessão expirar levam o antigo
+let tokenCsrf = null;
+
+async function avisarPaginas(mensagem) {
+    const janelas = await self.clients.matchAll({ type: 'window' });
+    janelas.forEach((janela) => janela.postMessage(mensagem));
+}
+
+async function enfileirar(pedido, chave) {
+    const cabecalhos = {};
+    for (const nome of CABECALHOS_FILA) {
+        const valor = pedido.headers.get(nome);
+        if (valor) cabecalhos[nome] = valor;
+    }
+    const item = {
+        url: pedido.url,
+        metodo: pedido.method,
+        cabecalhos,
+        chave,
+        corpo: await pedido.arrayBuffer(),
+        criado_em: Date.now(),
+    };
+    await transacao([LOJA_FILA], 'readwrite', (tx) => tx.objectStore(LOJA_FILA).add(item));
+    if (self.registration.sync) {
+        await self.registration.sync.register('enviar-fila').catch(() => {});
+    }
+    const pendentes = await transacao([LOJA_FILA], 'readonly', (tx) => ler(tx.objectStore(LOJA_FILA).count()));
+    avisarPaginas({ tipo: 'fila', pendentes });
+}
+
+let envioEmAndamento = null;
+
+// Uma só passada pela fila de cada vez (ativação, mensagem e Background Sync podem coincidir)
+function enviarFila() {
+    if (!envioEmAndamento) {
+        envioEmAndamento = enviarItensDaFila().finally(() => { envioEmAndamento = null; });
+    }
+    return envioEmAndamento;
+}
+
+// Cabeçalhos e corpo do reenvio, com o token CSRF atual no lugar do guardado
+async function pedidoDoItem(item) {
+    const cabecalhos = { ...item.cabecalhos };
+    if (item.chave) cabecalhos[CABECALHO_CHAVE] = item.chave;
+    let corpo = item.corpo;
+    if (tokenCsrf) {
+        if (cabecalhos['x-csrftoken']) cabecalhos['x-csrftoken'] = tokenCsrf;
+        const tipo = cabecalhos['content-type'] || '';
+        if (tipo.startsWith('application/x-www-form-urlencoded')) {
+            const campos = new URLSearchParams(new TextDecoder().decode(corpo));
+            if (campos.has('csrfmiddlewaretoken')) {
+                campos.set('csrfmiddlewaretoken', tokenCsrf);
+                corpo = campos.toString();
+            }
+        } else if (tipo.startsWith('multipart/form-data')) {
+            const campos = await new Response(corpo, { headers: { 'content-type': tipo } }).formData();
+            if (campos.has('csrfmiddlewaretoken')) {
+                campos.set('csrfmiddlewaretoken', tokenCsrf);
+                corpo = campos;
+                delete cabecalhos['content-type'];  // novo boundary, definido pelo fetch
+            }
+        }
+    }
+    return { method: item.metodo, headers: cabecalhos, body: corpo, credentials: 'same-origin' };
+}
+
+async function enviarItensDaFila() {
+    await conferencia;
+    const itens = await transacao([LOJA_FILA], 'readonly', (tx) => ler(tx.objectStore(LOJA_FILA).getAll()));
+    if (!itens.length) return;
+
+    let enviados = 0;
+    let sessaoExpirada = false;
+    const recusados = [];
+    for (const item of itens) {
+        // Sem conexão o fetch lança e o resto da fila espera a próxima tentativa
+        const resposta = await fetch(item.url, await pedidoDoItem(item));
+        if (resposta.redirected && new URL(resposta.url).pathname === CONFIG.login) {
+            // Sessão expirada: nada foi gravado; a fila espera o próximo login
+            sessaoExpirada = true;
+            break;
+        }
+        if (resposta.headers.get('X-Idempotency-Status') === 'processando') {
+            continue;  // o primeiro envio ainda está em execução; confere de novo depois
+        }
+        await transacao([LOJA_FILA], 'readwrite', (tx) => tx.objectStore(LOJA_FILA).delete(item.id));
+        if (resposta.ok || resposta.redirected) {
+            enviados += 1;
+        } else {
+            // Recusada pelo servidor (validação, permissão): repetir não adianta
+            recusados.push({ url: item.url, status: resposta.status });
+        }
+    }
+    const pendentes = await transacao([LOJA_FILA], 'readonly', (tx) => ler(tx.objectStore(LOJA_FILA).count()));
+    avisarPaginas({ tipo: 'fila', pendentes, enviados, recusados, sessaoExpirada });
+    if (!sessaoExpirada) await sincronizarDados().catch(() => {});
+}
+
+function respostaEnfileirada(pedido) {
+    if (pedido.headers.get('hx-request')) {
+        // HTMX: não troca nada na tela; a página mostra o aviso pelo evento
+        return new Response('', {
+            status: 202,
+            headers: { 'HX-Reswap': 'none', 'HX-Trigger': 'offline-enfileirado' },
+        });
+    }
+    const html = '<!DOCTYPE html><html lang="pt-br"><head><meta charset="utf-8">'
+        + '<meta name="viewport" content="width=device-width, initial-scale=1"><title>Sem conexão</title></head>'
+        + '<body style="font-family: sans-serif; padding: 2rem;"><h1>Sem conexão</h1>'
+        + '<p>Os dados foram guardados e serão enviados automaticamente quando a conexão voltar.</p>'
+        + '<p><a href="javascript:history.back()">Voltar</a></p></body></html>';
+    return new Response(html, { status: 202, headers: { 'Content-Type': 'text/html; charset=utf-8' } });
+}
+
+// --- Caches ---
+
+async function limitarCache(nome, maximo) {
+    const cache = await caches.open(nome);
+    const chaves = await cache.keys();
+    await Promise.all(chaves.slice(0, Math.max(0, chaves.length - maximo)).map((chave) => cache.delete(chave)));
+}
+
+async function cachePrimeiro(pedido, nomeCache) {
+    const guardada = await caches.match(pedido, { cacheName: nomeCache });
+    if (guardada) return guardada;
+    const resposta = await fetch(pedido);
+    if (resposta.ok || resposta.type === 'opaque') {
+        const cache = await caches.open(nomeCache);
+        await cache.put(pedido, resposta.clone());
+    }
+    return resposta;
+}
+
+async function staleWhileRevalidate(evento, pedido) {
+    await conferencia;
+    const cache = await caches.open(CACHE_BLOCOS);
+    const guardada = await cache.match(pedido, { ignoreVary: true });
+    const atualizacao = fetch(pedido).then(async (resposta) => {
+        // Sessão expirada: o bloco vira a página de login, que não pode ficar no cache
+        if (resposta.ok && !resposta.redirected) {
+            await cache.put(pedido, resposta.clone());
+            await limitarCache(CACHE_BLOCOS, MAX_BLOCOS);
+        }
+        return resposta;
+    });
+    if (guardada) {
+        evento.waitUntil(atualizacao.catch(() => {}));
+        return guardada;
+    }
+    return atualizacao;
+}
+
+async function redePrimeiro(pedido) {
+    await conferencia;
+    try {
+        const resposta = await fetch(pedido);
+        if (resposta.ok && !resposta.redirected) {
+            const cache = await caches.open(CACHE_PAGINAS);
+            await cache.put(pedido, resposta.clone());
+            await limitarCache(CACHE_PAGINAS, MAX_PAGINAS);
+        }
+        return resposta;
+    } catch (erro) {
+        const guardada = (await caches.match(pedido, { cacheName: CACHE_PAGINAS, ignoreVary: true }))
+            || (await caches.match('/', { cacheName: CACHE_PAGINAS, ignoreVary: true }));
+        if (guardada) return guardada;
+        throw erro;
+    }
+}
+
+// Sai do usuário: nada da sessão dele fica no aparelho
+async function limparSessao() {
+    const nomes = await caches.keys();
+    await Promise.all(nomes.filter((nome) => !nome.startsWith('estaticos-')).map((nome) => caches.delete(nome)));
+    await limparDados();
+    await transacao([LOJA_ESTADO, LOJA_FILA], 'readwrite', (tx) => {
+        tx.objectStore(LOJA_ESTADO).delete('usuario');
+        tx.objectStore(LOJA_FILA).clear();
+    });
+}
+
+// --- Usuário do aparelho ---
+
+// Conferências em ordem; caches, dados e fila esperam a última antes de serem usados
+let conferencia = Promise.resolve();
+
+// As páginas informam o usuário logado. Se ele mudou sem passar pelo /logout/
+// (sessão expirada e outro login), o que era do anterior é apagado
+function conferirUsuario(usuario) {
+    if (usuario === undefined || usuario === null) return conferencia;
+    conferencia = conferencia.then(async () => {
+        const anterior = await transacao([LOJA_ESTADO], 'readonly', (tx) => ler(tx.objectStore(LOJA_ESTADO).get('usuario')));
+        if (anterior === usuario) return;
+        await limparSessao();
+        await transacao([LOJA_ESTADO], 'readwrite', (tx) => tx.objectStore(LOJA_ESTADO).put(usuario, 'usuario'));
+    }).catch(() => {});
+    return conferencia;
+}
+
+// --- Ciclo de vida ---
+
+self.addEventListener('install', (evento) => {
+    evento.waitUntil(caches.open(CACHE_ESTATICOS).then((cache) => cache.addAll(CONFIG.preCache)));
+    self.skipWaiting();
+});
+
+self.addEventListener('activate', (evento) => {
+    evento.waitUntil((async () => {
+        const nomes = await caches.keys();
+        await Promise.all(nomes.filter((nome) => !nome.endsWith(`-${VERSAO}`)).map((nome) => caches.delete(nome)));
+        await self.clients.claim();
+        await enviarFila().catch(() => {});
+    })());
+});
+
+self.addEventListener('fetch', (evento) => {
+    const pedido = evento.request;
+    const url = new URL(pedido.url);
+
+    if (url.origin !== self.location.origin) {
+        if (pedido.method === 'GET' && CDNS.includes(url.hostname)) {
+            evento.respondWith(cachePrimeiro(pedido, CACHE_ESTATICOS));
+        }
+        return;
+    }
+
+    if (url.pathname === CONFIG.logout) {
+        evento.waitUntil(limparSessao());
+        return;
+    }
+    if (CONFIG.somenteRede.some((prefixo) => url.pathname.startsWith(prefixo))) return;
+
+    if (pedido.method !== 'GET') {
+        evento.respondWith((async () => {
+            const chave = self.crypto.randomUUID();
+            const cabecalhos = new Headers(pedido.headers);
+            cabecalhos.set(CABECALHO_CHAVE, chave);
+            const copia = pedido.clone();
+            try {
+                return await fetch(new Request(pedido, { headers: cabecalhos }));
+            } catch (erro) {
+                await enfileirar(copia, chave);
+                return respostaEnfileirada(copia);
+            }
+        })());
+        return;
+    }
+
+    if (url.pathname.startsWith(CONFIG.prefixoEstaticos)) {
+        evento.respondWith(cachePrimeiro(pedido, CACHE_ESTATICOS));
+    } else if (CONFIG.blocos.includes(url.pathname)) {
+        evento.respondWith(staleWhileRevalidate(evento, pedido));
+    } else if (pedido.mode === 'navigate') {
+        evento.respondWith(redePrimeiro(pedido));
+    }
+});
+
+self.addEventListener('message', (evento) => {
+    const dados = evento.data || {};
+    if (dados.csrf) tokenCsrf = dados.csrf;
+    const conferido = conferirUsuario(dados.usuario);
+    if (dados.tipo === 'usuario') {
+        evento.waitUntil(conferido);
+    } else if (dados.tipo === 'sincronizar') {
+        evento.waitUntil(sincronizarDados().catch(() => {}));
+    } else if (dados.tipo === 'enviar-fila') {
+        evento.waitUntil(enviarFila().catch(() => {}));
+    }
+});
+
+self.addEventListener('sync', (evento) => {
+    if (evento.tag === 'enviar-fila') {
+        evento.waitUntil(enviarFila());
+    }
+});
+
+self.addEventListener('push', (event) => {
+    const options = {
+        body: event.data ? event.data.text() : 'Nova atualização disponível!',
+        icon: '/static/icons/icon-192x192.png',
+        badge: '/static/icons/icon-72x72.png',
+        vibrate: [200, 100, 200],
+        tag: 'crm-intalog-notification',
+        requireInteraction: true,
+    };
+    event.waitUntil(
+        self.registration.showNotification('CRM - INTALOG', options)
+    );
+});
+
+self.addEventListener('notificationclick', (event) => {
+    event.notification.close();
+    event.waitUntil(clients.openWindow('/'));
+});